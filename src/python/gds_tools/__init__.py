@@ -0,0 +1,26 @@
+###GDS streaming and inspection tools.
+
+
+from .gds_stream_writer import GdsStreamWriter, PlacementRecord
+from .component_snapshot import ComponentSnapshot, load_snapshot, save_snapshot
+from .gds_diff import DiffRegion, LayoutDiff, cell_hashes, check_against_golden, diff_gds
+from .gds_scanner import CellStats, GdsLibraryStats, LayerStats, ReferenceRecord, print_summary, scan_gds
+
+__all__ = [
+    'GdsStreamWriter',
+    'PlacementRecord',
+    'CellStats',
+    'GdsLibraryStats',
+    'LayerStats',
+    'ReferenceRecord',
+    'print_summary',
+    'scan_gds',
+    'DiffRegion',
+    'LayoutDiff',
+    'cell_hashes',
+    'check_against_golden',
+    'diff_gds',
+    'ComponentSnapshot',
+    'load_snapshot',
+    'save_snapshot',
+]
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+import gc
+import json
+import math
+import os
+import pickle
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import gdstk
+import numpy as np
+
+LayerKey = Tuple[int, int]  # (layer, datatype)
+
+SNAPSHOT_VERSION = 1
+
+# All tables live in one binary file, the manifest holds their dtype, shape and
+# offset so loading is a single memory map plus array views (no per-table header parsing)
+TABLES_FILE = "tables.bin"
+MANIFEST_FILE = "manifest.json"
+INFO_FILE = "info.pkl"
+TABLE_ALIGNMENT = 64
+
+# Polygons are stored sorted by (layer, datatype, cell), so each layer is one
+# contiguous slice of the point buffer
+POLYGON_DTYPE = np.dtype([("cell", "<i4"), ("layer", "<i2"), ("datatype", "<i2"),
+                          ("start", "<i8"), ("count", "<i4")])
+LAYER_DTYPE = np.dtype([("layer", "<i2"), ("datatype", "<i2"), ("polygon_start", "<i8"), ("polygon_count", "<i8"),
+                        ("point_start", "<i8"), ("point_count", "<i8")])
+# Ports, references and labels are grouped by owning cell, in the original order
+_CELL_FIELDS = [("port_start", "<i8"), ("port_count", "<i4"), ("reference_start", "<i8"), ("reference_count", "<i4"),
+                ("label_start", "<i8"), ("label_count", "<i4")]
+
+
+def _text_dtype(values: List[str]) -> str:
+    return f"S{max([len(v) for v in values] + [1])}"
+
+
+def _decode(value: bytes) -> str:
+    return value.decode("ascii")
+
+
+def _collect_cells(component) -> List:
+    """Unique components below component, children before parents."""
+    order, seen = [], set()
+    stack = [(component, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if id(current) in seen:
+            continue
+        if expanded:
+            seen.add(id(current))
+            order.append(current)
+            continue
+        stack.append((current, True))
+        stack.extend((ref.parent, False) for ref in reversed(current.references) if id(ref.parent) not in seen)
+    return order
+
+
+def save_snapshot(component, path: str) -> str:
+    """
+    Save a gdsfactory Component, its hierarchy and ports as a snapshot directory.
+
+    Polygons of all cells go into one float64 point buffer ordered by layer,
+    ports, references and labels into structured arrays and the hierarchy into
+    a cell index table. Paths are stored as their polygons. Component.info is
+    pickled per cell (e.g. glayout netlists), entries that cannot be pickled
+    are dropped with a warning.
+
+    Args:
+        component: Component to save
+        path: Snapshot directory, created if needed
+
+    Returns:
+        str: The snapshot directory
+    """
+    os.makedirs(path, exist_ok=True)
+    cells = _collect_cells(component)
+    index = {id(cell): i for i, cell in enumerate(cells)}
+
+    polygon_cells, polygon_layers, polygon_points = [], [], []
+    ports, references, labels, infos = [], [], [], {}
+    cell_rows = []
+    for i, cell in enumerate(cells):
+        polygons = list(cell.polygons)
+        for path_element in cell.paths:
+            polygons.extend(path_element.to_polygons())
+        for polygon in polygons:
+            polygon_cells.append(i)
+            polygon_layers.append((polygon.layer, polygon.datatype))
+            polygon_points.append(polygon.points)
+
+        row = [cell.name, len(ports), len(cell.ports), len(references), len(cell.references), len(labels), len(cell.labels)]
+        cell_rows.append(tuple(row))
+        for port in cell.ports.values():
+            layer = port.layer if port.layer is not None else (-1, -1)
+            orientation = np.nan if port.orientation is None else port.orientation
+            width = np.nan if port.width is None else port.width
+            shear_angle = np.nan if port.shear_angle is None else port.shear_angle
+            ports.append((i, port.name, port.center[0], port.center[1], width, orientation,
+                          layer[0], layer[1], port.port_type or "", shear_angle))
+        for ref in cell.references:
+            spacing = ref.spacing if ref.spacing is not None else (0.0, 0.0)
+            references.append((i, index[id(ref.parent)], ref.name or "", ref.origin[0], ref.origin[1], ref.rotation,
+                               ref.magnification, bool(ref.x_reflection), ref.columns, ref.rows,
+                               spacing[0], spacing[1]))
+        for label in cell.labels:
+            labels.append((i, label.text, label.origin[0], label.origin[1], label.layer, label.texttype))
+
+        info = {}
+        for key, value in (cell.info or {}).items():
+            try:
+                pickle.dumps(value)
+            except Exception as e:
+                warnings.warn(f"{cell.name}: info[{key!r}] not saved in snapshot ({e})")
+                continue
+            info[key] = value
+        if info:
+            infos[i] = info
+
+    # Polygon table sorted by (layer, datatype, cell), stable so the per-cell order is kept
+    layers_array = np.array(polygon_layers, dtype=np.int64).reshape(-1, 2)
+    cells_array = np.array(polygon_cells, dtype=np.int64)
+    order = np.lexsort((cells_array, layers_array[:, 1], layers_array[:, 0]))
+    counts = np.fromiter((len(polygon_points[k]) for k in order), dtype=np.int64, count=len(order))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+    points = (np.concatenate([polygon_points[k] for k in order]) if len(order)
+              else np.zeros((0, 2))).astype("<f8")
+    polygon_table = np.zeros(len(order), dtype=POLYGON_DTYPE)
+    polygon_table["cell"] = cells_array[order]
+    polygon_table["layer"] = layers_array[order, 0]
+    polygon_table["datatype"] = layers_array[order, 1]
+    polygon_table["start"] = starts
+    polygon_table["count"] = counts
+
+    layer_rows = []
+    if len(order):
+        keys = layers_array[order]
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        first = np.concatenate(([0], boundaries))
+        last = np.concatenate((boundaries, [len(order)]))
+        for a, b in zip(first.tolist(), last.tolist()):
+            layer_rows.append((keys[a, 0], keys[a, 1], a, b - a, starts[a], starts[b - 1] + counts[b - 1] - starts[a]))
+    layer_table = np.array(layer_rows, dtype=LAYER_DTYPE)
+
+    cell_dtype = np.dtype([("name", _text_dtype([row[0] for row in cell_rows]))] + _CELL_FIELDS)
+    port_dtype = np.dtype([("cell", "<i4"), ("name", _text_dtype([p[1] for p in ports])), ("x", "<f8"), ("y", "<f8"),
+                           ("width", "<f8"), ("orientation", "<f8"), ("layer", "<i2"), ("datatype", "<i2"),
+                           ("port_type", _text_dtype([p[8] for p in ports])), ("shear_angle", "<f8")])
+    reference_dtype = np.dtype([("parent", "<i4"), ("child", "<i4"), ("name", _text_dtype([r[2] for r in references])),
+                                ("x", "<f8"), ("y", "<f8"), ("rotation", "<f8"), ("magnification", "<f8"),
+                                ("x_reflection", "?"), ("columns", "<i4"), ("rows", "<i4"),
+                                ("spacing_x", "<f8"), ("spacing_y", "<f8")])
+    label_dtype = np.dtype([("cell", "<i4"), ("text", _text_dtype([l[1] for l in labels])), ("x", "<f8"), ("y", "<f8"),
+                            ("layer", "<i2"), ("texttype", "<i2")])
+
+    tables = {
+        "points": points,
+        "polygons": polygon_table,
+        "layers": layer_table,
+        "cells": np.array(cell_rows, dtype=cell_dtype),
+        "ports": np.array(ports, dtype=port_dtype),
+        "references": np.array(references, dtype=reference_dtype),
+        "labels": np.array(labels, dtype=label_dtype),
+    }
+    manifest = {"version": SNAPSHOT_VERSION, "top": len(cells) - 1, "tables": {}}
+    with open(os.path.join(path, TABLES_FILE), "wb") as f:
+        for name, table in tables.items():
+            f.write(b"\0" * (-f.tell() % TABLE_ALIGNMENT))
+            manifest["tables"][name] = {"offset": f.tell(), "shape": list(table.shape),
+                                        "dtype": table.dtype.descr if table.dtype.names else table.dtype.str}
+            f.write(np.ascontiguousarray(table).tobytes())
+    with open(os.path.join(path, INFO_FILE), "wb") as f:
+        pickle.dump(infos, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    return path
+
+
+def _manifest_dtype(descr) -> np.dtype:
+    if isinstance(descr, str):
+        return np.dtype(descr)
+    return np.dtype([tuple(field) for field in descr])
+
+
+class ComponentSnapshot:
+    """
+    Read access to a snapshot directory written by save_snapshot.
+
+    With mmap=True the point buffer is memory-mapped, polygon coordinates are
+    only read from disk when a layer or cell is actually accessed.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path}: unsupported snapshot version {self.meta.get('version')}")
+        self.path = path
+        filename = os.path.join(path, TABLES_FILE)
+        buffer = np.memmap(filename, dtype=np.uint8, mode="r") if mmap else np.fromfile(filename, dtype=np.uint8)
+        tables = {}
+        for name, entry in self.meta["tables"].items():
+            dtype = _manifest_dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            tables[name] = buffer[entry["offset"]:entry["offset"] + nbytes].view(dtype).reshape(shape)
+        self.points = tables["points"]
+        self.polygon_table = tables["polygons"]
+        self.layer_table = tables["layers"]
+        self.cells = tables["cells"]
+        self.port_table = tables["ports"]
+        self.reference_table = tables["references"]
+        self.label_table = tables["labels"]
+        self._info: Optional[Dict[int, dict]] = None
+        self._names = {_decode(name): i for i, name in enumerate(self.cells["name"])}
+
+    @property
+    def top(self) -> str:
+        return _decode(self.cells["name"][self.meta["top"]])
+
+    @property
+    def cell_names(self) -> List[str]:
+        return list(self._names)
+
+    @property
+    def layers(self) -> List[LayerKey]:
+        return [(int(row["layer"]), int(row["datatype"])) for row in self.layer_table]
+
+    def info(self, cell: Optional[str] = None) -> dict:
+        """Component.info of a cell, unpickled on first use"""
+        return self._info_of(self._cell_index(cell))
+
+    def _cell_index(self, cell: Optional[str]) -> int:
+        if cell is None:
+            return self.meta["top"]
+        try:
+            return self._names[cell]
+        except KeyError:
+            raise ValueError(f"Cell {cell} not in snapshot {self.path}") from None
+
+    def _rows(self, table: np.ndarray, cell: Optional[str], kind: str) -> np.ndarray:
+        return self._rows_of(table, self._cell_index(cell), kind)
+
+    def ports(self, cell: Optional[str] = None) -> np.ndarray:
+        """Structured port array (name, x, y, width, orientation, layer, datatype, port_type) of a cell"""
+        return self._rows(self.port_table, cell, "port")
+
+    def port(self, name: str, cell: Optional[str] = None) -> np.void:
+        ports = self.ports(cell)
+        match = np.flatnonzero(ports["name"] == name.encode("ascii"))
+        if not len(match):
+            raise KeyError(f"Port {name} not found")
+        return ports[match[0]]
+
+    def references(self, cell: Optional[str] = None) -> np.ndarray:
+        return self._rows(self.reference_table, cell, "reference")
+
+    def labels(self, cell: Optional[str] = None) -> np.ndarray:
+        return self._rows(self.label_table, cell, "label")
+
+    def layer_points(self, layer: LayerKey) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points and polygon table slice of one layer, across all cells.
+
+        Returns views, nothing is copied until the arrays are used.
+        """
+        match = np.flatnonzero((self.layer_table["layer"] == layer[0]) & (self.layer_table["datatype"] == layer[1]))
+        if not len(match):
+            return self.points[:0], self.polygon_table[:0]
+        row = self.layer_table[match[0]]
+        polygons = self.polygon_table[row["polygon_start"]:row["polygon_start"] + row["polygon_count"]]
+        points = self.points[row["point_start"]:row["point_start"] + row["point_count"]]
+        return points, polygons
+
+    def polygons(self, layer: LayerKey, cell: Optional[str] = None) -> List[np.ndarray]:
+        """Own polygons of a cell on one layer as (n, 2) views into the point buffer"""
+        _, table = self.layer_points(layer)
+        table = table[table["cell"] == self._cell_index(cell)]
+        return [self.points[start:start + count] for start, count in zip(table["start"].tolist(), table["count"].tolist())]
+
+    def to_component(self, cell: Optional[str] = None):
+        """
+        Rebuild a gdsfactory Component with its hierarchy, ports, labels and info.
+
+        Args:
+            cell: Cell to rebuild (default: the snapshot's top cell)
+
+        Returns:
+            Component: The rebuilt component
+        """
+        # Rebuilding allocates many small objects at once, collector passes over a
+        # large live heap (e.g. a glayout session) would dominate the load time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._build(self._cell_index(cell))
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _build(self, root: int):
+        from gdsfactory.component import Component
+
+        # Cells are stored children first, so the needed ones can be built in index order
+        needed = {root}
+        for i in range(root, -1, -1):
+            if i in needed:
+                needed.update(self.references_of(i)["child"].tolist())
+
+        polygon_cells = np.asarray(self.polygon_table["cell"])
+        by_cell = np.argsort(polygon_cells, kind="stable")
+        bounds = np.searchsorted(polygon_cells[by_cell], np.arange(len(self.cells) + 1))
+
+        components = {}
+        for i in sorted(needed):
+            row = self.cells[i]
+            name = _decode(row["name"])
+            component = Component(name)
+            # Keep the saved name, gdsfactory would strip '$' and add a suffix when the
+            # original component is still alive in this process
+            component._cell.name = name
+            rows = self.polygon_table[by_cell[bounds[i]:bounds[i + 1]]]
+            if len(rows):
+                first = int(rows["start"].min())
+                last = int((rows["start"] + rows["count"]).max())
+                points = np.asarray(self.points[first:last])  # one read per cell when memory-mapped
+                component.add([gdstk.Polygon(points[start - first:start - first + count], layer, datatype)
+                               for start, count, layer, datatype in zip(rows["start"].tolist(), rows["count"].tolist(),
+                                                                         rows["layer"].tolist(), rows["datatype"].tolist())])
+            for ref in self.references_of(i):
+                columns, rows_count = int(ref["columns"]), int(ref["rows"])
+                spacing = (float(ref["spacing_x"]), float(ref["spacing_y"])) if columns * rows_count > 1 else None
+                component.add(_new_reference(components[int(ref["child"])], origin=(float(ref["x"]), float(ref["y"])),
+                                             rotation=float(ref["rotation"]), magnification=float(ref["magnification"]),
+                                             x_reflection=bool(ref["x_reflection"]), columns=columns, rows=rows_count,
+                                             spacing=spacing, name=_decode(ref["name"]) or None))
+            _restore_ports(component, self._rows_of(self.port_table, i, "port"))
+            for _, text, x, y, layer, texttype in self._rows_of(self.label_table, i, "label").tolist():
+                component.add(gdstk.Label(_decode(text), (x, y), layer=layer, texttype=texttype))
+            component.info.update(self._info_of(i))
+            components[i] = component
+        return components[root]
+
+    def references_of(self, index: int) -> np.ndarray:
+        return self._rows_of(self.reference_table, index, "reference")
+
+    def _rows_of(self, table: np.ndarray, index: int, kind: str) -> np.ndarray:
+        row = self.cells[index]
+        start = int(row[f"{kind}_start"])
+        return table[start:start + int(row[f"{kind}_count"])]
+
+    def _info_of(self, index: int) -> dict:
+        if self._info is None:
+            with open(os.path.join(self.path, INFO_FILE), "rb") as f:
+                self._info = pickle.load(f)
+        return dict(self._info.get(index, {}))
+
+
+def _restore_ports(component, rows: np.ndarray) -> None:
+    """
+    Recreate ports from their table rows.
+
+    Port() snaps every center to the grid, which dominates the load time of
+    cells with thousands of ports. Stored centers are already on grid, so only
+    the first port goes through the constructor and the others are copies of it.
+    """
+    from gdsfactory.port import Port
+
+    if not len(rows):
+        return
+    names = np.char.decode(rows["name"], "ascii").tolist()
+    port_types = np.char.decode(rows["port_type"], "ascii").tolist()
+    template = None
+    for name, port_type, (_, _, x, y, width, orientation, layer, datatype, _, shear_angle) in zip(
+            names, port_types, rows.tolist()):
+        fields = {
+            "width": None if math.isnan(width) else width,
+            "orientation": None if math.isnan(orientation) else orientation,
+            "layer": None if layer < 0 else (layer, datatype),
+            "port_type": port_type or "optical",
+            "shear_angle": None if math.isnan(shear_angle) else shear_angle,
+        }
+        if template is None:
+            port = template = Port(name, center=(x, y), parent=component, **fields)
+        else:
+            port = Port.__new__(Port)
+            port.__dict__.update(template.__dict__, name=name, center=np.array((x, y)), info={}, **fields)
+        component.ports[name] = port
+
+
+def _new_reference(child, **kwargs):
+    """
+    ComponentReference whose local ports are cloned without Port().
+
+    ComponentReference copies every port of the child through the Port
+    constructor, cloning the (already snapped) ports directly keeps references
+    to cells with thousands of ports cheap.
+    """
+    from gdsfactory.component_reference import ComponentReference
+    from gdsfactory.port import Port
+
+    ports, child.ports = child.ports, {}
+    try:
+        reference = ComponentReference(child, **kwargs)
+    finally:
+        child.ports = ports
+    local_ports = {}
+    for name, port in ports.items():
+        clone = local_ports[name] = Port.__new__(Port)
+        clone.__dict__.update(port.__dict__, center=port.center.copy())
+    reference._local_ports = local_ports
+    return reference
+
+
+def load_snapshot(path: str, mmap: bool = True, cell: Optional[str] = None):
+    """
+    Load a Component saved with save_snapshot.
+
+    Args:
+        path: Snapshot directory
+        mmap: Memory-map the polygon buffers instead of reading them up front
+        cell: Cell to rebuild (default: the top cell)
+
+    Returns:
+        Component: The rebuilt component with ports and hierarchy
+    """
+    return ComponentSnapshot(path, mmap=mmap).to_component(cell)
@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import gdstk
+import numpy as np
+
+from . import gds_records as rec
+from .gds_scanner import _BOUNDARY_HEAD, _BOUNDARY_WORD, _DATATYPE_WORD, _ENDEL_WORD, _LAYER_WORD, _WORD, _XY_WORD
+from .gds_stream_writer import BBox, _merge_bbox
+
+LayerKey = Tuple[int, int]  # (layer, datatype)
+Transform = Tuple[float, bool, float, Tuple[float, float]]  # (magnification, x_reflection, rotation [rad], origin)
+
+# Below this many tiles the XOR runs in-process, a worker pool costs more than it saves
+MIN_PARALLEL_TILES = 8
+
+_RECORD_HEAD = struct.Struct(">HBB")
+
+
+@dataclass
+class DiffRegion:
+    """A connected area where the candidate layout differs from the golden one"""
+    layer: LayerKey
+    kind: str  # "added" (only in candidate) or "removed" (only in golden)
+    bbox: BBox
+    area: float
+    polygons: int = 1
+
+    def __str__(self) -> str:
+        x0, y0, x1, y1 = self.bbox
+        return (f"{self.layer[0]}/{self.layer[1]} {self.kind:<7} area {self.area:10.4f} um^2 "
+                f"at ({x0:.3f}, {y0:.3f}) - ({x1:.3f}, {y1:.3f})")
+
+
+@dataclass
+class LabelChange:
+    kind: str  # "added" or "removed"
+    text: str
+    layer: LayerKey
+    origin: Tuple[float, float]
+
+
+@dataclass
+class LayoutDiff:
+    """Result of a golden vs. candidate layout comparison"""
+    golden: str
+    candidate: str
+    golden_top: str
+    candidate_top: str
+    regions: List[DiffRegion] = field(default_factory=list)
+    label_changes: List[LabelChange] = field(default_factory=list)
+    pruned_instances: int = 0  # identical subtrees skipped through their hashes
+    compared_polygons: int = 0
+    tiles: int = 0
+
+    @property
+    def identical(self) -> bool:
+        return not self.regions and not self.label_changes
+
+    def area_by_layer(self) -> Dict[LayerKey, float]:
+        areas: Dict[LayerKey, float] = defaultdict(float)
+        for region in self.regions:
+            areas[region.layer] += region.area
+        return dict(areas)
+
+    def summary(self, max_regions: int = 20) -> str:
+        lines = [f"{self.candidate} ({self.candidate_top}) vs golden {self.golden} ({self.golden_top}): "
+                 + ("identical" if self.identical else
+                    f"{len(self.regions)} changed regions, {len(self.label_changes)} label changes"),
+                 f"  {self.pruned_instances} identical instances pruned, {self.compared_polygons} polygons "
+                 f"compared in {self.tiles} tiles"]
+        for region in self.regions[:max_regions]:
+            lines.append(f"  {region}")
+        if len(self.regions) > max_regions:
+            lines.append(f"  ... {len(self.regions) - max_regions} more regions")
+        for change in self.label_changes[:max_regions]:
+            lines.append(f"  label {change.kind:<7} '{change.text}' {change.layer[0]}/{change.layer[1]} "
+                         f"at ({change.origin[0]:.3f}, {change.origin[1]:.3f})")
+        return "\n".join(lines)
+
+
+def cell_hashes(filename: str) -> Dict[str, str]:
+    """
+    Content hash of every cell of a GDS file.
+
+    A cell hash covers the raw bytes of its element records with the BGNSTR
+    timestamps and the cell name left out, and each SNAME replaced by the hash
+    of the referenced cell. Equal hashes therefore mean equal subtrees even when
+    the cells were renamed (gdsfactory suffixes such as $1) or written at a
+    different time.
+    """
+    return _hash_file(filename)[0]
+
+
+def _hash_file(filename: str) -> Tuple[Dict[str, str], List[str]]:
+    """Cell hashes and top cell names of a GDS file"""
+    with open(filename, "rb") as f:
+        if f.seek(0, 2) == 0:
+            raise ValueError(f"{filename} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _cell_hashes(mm)
+
+
+def _cell_hashes(buf) -> Tuple[Dict[str, str], List[str]]:
+    # cell name -> list of byte chunks and child names, in record order
+    bodies: Dict[str, List[Union[bytes, Tuple[str]]]] = {}
+    units = b""
+    unpack_head = _RECORD_HEAD.unpack_from
+    unpack_boundary = _BOUNDARY_HEAD.unpack_from
+    unpack_word = _WORD.unpack_from
+    pos, end = 0, len(buf)
+    name: Optional[str] = None
+    body: List[Union[bytes, Tuple[str]]] = []
+    chunk_start = 0
+    while pos + 4 <= end:
+        length, rtype, _ = unpack_head(buf, pos)
+        if length < 4:
+            if length == 0:
+                break
+            raise ValueError(f"Corrupt record length {length} at offset {pos}")
+        if rtype == rec.BOUNDARY:
+            # Plain polygons carry no names, skip whole elements at once
+            start = pos
+            while pos + 20 <= end:
+                head = unpack_boundary(buf, pos)
+                if (head[0] != _BOUNDARY_WORD or head[1] != _LAYER_WORD or head[3] != _DATATYPE_WORD
+                        or head[5] & 0xFFFF != _XY_WORD):
+                    break
+                endel = pos + 16 + (head[5] >> 16)
+                if endel + 4 > end or unpack_word(buf, endel)[0] != _ENDEL_WORD:
+                    break
+                pos = endel + 4
+            if pos != start:
+                continue
+        if rtype == rec.UNITS:
+            units = bytes(buf[pos:pos + length])
+        elif rtype == rec.STRNAME:
+            name = bytes(buf[pos + 4:pos + length]).rstrip(b"\x00").decode("ascii", errors="replace")
+            body = [units]
+            chunk_start = pos + length
+        elif rtype == rec.SNAME and name is not None:
+            body.append(bytes(buf[chunk_start:pos]))
+            body.append((bytes(buf[pos + 4:pos + length]).rstrip(b"\x00").decode("ascii", errors="replace"),))
+            chunk_start = pos + length
+        elif rtype == rec.ENDSTR and name is not None:
+            body.append(bytes(buf[chunk_start:pos]))
+            bodies[name] = body
+            name = None
+        elif rtype == rec.ENDLIB:
+            break
+        pos += length
+
+    hashes: Dict[str, str] = {}
+    for root in bodies:
+        if root in hashes:
+            continue
+        # Post-order walk, (name, True) marks a cell whose children are all hashed
+        path = set()
+        stack = [(root, False)]
+        while stack:
+            current, children_done = stack.pop()
+            if current in hashes:
+                continue
+            if not children_done:
+                if current in path:
+                    raise ValueError(f"Cyclic reference through cell {current}")
+                path.add(current)
+                stack.append((current, True))
+                stack.extend((part[0], False) for part in bodies[current]
+                             if isinstance(part, tuple) and part[0] in bodies and part[0] not in hashes)
+                continue
+            digest = hashlib.blake2b(digest_size=16)
+            for part in bodies[current]:
+                if isinstance(part, tuple):
+                    # references to cells missing from the file hash by name
+                    digest.update(hashes.get(part[0], part[0]).encode())
+                else:
+                    digest.update(part)
+            hashes[current] = digest.hexdigest()
+            path.discard(current)
+    referenced = {part[0] for body in bodies.values() for part in body if isinstance(part, tuple)}
+    return hashes, [name for name in bodies if name not in referenced]
+
+
+def _top_name(hashes: Dict[str, str], tops: List[str], top: Optional[str], filename: str) -> str:
+    if top is not None:
+        if top not in hashes:
+            raise ValueError(f"Cell {top} not found in {filename}")
+        return top
+    if len(tops) != 1:
+        raise ValueError(f"{filename} has {len(tops)} top cells, pass the one to compare explicitly")
+    return tops[0]
+
+
+def _find_cell(library, name: str):
+    for cell in library.cells:
+        if cell.name == name:
+            return cell
+    raise ValueError(f"Cell {name} not found")
+
+
+def _transform_point(point: Tuple[float, float], transform: Transform) -> Tuple[float, float]:
+    magnification, x_reflection, rotation, (dx, dy) = transform
+    x, y = point[0] * magnification, point[1] * magnification
+    if x_reflection:
+        y = -y
+    c, s = math.cos(rotation), math.sin(rotation)
+    return (x * c - y * s + dx, x * s + y * c + dy)
+
+
+def _reference_transform(reference) -> Transform:
+    return (reference.magnification, bool(reference.x_reflection), reference.rotation, tuple(reference.origin))
+
+
+def _apply_chain(polygon, chain: Sequence[Transform]):
+    """Apply parent reference transforms, innermost first"""
+    for magnification, x_reflection, rotation, origin in reversed(chain):
+        polygon.transform(magnification, x_reflection, rotation, origin)
+    return polygon
+
+
+def _chain_points(points: np.ndarray, chain: Sequence[Transform]) -> np.ndarray:
+    """NumPy version of _apply_chain for an (n, 2) point array"""
+    for magnification, x_reflection, rotation, (dx, dy) in reversed(chain):
+        x, y = points[:, 0] * magnification, points[:, 1] * magnification
+        if x_reflection:
+            y = -y
+        c, s = math.cos(rotation), math.sin(rotation)
+        points = np.column_stack((x * c - y * s + dx, x * s + y * c + dy))
+    return points
+
+
+def _overlapping(bounds: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Mask of the (n, 4) bounds touching any of the (m, 4) boxes"""
+    mask = np.zeros(len(bounds), dtype=bool)
+    for x0, y0, x1, y1 in boxes:
+        mask |= (bounds[:, 0] <= x1) & (x0 <= bounds[:, 2]) & (bounds[:, 1] <= y1) & (y0 <= bounds[:, 3])
+    return mask
+
+
+def _chain_bbox(item, chain: Sequence[Transform]) -> Optional[BBox]:
+    """Bounding box of a cell or reference after the parent transforms"""
+    box = item.bounding_box()
+    if box is None:
+        return None
+    (x0, y0), (x1, y1) = box
+    corners = [(x0, y0), (x1, y0), (x0, y1), (x1, y1)]
+    for transform in reversed(chain):
+        corners = [_transform_point(corner, transform) for corner in corners]
+    xs, ys = zip(*corners)
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+class _Collector:
+    """Walks golden and candidate hierarchies in step and gathers the geometry that needs an XOR."""
+
+    def __init__(self, golden_hashes: Dict[str, str], candidate_hashes: Dict[str, str], grid: float):
+        self.hashes = (golden_hashes, candidate_hashes)
+        self.grid = grid
+        self.polygons: Tuple[Dict[LayerKey, List[np.ndarray]], ...] = (defaultdict(list), defaultdict(list))
+        self.labels: Tuple[Counter, Counter] = (Counter(), Counter())
+        # Golden side of every pruned subtree with its parent transforms, flattened
+        # later only where it overlaps a difference
+        self.common: List[Tuple[object, Tuple[Transform, ...]]] = []
+        self.pruned = 0
+        self._local: Dict[int, Tuple[List[np.ndarray], np.ndarray, List[LayerKey]]] = {}
+
+    def _cell_hash(self, side: int, cell) -> str:
+        name = cell if isinstance(cell, str) else cell.name
+        return self.hashes[side].get(name, name)
+
+    def _reference_key(self, side: int, reference) -> tuple:
+        """Placement signature of a reference, coordinates snapped to the database grid"""
+        grid = self.grid
+        repetition = reference.repetition
+        offsets = None
+        if repetition.size > 1:
+            offsets = tuple(int(round(c / grid)) for c in np.asarray(repetition.get_offsets()).ravel())
+        return (self._cell_hash(side, reference.cell),
+                int(round(reference.origin[0] / grid)), int(round(reference.origin[1] / grid)),
+                round(reference.rotation % (2 * math.pi), 9), round(reference.magnification, 12),
+                bool(reference.x_reflection), offsets)
+
+    def _add(self, side: int, polygons, labels, chain: Sequence[Transform]) -> None:
+        store = self.polygons[side]
+        for polygon in polygons:
+            _apply_chain(polygon, chain)
+            store[(polygon.layer, polygon.datatype)].append(polygon.points)
+        for label in labels:
+            origin = tuple(label.origin)
+            for transform in reversed(chain):
+                origin = _transform_point(origin, transform)
+            key = (label.text, (label.layer, label.texttype),
+                   int(round(origin[0] / self.grid)), int(round(origin[1] / self.grid)))
+            self.labels[side][key] += 1
+
+    def _local_polygons(self, cell) -> Tuple[List[np.ndarray], np.ndarray, List[LayerKey]]:
+        """Own polygons of a cell with their bounds, cached per cell"""
+        local = self._local.get(id(cell))
+        if local is None:
+            polygons = cell.get_polygons(depth=0)
+            points = [polygon.points for polygon in polygons]
+            local = self._local[id(cell)] = (points, _polygon_bounds(points),
+                                             [(polygon.layer, polygon.datatype) for polygon in polygons])
+        return local
+
+    def shared_geometry(self, boxes: np.ndarray, layers) -> Dict[LayerKey, List[np.ndarray]]:
+        """
+        Polygons of the pruned subtrees that touch the given boxes.
+
+        Descends the hierarchy instead of flattening whole instances, so an
+        edit next to a large identical array only pulls in its neighbourhood.
+        """
+        shared: Dict[LayerKey, List[np.ndarray]] = defaultdict(list)
+        stack = list(self.common)
+        while stack:
+            item, chain = stack.pop()
+            box = _chain_bbox(item, chain)
+            if box is None or not _overlapping(np.array([box]), boxes)[0]:
+                continue
+            if isinstance(item, gdstk.Reference):
+                if isinstance(item.cell, str):
+                    continue
+                offsets = item.repetition.get_offsets() if item.repetition.size > 1 else [(0.0, 0.0)]
+                for dx, dy in offsets:
+                    transform = (item.magnification, bool(item.x_reflection), item.rotation,
+                                 (item.origin[0] + dx, item.origin[1] + dy))
+                    stack.append((item.cell, chain + (transform,)))
+                continue
+            points, bounds, keys = self._local_polygons(item)
+            if points:
+                # Conservative global bounds from the transformed corners of the local ones
+                corners = np.vstack([bounds[:, [0, 1]], bounds[:, [2, 1]], bounds[:, [0, 3]], bounds[:, [2, 3]]])
+                corners = _chain_points(corners, chain).reshape(4, len(points), 2)
+                global_bounds = np.column_stack((corners[:, :, 0].min(0), corners[:, :, 1].min(0),
+                                                 corners[:, :, 0].max(0), corners[:, :, 1].max(0)))
+                for index in np.flatnonzero(_overlapping(global_bounds, boxes)).tolist():
+                    if keys[index] in layers:
+                        shared[keys[index]].append(_chain_points(points[index], chain))
+            stack.extend((reference, chain) for reference in item.references)
+        return shared
+
+    def collect(self, golden_cell, candidate_cell) -> None:
+        stack = [(golden_cell, candidate_cell, ())]
+        while stack:
+            golden, candidate, chain = stack.pop()
+            if self._cell_hash(0, golden) == self._cell_hash(1, candidate):
+                self.pruned += 1
+                self.common.append((golden, chain))
+                continue
+            for side, cell in enumerate((golden, candidate)):
+                self._add(side, cell.get_polygons(depth=0), cell.get_labels(depth=0), chain)
+
+            # References with the same child content and placement cancel out
+            keyed: Tuple[Dict[tuple, list], ...] = ({}, {})
+            for side, cell in enumerate((golden, candidate)):
+                for reference in cell.references:
+                    keyed[side].setdefault(self._reference_key(side, reference), []).append(reference)
+            # Unmatched references grouped by placement only, the child hash dropped
+            unmatched: Tuple[Dict[tuple, list], ...] = ({}, {})
+            for key in set(keyed[0]) | set(keyed[1]):
+                refs = (keyed[0].get(key, []), keyed[1].get(key, []))
+                common = min(len(refs[0]), len(refs[1]))
+                self.pruned += common * max(refs[0][0].repetition.size, 1) if common else 0
+                self.common.extend((reference, chain) for reference in refs[0][:common])
+                for side in (0, 1):
+                    for reference in refs[side][common:]:
+                        unmatched[side].setdefault(key[1:], []).append(reference)
+
+            for placement in set(unmatched[0]) | set(unmatched[1]):
+                refs = (unmatched[0].get(placement, []), unmatched[1].get(placement, []))
+                paired = (len(refs[0]) == len(refs[1]) == 1 and placement[-1] is None
+                          and not isinstance(refs[0][0].cell, str) and not isinstance(refs[1][0].cell, str))
+                if paired:
+                    # Same placement, different content: descend so that a change deep in the
+                    # hierarchy only pulls in the geometry along its own branch
+                    stack.append((refs[0][0].cell, refs[1][0].cell,
+                                  chain + (_reference_transform(refs[0][0]),)))
+                    continue
+                for side in (0, 1):
+                    for reference in refs[side]:
+                        self._add(side, reference.get_polygons(), reference.get_labels(), chain)
+
+
+def _polygon_bounds(points: List[np.ndarray]) -> np.ndarray:
+    """(n, 4) array of xmin, ymin, xmax, ymax per polygon"""
+    if not points:
+        return np.zeros((0, 4))
+    counts = np.fromiter((len(p) for p in points), dtype=np.int64, count=len(points))
+    flat = np.concatenate(points)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return np.column_stack((np.minimum.reduceat(flat[:, 0], starts), np.minimum.reduceat(flat[:, 1], starts),
+                            np.maximum.reduceat(flat[:, 0], starts), np.maximum.reduceat(flat[:, 1], starts)))
+
+
+def _tile_members(bounds: np.ndarray, origin: Tuple[float, float], tile_size: float,
+                  shape: Tuple[int, int]) -> Dict[int, List[int]]:
+    """Tile index -> polygons whose bounding box overlaps the tile"""
+    members: Dict[int, List[int]] = defaultdict(list)
+    if not len(bounds):
+        return members
+    nx, ny = shape
+    ix0 = np.clip(((bounds[:, 0] - origin[0]) // tile_size).astype(np.int64), 0, nx - 1)
+    iy0 = np.clip(((bounds[:, 1] - origin[1]) // tile_size).astype(np.int64), 0, ny - 1)
+    ix1 = np.clip(((bounds[:, 2] - origin[0]) // tile_size).astype(np.int64), 0, nx - 1)
+    iy1 = np.clip(((bounds[:, 3] - origin[1]) // tile_size).astype(np.int64), 0, ny - 1)
+    single = (ix0 == ix1) & (iy0 == iy1)
+    tile = iy0 * nx + ix0
+    order = np.flatnonzero(single)
+    order = order[np.argsort(tile[order], kind="stable")]
+    if len(order):
+        ids, starts = np.unique(tile[order], return_index=True)
+        for tile_id, group in zip(ids.tolist(), np.split(order, starts[1:])):
+            members[tile_id].extend(group.tolist())
+    for index in np.flatnonzero(~single).tolist():
+        for iy in range(iy0[index], iy1[index] + 1):
+            for ix in range(ix0[index], ix1[index] + 1):
+                members[iy * nx + ix].append(index)
+    return members
+
+
+def _same_polygons(golden: List[np.ndarray], candidate: List[np.ndarray]) -> bool:
+    """Exact multiset comparison of two polygon lists, order independent"""
+    if len(golden) != len(candidate):
+        return False
+    if sorted(len(p) for p in golden) != sorted(len(p) for p in candidate):
+        return False
+    key = lambda p: p.tobytes()
+    return all(np.array_equal(a, b) for a, b in zip(sorted(golden, key=key), sorted(candidate, key=key)))
+
+
+def _xor_tile(task) -> List[Tuple[str, BBox, float]]:
+    """Worker: golden/candidate difference of one layer inside one tile."""
+    (x0, y0, x1, y1), golden, candidate, precision = task
+    tile = gdstk.rectangle((x0, y0), (x1, y1))
+    golden = gdstk.boolean(golden, tile, "and", precision) if golden else []
+    candidate = gdstk.boolean(candidate, tile, "and", precision) if candidate else []
+    pieces = []
+    for kind, first, second in (("added", candidate, golden), ("removed", golden, candidate)):
+        if not first:
+            continue
+        for polygon in gdstk.boolean(first, second, "not", precision):
+            (px0, py0), (px1, py1) = polygon.bounding_box()
+            pieces.append((kind, (px0, py0, px1, py1), polygon.area()))
+    return pieces
+
+
+def _merge_regions(layer: LayerKey, kind: str, pieces: List[Tuple[BBox, float]], tolerance: float) -> List[DiffRegion]:
+    """Join pieces whose boxes touch, e.g. one change split across tile boundaries."""
+    parent = list(range(len(pieces)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    order = sorted(range(len(pieces)), key=lambda i: pieces[i][0][0])
+    active: List[int] = []
+    for i in order:
+        box = pieces[i][0]
+        active = [j for j in active if pieces[j][0][2] + tolerance >= box[0]]
+        for j in active:
+            other = pieces[j][0]
+            if other[1] <= box[3] + tolerance and box[1] <= other[3] + tolerance:
+                parent[find(i)] = find(j)
+        active.append(i)
+
+    groups: Dict[int, DiffRegion] = {}
+    for i, (box, area) in enumerate(pieces):
+        root = find(i)
+        region = groups.get(root)
+        if region is None:
+            groups[root] = DiffRegion(layer, kind, box, area)
+        else:
+            region.bbox = _merge_bbox(region.bbox, box)
+            region.area += area
+            region.polygons += 1
+    return list(groups.values())
+
+
+def diff_gds(golden: str, candidate: str, top: Optional[str] = None, candidate_top: Optional[str] = None,
+             tile_size: float = 50.0, processes: Optional[int] = None, min_area: float = 1e-6) -> LayoutDiff:
+    """
+    Geometric XOR of a candidate GDS against a golden one.
+
+    Cells are hashed first (see cell_hashes) and instances of identical subtrees
+    placed identically in both layouts are skipped without being flattened.
+    The remaining geometry is compared per layer on a grid of tiles, the tiles
+    holding differing polygons are XORed with gdstk in a process pool.
+
+    Args:
+        golden: Reference GDS file
+        candidate: GDS file to check
+        top: Top cell of the golden layout (default: its only top cell)
+        candidate_top: Top cell of the candidate (default: top if given, else its only top cell)
+        tile_size: Tile edge in um
+        processes: Worker processes for the XOR (default: CPU count, 1 runs in-process)
+        min_area: Differences smaller than this (um^2) are treated as numerical noise
+
+    Returns:
+        LayoutDiff: changed regions and labels
+    """
+    golden_hashes, golden_tops = _hash_file(golden)
+    candidate_hashes, candidate_tops = _hash_file(candidate)
+    golden_name = _top_name(golden_hashes, golden_tops, top, golden)
+    candidate_name = _top_name(candidate_hashes, candidate_tops, candidate_top or top, candidate)
+    if golden_hashes[golden_name] == candidate_hashes[candidate_name]:
+        return LayoutDiff(golden, candidate, golden_name, candidate_name, pruned_instances=1)
+
+    golden_lib = gdstk.read_gds(golden, unit=1e-6)
+    candidate_lib = gdstk.read_gds(candidate, unit=1e-6)
+    # Coarsest database grid of the two, in um
+    grid = max(golden_lib.precision, candidate_lib.precision) / 1e-6
+
+    collector = _Collector(golden_hashes, candidate_hashes, grid)
+    collector.collect(_find_cell(golden_lib, golden_name), _find_cell(candidate_lib, candidate_name))
+    result = LayoutDiff(golden, candidate, golden_name, candidate_name, pruned_instances=collector.pruned)
+
+    for side, kind in ((0, "removed"), (1, "added")):
+        extra = collector.labels[side] - collector.labels[1 - side]
+        for (text, layer, x, y), count in sorted(extra.items()):
+            result.label_changes.extend([LabelChange(kind, text, layer, (x * grid, y * grid))] * count)
+
+    tasks, task_layers = [], []
+    # layer -> (tile grid origin, grid shape, tile index -> task index)
+    dirty: Dict[LayerKey, Tuple[Tuple[float, float], Tuple[int, int], Dict[int, int]]] = {}
+    for layer in sorted(set(collector.polygons[0]) | set(collector.polygons[1])):
+        polygons = (collector.polygons[0].get(layer, []), collector.polygons[1].get(layer, []))
+        result.compared_polygons += len(polygons[0]) + len(polygons[1])
+        if _same_polygons(*polygons):
+            continue
+        bounds = (_polygon_bounds(polygons[0]), _polygon_bounds(polygons[1]))
+        all_bounds = np.vstack(bounds)
+        origin = (float(all_bounds[:, 0].min()), float(all_bounds[:, 1].min()))
+        shape = (max(int(math.ceil((all_bounds[:, 2].max() - origin[0]) / tile_size)), 1),
+                 max(int(math.ceil((all_bounds[:, 3].max() - origin[1]) / tile_size)), 1))
+        members = (_tile_members(bounds[0], origin, tile_size, shape),
+                   _tile_members(bounds[1], origin, tile_size, shape))
+        tile_tasks: Dict[int, int] = {}
+        dirty[layer] = (origin, shape, tile_tasks)
+        for tile_id in sorted(set(members[0]) | set(members[1])):
+            tile_polygons = ([polygons[0][i] for i in members[0].get(tile_id, [])],
+                             [polygons[1][i] for i in members[1].get(tile_id, [])])
+            if _same_polygons(*tile_polygons):
+                continue
+            iy, ix = divmod(tile_id, shape[0])
+            x0, y0 = origin[0] + ix * tile_size, origin[1] + iy * tile_size
+            tile_tasks[tile_id] = len(tasks)
+            tasks.append(((x0, y0, x0 + tile_size, y0 + tile_size), tile_polygons[0], tile_polygons[1], grid))
+            task_layers.append(layer)
+    result.tiles = len(tasks)
+
+    # Pruned geometry is identical on both sides but still takes part in the XOR where it
+    # overlaps a difference, e.g. a shape drawn over existing metal only adds the uncovered part
+    if tasks:
+        shared = collector.shared_geometry(np.array([task[0] for task in tasks]), dirty)
+        for layer, points in shared.items():
+            origin, shape, tile_tasks = dirty[layer]
+            for tile_id, indices in _tile_members(_polygon_bounds(points), origin, tile_size, shape).items():
+                if tile_id in tile_tasks:
+                    task = tasks[tile_tasks[tile_id]]
+                    task[1].extend(points[i] for i in indices)
+                    task[2].extend(points[i] for i in indices)
+
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(tasks) >= MIN_PARALLEL_TILES:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            outputs = list(pool.map(_xor_tile, tasks, chunksize=max(len(tasks) // (4 * processes), 1)))
+    else:
+        outputs = [_xor_tile(task) for task in tasks]
+
+    pieces: Dict[Tuple[LayerKey, str], List[Tuple[BBox, float]]] = defaultdict(list)
+    for layer, output in zip(task_layers, outputs):
+        for kind, box, area in output:
+            pieces[(layer, kind)].append((box, area))
+    for (layer, kind), layer_pieces in sorted(pieces.items()):
+        regions = _merge_regions(layer, kind, layer_pieces, grid)
+        result.regions.extend(region for region in regions if region.area >= min_area)
+    result.regions.sort(key=lambda region: (region.layer, region.kind, region.bbox))
+    return result
+
+
+def check_against_golden(layout, golden: str, top: Optional[str] = None, **kwargs) -> LayoutDiff:
+    """
+    Compare a regenerated layout with a checked-in golden GDS.
+
+    Args:
+        layout: GDS filename, or a gdsfactory Component which is written to a temporary file
+        golden: Golden GDS file, e.g. lvs/gds/Gilbert_cell_interdigited.gds
+        top: Top cell of the golden layout
+        **kwargs: Forwarded to diff_gds
+
+    Returns:
+        LayoutDiff: changed regions and labels
+    """
+    if isinstance(layout, (str, os.PathLike)):
+        return diff_gds(golden, os.fspath(layout), top=top, **kwargs)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "candidate.gds")
+        layout.write_gds(filename)
+        return diff_gds(golden, filename, top=top, **kwargs)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Geometric XOR of a GDS layout against a golden file")
+    parser.add_argument("golden", help="golden GDS file")
+    parser.add_argument("candidate", help="GDS file to check")
+    parser.add_argument("--top", help="top cell of the golden layout")
+    parser.add_argument("--candidate-top", help="top cell of the candidate layout")
+    parser.add_argument("--tile-size", type=float, default=50.0, help="XOR tile edge in um")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes")
+    parser.add_argument("--max-regions", type=int, default=20, help="regions listed in the report")
+    args = parser.parse_args(argv)
+
+    result = diff_gds(args.golden, args.candidate, top=args.top, candidate_top=args.candidate_top,
+                      tile_size=args.tile_size, processes=args.processes)
+    print(result.summary(max_regions=args.max_regions))
+    return 0 if result.identical else 1
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import math
+import struct
+import time
+from typing import Iterable, Optional, Sequence
+
+# GDSII record types (upper byte of the record type/data type word)
+HEADER = 0x00
+BGNLIB = 0x01
+LIBNAME = 0x02
+UNITS = 0x03
+ENDLIB = 0x04
+BGNSTR = 0x05
+STRNAME = 0x06
+ENDSTR = 0x07
+BOUNDARY = 0x08
+PATH = 0x09
+SREF = 0x0A
+AREF = 0x0B
+TEXT = 0x0C
+LAYER = 0x0D
+DATATYPE = 0x0E
+WIDTH = 0x0F
+XY = 0x10
+ENDEL = 0x11
+SNAME = 0x12
+COLROW = 0x13
+NODE = 0x15
+TEXTTYPE = 0x16
+PRESENTATION = 0x17
+STRING = 0x19
+STRANS = 0x1A
+MAG = 0x1B
+ANGLE = 0x1C
+PATHTYPE = 0x21
+BOX = 0x2D
+BOXTYPE = 0x2E
+
+# GDSII data types (lower byte of the record type/data type word)
+NO_DATA = 0x00
+BIT_ARRAY = 0x01
+INT2 = 0x02
+INT4 = 0x03
+REAL8 = 0x05
+ASCII = 0x06
+
+# STRANS flag for reflection about the x axis (applied before rotation)
+STRANS_REFLECTION = 0x8000
+
+# A record length is stored in 16 bits, so one XY record holds at most 8191 points
+MAX_XY_POINTS = (0xFFFF - 4) // 8
+
+
+def encode_real8(value: float) -> bytes:
+    """Encode a float into the GDSII excess-64, base-16 8-byte real format."""
+    if value == 0:
+        return b"\x00" * 8
+    sign = 0x80 if value < 0 else 0x00
+    value = abs(value)
+    exponent = int(math.floor(math.log(value, 16))) + 1
+    mantissa = value / 16.0 ** exponent
+    # log() rounding can leave the mantissa just outside [1/16, 1)
+    while mantissa >= 1.0:
+        mantissa /= 16.0
+        exponent += 1
+    while mantissa < 1.0 / 16.0:
+        mantissa *= 16.0
+        exponent -= 1
+    mantissa_int = int(round(mantissa * (1 << 56)))
+    if mantissa_int >= (1 << 56):
+        mantissa_int >>= 4
+        exponent += 1
+    return struct.pack(">Q", ((sign | (exponent + 64)) << 56) | mantissa_int)
+
+
+def decode_real8(data: bytes, offset: int = 0) -> float:
+    """Decode a GDSII 8-byte real starting at offset."""
+    (word,) = struct.unpack_from(">Q", data, offset)
+    if word & 0x00FFFFFFFFFFFFFF == 0:
+        return 0.0
+    sign = -1.0 if word >> 63 else 1.0
+    exponent = ((word >> 56) & 0x7F) - 64
+    mantissa = (word & 0x00FFFFFFFFFFFFFF) / float(1 << 56)
+    return sign * mantissa * 16.0 ** exponent
+
+
+def pack_record(record_type: int, data_type: int, payload: bytes = b"") -> bytes:
+    """Pack a single GDSII record (4 byte header + payload)."""
+    if len(payload) % 2:
+        payload += b"\x00"
+    length = 4 + len(payload)
+    if length > 0xFFFF:
+        raise ValueError(f"GDS record 0x{record_type:02X} too long ({length} bytes)")
+    return struct.pack(">HBB", length, record_type, data_type) + payload
+
+
+def pack_int2(record_type: int, values: Iterable[int]) -> bytes:
+    values = list(values)
+    return pack_record(record_type, INT2, struct.pack(f">{len(values)}h", *values))
+
+
+def pack_int4(record_type: int, values: Sequence[int]) -> bytes:
+    return pack_record(record_type, INT4, struct.pack(f">{len(values)}i", *values))
+
+
+def pack_real8(record_type: int, values: Iterable[float]) -> bytes:
+    return pack_record(record_type, REAL8, b"".join(encode_real8(v) for v in values))
+
+
+def pack_ascii(record_type: int, text: str) -> bytes:
+    return pack_record(record_type, ASCII, text.encode("ascii", errors="replace"))
+
+
+def pack_timestamp(record_type: int, timestamp: Optional[float] = None) -> bytes:
+    """BGNLIB/BGNSTR record carrying modification and access dates."""
+    t = time.localtime(timestamp if timestamp is not None else time.time())
+    date = [t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec]
+    return pack_int2(record_type, date + date)
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+
+import mmap
+import struct
+import traceback
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import gds_records as rec
+from .gds_stream_writer import BBox, _merge_bbox, _transform_bbox
+
+LayerKey = Tuple[int, int]  # (layer, datatype)
+
+# Number of polygons whose coordinates are gathered and reduced at once.
+# Bounds the working memory of a scan independently of the file size.
+POLYGON_CHUNK = 1 << 18
+
+# Fast path for a BOUNDARY element: BOUNDARY, LAYER, DATATYPE and the XY header in one unpack,
+# each record header (length + record type + data type) is read as a single 32 bit word
+_BOUNDARY_HEAD = struct.Struct(">IIhIhI")
+_WORD = struct.Struct(">I")
+_RECORD_HEAD = struct.Struct(">HBB")
+_BOUNDARY_WORD = (4 << 16) | (rec.BOUNDARY << 8) | rec.NO_DATA
+_LAYER_WORD = (6 << 16) | (rec.LAYER << 8) | rec.INT2
+_DATATYPE_WORD = (6 << 16) | (rec.DATATYPE << 8) | rec.INT2
+_XY_WORD = (rec.XY << 8) | rec.INT4
+_ENDEL_WORD = (4 << 16) | (rec.ENDEL << 8) | rec.NO_DATA
+
+
+@dataclass
+class LayerStats:
+    """Polygon statistics of one layer, areas in user units squared (um^2)"""
+    polygons: int = 0
+    area: float = 0.0
+    bbox: Optional[BBox] = None
+    paths: int = 0
+    labels: int = 0
+
+    def merge(self, other: "LayerStats", multiplicity: int = 1, bbox: Optional[BBox] = None) -> None:
+        self.polygons += multiplicity * other.polygons
+        self.area += multiplicity * other.area
+        self.paths += multiplicity * other.paths
+        self.labels += multiplicity * other.labels
+        self.bbox = _merge_bbox(self.bbox, bbox if bbox is not None else other.bbox)
+
+
+@dataclass
+class ReferenceRecord:
+    """One SREF/AREF of a cell, coordinates in user units"""
+    cell_name: str
+    origin: Tuple[float, float]
+    rotation: float = 0.0
+    x_reflection: bool = False
+    magnification: float = 1.0
+    columns: int = 1
+    rows: int = 1
+    column_step: Tuple[float, float] = (0.0, 0.0)
+    row_step: Tuple[float, float] = (0.0, 0.0)
+
+    @property
+    def instances(self) -> int:
+        return self.columns * self.rows
+
+
+@dataclass
+class CellStats:
+    """Per-cell statistics gathered without building polygon objects"""
+    name: str
+    layers: Dict[LayerKey, LayerStats] = field(default_factory=dict)
+    references: List[ReferenceRecord] = field(default_factory=list)
+
+    def layer(self, key: LayerKey) -> LayerStats:
+        stats = self.layers.get(key)
+        if stats is None:
+            stats = self.layers[key] = LayerStats()
+        return stats
+
+    @property
+    def children(self) -> Dict[str, int]:
+        """Child cell name -> number of placed instances"""
+        counts: Dict[str, int] = {}
+        for ref in self.references:
+            counts[ref.cell_name] = counts.get(ref.cell_name, 0) + ref.instances
+        return counts
+
+    @property
+    def bbox(self) -> Optional[BBox]:
+        """Bounding box of the cell's own geometry (children excluded)"""
+        bbox = None
+        for stats in self.layers.values():
+            bbox = _merge_bbox(bbox, stats.bbox)
+        return bbox
+
+
+@dataclass
+class GdsLibraryStats:
+    """Result of a GDS scan"""
+    filename: str
+    libname: str
+    unit: float
+    precision: float
+    cells: Dict[str, CellStats]
+    file_size: int
+
+    @property
+    def top_cells(self) -> List[str]:
+        referenced = {ref.cell_name for cell in self.cells.values() for ref in cell.references}
+        return [name for name in self.cells if name not in referenced]
+
+    def hierarchy(self, cell_name: Optional[str] = None) -> Iterator[Tuple[int, str, int]]:
+        """Depth-first walk yielding (depth, cell name, instances in parent)."""
+        roots = [cell_name] if cell_name else self.top_cells
+        stack = [(0, name, 1) for name in reversed(roots)]
+        while stack:
+            depth, name, count = stack.pop()
+            yield depth, name, count
+            cell = self.cells.get(name)
+            if cell is None:
+                continue
+            for child, child_count in reversed(list(cell.children.items())):
+                stack.append((depth + 1, child, child_count))
+
+    def flat_layer_stats(self, cell_name: str) -> Dict[LayerKey, LayerStats]:
+        """
+        Per-layer statistics of a cell with its whole hierarchy expanded.
+
+        Counts and areas are multiplied by instance counts, the area is the drawn
+        area (overlaps between polygons are not merged). Bounding boxes account
+        for each reference transform.
+        """
+        memo: Dict[str, Dict[LayerKey, LayerStats]] = {}
+        # Post-order over the hierarchy so children are expanded before parents
+        order: List[str] = []
+        visiting = set()
+        stack = [(cell_name, False)]
+        while stack:
+            name, expanded = stack.pop()
+            if name in memo or (not expanded and name in visiting):
+                continue
+            if expanded:
+                order.append(name)
+                memo[name] = {}
+                continue
+            visiting.add(name)
+            stack.append((name, True))
+            cell = self.cells.get(name)
+            if cell is not None:
+                for child in cell.children:
+                    if child not in memo:
+                        stack.append((child, False))
+
+        for name in order:
+            cell = self.cells.get(name)
+            flat = memo[name]
+            if cell is None:
+                continue
+            for key, stats in cell.layers.items():
+                flat.setdefault(key, LayerStats()).merge(stats)
+            for ref in cell.references:
+                for key, stats in memo.get(ref.cell_name, {}).items():
+                    flat.setdefault(key, LayerStats()).merge(stats, ref.instances, _reference_bbox(stats.bbox, ref))
+        return memo[cell_name]
+
+    def flat_bbox(self, cell_name: str) -> Optional[BBox]:
+        bbox = None
+        for stats in self.flat_layer_stats(cell_name).values():
+            bbox = _merge_bbox(bbox, stats.bbox)
+        return bbox
+
+
+def _reference_bbox(bbox: Optional[BBox], ref: ReferenceRecord) -> Optional[BBox]:
+    if bbox is None:
+        return None
+    first = _transform_bbox(bbox, ref.origin, ref.rotation, ref.x_reflection, ref.magnification)
+    if ref.instances == 1:
+        return first
+    last_column = ((ref.columns - 1) * ref.column_step[0], (ref.columns - 1) * ref.column_step[1])
+    last_row = ((ref.rows - 1) * ref.row_step[0], (ref.rows - 1) * ref.row_step[1])
+    shifts = [(0.0, 0.0), last_column, last_row, (last_column[0] + last_row[0], last_column[1] + last_row[1])]
+    corners = [(first[0] + sx, first[1] + sy, first[2] + sx, first[3] + sy) for sx, sy in shifts]
+    bbox = None
+    for corner in corners:
+        bbox = _merge_bbox(bbox, corner)
+    return bbox
+
+
+class _PolygonBatch:
+    """Collects XY record locations and reduces them in vectorized chunks."""
+
+    def __init__(self, buffer, scale: float):
+        # Two zero-copy int32 views of the mapped file, one per 4-byte alignment,
+        # XY payloads always start on an even offset
+        self._views = (
+            np.frombuffer(buffer, dtype=">i4", count=len(buffer) // 4),
+            np.frombuffer(buffer, dtype=">i4", offset=2, count=(len(buffer) - 2) // 4),
+        )
+        self._scale = scale
+        # LayerStats objects are referenced by index so a chunk holds plain integers only
+        self._registry: List[LayerStats] = []
+        self._registry_index: Dict[int, int] = {}
+        self.offsets = array("q")
+        self.counts = array("q")
+        self.owners = array("q")
+
+    def register(self, owner: LayerStats) -> int:
+        index = self._registry_index.get(id(owner))
+        if index is None:
+            index = self._registry_index[id(owner)] = len(self._registry)
+            self._registry.append(owner)
+        return index
+
+    def add(self, offset: int, npoints: int, owner: LayerStats) -> None:
+        self.offsets.append(offset)
+        self.counts.append(npoints)
+        self.owners.append(self.register(owner))
+        if len(self.owners) >= POLYGON_CHUNK:
+            self.flush()
+
+    def scan_boundaries(self, buf, pos: int, end: int, cell: "CellStats", layer_index: Dict[LayerKey, int]) -> int:
+        """
+        Consume a run of plain BOUNDARY elements starting at pos.
+
+        This is the hot loop of a scan, kept free of attribute lookups. Returns
+        the offset of the first record it could not handle.
+        """
+        unpack_head = _BOUNDARY_HEAD.unpack_from
+        unpack_word = _WORD.unpack_from
+        add_offset = self.offsets.append
+        add_count = self.counts.append
+        add_owner = self.owners.append
+        pending = len(self.owners)
+        while pos + 20 <= end:
+            head = unpack_head(buf, pos)
+            xy_head = head[5]
+            if (head[0] != _BOUNDARY_WORD or head[1] != _LAYER_WORD or head[3] != _DATATYPE_WORD
+                    or xy_head & 0xFFFF != _XY_WORD):
+                break
+            endel = pos + 16 + (xy_head >> 16)
+            if (xy_head >> 16) < 20 or endel + 4 > end or unpack_word(buf, endel)[0] != _ENDEL_WORD:
+                break
+            key = (head[2], head[4])
+            index = layer_index.get(key)
+            if index is None:
+                index = layer_index[key] = self.register(cell.layer(key))
+            add_offset(pos + 20)
+            add_count(((xy_head >> 16) - 4) >> 3)
+            add_owner(index)
+            pos = endel + 4
+            pending += 1
+            if pending >= POLYGON_CHUNK:
+                self.flush()
+                add_offset = self.offsets.append
+                add_count = self.counts.append
+                add_owner = self.owners.append
+                pending = 0
+        return pos
+
+    def flush(self) -> None:
+        if not self.owners:
+            return
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        counts = np.frombuffer(self.counts, dtype=np.int64)
+        owners = np.frombuffer(self.owners, dtype=np.int64)
+        for parity in (0, 1):
+            sel = np.nonzero((offsets % 4 != 0) == bool(parity))[0]
+            if len(sel):
+                self._reduce(owners[sel], offsets[sel], counts[sel], self._views[parity], 2 * parity)
+        self.offsets = array("q")
+        self.counts = array("q")
+        self.owners = array("q")
+
+    def _reduce(self, owner_index, offsets, counts, view, base) -> None:
+        # Closed GDS polygons repeat the first point, drop it from the shoelace sum
+        npoints = counts - 1
+        starts = (offsets - base) // 4
+        total = int(npoints.sum())
+        poly_start = np.zeros(len(npoints), dtype=np.int64)
+        np.cumsum(npoints[:-1], out=poly_start[1:])
+        local = np.arange(total, dtype=np.int64) - np.repeat(poly_start, npoints)
+        word = np.repeat(starts, npoints) + 2 * local
+        x = view[word].astype(np.float64)
+        y = view[word + 1].astype(np.float64)
+        nxt = np.arange(total, dtype=np.int64) + 1
+        last = poly_start + npoints - 1
+        nxt[last] = poly_start
+        cross = x * y[nxt] - x[nxt] * y
+        area = np.abs(np.add.reduceat(cross, poly_start)) * 0.5 * self._scale ** 2
+        xmin = np.minimum.reduceat(x, poly_start) * self._scale
+        ymin = np.minimum.reduceat(y, poly_start) * self._scale
+        xmax = np.maximum.reduceat(x, poly_start) * self._scale
+        ymax = np.maximum.reduceat(y, poly_start) * self._scale
+
+        # Reduce per owning LayerStats before touching Python objects
+        uniq, inverse = np.unique(owner_index, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(uniq)))
+        area_sum = np.add.reduceat(area[order], bounds)
+        counts_per = np.bincount(inverse, minlength=len(uniq))
+        bx0 = np.minimum.reduceat(xmin[order], bounds)
+        by0 = np.minimum.reduceat(ymin[order], bounds)
+        bx1 = np.maximum.reduceat(xmax[order], bounds)
+        by1 = np.maximum.reduceat(ymax[order], bounds)
+        for k, index in enumerate(uniq):
+            stats = self._registry[int(index)]
+            stats.polygons += int(counts_per[k])
+            stats.area += float(area_sum[k])
+            stats.bbox = _merge_bbox(stats.bbox, (float(bx0[k]), float(by0[k]), float(bx1[k]), float(by1[k])))
+
+
+def _read_string(buffer, offset: int, length: int) -> str:
+    return bytes(buffer[offset:offset + length]).rstrip(b"\x00").decode("ascii", errors="replace")
+
+
+def scan_gds(filename: str) -> GdsLibraryStats:
+    """
+    Scan a GDSII file through a read-only memory map.
+
+    Records are walked in place, polygon coordinates are only ever read through
+    zero-copy NumPy views of the map and reduced chunk by chunk, so memory use
+    does not grow with the number of polygons.
+
+    Args:
+        filename: GDS file to scan
+
+    Returns:
+        GdsLibraryStats: per-cell layer statistics and reference records
+    """
+    with open(filename, "rb") as f:
+        file_size = f.seek(0, 2)
+        if file_size == 0:
+            raise ValueError(f"{filename} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = memoryview(mm)
+            try:
+                return _scan(buf, filename, file_size)
+            except Exception as e:
+                # The failed frames hold NumPy views of the map, drop them so it can be closed
+                traceback.clear_frames(e.__traceback__)
+                raise
+            finally:
+                buf.release()
+
+
+def _scan(buf, filename: str, file_size: int) -> GdsLibraryStats:
+    cells: Dict[str, CellStats] = {}
+    libname = ""
+    unit, precision = 1e-6, 1e-9
+    batch: Optional[_PolygonBatch] = None
+    scale = 1e-3
+
+    cell: Optional[CellStats] = None
+    element = None  # record type of the element being parsed
+    layer = datatype = 0
+    ref: Optional[ReferenceRecord] = None
+    strans = 0
+    pos = 0
+    end = file_size
+    unpack_head = _RECORD_HEAD.unpack_from
+    layer_index: Dict[LayerKey, int] = {}  # (layer, datatype) -> batch owner index for the current cell
+
+    while pos + 4 <= end:
+        length, rtype, _ = unpack_head(buf, pos)
+        if length < 4:
+            if length == 0:
+                break  # zero padding after ENDLIB
+            raise ValueError(f"Corrupt record length {length} at offset {pos}")
+        if pos + length > end:
+            raise ValueError(f"truncated record at offset {pos}: {length} bytes, {end - pos} left in {filename}")
+
+        if rtype == rec.BOUNDARY and cell is not None:
+            next_pos = batch.scan_boundaries(buf, pos, end, cell, layer_index)
+            if next_pos != pos:
+                pos = next_pos
+                continue
+        payload = pos + 4
+
+        if rtype == rec.UNITS:
+            precision_in_units = rec.decode_real8(buf, payload)
+            precision = rec.decode_real8(buf, payload + 8)
+            unit = precision / precision_in_units
+            scale = precision_in_units
+            batch = _PolygonBatch(buf, scale)
+        elif rtype == rec.LIBNAME:
+            libname = _read_string(buf, payload, length - 4)
+        elif rtype == rec.STRNAME:
+            name = _read_string(buf, payload, length - 4)
+            cell = cells.get(name) or CellStats(name)
+            cells[name] = cell
+            layer_index = {}
+        elif rtype == rec.ENDSTR:
+            cell = None
+        elif rtype in (rec.BOUNDARY, rec.BOX, rec.PATH, rec.TEXT, rec.NODE):
+            element = rtype
+            layer = datatype = 0
+        elif rtype in (rec.SREF, rec.AREF):
+            element = rtype
+            ref = ReferenceRecord("", (0.0, 0.0))
+            strans = 0
+        elif rtype == rec.LAYER:
+            (layer,) = struct.unpack_from(">h", buf, payload)
+        elif rtype in (rec.DATATYPE, rec.TEXTTYPE, rec.BOXTYPE):
+            (datatype,) = struct.unpack_from(">h", buf, payload)
+        elif rtype == rec.SNAME and ref is not None:
+            ref.cell_name = _read_string(buf, payload, length - 4)
+        elif rtype == rec.STRANS and ref is not None:
+            (strans,) = struct.unpack_from(">H", buf, payload)
+            ref.x_reflection = bool(strans & rec.STRANS_REFLECTION)
+        elif rtype == rec.MAG and ref is not None:
+            ref.magnification = rec.decode_real8(buf, payload)
+        elif rtype == rec.ANGLE and ref is not None:
+            ref.rotation = rec.decode_real8(buf, payload)
+        elif rtype == rec.COLROW and ref is not None:
+            ref.columns, ref.rows = struct.unpack_from(">hh", buf, payload)
+        elif rtype == rec.XY and cell is not None:
+            npoints = (length - 4) // 8
+            if npoints < (2 if element in (rec.BOUNDARY, rec.BOX) else 1):
+                raise ValueError(f"XY record with {npoints} points at offset {pos}")
+            if element in (rec.BOUNDARY, rec.BOX):
+                batch.add(payload, npoints, cell.layer((layer, datatype)))
+            elif element == rec.PATH:
+                cell.layer((layer, datatype)).paths += 1
+            elif element == rec.TEXT:
+                cell.layer((layer, datatype)).labels += 1
+            elif element in (rec.SREF, rec.AREF) and ref is not None:
+                coords = struct.unpack_from(f">{2 * npoints}i", buf, payload)
+                ref.origin = (coords[0] * scale, coords[1] * scale)
+                if element == rec.AREF and npoints >= 3:
+                    ref.column_step = ((coords[2] - coords[0]) * scale / max(ref.columns, 1),
+                                       (coords[3] - coords[1]) * scale / max(ref.columns, 1))
+                    ref.row_step = ((coords[4] - coords[0]) * scale / max(ref.rows, 1),
+                                    (coords[5] - coords[1]) * scale / max(ref.rows, 1))
+        elif rtype == rec.ENDEL:
+            if element in (rec.SREF, rec.AREF) and ref is not None and cell is not None:
+                cell.references.append(ref)
+            element = None
+            ref = None
+        elif rtype == rec.ENDLIB:
+            break
+        pos += length
+    else:
+        raise ValueError(f"truncated record at offset {pos}: {filename} ends before ENDLIB")
+
+    if batch is not None:
+        batch.flush()
+    return GdsLibraryStats(filename, libname, unit, precision, cells, file_size)
+
+
+def print_summary(stats: GdsLibraryStats, layer_names: Optional[Dict[LayerKey, str]] = None, flat: bool = True) -> None:
+    """Print cells, hierarchy and per-layer statistics of a scanned library."""
+    layer_names = layer_names or {}
+    print(f"{stats.filename}: library '{stats.libname}', {len(stats.cells)} cells, "
+          f"{stats.file_size / 1e6:.1f} MB, unit {stats.unit:g} m, precision {stats.precision:g} m")
+
+    print("\nHierarchy:")
+    for depth, name, count in stats.hierarchy():
+        multiplicity = f" x{count}" if count > 1 else ""
+        print(f"  {'  ' * depth}{name}{multiplicity}")
+
+    for top in stats.top_cells:
+        layers = stats.flat_layer_stats(top) if flat else stats.cells[top].layers
+        bbox = stats.flat_bbox(top)
+        print(f"\nTop cell {top}" + (f", bbox ({bbox[0]:.3f}, {bbox[1]:.3f}) - ({bbox[2]:.3f}, {bbox[3]:.3f})" if bbox else ""))
+        print(f"  {'layer':<22}{'polygons':>10}{'paths':>8}{'labels':>8}{'area [um^2]':>16}  bbox")
+        for key in sorted(layers):
+            layer_stats = layers[key]
+            name = layer_names.get(key, "")
+            label = f"{key[0]}/{key[1]}" + (f" {name}" if name else "")
+            box = layer_stats.bbox
+            box_text = f"({box[0]:.3f}, {box[1]:.3f}) - ({box[2]:.3f}, {box[3]:.3f})" if box else "-"
+            print(f"  {label:<22}{layer_stats.polygons:>10}{layer_stats.paths:>8}{layer_stats.labels:>8}"
+                  f"{layer_stats.area:>16.3f}  {box_text}")
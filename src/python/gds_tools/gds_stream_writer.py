@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import shutil
+import tempfile
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import gds_records as rec
+
+BBox = Tuple[float, float, float, float]  # (xmin, ymin, xmax, ymax)
+
+
+@dataclass
+class PlacementRecord:
+    """Lightweight record of one top-cell reference, kept instead of the Component"""
+    cell_name: str
+    origin: Tuple[float, float]
+    rotation: float
+    x_reflection: bool
+    magnification: float
+
+
+def _transform_bbox(bbox: BBox, origin, rotation: float, x_reflection: bool, magnification: float) -> BBox:
+    """Bounding box of a child bbox after a GDS reference transform."""
+    xmin, ymin, xmax, ymax = bbox
+    corners = np.array([[xmin, ymin], [xmin, ymax], [xmax, ymin], [xmax, ymax]], dtype=float)
+    if x_reflection:
+        corners[:, 1] = -corners[:, 1]
+    corners *= magnification
+    if rotation:
+        theta = np.deg2rad(rotation)
+        c, s = np.cos(theta), np.sin(theta)
+        corners = corners @ np.array([[c, s], [-s, c]])
+    corners += np.asarray(origin, dtype=float)
+    return (corners[:, 0].min(), corners[:, 1].min(), corners[:, 0].max(), corners[:, 1].max())
+
+
+def _merge_bbox(a: Optional[BBox], b: Optional[BBox]) -> Optional[BBox]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _reference_repetition(ref) -> Optional[Tuple[int, int, float, float]]:
+    """Return (columns, rows, x_spacing, y_spacing) for array references, else None."""
+    gdstk_ref = getattr(ref, "_reference", None)
+    repetition = getattr(gdstk_ref, "repetition", None)
+    columns = getattr(repetition, "columns", None)
+    rows = getattr(repetition, "rows", None)
+    spacing = getattr(repetition, "spacing", None)
+    if not columns or not rows or spacing is None:
+        return None
+    if columns == 1 and rows == 1:
+        return None
+    return int(columns), int(rows), float(spacing[0]), float(spacing[1])
+
+
+class GdsStreamWriter:
+    """
+    Streaming GDSII library writer.
+
+    Every unique cell is serialized as soon as it is handed to the writer, and the
+    references of the top cell are spooled to a temporary file as they are added.
+    Only cell names, digests and bounding boxes and PlacementRecords stay in
+    memory, so the caller can drop each Component right after writing it. Cells
+    are identified by their content: a Component identical to a written cell
+    is mapped to that cell whatever its name, so Components rebuilt after
+    clearing the @cell cache are not duplicated, and a different cell under a
+    name already written gets a "$n" suffix. The top cell is assembled from
+    the spool when the writer is closed.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        top_cell_name: str,
+        unit: float = 1e-6,
+        precision: float = 1e-9,
+        libname: str = "library",
+        spool_dir: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ):
+        """
+        Open the output file and write the library header.
+
+        Args:
+            filename: Output GDS filename
+            top_cell_name: Name of the top cell assembled on close()
+            unit: User unit in meters (gdsfactory uses micrometers)
+            precision: Database unit in meters
+            libname: GDS library name
+            spool_dir: Directory for the top-cell spool file (system temp if None)
+            timestamp: Fixed timestamp for BGNLIB/BGNSTR records (now if None),
+                useful to get byte-identical files from identical layouts
+        """
+        self.filename = filename
+        self.top_cell_name = top_cell_name
+        self.unit = unit
+        self.precision = precision
+        self.timestamp = timestamp
+        self._scale = unit / precision
+
+        # Lightweight bookkeeping only: cell name -> digest of its elements, and bboxes
+        self._written: Dict[str, bytes] = {}
+        self._digests: Dict[bytes, str] = {}
+        # id -> (weak reference, cell name) of Components still alive, skips serializing them again
+        self._alive: Dict[int, Tuple[weakref.ref, str]] = {}
+        self._bboxes: Dict[str, Optional[BBox]] = {}
+        self.placements: List[PlacementRecord] = []
+        self._top_bbox: Optional[BBox] = None
+
+        self._stream = open(filename, "wb")
+        self._spool = tempfile.TemporaryFile(dir=spool_dir)
+        self._closed = False
+
+        self._stream.write(rec.pack_int2(rec.HEADER, [600]))
+        self._stream.write(rec.pack_timestamp(rec.BGNLIB, timestamp))
+        self._stream.write(rec.pack_ascii(rec.LIBNAME, libname))
+        self._stream.write(rec.pack_real8(rec.UNITS, [precision / unit, precision]))
+
+    def __enter__(self) -> "GdsStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # ------------------------------------------------------------------ #
+    # Element serialization
+    # ------------------------------------------------------------------ #
+    def _to_db(self, points) -> np.ndarray:
+        return np.round(np.asarray(points, dtype=float) * self._scale).astype(np.int64)
+
+    def _boundary(self, points, layer: int, datatype: int) -> bytes:
+        db_points = self._to_db(points).reshape(-1, 2)
+        if len(db_points) + 1 > rec.MAX_XY_POINTS:
+            raise ValueError(f"Polygon with {len(db_points)} points exceeds the GDSII XY record limit")
+        closed = np.vstack([db_points, db_points[:1]]).astype(">i4")
+        return b"".join((
+            rec.pack_record(rec.BOUNDARY, rec.NO_DATA),
+            rec.pack_int2(rec.LAYER, [layer]),
+            rec.pack_int2(rec.DATATYPE, [datatype]),
+            rec.pack_record(rec.XY, rec.INT4, closed.tobytes()),
+            rec.pack_record(rec.ENDEL, rec.NO_DATA),
+        ))
+
+    def _text(self, text: str, origin, layer: int, texttype: int) -> bytes:
+        x, y = self._to_db(origin)
+        return b"".join((
+            rec.pack_record(rec.TEXT, rec.NO_DATA),
+            rec.pack_int2(rec.LAYER, [layer]),
+            rec.pack_int2(rec.TEXTTYPE, [texttype]),
+            rec.pack_int4(rec.XY, [int(x), int(y)]),
+            rec.pack_ascii(rec.STRING, text),
+            rec.pack_record(rec.ENDEL, rec.NO_DATA),
+        ))
+
+    def _strans(self, rotation: float, x_reflection: bool, magnification: float) -> bytes:
+        if not rotation and not x_reflection and magnification == 1:
+            return b""
+        out = rec.pack_record(rec.STRANS, rec.BIT_ARRAY, (rec.STRANS_REFLECTION if x_reflection else 0).to_bytes(2, "big"))
+        if magnification != 1:
+            out += rec.pack_real8(rec.MAG, [magnification])
+        if rotation:
+            out += rec.pack_real8(rec.ANGLE, [rotation % 360])
+        return out
+
+    def _sref(self, cell_name: str, origin, rotation: float, x_reflection: bool, magnification: float) -> bytes:
+        x, y = self._to_db(origin)
+        return b"".join((
+            rec.pack_record(rec.SREF, rec.NO_DATA),
+            rec.pack_ascii(rec.SNAME, cell_name),
+            self._strans(rotation, x_reflection, magnification),
+            rec.pack_int4(rec.XY, [int(x), int(y)]),
+            rec.pack_record(rec.ENDEL, rec.NO_DATA),
+        ))
+
+    def _aref(self, cell_name: str, origin, rotation: float, x_reflection: bool, magnification: float,
+              columns: int, rows: int, x_spacing: float, y_spacing: float) -> bytes:
+        ox, oy = origin
+        lattice = self._to_db([[ox, oy], [ox + columns * x_spacing, oy], [ox, oy + rows * y_spacing]])
+        return b"".join((
+            rec.pack_record(rec.AREF, rec.NO_DATA),
+            rec.pack_ascii(rec.SNAME, cell_name),
+            self._strans(rotation, x_reflection, magnification),
+            rec.pack_int2(rec.COLROW, [columns, rows]),
+            rec.pack_int4(rec.XY, [int(v) for v in lattice.ravel()]),
+            rec.pack_record(rec.ENDEL, rec.NO_DATA),
+        ))
+
+    # ------------------------------------------------------------------ #
+    # Cell writing
+    # ------------------------------------------------------------------ #
+    def _claim_name(self, name: str, digest: bytes) -> Tuple[str, bool]:
+        """Return (gds name, already written) for a cell body, renaming on clashes."""
+        if digest in self._digests:
+            # identical content, e.g. a Unnamed_<uuid> cell built again
+            return self._digests[digest], True
+        candidate, suffix = name, 0
+        # Same name, different content: keep both cells under unique names
+        while candidate in self._written:
+            if self._written[candidate] == digest:
+                return candidate, True
+            suffix += 1
+            candidate = f"{name}${suffix}"
+        return candidate, False
+
+    def _cell_body(self, component, child_names: Dict[int, str]) -> Tuple[bytes, Optional[BBox]]:
+        """Elements of a single cell whose children are already written, and its bbox."""
+        out = []
+        bbox: Optional[BBox] = None
+
+        polygons = list(component.polygons)
+        for path in getattr(component, "paths", []):
+            polygons.extend(path.to_polygons())
+        for polygon in polygons:
+            points = np.asarray(polygon.points, dtype=float)
+            if len(points) < 3:
+                continue
+            out.append(self._boundary(points, polygon.layer, polygon.datatype))
+            bbox = _merge_bbox(bbox, (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()))
+
+        for label in component.labels:
+            out.append(self._text(label.text, label.origin, label.layer, label.texttype))
+
+        for ref in component.references:
+            child_name = child_names[id(ref.parent)]
+            rotation = ref.rotation or 0
+            x_reflection = bool(ref.x_reflection)
+            magnification = ref.magnification or 1
+            repetition = _reference_repetition(ref)
+            child_bbox = self._bboxes.get(child_name)
+            if repetition is None:
+                out.append(self._sref(child_name, ref.origin, rotation, x_reflection, magnification))
+                if child_bbox is not None:
+                    bbox = _merge_bbox(bbox, _transform_bbox(child_bbox, ref.origin, rotation, x_reflection, magnification))
+            else:
+                columns, rows, x_spacing, y_spacing = repetition
+                out.append(self._aref(child_name, ref.origin, rotation, x_reflection, magnification,
+                                      columns, rows, x_spacing, y_spacing))
+                if child_bbox is not None:
+                    first = _transform_bbox(child_bbox, ref.origin, rotation, x_reflection, magnification)
+                    last = (first[0] + (columns - 1) * x_spacing, first[1] + (rows - 1) * y_spacing,
+                            first[2] + (columns - 1) * x_spacing, first[3] + (rows - 1) * y_spacing)
+                    bbox = _merge_bbox(bbox, _merge_bbox(first, last))
+        return b"".join(out), bbox
+
+    def _write_cell(self, gds_name: str, body: bytes, digest: bytes, bbox: Optional[BBox]) -> None:
+        self._stream.write(b"".join((rec.pack_timestamp(rec.BGNSTR, self.timestamp), rec.pack_ascii(rec.STRNAME, gds_name),
+                                     body, rec.pack_record(rec.ENDSTR, rec.NO_DATA))))
+        self._written[gds_name] = digest
+        self._digests[digest] = gds_name
+        self._bboxes[gds_name] = bbox
+
+    def _remember(self, component, gds_name: str) -> None:
+        key = id(component)
+        try:
+            # the entry goes away with the Component, before its id can be reused
+            ref = weakref.ref(component, lambda _, key=key: self._alive.pop(key, None))
+        except TypeError:
+            return
+        self._alive[key] = (ref, gds_name)
+
+    def _alive_name(self, component) -> Optional[str]:
+        entry = self._alive.get(id(component))
+        return entry[1] if entry is not None and entry[0]() is component else None
+
+    def write_component(self, component) -> str:
+        """
+        Write a Component and every sub-cell not written yet.
+
+        Cells are emitted children-first, so the Component can be released by the
+        caller as soon as this returns.
+
+        Args:
+            component: gdsfactory Component to serialize
+
+        Returns:
+            str: Name of the GDS cell holding the component
+        """
+        if self._closed:
+            raise ValueError("GdsStreamWriter is closed")
+
+        child_names: Dict[int, str] = {}
+        # Iterative post-order walk, deep glayout hierarchies can exceed the recursion limit
+        stack = [(component, False)]
+        while stack:
+            comp, expanded = stack.pop()
+            if id(comp) in child_names:
+                continue
+            known = self._alive_name(comp)
+            if known is not None:
+                child_names[id(comp)] = known
+                continue
+            if not expanded:
+                stack.append((comp, True))
+                for ref in comp.references:
+                    if id(ref.parent) not in child_names:
+                        stack.append((ref.parent, False))
+                continue
+            body, bbox = self._cell_body(comp, child_names)
+            digest = hashlib.sha1(body).digest()
+            gds_name, done = self._claim_name(comp.name, digest)
+            if gds_name == self.top_cell_name:
+                raise ValueError(f"Cell name '{gds_name}' clashes with the top cell name")
+            if not done:
+                self._write_cell(gds_name, body, digest, bbox)
+            self._remember(comp, gds_name)
+            child_names[id(comp)] = gds_name
+        return child_names[id(component)]
+
+    def cell_bbox(self, cell_name: str) -> Optional[BBox]:
+        """Bounding box (xmin, ymin, xmax, ymax) of a written cell, None if it is empty."""
+        return self._bboxes[cell_name]
+
+    # ------------------------------------------------------------------ #
+    # Top cell
+    # ------------------------------------------------------------------ #
+    def add_reference(
+        self,
+        cell_name: str,
+        origin: Tuple[float, float] = (0.0, 0.0),
+        rotation: float = 0,
+        x_reflection: bool = False,
+        magnification: float = 1.0,
+    ) -> PlacementRecord:
+        """Place an already written cell in the top cell."""
+        if cell_name not in self._bboxes:
+            raise KeyError(f"Cell '{cell_name}' has not been written yet")
+        origin = (float(origin[0]), float(origin[1]))
+        self._spool.write(self._sref(cell_name, origin, rotation, x_reflection, magnification))
+        placement = PlacementRecord(cell_name, origin, rotation, x_reflection, magnification)
+        self.placements.append(placement)
+        child_bbox = self._bboxes[cell_name]
+        if child_bbox is not None:
+            self._top_bbox = _merge_bbox(self._top_bbox, _transform_bbox(child_bbox, origin, rotation, x_reflection, magnification))
+        return placement
+
+    def add_component(self, component, origin: Tuple[float, float] = (0.0, 0.0), **transform) -> PlacementRecord:
+        """Write a Component (if needed) and place it in the top cell."""
+        return self.add_reference(self.write_component(component), origin, **transform)
+
+    def add_polygon(self, points: Sequence[Tuple[float, float]], layer: Tuple[int, int]) -> None:
+        """Add a polygon directly to the top cell."""
+        points = np.asarray(points, dtype=float)
+        self._spool.write(self._boundary(points, layer[0], layer[1]))
+        self._top_bbox = _merge_bbox(self._top_bbox, (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()))
+
+    def add_label(self, text: str, position: Tuple[float, float], layer: Tuple[int, int]) -> None:
+        """Add a text label directly to the top cell."""
+        self._spool.write(self._text(text, position, layer[0], layer[1]))
+
+    @property
+    def top_bbox(self) -> Optional[BBox]:
+        """Bounding box of everything placed in the top cell so far."""
+        return self._top_bbox
+
+    def close(self) -> None:
+        """Assemble the top cell from the spool and finish the library."""
+        if self._closed:
+            return
+        self._stream.write(rec.pack_timestamp(rec.BGNSTR, self.timestamp))
+        self._stream.write(rec.pack_ascii(rec.STRNAME, self.top_cell_name))
+        self._spool.seek(0)
+        shutil.copyfileobj(self._spool, self._stream, length=1 << 20)
+        self._stream.write(rec.pack_record(rec.ENDSTR, rec.NO_DATA))
+        self._stream.write(rec.pack_record(rec.ENDLIB, rec.NO_DATA))
+        self._spool.close()
+        self._stream.close()
+        self._closed = True
+
+    def abort(self) -> None:
+        """Close without finishing the library and remove the partial file."""
+        if self._closed:
+            return
+        self._spool.close()
+        self._stream.close()
+        self._closed = True
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
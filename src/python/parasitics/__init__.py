@@ -0,0 +1,48 @@
+###Parasitic estimation.
+
+
+from .em import (CMIRROR_ROUTES, CMIRROR_TB_CURRENTS, GILBERT_ROUTES, GILBERT_TB_CURRENTS, EMReport,
+                 RmultSuggestion, currents_from_raw, em_check)
+from .ir_drop import IRDropReport, Segment, device_sources, ir_drop
+from .mesh import Mesh, build_mesh
+from .pex_lite import NetParasitics, ParasiticReport, access_resistance, estimate_parasitics, write_spice
+from .reduce import (ReductionConfig, ReductionReport, TestbenchComparison, compare_testbench, format_subckt,
+                     merge_parallel, reduce_netlist, reduce_subckt)
+from .tech import GF180, SKY130, TECHS, ConductorTech, Tech, ViaTech, tech_for
+
+__all__ = [
+    'access_resistance',
+    'build_mesh',
+    'CMIRROR_ROUTES',
+    'CMIRROR_TB_CURRENTS',
+    'compare_testbench',
+    'ConductorTech',
+    'currents_from_raw',
+    'device_sources',
+    'em_check',
+    'EMReport',
+    'estimate_parasitics',
+    'format_subckt',
+    'GF180',
+    'GILBERT_ROUTES',
+    'GILBERT_TB_CURRENTS',
+    'ir_drop',
+    'IRDropReport',
+    'merge_parallel',
+    'Mesh',
+    'NetParasitics',
+    'ParasiticReport',
+    'reduce_netlist',
+    'reduce_subckt',
+    'ReductionConfig',
+    'ReductionReport',
+    'RmultSuggestion',
+    'Segment',
+    'SKY130',
+    'Tech',
+    'tech_for',
+    'TECHS',
+    'TestbenchComparison',
+    'ViaTech',
+    'write_spice',
+]
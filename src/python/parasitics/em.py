@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+import math
+import re
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from simulation.rawfile import RawFile
+
+from .ir_drop import ir_drop
+from .mesh import Mesh, build_mesh
+from .tech import Tech
+
+CurrentSpec = Union[str, float, Sequence[Union[str, float]]]  # vector name(s) and/or fixed amps, summed
+
+# Layout pin -> saved vectors of the design_tb testbenches. The LO pair steers
+# the whole tail current to one output at a time, so each output gets the sum.
+GILBERT_TB_CURRENTS: Dict[str, CurrentSpec] = {
+    "I_bias_pos": "@m.xgilbert_mixer.xm_rf_pos.m0[id]",
+    "I_bias_neg": "@m.xgilbert_mixer.xm_rf_neg.m0[id]",
+    "V_out_p": ("@m.xgilbert_mixer.xm_rf_pos.m0[id]", "@m.xgilbert_mixer.xm_rf_neg.m0[id]"),
+    "V_out_n": ("@m.xgilbert_mixer.xm_rf_pos.m0[id]", "@m.xgilbert_mixer.xm_rf_neg.m0[id]"),
+}
+# Local_mirror_nmos_tb: 10 uA reference from I0, output current measured by Vmeas1
+CMIRROR_TB_CURRENTS: Dict[str, CurrentSpec] = {
+    "I_BIAS": 10e-6,
+    "I_OUT": "i(vmeas1)",
+    "VSS": ("i(vmeas1)", 10e-6),
+}
+
+# Layout net -> (builder argument holding the FET config, "sd" or "gate" routes)
+GILBERT_ROUTES: Dict[str, Tuple[str, str]] = {
+    "I_bias_pos": ("rf_fet_config", "sd"),
+    "I_bias_neg": ("rf_fet_config", "sd"),
+    "V_RF": ("rf_fet_config", "gate"),
+    "V_RF_b": ("rf_fet_config", "gate"),
+    "V_out_p": ("lo_fet_config", "sd"),
+    "V_out_n": ("lo_fet_config", "sd"),
+    "V_LO": ("lo_fet_config", "gate"),
+    "V_LO_b": ("lo_fet_config", "gate"),
+}
+CMIRROR_ROUTES: Dict[str, Tuple[str, str]] = {
+    "I_BIAS": ("cmirror_config", "sd"),
+    "I_OUT": ("cmirror_config", "sd"),
+}
+
+LAYER_ORDER = ("active_diff", "poly", "mcon", "met1", "via1", "met2", "via2", "met3", "via3", "met4", "via4", "met5")
+
+
+def _vector_key(name: str) -> str:
+    """ngspice names branch currents v1#branch or i(v1) depending on the version"""
+    name = name.lower()
+    match = re.fullmatch(r"(.+)#branch", name)
+    return f"i({match.group(1)})" if match else name
+
+
+def currents_from_raw(
+    path: Union[str, Path],
+    currents: Mapping[str, CurrentSpec],
+    plot: Optional[str] = None,
+) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+    """
+    Net currents from an ngspice rawfile, e.g. the Gilbert_cell_tb_sim.raw an op + tran run writes.
+
+    Args:
+        path: Rawfile
+        currents: {layout net: vector name, fixed amps or a sequence of both}, magnitudes are summed
+        plot: Use the first plot whose name contains this ("Transient", "Operating"),
+            default the last plot holding every named vector
+
+    Returns:
+        ({net: current magnitude per point (A)}, time vector of the plot or None)
+    """
+    wanted = {_vector_key(v) for spec in currents.values()
+              for v in ([spec] if isinstance(spec, (str, float, int)) else spec) if isinstance(v, str)}
+    candidates = []
+    for raw_plot in RawFile(path):
+        if plot is not None and plot.lower() not in raw_plot.plotname.lower():
+            continue
+        vectors = {_vector_key(k): v for k, v in raw_plot.vectors().items()}
+        if wanted <= set(vectors):
+            candidates.append((raw_plot.plotname, vectors))
+    if not candidates:
+        raise ValueError(f"{path}: no {'plot ' + repr(plot) if plot else 'plot'} with {', '.join(sorted(wanted))}")
+    name, vectors = candidates[0] if plot is not None else candidates[-1]
+    if any(np.iscomplexobj(v) for v in vectors.values()):
+        raise ValueError(f"{path}: plot {name!r} is complex, EM needs DC or transient currents")
+    points = len(next(iter(vectors.values())))
+    result = {}
+    for net, spec in currents.items():
+        total = np.zeros(points)
+        for item in ([spec] if isinstance(spec, (str, float, int)) else spec):
+            total = total + np.abs(vectors[_vector_key(item)] if isinstance(item, str) else float(item))
+        result[net] = total
+    time = vectors.get("time")
+    return result, None if time is None else np.array(time)
+
+
+def _statistic(current: np.ndarray, time: Optional[np.ndarray], statistic: str) -> float:
+    current = np.abs(np.atleast_1d(np.asarray(current, dtype=float)))
+    if statistic == "peak":
+        return float(current.max())
+    weights = np.gradient(time) if time is not None and len(time) == len(current) > 1 else np.ones(len(current))
+    if statistic == "mean":
+        return float(np.average(current, weights=weights))
+    if statistic == "rms":
+        return float(np.sqrt(np.average(current ** 2, weights=weights)))
+    raise ValueError(f"statistic must be rms, mean or peak, not {statistic!r}")
+
+
+def _rmult_field(config, kind: str, layer: str) -> Optional[str]:
+    """
+    rmult attribute of config that sizes a route of kind on layer, None: not set by the config.
+
+    interfinger_rmult widens the contact arrays on the diffusion, sd_rmult the
+    source/drain tracks on sd_route_topmet and gate_rmult the rows of the gate
+    via arrays. The straps between fingers and tracks keep their width.
+    """
+    if layer not in LAYER_ORDER:
+        return None
+    rank = LAYER_ORDER.index(layer)
+    if kind == "gate":
+        top = LAYER_ORDER.index(getattr(config, "gate_route_topmet", "met2"))
+        return "gate_rmult" if LAYER_ORDER.index("mcon") <= rank <= top else None
+    if layer == "mcon":
+        return "interfinger_rmult"
+    return "sd_rmult" if layer == getattr(config, "sd_route_topmet", "met2") else None
+
+
+@dataclass
+class RmultSuggestion:
+    """Minimum routing multiplier keeping every segment it sizes under the EM limit"""
+    config: str
+    field: str
+    current: int
+    suggested: int
+    worst_ratio: float  # density over limit at the current rmult
+    net: str  # net of the worst segment
+
+
+@dataclass
+class EMReport:
+    """Result of em_check(): per segment current density against the layer limits"""
+    net: np.ndarray  # (m,) net name of each segment
+    layer: np.ndarray  # (m,) glayer
+    center: np.ndarray  # (m, 2) um
+    current: np.ndarray  # (m,) A, the statistic of the segment current
+    density: np.ndarray  # mA/um, mA per cut for vias
+    limit_ratio: np.ndarray
+    statistic: str
+    sized: np.ndarray = None  # (m,) segment width set by an rmult of the configs
+    suggestions: List[RmultSuggestion] = field(default_factory=list)
+
+    @property
+    def violations(self) -> np.ndarray:
+        """Indices of the segments over their limit, worst first"""
+        over = np.flatnonzero(self.limit_ratio > 1.0)
+        return over[np.argsort(-self.limit_ratio[over])]
+
+    @property
+    def passed(self) -> bool:
+        return len(self.violations) == 0
+
+    @property
+    def unsized_violations(self) -> np.ndarray:
+        """Violations on geometry no rmult widens, these need a layout change"""
+        violations = self.violations
+        return violations[~self.sized[violations]]
+
+    def worst(self, net: Optional[str] = None) -> float:
+        ratios = self.limit_ratio if net is None else self.limit_ratio[self.net == net]
+        return float(ratios.max()) if len(ratios) else 0.0
+
+    def apply(self, configs: Mapping[str, object]) -> Dict[str, object]:
+        """Copies of the FET configs with the suggested rmult, e.g. {"rf_fet_config": RFFETConfig()}"""
+        result = dict(configs)
+        for suggestion in self.suggestions:
+            if suggestion.config in result:
+                result[suggestion.config] = replace(result[suggestion.config],
+                                                    **{suggestion.field: suggestion.suggested})
+        return result
+
+    def __str__(self) -> str:
+        lines = [f"EM ({self.statistic}): {len(self.violations)} of {len(self.limit_ratio)} segments over the limit"]
+        for net in dict.fromkeys(self.net.tolist()):
+            lines.append(f"  {net:<16} worst {self.worst(net):7.1%} of limit")
+        unsized = len(self.unsized_violations)
+        if unsized:
+            lines.append(f"  {unsized} violations on geometry no rmult widens")
+        for s in self.suggestions:
+            lines.append(f"  {s.config}.{s.field}: {s.current} -> {s.suggested} (worst {s.worst_ratio:.1%} on {s.net})")
+        return "\n".join(lines)
+
+
+def em_check(
+    component,
+    pdk,
+    currents: Mapping[str, Union[float, Sequence[float], np.ndarray]],
+    time: Optional[np.ndarray] = None,
+    configs: Optional[Mapping[str, object]] = None,
+    routes: Optional[Mapping[str, Tuple[str, str]]] = None,
+    statistic: str = "rms",
+    tech: Optional[Tech] = None,
+    max_segment: float = 1.0,
+    mesh: Optional[Mesh] = None,
+) -> EMReport:
+    """
+    Check the current density of every routed segment against the layer EM limits.
+
+    Each net is solved once for 1 A flowing from its pin into its devices
+    (see ir_drop); the segment densities then scale with the simulated net
+    current. With configs and routes, the minimum rmult keeping each sized
+    route under its limit is suggested, assuming widths and via counts grow
+    linearly with rmult. Via arrays fill in steps and current crowds at their
+    edges, so the suggestion is a lower bound: check the rebuilt layout again.
+
+    Args:
+        component: gdsfactory Component the currents were simulated for
+        pdk: MappedPDK the component was generated with
+        currents: {layout net: current (A), a waveform or a scalar}, e.g. from currents_from_raw
+        time: Time points of the waveforms, weights the rms and mean
+        configs: FET configs the component was built with, e.g. {"cmirror_config": CMirrorConfig()}
+        routes: {net: (config name, "sd" or "gate")}, e.g. GILBERT_ROUTES or CMIRROR_ROUTES
+        statistic: "rms", "mean" or "peak" of the waveforms
+        tech: Layer resistances and EM limits, default the built-in table of pdk
+        max_segment: Mesh resolution (um)
+        mesh: Mesh of component from an earlier call, skips extraction
+
+    Returns:
+        EMReport: densities, violations and rmult suggestions
+    """
+    mesh = mesh if mesh is not None else build_mesh(component, pdk, tech, max_segment=max_segment)
+    missing = [net for net in currents if net not in mesh.pins]
+    if missing:
+        raise ValueError(f"no pin label for {', '.join(missing)} in the layout")
+    nets, layers, centers, amps, density, ratio = [], [], [], [], [], []
+    for net, waveform in currents.items():
+        value = _statistic(waveform, time, statistic)
+        unit = ir_drop(component, pdk, net, current=1.0, mesh=mesh)
+        edges = unit.edges
+        nets.append(np.full(len(edges), net, dtype=object))
+        layers.append(np.array([mesh.layers[k] for k in mesh.edge_layer[unit.edge_index]], dtype=object))
+        centers.append((mesh.rects[edges[:, 0], :2] + mesh.rects[edges[:, 0], 2:]
+                        + mesh.rects[edges[:, 1], :2] + mesh.rects[edges[:, 1], 2:]) / 4)
+        amps.append(np.abs(unit.current) * value)
+        density.append(unit.density * value)
+        ratio.append(unit.limit_ratio * value)
+    join = (lambda parts, empty: np.concatenate(parts) if parts else empty)
+    report = EMReport(join(nets, np.zeros(0, dtype=object)), join(layers, np.zeros(0, dtype=object)),
+                      join(centers, np.zeros((0, 2))), join(amps, np.zeros(0)), join(density, np.zeros(0)),
+                      join(ratio, np.zeros(0)), statistic)
+    report.sized = np.zeros(len(report.net), dtype=bool)
+
+    for net, (config_name, kind) in (routes or {}).items():
+        if net not in currents or configs is None or config_name not in configs:
+            continue
+        config = configs[config_name]
+        on_net = report.net == net
+        for layer in np.unique(report.layer[on_net]):
+            rmult_field = _rmult_field(config, kind, layer)
+            if rmult_field is None:
+                continue
+            segments = on_net & (report.layer == layer)
+            report.sized |= segments
+            worst = float(report.limit_ratio[segments].max())
+            rmult = int(getattr(config, rmult_field))
+            suggested = max(1, math.ceil(rmult * worst - 1e-9))
+            previous = next((s for s in report.suggestions
+                             if s.config == config_name and s.field == rmult_field), None)
+            if previous is None:
+                report.suggestions.append(RmultSuggestion(config_name, rmult_field, rmult, suggested, worst, net))
+            elif worst > previous.worst_ratio:
+                previous.suggested, previous.worst_ratio, previous.net = suggested, worst, net
+    return report
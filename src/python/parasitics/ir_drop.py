@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse.linalg import spsolve
+
+from .mesh import Mesh, build_mesh
+from .tech import Tech
+
+Source = Tuple[float, float, float]  # x, y (um), current (A) flowing into the net there
+
+
+@dataclass
+class Segment:
+    """One resistor of the mesh with its DC current"""
+    layer: str
+    center: Tuple[float, float]
+    current: float  # A
+    density: float  # mA/um of width, mA per cut for vias
+    limit_ratio: float  # density over the layer's EM limit
+
+
+@dataclass
+class IRDropReport:
+    """Result of ir_drop(): node voltages of one net above its pin"""
+    net: str
+    mesh: Mesh
+    nodes: np.ndarray  # mesh nodes of the net
+    voltage: np.ndarray  # (len(nodes),) V above the pin
+    edge_index: np.ndarray  # mesh edges of the net
+    current: np.ndarray  # (len(edges),) A, positive from the first node to the second
+    density: np.ndarray  # mA/um, mA per cut for via edges
+    limit_ratio: np.ndarray
+    total_current: float
+    elapsed: float = 0.0
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self.mesh.edges[self.edge_index]
+
+    @property
+    def worst_drop(self) -> float:
+        return float(np.abs(self.voltage).max()) if len(self.voltage) else 0.0
+
+    @property
+    def worst_location(self) -> Tuple[float, float]:
+        rect = self.mesh.rects[self.nodes[np.argmax(np.abs(self.voltage))]]
+        return float((rect[0] + rect[2]) / 2), float((rect[1] + rect[3]) / 2)
+
+    def segments(self, top: Optional[int] = 10) -> List[Segment]:
+        """Segments by decreasing EM limit ratio"""
+        order = np.argsort(-self.limit_ratio)[:top]
+        rects, edges = self.mesh.rects, self.edges
+        result = []
+        for e in order:
+            i, j = edges[e]
+            center = (rects[i, :2] + rects[i, 2:] + rects[j, :2] + rects[j, 2:]) / 4
+            result.append(Segment(self.mesh.layers[self.mesh.edge_layer[self.edge_index[e]]],
+                                  (float(center[0]), float(center[1])), float(self.current[e]),
+                                  float(self.density[e]), float(self.limit_ratio[e])))
+        return result
+
+    def __str__(self) -> str:
+        x, y = self.worst_location
+        lines = [f"{self.net}: {self.total_current * 1e3:.3f} mA, worst drop {self.worst_drop * 1e3:.3f} mV "
+                 f"at ({x:.2f}, {y:.2f}), {len(self.nodes)} nodes in {self.elapsed * 1e3:.1f} ms"]
+        for segment in self.segments(5):
+            unit = "mA/cut" if segment.layer in self.mesh.tech.vias else "mA/um"
+            lines.append(f"  {segment.layer:<12} ({segment.center[0]:8.2f}, {segment.center[1]:8.2f}) "
+                         f"{segment.density:8.4f} {unit:<6} {segment.limit_ratio:6.1%} of limit")
+        return "\n".join(lines)
+
+
+def device_sources(mesh: Mesh, net: str, current: float) -> List[Source]:
+    """
+    current spread over the active_diff (source/drain) shapes of net in proportion to their area.
+
+    Taps are not conductors in the tech tables, so body ties take no current. Nets
+    without diffusion, like gates, take the current at their poly shapes.
+    """
+    k = mesh.net_index(net)
+    nodes = mesh.device_nodes()
+    nodes = nodes[mesh.net[nodes] == k]
+    diffusion = nodes[mesh.layer[nodes] == mesh.layer_index("active_diff")]
+    nodes = diffusion if len(diffusion) else nodes
+    if len(nodes) == 0:
+        raise ValueError(f"net {net} has no diffusion or poly to inject current at, pass sources=")
+    rects = mesh.rects[nodes]
+    area = np.prod(rects[:, 2:] - rects[:, :2], axis=1)
+    centers = (rects[:, :2] + rects[:, 2:]) / 2
+    return [(x, y, current * a / area.sum()) for (x, y), a in zip(centers, area)]
+
+
+def _node_at(mesh: Mesh, k: int, x: float, y: float) -> int:
+    rects = mesh.rects
+    inside = np.flatnonzero((mesh.net == k) & ~mesh.is_via & (rects[:, 0] <= x) & (rects[:, 2] >= x)
+                            & (rects[:, 1] <= y) & (rects[:, 3] >= y))
+    if len(inside) == 0:
+        raise ValueError(f"no shape of net {mesh.net_names[k]} at ({x}, {y})")
+    return int(inside[np.argmin(mesh.layer[inside])])  # lowest layer: where devices attach
+
+
+def ir_drop(
+    component,
+    pdk,
+    net: str = "VSS",
+    current: float = 1e-3,
+    sources: Optional[Sequence[Source]] = None,
+    tech: Optional[Tech] = None,
+    max_segment: float = 1.0,
+    mesh: Optional[Mesh] = None,
+) -> IRDropReport:
+    """
+    DC voltage drop and current density along the metal of one net, e.g. the VSS rings.
+
+    The net is extracted as a resistive mesh (see build_mesh), its pin label is
+    held at 0 V and the source currents flow in at the devices; one sparse solve
+    gives every node voltage and segment current.
+
+    Args:
+        component: gdsfactory Component, e.g. GilbertMixerInterdigited(...).build()
+        pdk: MappedPDK the component was generated with
+        net: Pin label of the net, the reference node
+        current: Total current (A) spread over the diffusion of the net when sources is None
+        sources: Current injection points (x, y, amps)
+        tech: Layer resistances and EM limits, default the built-in table of pdk
+        max_segment: Mesh resolution along straps and rings (um)
+        mesh: Mesh of component from an earlier call, skips extraction
+
+    Returns:
+        IRDropReport: node voltages, worst drop and per segment current density
+    """
+    start = time.perf_counter()
+    mesh = mesh if mesh is not None else build_mesh(component, pdk, tech, max_segment=max_segment)
+    if net not in mesh.pins:
+        raise ValueError(f"no pin label {net!r} in the layout, pins are {', '.join(mesh.pins)}")
+    k = mesh.net_index(net)
+    sources = device_sources(mesh, net, current) if sources is None else sources
+
+    nodes = np.flatnonzero(mesh.net == k)
+    local = np.full(mesh.nodes, -1)
+    local[nodes] = np.arange(len(nodes))
+    injected = np.zeros(len(nodes))
+    for x, y, amps in sources:
+        injected[local[_node_at(mesh, k, x, y)]] += amps
+    reference = np.unique(local[mesh.pins[net]])
+    inner = np.setdiff1d(np.arange(len(nodes)), reference)
+
+    laplacian = mesh.laplacian()[nodes][:, nodes].tocsr()
+    voltage = np.zeros(len(nodes))
+    if len(inner):
+        voltage[inner] = np.atleast_1d(spsolve(laplacian[inner][:, inner].tocsc(), injected[inner]))
+
+    on_net = np.flatnonzero(mesh.net[mesh.edges[:, 0]] == k)
+    edges = mesh.edges[on_net]
+    edge_current = mesh.conductance[on_net] * (voltage[local[edges[:, 0]]] - voltage[local[edges[:, 1]]])
+    tech = mesh.tech
+    is_cut = mesh.edge_width[on_net] == 0
+    layers = [mesh.layers[layer] for layer in mesh.edge_layer[on_net]]
+    limits = np.array([tech.vias[g].em_limit if g in tech.vias else tech.conductors[g].em_limit for g in layers])
+    density = np.abs(edge_current) * 1e3 / np.where(is_cut, 1.0, mesh.edge_width[on_net])
+    return IRDropReport(net, mesh, nodes, voltage, on_net, edge_current, density, density / limits,
+                        float(np.sum([amps for _, _, amps in sources])), time.perf_counter() - start)
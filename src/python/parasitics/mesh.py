@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import gdstk
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from .tech import Tech, tech_for
+
+EPS = 1e-6
+CHUNK = 512  # rows of the pairwise overlap test evaluated at once
+
+
+def rectangles(points) -> np.ndarray:
+    """
+    Decompose a Manhattan polygon into disjoint rectangles (k, 4) of xmin, ymin, xmax, ymax.
+
+    Horizontal slabs between consecutive vertex y coordinates are filled by even-odd
+    crossings of the polygon edges, vertically adjacent slabs of the same x span are joined.
+    """
+    points = np.asarray(points, dtype=float)
+    start, end = points, np.roll(points, -1, axis=0)
+    ys = np.unique(points[:, 1])
+    rects: List[List[float]] = []
+    open_spans: Dict[Tuple[float, float], int] = {}
+    for y0, y1 in zip(ys[:-1], ys[1:]):
+        mid = (y0 + y1) / 2
+        crossing = (np.minimum(start[:, 1], end[:, 1]) < mid) & (np.maximum(start[:, 1], end[:, 1]) > mid)
+        a, b = start[crossing], end[crossing]
+        xs = np.sort(a[:, 0] + (mid - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1]))
+        spans = {}
+        for x0, x1 in zip(xs[0::2], xs[1::2]):
+            if x1 - x0 <= EPS:
+                continue
+            key = (round(x0, 6), round(x1, 6))
+            if key in open_spans and abs(rects[open_spans[key]][3] - y0) <= EPS:
+                rects[open_spans[key]][3] = y1
+                spans[key] = open_spans[key]
+            else:
+                spans[key] = len(rects)
+                rects.append([x0, y0, x1, y1])
+        open_spans = spans
+    return np.array(rects, dtype=float).reshape(-1, 4)
+
+
+def split_rectangles(rects: np.ndarray, max_length: float) -> np.ndarray:
+    """
+    Cut rectangles along their long side at the multiples of max_length.
+
+    Cutting at a common grid keeps the pieces of neighbouring rectangles aligned.
+    """
+    along_x = rects[:, 2] - rects[:, 0] >= rects[:, 3] - rects[:, 1]
+    low = np.where(along_x, rects[:, 0], rects[:, 1])
+    high = np.where(along_x, rects[:, 2], rects[:, 3])
+    first = np.ceil((low + EPS) / max_length)
+    cuts = np.maximum(np.floor((high - EPS) / max_length) - first + 1, 0).astype(int)
+    index = np.repeat(np.arange(len(rects)), cuts + 1)
+    k = np.arange(len(index)) - np.repeat(np.cumsum(cuts + 1) - cuts - 1, cuts + 1)
+    start = np.where(k == 0, low[index], (first[index] + k - 1) * max_length)
+    stop = np.where(k == cuts[index], high[index], (first[index] + k) * max_length)
+    pieces = rects[index].copy()
+    pieces[:, 0] = np.where(along_x[index], start, pieces[:, 0])
+    pieces[:, 2] = np.where(along_x[index], stop, pieces[:, 2])
+    pieces[:, 1] = np.where(along_x[index], pieces[:, 1], start)
+    pieces[:, 3] = np.where(along_x[index], pieces[:, 3], stop)
+    return pieces
+
+
+def _pairs(a: np.ndarray, b: np.ndarray, same: bool, overlap_only: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Index pairs of rects in a and b that overlap (or share an edge, unless overlap_only)"""
+    first, second = [], []
+    for offset in range(0, len(a), CHUNK):
+        chunk = a[offset:offset + CHUNK]
+        ox = np.minimum(chunk[:, None, 2], b[None, :, 2]) - np.maximum(chunk[:, None, 0], b[None, :, 0])
+        oy = np.minimum(chunk[:, None, 3], b[None, :, 3]) - np.maximum(chunk[:, None, 1], b[None, :, 1])
+        if overlap_only:
+            hit = (ox > EPS) & (oy > EPS)
+        else:
+            hit = (ox > -EPS) & (oy > -EPS) & (np.maximum(ox, oy) > EPS)
+        i, j = np.nonzero(hit)
+        i += offset
+        if same:
+            keep = i < j
+            i, j = i[keep], j[keep]
+        first.append(i)
+        second.append(j)
+    return np.concatenate(first or [np.zeros(0, np.intp)]), np.concatenate(second or [np.zeros(0, np.intp)])
+
+
+def _half_resistance(rects: np.ndarray, contacts: np.ndarray, sheet: np.ndarray) -> np.ndarray:
+    """Resistance from each rect center to the nearest point of a contact region (k, 4) on it"""
+    center = (rects[:, :2] + rects[:, 2:]) / 2
+    distance = np.abs(np.clip(center, contacts[:, :2], contacts[:, 2:]) - center)
+    return sheet * (distance[:, 0] / (rects[:, 3] - rects[:, 1]) + distance[:, 1] / (rects[:, 2] - rects[:, 0]))
+
+
+@dataclass
+class Mesh:
+    """
+    Resistor network of a layout: one node per conductor rectangle or via cut.
+
+    Conductor shapes are merged per layer (diffusion minus poly) and cut into
+    disjoint rectangles; touching rectangles and cuts landing on them are joined
+    by resistors running through the rectangle centers.
+    """
+    layers: List[str]  # glayer of each layer index
+    rects: np.ndarray  # (n, 4) xmin, ymin, xmax, ymax
+    layer: np.ndarray  # (n,) layer index
+    is_via: np.ndarray  # (n,) node is a via cut
+    piece: np.ndarray  # (n,) merged polygon the rect was cut from, -1 for cuts
+    piece_area: np.ndarray  # (p,) um^2
+    piece_perimeter: np.ndarray  # (p,) um
+    edges: np.ndarray  # (m, 2) node pairs
+    conductance: np.ndarray  # (m,) siemens
+    edge_width: np.ndarray  # (m,) um of metal the current crosses, 0 for cut edges
+    edge_layer: np.ndarray  # (m,) layer index of the conductor (the cut for cut edges)
+    net: np.ndarray  # (n,) net index
+    net_names: List[str]
+    pins: Dict[str, List[int]] = field(default_factory=dict)  # label text -> nodes
+    shorts: List[Tuple[str, str]] = field(default_factory=list)  # labels found on the same net
+    tech: Optional[Tech] = None
+
+    @property
+    def nodes(self) -> int:
+        return len(self.rects)
+
+    def layer_index(self, glayer: str) -> int:
+        return self.layers.index(glayer)
+
+    def net_index(self, name: str) -> int:
+        return self.net_names.index(name)
+
+    def device_nodes(self) -> np.ndarray:
+        """Diffusion and poly nodes, where devices attach to the routing"""
+        terminals = [self.layers.index(g) for g in ("active_diff", "poly") if g in self.layers]
+        return np.flatnonzero(np.isin(self.layer, terminals) & ~self.is_via)
+
+    def laplacian(self) -> sparse.csr_matrix:
+        n = self.nodes
+        i, j = self.edges[:, 0], self.edges[:, 1]
+        g = self.conductance
+        matrix = sparse.coo_matrix((np.concatenate([-g, -g]), (np.concatenate([i, j]), np.concatenate([j, i]))),
+                                   shape=(n, n)).tocsr()
+        return matrix + sparse.diags(np.bincount(np.concatenate([i, j]), np.concatenate([g, g]), minlength=n))
+
+
+def _glayer_polygons(component, pdk, glayers) -> Dict[str, List[np.ndarray]]:
+    by_spec = component.get_polygons(by_spec=True)
+    found: Dict[str, List[np.ndarray]] = {}
+    for glayer in glayers:
+        try:
+            spec = tuple(pdk.get_glayer(glayer))
+        except Exception:
+            continue  # glayer not mapped by this PDK
+        found[glayer] = list(by_spec.get(spec, []))
+    return found
+
+
+def _label_glayer(pdk, layer, conductors) -> Optional[str]:
+    for glayer in conductors:
+        for suffix in ("_label", "_pin"):
+            try:
+                if tuple(pdk.get_glayer(glayer + suffix)) == tuple(layer):
+                    return glayer
+            except Exception:
+                continue
+    return None
+
+
+def build_mesh(component, pdk, tech: Optional[Tech] = None, max_segment: Optional[float] = None) -> Mesh:
+    """
+    Extract the resistor network and nets of a (flattened view of a) component.
+
+    Net names come from the text labels the builders put on their pins, other
+    nets are named net0, net1, ...
+
+    Args:
+        component: gdsfactory Component, e.g. GilbertMixerInterdigited(...).build()
+        pdk: MappedPDK the component was generated with
+        tech: Layer resistances and capacitances, default the built-in table of pdk
+        max_segment: Cut conductor rectangles into pieces no longer than this (um), finer
+            voltage and current resolution along long straps and rings, None: no cutting
+
+    Returns:
+        Mesh: nodes, resistors and nets
+    """
+    tech = tech_for(pdk, tech)
+    conductors = list(tech.conductors)
+    polygons = _glayer_polygons(component, pdk, conductors + list(tech.vias))
+    layers, rect_list, layer_list, via_list, piece_list = [], [], [], [], []
+    piece_area, piece_perimeter = [], []
+
+    def add(glayer, rects, is_via, pieces):
+        layers.append(glayer)
+        rect_list.append(rects)
+        layer_list.append(np.full(len(rects), len(layers) - 1))
+        via_list.append(np.full(len(rects), is_via))
+        piece_list.append(pieces)
+
+    poly = [gdstk.Polygon(p) for p in polygons.get("poly", [])]
+    for glayer in conductors:
+        shapes = [gdstk.Polygon(p) for p in polygons.get(glayer, [])]
+        # gates split the diffusion into source and drain
+        merged = gdstk.boolean(shapes, poly, "not") if glayer == "active_diff" else gdstk.boolean(shapes, [], "or")
+        rects, pieces = [], []
+        for shape in merged:
+            cut = rectangles(shape.points)
+            if max_segment:
+                cut = split_rectangles(cut, max_segment)
+            rects.append(cut)
+            pieces.append(np.full(len(cut), len(piece_area)))
+            piece_area.append(shape.area())
+            piece_perimeter.append(shape.perimeter())
+        add(glayer, np.concatenate(rects or [np.zeros((0, 4))]), False,
+            np.concatenate(pieces or [np.zeros(0, dtype=int)]))
+    for glayer in tech.vias:
+        cuts = np.array([[p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()]
+                         for p in polygons.get(glayer, [])], dtype=float).reshape(-1, 4)
+        add(glayer, cuts, True, np.full(len(cuts), -1))
+
+    rects = np.concatenate(rect_list)
+    layer = np.concatenate(layer_list)
+    is_via = np.concatenate(via_list)
+    starts = np.cumsum([0] + [len(r) for r in rect_list])
+    nodes = {glayer: np.arange(starts[k], starts[k + 1]) for k, glayer in enumerate(layers)}
+    sheet = np.array([tech.conductors[g].sheet_resistance if g in tech.conductors else 0.0 for g in layers])[layer]
+
+    edges, resistance, width, edge_layer = [], [], [], []
+    for glayer in conductors:
+        own = nodes[glayer]
+        i, j = _pairs(rects[own], rects[own], same=True, overlap_only=False)
+        i, j = own[i], own[j]
+        contact = np.column_stack([np.maximum(rects[i, :2], rects[j, :2]), np.minimum(rects[i, 2:], rects[j, 2:])])
+        edges.append(np.column_stack([i, j]))
+        resistance.append(_half_resistance(rects[i], contact, sheet[i]) + _half_resistance(rects[j], contact, sheet[j]))
+        # the current between two rectangles crosses their shared edge
+        width.append(np.max(contact[:, 2:] - contact[:, :2], axis=1))
+        edge_layer.append(layer[i])
+    for glayer, via in tech.vias.items():
+        cuts = nodes[glayer]
+        for side in via.bottom + (via.top,):
+            if side not in nodes:
+                continue
+            metal = nodes[side]
+            c, m = _pairs(rects[cuts], rects[metal], same=False, overlap_only=True)
+            c, m = cuts[c], metal[m]
+            contact = np.column_stack([np.maximum(rects[c, :2], rects[m, :2]), np.minimum(rects[c, 2:], rects[m, 2:])])
+            edges.append(np.column_stack([c, m]))
+            resistance.append(_half_resistance(rects[m], contact, sheet[m]) + via.resistance / 2)
+            width.append(np.zeros(len(c)))
+            edge_layer.append(layer[c])
+
+    edges = np.concatenate(edges).astype(np.intp)
+    resistance = np.maximum(np.concatenate(resistance), 1e-6)
+    n = len(rects)
+    adjacency = sparse.coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(n, n))
+    _, net = connected_components(adjacency, directed=False)
+
+    # Name nets after the pin labels on them
+    pins: Dict[str, List[int]] = {}
+    names: Dict[int, str] = {}
+    shorts = []
+    labels = component.get_labels() if hasattr(component, "get_labels") else component.labels
+    for label in labels:
+        glayer = _label_glayer(pdk, (label.layer, label.texttype), conductors)
+        candidates = [nodes[glayer]] if glayer else [nodes[g] for g in reversed(conductors)]
+        x, y = label.origin
+        for own in candidates:
+            inside = own[(rects[own, 0] <= x + EPS) & (rects[own, 2] >= x - EPS)
+                         & (rects[own, 1] <= y + EPS) & (rects[own, 3] >= y - EPS)]
+            if len(inside):
+                pins.setdefault(label.text, []).append(int(inside[0]))
+                other = names.setdefault(int(net[inside[0]]), label.text)
+                if other != label.text:
+                    shorts.append((other, label.text))
+                break
+    net_names = [names.get(k, f"net{k}") for k in range(net.max() + 1 if n else 0)]
+
+    return Mesh(layers, rects, layer, is_via, np.concatenate(piece_list), np.array(piece_area),
+                np.array(piece_perimeter), edges, 1 / resistance, np.concatenate(width),
+                np.concatenate(edge_layer), net, net_names, pins, shorts, tech)
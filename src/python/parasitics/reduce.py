@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import itertools
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from simulation.batch import NGSPICE, SimJob, SimResult, run_batch
+from simulation.spice_index import Instance, SpiceIndex, Subckt, spice_number
+
+# Elements that are never merged or treated as parasitics
+_SOURCES = frozenset("vibefgh")
+# SPICE's minimum conductance to ground, keeps floating islands solvable
+GMIN = 1e-12
+
+
+@dataclass
+class ReductionConfig:
+    """
+    What reduce_subckt may change. Only R and C lines with a plain value are
+    parasitics; nodes of devices, inductors, sources and the ports are kept.
+    """
+    ground: Optional[str] = None  # lumping reference, default VSS if it is a port, else 0
+    min_coupling: float = 0.0  # F, smaller coupling capacitors go to ground at both ends
+    min_cap: float = 0.0  # F, a node between at most two resistors with less capacitance is folded into its neighbours
+    ticer_tau: float = 0.0  # s, eliminate nodes whose C/G time constant is below this (0: no TICER)
+    max_degree: int = 8  # TICER and exact star-mesh steps only remove nodes with at most this many neighbours
+    merge_devices: bool = True  # collapse parallel identical devices into one with the summed m
+    keep: Tuple[str, ...] = ()  # nets never eliminated
+
+
+@dataclass
+class ReductionReport:
+    """Result of reduce_subckt: what was removed and how far the reduced network is from the original"""
+    subckt: str
+    nodes: Tuple[int, int]  # before, after
+    resistors: Tuple[int, int]
+    capacitors: Tuple[int, int]
+    devices: Tuple[int, int]
+    eliminated: Dict[str, int]  # exact / lumped / ticer node eliminations
+    lumped_couplings: int
+    capacitance: Tuple[float, float]  # F, total before and after
+    max_tau: float  # s, largest C/G of a node eliminated approximately
+    admittance_error: Dict[float, float] = field(default_factory=dict)  # Hz -> relative port admittance error
+    solve_speedup: Optional[float] = None
+    elapsed: float = 0.0
+
+    def error_bound(self, frequency: float) -> float:
+        """
+        Bound on the relative port admittance error of the node eliminations at a frequency.
+
+        Eliminating a node is exact at DC (star-mesh transform) and drops
+        terms of order w*tau and (w*tau)^2 of that node, so 2 w max_tau
+        bounds every approximate step while w max_tau << 1. Lumped coupling
+        capacitors are not covered; admittance_error measures everything.
+        """
+        return 4 * np.pi * frequency * self.max_tau
+
+    def __str__(self) -> str:
+        lines = [f"{self.subckt}: nodes {self.nodes[0]} -> {self.nodes[1]}, R {self.resistors[0]} -> "
+                 f"{self.resistors[1]}, C {self.capacitors[0]} -> {self.capacitors[1]}, devices "
+                 f"{self.devices[0]} -> {self.devices[1]} in {self.elapsed * 1e3:.0f} ms",
+                 f"  eliminated {', '.join(f'{n} {kind}' for kind, n in self.eliminated.items())}, "
+                 f"{self.lumped_couplings} coupling caps lumped, max tau {self.max_tau:.3g} s",
+                 f"  total C {self.capacitance[0] * 1e15:.4g} fF -> {self.capacitance[1] * 1e15:.4g} fF"]
+        for frequency, error in self.admittance_error.items():
+            lines.append(f"  port admittance error at {frequency:.3g} Hz: {error:.3g} "
+                         f"(bound {self.error_bound(frequency):.3g})")
+        if self.solve_speedup is not None:
+            lines.append(f"  sparse LU speedup {self.solve_speedup:.1f}x")
+        return "\n".join(lines)
+
+
+def _value(instance: Instance) -> Optional[float]:
+    """Value of a parasitic R or C, None for anything else"""
+    if instance.kind not in "rc" or instance.ref is not None or "value" not in instance.params:
+        return None
+    if len(instance.nodes) != 2 or set(instance.params) - {"value", "m"}:
+        return None
+    try:
+        return spice_number(instance.params["value"])
+    except ValueError:
+        return None
+
+
+class _Network:
+    """Symmetric conductance and capacitance adjacency of the parasitic R/C elements"""
+
+    def __init__(self):
+        self.g: Dict[str, Dict[str, float]] = {}
+        self.c: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _add(table: Dict[str, Dict[str, float]], a: str, b: str, value: float) -> None:
+        if a == b or value == 0:
+            return
+        row = table.setdefault(a, {})
+        row[b] = row.get(b, 0.0) + value
+        row = table.setdefault(b, {})
+        row[a] = row.get(a, 0.0) + value
+
+    def add_g(self, a: str, b: str, value: float) -> None:
+        self._add(self.g, a, b, value)
+
+    def add_c(self, a: str, b: str, value: float) -> None:
+        self._add(self.c, a, b, value)
+
+    def remove_c(self, a: str, b: str) -> float:
+        value = self.c[a].pop(b)
+        del self.c[b][a]
+        return value
+
+    def nodes(self) -> set:
+        return {n for n, row in self.g.items() if row} | {n for n, row in self.c.items() if row}
+
+    def edges(self, table: Dict[str, Dict[str, float]]) -> List[Tuple[str, str, float]]:
+        return [(a, b, v) for a, row in table.items() for b, v in row.items() if a < b]
+
+    def eliminate(self, node: str) -> None:
+        """
+        Remove a node by the first order TICER step.
+
+        With conductances g_k and capacitances c_k from the node to its
+        neighbours and G = sum(g_k): g_ij += g_i g_j / G, c_ij += (g_i c_j + g_j c_i) / G.
+        """
+        gn, cn = self.g.pop(node, {}), self.c.pop(node, {})
+        for other in gn:
+            del self.g[other][node]
+        for other in cn:
+            del self.c[other][node]
+        total = sum(gn.values())
+        neighbours = sorted(set(gn) | set(cn))
+        for i, j in itertools.combinations(neighbours, 2):
+            gi, gj, ci, cj = gn.get(i, 0.0), gn.get(j, 0.0), cn.get(i, 0.0), cn.get(j, 0.0)
+            self.add_g(i, j, gi * gj / total)
+            self.add_c(i, j, (gi * cj + gj * ci) / total)
+
+    def matrices(self, order: Sequence[str]) -> Tuple[sparse.csr_matrix, sparse.csr_matrix]:
+        """Nodal conductance and capacitance matrices over order"""
+        position = {node: i for i, node in enumerate(order)}
+        out = []
+        for table in (self.g, self.c):
+            rows, cols, values = [], [], []
+            for a, b, v in self.edges(table):
+                i, j = position[a], position[b]
+                rows += [i, j, i, j]
+                cols += [i, j, j, i]
+                values += [v, v, -v, -v]
+            out.append(sparse.csr_matrix((values, (rows, cols)), shape=(len(order), len(order))))
+        return out[0], out[1]
+
+
+def _device_key(instance: Instance, nodes: Tuple[str, ...]) -> Optional[tuple]:
+    """Key two devices share when they are parallel and identical, None when instance cannot be merged"""
+    kind = instance.kind
+    if kind in _SOURCES or kind in "kl":
+        return None
+    params = {k: v for k, v in instance.params.items() if k != "m"}
+    if "m" in instance.params:
+        try:
+            spice_number(instance.params["m"])
+        except ValueError:
+            return None
+    ref = (instance.ref or "").lower()
+    if kind in "rc" and len(nodes) == 2:
+        nodes = tuple(sorted(nodes))
+    elif len(nodes) == 4 and (kind == "m" or "fet" in ref):
+        # drain and source are interchangeable
+        nodes = (*sorted((nodes[0], nodes[2])), nodes[1], nodes[3])
+    return kind, ref, nodes, tuple(sorted(params.items()))
+
+
+def merge_parallel(instances: Sequence[Instance], canonical=str.lower) -> Tuple[List[Instance], int]:
+    """
+    Collapse devices with the same model, parameters and terminals into one
+    with the summed m, as netgen does before comparing ("Merged N parallel
+    devices"). Returns the devices and how many were merged away.
+    """
+    merged: Dict[tuple, Instance] = {}
+    out: List[Instance] = []
+    removed = 0
+    for instance in instances:
+        key = _device_key(instance, tuple(canonical(n) for n in instance.nodes))
+        if key is None:
+            out.append(instance)
+            continue
+        first = merged.get(key)
+        if first is None:
+            merged[key] = Instance(instance.name, instance.nodes, instance.ref, dict(instance.params))
+            out.append(merged[key])
+            continue
+        first.params["m"] = f"{first.multiplier + instance.multiplier:g}"
+        removed += 1
+    return out, removed
+
+
+def _ground(subckt: Subckt, config: ReductionConfig) -> str:
+    if config.ground is not None:
+        return config.ground.lower()
+    return "vss" if "vss" in (port.lower() for port in subckt.ports) else "0"
+
+
+def reduce_subckt(subckt: Subckt, config: Optional[ReductionConfig] = None,
+                  frequencies: Sequence[float] = (0.0, 1e8, 1e9), measure_speedup: bool = True
+                  ) -> Tuple[Subckt, ReductionReport]:
+    """
+    Reduce the parasitic R/C network of a subcircuit.
+
+    Parallel resistors and capacitors are summed; resistor chains and
+    dangling resistors are removed exactly (star-mesh transform of nodes
+    without capacitance); coupling capacitors below min_coupling are lumped
+    to ground, nodes of resistor chains with less than min_cap and, with
+    ticer_tau, every node with a C/G time constant below it are eliminated
+    by the TICER step, which keeps DC exact and moves the node capacitance
+    to its neighbours; parallel identical devices are merged. Net names are
+    case insensitive, as in ngspice.
+
+    Args:
+        subckt: Subcircuit from a SpiceIndex, e.g. index["gf180mcu_fd_io__asig_5p0_extracted"]
+        config: Thresholds, default only exact reductions and device merging
+        frequencies: Hz at which the port admittance of both networks is compared
+        measure_speedup: Time a sparse LU factorization of both networks
+
+    Returns:
+        (Subckt, ReductionReport): the reduced subcircuit with the same ports
+    """
+    start = time.perf_counter()
+    config = config or ReductionConfig()
+    ground = _ground(subckt, config)
+    spelling: Dict[str, str] = {}
+    for net in [*subckt.ports, *(n for instance in subckt.instances for n in instance.nodes)]:
+        spelling.setdefault(net.lower(), net)
+    spelling.setdefault(ground, config.ground or ground)
+
+    network, devices, resistors, capacitors = _Network(), [], 0, 0
+    for instance in subckt.instances:
+        value = _value(instance)
+        if value is None:
+            devices.append(instance)
+            continue
+        a, b = (n.lower() for n in instance.nodes)
+        if instance.kind == "r":
+            resistors += 1
+            network.add_g(a, b, instance.multiplier / max(value, 1e-6))
+        else:
+            capacitors += 1
+            network.add_c(a, b, value * instance.multiplier)
+    protected = {p.lower() for p in subckt.ports} | {k.lower() for k in config.keep} | {ground}
+    protected |= {n.lower() for instance in devices for n in instance.nodes}
+    original = _Network()
+    original.g = {n: dict(row) for n, row in network.g.items()}
+    original.c = {n: dict(row) for n, row in network.c.items()}
+    capacitance = sum(v for _, _, v in network.edges(network.c))
+
+    lumped_couplings = 0
+    if config.min_coupling > 0:
+        for a, b, v in network.edges(network.c):
+            if ground not in (a, b) and v < config.min_coupling:
+                network.remove_c(a, b)
+                network.add_c(a, ground, v)
+                network.add_c(b, ground, v)
+                lumped_couplings += 1
+
+    def step(node: str) -> Optional[Tuple[float, str]]:
+        if node in protected:
+            return None
+        gn, cn = network.g.get(node, {}), network.c.get(node, {})
+        conductance = sum(gn.values())
+        if conductance <= 0:
+            return None
+        degree = len(set(gn) | set(cn))
+        total_c = sum(cn.values())
+        if total_c == 0 and degree <= max(2, config.max_degree):
+            return 0.0, "exact"
+        tau = total_c / conductance
+        if total_c < config.min_cap and len(gn) <= 2:
+            return tau, "lumped"
+        if tau < config.ticer_tau and degree <= config.max_degree:
+            return tau, "ticer"
+        return None
+
+    eliminated = {"exact": 0, "lumped": 0, "ticer": 0}
+    max_tau = 0.0
+    # Smallest time constants first: a node is popped with priority 0 to be
+    # (re)evaluated and goes back with its time constant until that comes up
+    heap = [(0.0, node) for node in network.nodes()]
+    heapq.heapify(heap)
+    while heap:
+        priority, node = heapq.heappop(heap)
+        decision = step(node)
+        if decision is None:
+            continue
+        tau, kind = decision
+        if tau > priority:
+            heapq.heappush(heap, (tau, node))
+            continue
+        neighbours = set(network.g.get(node, ())) | set(network.c.get(node, ()))
+        network.eliminate(node)
+        eliminated[kind] += 1
+        if kind != "exact":
+            max_tau = max(max_tau, tau)
+        for other in neighbours:
+            heapq.heappush(heap, (0.0, other))
+
+    if config.merge_devices:
+        devices, _ = merge_parallel(devices)
+    instances = list(devices)
+    names = {instance.name.lower() for instance in devices}
+    for prefix, table in (("R", network.g), ("C", network.c)):
+        counter = itertools.count()
+        for a, b, v in network.edges(table):
+            name = f"{prefix}p{next(counter)}"
+            while name.lower() in names:
+                name = f"{prefix}p{next(counter)}"
+            value = 1.0 / v if prefix == "R" else v
+            instances.append(Instance(name, (spelling[a], spelling[b]), None, {"value": f"{value:.6g}"}))
+    reduced = Subckt(subckt.name, subckt.ports, instances, dict(subckt.params), subckt.source)
+
+    report = ReductionReport(
+        subckt.name,
+        (len({n.lower() for n in subckt.nets}), len({n.lower() for n in reduced.nets})),
+        (resistors, len(network.edges(network.g))),
+        (capacitors, len(network.edges(network.c))),
+        (len(subckt.instances) - resistors - capacitors, len(devices)),
+        eliminated, lumped_couplings,
+        (capacitance, sum(v for _, _, v in network.edges(network.c))),
+        max_tau,
+    )
+    boundary = sorted(protected & (original.nodes() | network.nodes()))
+    if frequencies:
+        report.admittance_error = _admittance_error(original, network, boundary, frequencies)
+    if measure_speedup:
+        report.solve_speedup = _factor_time(original) / _factor_time(network)
+    report.elapsed = time.perf_counter() - start
+    return reduced, report
+
+
+def _admittance_error(original: _Network, reduced: _Network, boundary: Sequence[str],
+                          frequencies: Sequence[float], probes: int = 4, seed: int = 0) -> Dict[float, float]:
+    """
+    Relative difference of the admittance two networks present at their
+    boundary nodes, ||(Y_original - Y_reduced) v|| / ||Y_original v|| for
+    random boundary voltages v, with every other node left to settle.
+    """
+    rng = np.random.default_rng(seed)
+    voltages = rng.standard_normal((len(boundary), probes))
+    errors = {}
+    currents = []
+    for network in (original, reduced):
+        inner = sorted(network.nodes() - set(boundary))
+        order = list(boundary) + inner
+        g, c = network.matrices(order)
+        nb = len(boundary)
+        per_frequency = []
+        for frequency in frequencies:
+            y = (g + 2j * np.pi * frequency * c).tocsc() if frequency else g.tocsc().astype(complex)
+            y = y + GMIN * sparse.eye(len(order), format="csc")
+            y_bb, y_bi = y[:nb, :nb], y[:nb, nb:]
+            current = y_bb @ voltages
+            if inner:
+                y_ii, y_ib = y[nb:, nb:], y[nb:, :nb]
+                inside = splu(y_ii.tocsc()).solve(np.asarray(-(y_ib @ voltages), dtype=complex))
+                current = current + y_bi @ inside
+            per_frequency.append(current)
+        currents.append(per_frequency)
+    for k, frequency in enumerate(frequencies):
+        reference = np.linalg.norm(currents[0][k])
+        errors[frequency] = float(np.linalg.norm(currents[0][k] - currents[1][k]) / reference) if reference else 0.0
+    return errors
+
+
+def _factor_time(network: _Network, frequency: float = 1e9, repeats: int = 3) -> float:
+    """Best of a few sparse LU factorizations of the nodal matrix, the work of one simulator iteration"""
+    order = sorted(network.nodes())
+    g, c = network.matrices(order)
+    y = (g + 2j * np.pi * frequency * c + GMIN * sparse.eye(len(order))).tocsc()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        splu(y)
+        best = min(best, time.perf_counter() - start)
+    return max(best, 1e-9)
+
+
+def format_subckt(subckt: Subckt) -> str:
+    """SPICE text of a subcircuit, long lines continued with "+" """
+    head = f".subckt {subckt.name} {' '.join(subckt.ports)}"
+    if subckt.params:
+        head += " " + " ".join(f"{k}={v}" for k, v in subckt.params.items())
+    lines = [head]
+    for instance in subckt.instances:
+        words = [instance.name, *instance.nodes]
+        if instance.ref is not None:
+            words.append(instance.ref)
+        if "value" in instance.params:
+            words.append(instance.params["value"])
+        words += [f"{k}={v}" for k, v in instance.params.items() if k != "value"]
+        line = words[0]
+        for word in words[1:]:
+            if len(line) - line.rfind("\n") + len(word) > 120:
+                line += "\n+"
+            line += " " + word
+        lines.append(line)
+    lines.append(".ends")
+    return "\n".join(lines) + "\n"
+
+
+def reduce_netlist(path: str, output: str, subckts: Optional[Sequence[str]] = None,
+                   config: Optional[ReductionConfig] = None, frequencies: Sequence[float] = (0.0, 1e8, 1e9),
+                   measure_speedup: bool = True) -> List[ReductionReport]:
+    """
+    Write a copy of a SPICE file with the parasitics of its subcircuits reduced.
+
+    Args:
+        path: SPICE file, e.g. gf180mcu_fd_io__asig_5p0_extracted.spice
+        output: Reduced file, can be included in place of path
+        subckts: Subcircuits to reduce (default every one with parasitic R or C), the others are copied
+        config: See ReductionConfig
+
+    Returns:
+        List[ReductionReport]: one per reduced subcircuit
+    """
+    index = SpiceIndex.build(path)
+    reports, blocks = [], [f"* {os.path.basename(path)} with reduced parasitics"]
+    wanted = None if subckts is None else {name.lower() for name in subckts}
+    for subckt in index:
+        has_parasitics = any(_value(instance) is not None for instance in subckt.instances)
+        if (wanted is None and has_parasitics) or (wanted is not None and subckt.name.lower() in wanted):
+            subckt, report = reduce_subckt(subckt, config, frequencies, measure_speedup)
+            reports.append(report)
+        blocks.append(format_subckt(subckt))
+    if wanted is not None and not wanted <= {name.lower() for name in index.names}:
+        raise ValueError(f"no subcircuit {', '.join(sorted(wanted - {n.lower() for n in index.names}))} in {path}")
+    with open(output, "w") as f:
+        f.write("\n".join(blocks))
+    return reports
+
+
+@dataclass
+class TestbenchComparison:
+    """A testbench run with the original and with the reduced include"""
+    original: SimResult
+    reduced: SimResult
+
+    @property
+    def speedup(self) -> float:
+        return self.original.elapsed / self.reduced.elapsed if self.reduced.elapsed else float("inf")
+
+    def deviations(self) -> Dict[str, float]:
+        """Relative change of every measurement both runs printed"""
+        out = {}
+        for name, value in self.original.measurements.items():
+            if name in self.reduced.measurements:
+                other = self.reduced.measurements[name]
+                out[name] = abs(other - value) / abs(value) if value else abs(other)
+        return out
+
+    def __str__(self) -> str:
+        lines = [f"{self.original.job}: {self.original.elapsed:.2f} s -> {self.reduced.elapsed:.2f} s "
+                 f"({self.speedup:.1f}x), {self.original.status}/{self.reduced.status}"]
+        lines += [f"  {name}: {error:.3g}" for name, error in self.deviations().items()]
+        return "\n".join(lines)
+
+
+def compare_testbench(netlist: str, original: str, reduced: str, output_dir: str,
+                      simulator: Sequence[str] = NGSPICE, timeout: Optional[float] = None) -> TestbenchComparison:
+    """
+    Simulate a testbench as it is and with its .include of original replaced by reduced.
+
+    Includes are matched by file name, so decks exported with another
+    checkout's absolute paths (Gilbert_cell_hierarchal_tb) are rewritten too.
+    """
+    with open(netlist) as f:
+        deck = f.read()
+    lines, found = [], False
+    for line in deck.splitlines():
+        words = line.split()
+        if (len(words) == 2 and words[0].lower() in (".include", ".inc")
+                and os.path.basename(words[1].strip("'\"")) == os.path.basename(original)):
+            line, found = f"{words[0]} {os.path.abspath(reduced)}", True
+        lines.append(line)
+    if not found:
+        raise ValueError(f"{netlist} does not include {os.path.basename(original)}")
+    name = os.path.splitext(os.path.basename(netlist))[0]
+    jobs = [SimJob(name, netlist, timeout=timeout), SimJob(f"{name}_reduced", netlist, timeout=timeout,
+                                                          deck="\n".join(lines) + "\n")]
+    # One at a time, so the two runs do not compete for the same cores
+    batch = run_batch(jobs, output_dir, simulator=simulator, processes=1)
+    return TestbenchComparison(*batch.results)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reduce the parasitic R/C network of extracted SPICE subcircuits")
+    parser.add_argument("netlist", help="extracted SPICE file")
+    parser.add_argument("output", help="reduced SPICE file")
+    parser.add_argument("--subckt", nargs="+", help="subcircuits to reduce (default all with parasitics)")
+    parser.add_argument("--ground", help="net coupling capacitors are lumped to (default VSS or 0)")
+    parser.add_argument("--min-coupling", type=float, default=0.0, help="F, lump smaller coupling capacitors")
+    parser.add_argument("--min-cap", type=float, default=0.0, help="F, fold resistor chain nodes with less C")
+    parser.add_argument("--ticer-tau", type=float, default=0.0, help="s, TICER time constant threshold")
+    parser.add_argument("--max-degree", type=int, default=8, help="neighbours of a node TICER may remove")
+    parser.add_argument("--keep", nargs="+", default=[], help="nets never eliminated")
+    parser.add_argument("--no-merge", action="store_true", help="keep parallel devices")
+    parser.add_argument("--frequencies", nargs="+", type=float, default=[0.0, 1e8, 1e9],
+                        help="Hz at which the port admittance error is reported")
+    parser.add_argument("--testbench", nargs="+", default=[], help="decks including netlist to simulate both ways")
+    parser.add_argument("--run-dir", default="reduce_runs", help="directory for the testbench runs")
+    args = parser.parse_args(argv)
+
+    config = ReductionConfig(args.ground, args.min_coupling, args.min_cap, args.ticer_tau, args.max_degree,
+                             not args.no_merge, tuple(args.keep))
+    for report in reduce_netlist(args.netlist, args.output, args.subckt, config, args.frequencies):
+        print(report)
+    for testbench in args.testbench:
+        run_dir = os.path.join(args.run_dir, os.path.splitext(os.path.basename(testbench))[0])
+        print(compare_testbench(testbench, args.netlist, args.output, run_dir))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ConductorTech:
+    """Electrical data of one conducting glayer"""
+    sheet_resistance: float  # ohm / square
+    area_cap: float  # aF / um^2, to substrate
+    fringe_cap: float  # aF / um of perimeter
+    em_limit: float  # mA / um of width, DC
+
+
+@dataclass(frozen=True)
+class ViaTech:
+    """Electrical data of one cut glayer"""
+    bottom: Tuple[str, ...]  # glayers the cut lands on
+    top: str
+    resistance: float  # ohm per cut
+    em_limit: float  # mA per cut, DC
+
+
+@dataclass(frozen=True)
+class Tech:
+    conductors: Dict[str, ConductorTech]
+    vias: Dict[str, ViaTech]
+
+
+# Typical values for estimation, not signoff. Pass a Tech built from the foundry
+# documents where the numbers matter. active_diff is the salicided diffusion,
+# its junction capacitance belongs to the device models and is left out.
+GF180 = Tech(
+    conductors={
+        "active_diff": ConductorTech(7.0, 0.0, 0.0, 0.5),
+        "poly": ConductorTech(7.0, 100.0, 50.0, 0.5),
+        "met1": ConductorTech(0.09, 32.0, 38.0, 1.0),
+        "met2": ConductorTech(0.09, 15.0, 33.0, 1.3),
+        "met3": ConductorTech(0.09, 10.0, 30.0, 1.3),
+        "met4": ConductorTech(0.09, 7.5, 28.0, 1.3),
+        "met5": ConductorTech(0.04, 6.0, 26.0, 2.5),
+    },
+    vias={
+        "mcon": ViaTech(("active_diff", "poly"), "met1", 6.3, 0.3),
+        "via1": ViaTech(("met1",), "met2", 4.5, 0.4),
+        "via2": ViaTech(("met2",), "met3", 4.5, 0.4),
+        "via3": ViaTech(("met3",), "met4", 4.5, 0.4),
+        "via4": ViaTech(("met4",), "met5", 4.5, 0.4),
+    },
+)
+
+# glayout's sky130 met1 is li1 and mcon is licon1
+SKY130 = Tech(
+    conductors={
+        "active_diff": ConductorTech(120.0, 0.0, 0.0, 0.1),
+        "poly": ConductorTech(48.0, 106.0, 55.0, 0.1),
+        "met1": ConductorTech(12.8, 37.0, 41.0, 0.2),
+        "met2": ConductorTech(0.125, 25.8, 40.0, 1.0),
+        "met3": ConductorTech(0.125, 17.5, 40.0, 1.0),
+        "met4": ConductorTech(0.047, 12.4, 40.0, 2.8),
+        "met5": ConductorTech(0.047, 8.4, 36.0, 2.8),
+    },
+    vias={
+        "mcon": ViaTech(("active_diff", "poly"), "met1", 152.0, 0.1),
+        "via1": ViaTech(("met1",), "met2", 9.3, 0.2),
+        "via2": ViaTech(("met2",), "met3", 4.5, 0.3),
+        "via3": ViaTech(("met3",), "met4", 3.4, 0.3),
+        "via4": ViaTech(("met4",), "met5", 3.4, 0.6),
+    },
+)
+
+TECHS = {"gf180": GF180, "sky130": SKY130}
+
+
+def tech_for(pdk, tech: Optional[Tech] = None) -> Tech:
+    """The given tech, or the built-in table of pdk"""
+    if tech is not None:
+        return tech
+    if pdk.name not in TECHS:
+        raise ValueError(f"no parasitic data for PDK {pdk.name!r}, pass tech=")
+    return TECHS[pdk.name]
@@ -0,0 +1,15 @@
+###Cell placement and floorplanning.
+
+
+from .floorplan import Block, Floorplan, block_from_component, floorplan
+from .skyline import Packing, pack_components, pack_skyline
+
+__all__ = [
+    'Block',
+    'block_from_component',
+    'Floorplan',
+    'floorplan',
+    'Packing',
+    'pack_components',
+    'pack_skyline',
+]
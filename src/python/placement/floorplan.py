@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .skyline import pack_skyline
+
+Net = Union[Sequence[str], str]  # ("gilbert.V_out_p", "buffer.Vin_plus") or "gilbert.V_out_p buffer.Vin_plus"
+
+
+@dataclass
+class Block:
+    """A block to floorplan: bbox size and pin positions relative to the bbox lower left corner"""
+    name: str
+    size: Tuple[float, float]
+    pins: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    component: Optional[object] = None
+    origin: Tuple[float, float] = (0.0, 0.0)  # bbox lower left corner of component
+
+
+def _pin_center(component, pin: str) -> Optional[Tuple[float, float]]:
+    # The builders label their pins (CmirrorWithDecap exports them as labels only)
+    for label in component.labels:
+        if label.text == pin:
+            return tuple(float(v) for v in label.origin)
+    if pin in component.ports:
+        return tuple(float(v) for v in component.ports[pin].center)
+    return None
+
+
+def block_from_component(name: str, component, pins: Optional[Sequence[str]] = None) -> Block:
+    """
+    Block of a generated component, pins looked up by label text or port name.
+
+    Raises:
+        ValueError: a requested pin is neither a label nor a port of component
+    """
+    (xmin, ymin), (xmax, ymax) = np.asarray(component.bbox, dtype=float)
+    block = Block(name, (xmax - xmin, ymax - ymin), component=component, origin=(xmin, ymin))
+    for pin in pins or ():
+        center = _pin_center(component, pin)
+        if center is None:
+            raise ValueError(f"block {name}: no label or port named {pin!r}")
+        block.pins[pin] = (center[0] - xmin, center[1] - ymin)
+    return block
+
+
+def _net_pins(net: Net) -> List[Tuple[str, str]]:
+    pins = net.split() if isinstance(net, str) else list(net)
+    return [tuple(pin.split(".", 1)) for pin in pins]
+
+
+@dataclass
+class Floorplan:
+    """Result of floorplan(): lower left corner and mirroring of every block"""
+    blocks: List[Block]
+    positions: np.ndarray  # (n, 2) bbox lower left corners
+    mirrored: np.ndarray  # (n,) mirrored about the y axis
+    width: float
+    height: float
+    wirelength: float  # half perimeter wirelength of all nets (um)
+    iterations: int = 0
+
+    @property
+    def area(self) -> float:
+        return self.width * self.height
+
+    @property
+    def utilization(self) -> float:
+        return float(sum(b.size[0] * b.size[1] for b in self.blocks) / self.area) if self.area else 0.0
+
+    def placement(self) -> Dict[str, Tuple[float, float]]:
+        return {block.name: tuple(float(v) for v in position) for block, position in zip(self.blocks, self.positions)}
+
+    def build(self, name: str = "floorplan"):
+        """Top level Component with one reference per block that has a component"""
+        from gdsfactory import Component
+
+        top = Component(name)
+        for block, (x, y), mirrored in zip(self.blocks, self.positions, self.mirrored):
+            if block.component is None:
+                continue
+            ref = top << block.component
+            if mirrored:
+                ref.mirror_x(x0=block.origin[0] + block.size[0] / 2)
+            ref.move((x - block.origin[0], y - block.origin[1]))
+            ref.name = block.name
+        return top
+
+    def __str__(self) -> str:
+        return (f"{len(self.blocks)} blocks in {self.width:.1f} x {self.height:.1f} um "
+                f"(utilization {self.utilization:.1%}), wirelength {self.wirelength:.1f} um")
+
+
+class _Problem:
+    """Bbox and pin arrays of a floorplan, costs evaluated for many chains at once"""
+
+    def __init__(self, blocks: List[Block], nets: Sequence[Net], spacing: float):
+        index = {block.name: i for i, block in enumerate(blocks)}
+        self.sizes = np.array([block.size for block in blocks], dtype=float)
+        self.padded = self.sizes + spacing
+        self.spacing = spacing
+        pin_block, pin_offset, pin_net = [], [], []
+        for n, net in enumerate(nets):
+            for block_name, pin in _net_pins(net):
+                if block_name not in index:
+                    raise ValueError(f"net {net!r}: unknown block {block_name!r}")
+                if pin not in blocks[index[block_name]].pins:
+                    raise ValueError(f"net {net!r}: block {block_name!r} has no pin {pin!r}")
+                pin_block.append(index[block_name])
+                pin_offset.append(blocks[index[block_name]].pins[pin])
+                pin_net.append(n)
+        order = np.argsort(pin_net, kind="stable")
+        self.pin_block = np.array(pin_block, dtype=np.intp)[order]
+        self.pin_offset = np.array(pin_offset, dtype=float).reshape(-1, 2)[order]
+        self.net_starts = np.flatnonzero(np.diff(np.array(pin_net)[order], prepend=-1)) if pin_net else None
+        self.pairs = np.triu_indices(len(blocks), k=1)
+        self.block_area = float(np.prod(self.sizes, axis=1).sum())
+
+    def wirelength(self, positions: np.ndarray, mirrored: np.ndarray) -> np.ndarray:
+        """HPWL of all nets, positions (k, n, 2), mirrored (k, n)"""
+        if self.net_starts is None:
+            return np.zeros(len(positions))
+        offset_x = np.where(mirrored[:, self.pin_block], self.sizes[self.pin_block, 0] - self.pin_offset[:, 0],
+                            self.pin_offset[:, 0])
+        pins = positions[:, self.pin_block] + np.stack([offset_x, np.broadcast_to(self.pin_offset[:, 1],
+                                                                                   offset_x.shape)], axis=-1)
+        span = (np.maximum.reduceat(pins, self.net_starts, axis=1)
+                - np.minimum.reduceat(pins, self.net_starts, axis=1))
+        return span.sum(axis=(1, 2))
+
+    def bbox_area(self, positions: np.ndarray) -> np.ndarray:
+        extent = (positions + self.padded).max(axis=1) - positions.min(axis=1) - self.spacing
+        return np.prod(extent, axis=1)
+
+    def overlap(self, positions: np.ndarray) -> np.ndarray:
+        """Total overlap area of block pairs, blocks grown by spacing"""
+        i, j = self.pairs
+        low = np.maximum(positions[:, i], positions[:, j])
+        high = np.minimum(positions[:, i] + self.padded[i], positions[:, j] + self.padded[j])
+        return np.prod(np.maximum(high - low, 0), axis=2).sum(axis=1)
+
+
+def floorplan(
+    blocks: Union[Sequence[Block], Mapping[str, object]],
+    nets: Sequence[Net] = (),
+    spacing: float = 10.0,
+    wirelength_weight: float = 1.0,
+    chains: int = 32,
+    iterations: int = 2000,
+    allow_mirror: bool = True,
+    grid: float = 0.01,
+    seed: Optional[int] = 0,
+) -> Floorplan:
+    """
+    Place blocks for small area and short nets with simulated annealing.
+
+    Many annealing chains run side by side as (chains, blocks, 2) arrays, each
+    step moves, swaps or mirrors one block per chain and the costs of all
+    chains are evaluated together. Overlaps are penalized with a weight that
+    grows during the schedule; the best overlap free state any chain visited
+    is returned (the skyline packing the chains start from is one).
+
+    Args:
+        blocks: Blocks, or {name: Component}, pins are then taken from the nets
+        nets: Pins to connect, each a sequence (or space separated string) of "block.pin"
+        spacing: Minimum gap between blocks (um)
+        wirelength_weight: Weight of wirelength against area, both normalized to the block area
+        chains: Annealing chains run in parallel
+        iterations: Annealing steps per chain
+        allow_mirror: Allow mirroring blocks about their vertical axis
+        grid: Block positions are snapped to this grid (um)
+        seed: Random seed, None: nondeterministic
+
+    Returns:
+        Floorplan: block positions, area and wirelength
+    """
+    if isinstance(blocks, Mapping):
+        wanted: Dict[str, List[str]] = {name: [] for name in blocks}
+        for net in nets:
+            for block_name, pin in _net_pins(net):
+                if block_name not in wanted:
+                    raise ValueError(f"net {net!r}: unknown block {block_name!r}")
+                wanted[block_name].append(pin)
+        blocks = [block_from_component(name, component, sorted(set(wanted[name])))
+                  for name, component in blocks.items()]
+    blocks = list(blocks)
+    if not blocks:
+        raise ValueError("nothing to floorplan")
+    # one grid step of extra margin so snapping the result cannot eat into the spacing
+    problem = _Problem(blocks, nets, spacing + grid)
+    rng = np.random.default_rng(seed)
+    n = len(blocks)
+
+    # Every chain starts from the skyline packing, a legal and fairly compact placement
+    start = pack_skyline(problem.sizes, spacing=spacing + grid).positions
+    positions = np.repeat(start[None], chains, axis=0)
+    mirrored = np.zeros((chains, n), dtype=bool)
+
+    area_scale = problem.block_area
+    wire_scale = np.sqrt(area_scale) * max(len(nets), 1)
+
+    def costs(positions, mirrored):
+        # (area + wirelength cost, overlap cost), the overlap weight changes along the schedule
+        base = (problem.bbox_area(positions) / area_scale
+                + wirelength_weight * problem.wirelength(positions, mirrored) / wire_scale)
+        return base, problem.overlap(positions) / area_scale
+
+    base, overlap = costs(positions, mirrored)
+    best_positions, best_mirrored, best_cost = start.copy(), mirrored[0].copy(), base[0]
+    step = np.sqrt(area_scale / n)
+    temperature = 0.1
+    cooling = (1e-4 / temperature) ** (1 / max(iterations, 1))
+    rows = np.arange(chains)
+    for iteration in range(iterations):
+        fraction = iteration / max(iterations - 1, 1)
+        penalty = 1.0 + 99.0 * fraction
+        block = rng.integers(n, size=chains)
+        move = rng.random(chains)
+        trial_positions, trial_mirrored = positions.copy(), mirrored.copy()
+
+        shift = move < 0.7
+        trial_positions[rows[shift], block[shift]] += rng.normal(0, step * (1 - 0.9 * fraction), (shift.sum(), 2))
+        swap = (move >= 0.7) & (move < 0.9) & (n > 1)
+        if np.any(swap):
+            other = (block + rng.integers(1, max(n, 2), size=chains)) % n
+            a, b, r = block[swap], other[swap], rows[swap]
+            # swap centers, so blocks of different sizes trade places around the same spot
+            center_a = positions[r, a] + problem.sizes[a] / 2
+            center_b = positions[r, b] + problem.sizes[b] / 2
+            trial_positions[r, a] = center_b - problem.sizes[a] / 2
+            trial_positions[r, b] = center_a - problem.sizes[b] / 2
+        flip = (move >= 0.9) & allow_mirror
+        trial_mirrored[rows[flip], block[flip]] ^= True
+
+        trial_base, trial_overlap = costs(trial_positions, trial_mirrored)
+        delta = trial_base + penalty * trial_overlap - base - penalty * overlap
+        accept = (delta < 0) | (rng.random(chains) < np.exp(-np.maximum(delta, 0) / temperature))
+        positions[accept], mirrored[accept] = trial_positions[accept], trial_mirrored[accept]
+        base[accept], overlap[accept] = trial_base[accept], trial_overlap[accept]
+        temperature *= cooling
+
+        legal_cost = np.where(overlap == 0, base, np.inf)
+        chain = int(np.argmin(legal_cost))
+        if legal_cost[chain] < best_cost:
+            best_cost = legal_cost[chain]
+            best_positions, best_mirrored = positions[chain].copy(), mirrored[chain].copy()
+
+    best_positions = np.round((best_positions - best_positions.min(axis=0)) / grid) * grid
+    extent = (best_positions + problem.sizes).max(axis=0)
+    wirelength = float(problem.wirelength(best_positions[None], best_mirrored[None])[0])
+    return Floorplan(blocks, best_positions, best_mirrored, float(extent[0]), float(extent[1]), wirelength,
+                     iterations)
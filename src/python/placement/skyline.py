@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Strip widths tried by pack_skyline when none is given, as multiples of sqrt(total area)
+WIDTH_FACTORS = (1.0, 1.1, 1.25)
+
+
+@dataclass
+class Packing:
+    """Result of pack_skyline: lower left corner of every cell, in input order"""
+    positions: np.ndarray  # (n, 2)
+    sizes: np.ndarray  # (n, 2) cell bbox sizes, spacing excluded
+    width: float  # extent of the placed cells
+    height: float
+
+    @property
+    def area(self) -> float:
+        return self.width * self.height
+
+    @property
+    def utilization(self) -> float:
+        """Cell area over bounding box area"""
+        return float(np.prod(self.sizes, axis=1).sum() / self.area) if self.area else 0.0
+
+    def offsets(self, bbox_mins) -> np.ndarray:
+        """Translations that move cells whose bbox starts at bbox_mins (n, 2) onto their positions"""
+        return self.positions - np.asarray(bbox_mins, dtype=float)
+
+    def __str__(self) -> str:
+        return (f"{len(self.sizes)} cells in {self.width:.1f} x {self.height:.1f} um, "
+                f"utilization {self.utilization:.1%}")
+
+
+def _pack_strip(sizes: np.ndarray, order: np.ndarray, strip_width: float) -> np.ndarray:
+    """
+    Bottom left skyline packing of sizes (spacing included) into a strip of strip_width.
+
+    The skyline is a list of segments (start x, height); every cell goes to the
+    segment start where it sits lowest, leftmost on ties. The skyline stays
+    short, plain lists beat NumPy's per call overhead here.
+    """
+    xs, ys = [0.0], [0.0]
+    positions = np.empty_like(sizes)
+    cells = sizes.tolist()
+    for i in order.tolist():
+        w, h = cells[i]
+        n = len(xs)
+        best_y, first, stop = float("inf"), 0, n
+        # a cell sits at least as high as its start segment: visit starts from the lowest up
+        for start in sorted(range(n), key=ys.__getitem__):
+            if ys[start] > best_y or (ys[start] == best_y and start > first):
+                if ys[start] > best_y:
+                    break
+                continue
+            if xs[start] + w > strip_width + 1e-9:
+                continue
+            right = xs[start] + w - 1e-9
+            y, k = ys[start], start + 1
+            while k < n and xs[k] < right and y <= best_y:
+                y = max(y, ys[k])
+                k += 1
+            if y < best_y or (y == best_y and start < first):
+                best_y, first, stop = y, start, k
+        if best_y == float("inf"):  # wider than the strip: place at the left edge, on top
+            best_y = max(ys)
+        x = xs[first]
+        positions[i] = x, best_y
+
+        # replace the covered segments by the cell top, keep the rest of a partly covered one
+        segment_xs, segment_ys = [x], [best_y + h]
+        if x + w < (xs[stop] if stop < n else strip_width) - 1e-9:
+            segment_xs.append(x + w)
+            segment_ys.append(ys[stop - 1])
+        xs[first:stop], ys[first:stop] = segment_xs, segment_ys
+        if first > 0 and ys[first - 1] == ys[first]:  # merge with the left neighbour
+            del xs[first], ys[first]
+    return positions
+
+
+def pack_skyline(
+    sizes,
+    width: Optional[float] = None,
+    spacing: float = 0.0,
+    sort: str = "height",
+) -> Packing:
+    """
+    Pack rectangular cells densely with skyline bin packing.
+
+    Cells are inserted in decreasing height (or area, or width) order; they
+    are not rotated. Without a width several strip widths around the square
+    root of the total area are tried and the smallest bounding box is kept.
+
+    Args:
+        sizes: (n, 2) array of cell bbox widths and heights
+        width: Strip width (um), None: choose one
+        spacing: Minimum gap between cells (um)
+        sort: Insertion order, "height", "area", "width" or "none"
+
+    Returns:
+        Packing: cell positions in input order and utilization
+    """
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    if len(sizes) == 0:
+        return Packing(np.zeros((0, 2)), sizes, 0.0, 0.0)
+    if np.any(sizes < 0):
+        raise ValueError("cell sizes must be non-negative")
+    padded = np.maximum(sizes + spacing, 1e-6)
+    keys = {"height": (padded[:, 0], padded[:, 1]), "area": (np.prod(padded, axis=1),),
+            "width": (padded[:, 1], padded[:, 0])}
+    if sort == "none":
+        order = np.arange(len(sizes))
+    elif sort in keys:
+        order = np.lexsort(keys[sort])[::-1]
+    else:
+        raise ValueError(f"sort must be one of height, area, width or none, not {sort!r}")
+
+    if width is not None:
+        widths = [max(width + spacing, padded[:, 0].max())]
+    else:
+        side = np.sqrt(np.prod(padded, axis=1).sum())
+        widths = sorted({max(factor * side, padded[:, 0].max()) for factor in WIDTH_FACTORS})
+    best = None
+    for strip_width in widths:
+        positions = _pack_strip(padded, order, strip_width)
+        extent = (positions + padded).max(axis=0) - spacing
+        packing = Packing(positions, sizes, float(extent[0]), float(extent[1]))
+        if best is None or packing.area < best.area:
+            best = packing
+    return best
+
+
+def pack_components(top, components: Sequence, spacing: float = 5.0, width: Optional[float] = None,
+                    **kwargs) -> Packing:
+    """
+    Place components into top with pack_skyline, e.g. for test chip arrays.
+
+    Args:
+        top: gdsfactory Component receiving one reference per component
+        components: Components to place
+        spacing: Gap between cells (um)
+        width: Strip width (um), None: choose one
+        **kwargs: Forwarded to pack_skyline
+
+    Returns:
+        Packing: positions of the component bboxes
+    """
+    bboxes = np.array([np.asarray(component.bbox, dtype=float) for component in components]).reshape(-1, 2, 2)
+    packing = pack_skyline(bboxes[:, 1] - bboxes[:, 0], width=width, spacing=spacing, **kwargs)
+    for component, offset in zip(components, packing.offsets(bboxes[:, 0])):
+        (top << component).move(tuple(offset))
+    return packing
@@ -0,0 +1,63 @@
+###Simulation runners for the design_tb testbenches.
+
+
+from .batch import (NGSPICE, STUB_SIMULATOR, TESTBENCH_DIR, BatchResult, SimJob, SimResult, SimulationStore,
+                    parse_measurements, prepare_deck, run_batch, run_job, testbench_jobs)
+from .cache import DEFAULT_CACHE_DIR, CachedRun, SimCacheStats, SimulationCache, simulator_version
+from .corners import (MIMCAP_CORNERS, MOS_CORNERS, RES_CORNERS, TEMPERATURES, Corner, CornerPlan, CornerTable,
+                      CornerVariant, apply_corner, corner_grid, expand_corners, run_corners)
+from .iip3 import IIP3Fit, TwoToneResult, TwoToneSetup, fit_iip3, resample, two_tone_spectrum
+from .netlist import NetlistExpander, include_reference, iter_logical_lines, logical_lines
+from .rawfile import RawFile, RawPlot, RawVariable
+from .spice_index import Instance, SpiceIndex, Subckt, load_index, spice_number, split_element
+
+__all__ = [
+    'apply_corner',
+    'BatchResult',
+    'CachedRun',
+    'Corner',
+    'corner_grid',
+    'CornerPlan',
+    'CornerTable',
+    'CornerVariant',
+    'DEFAULT_CACHE_DIR',
+    'expand_corners',
+    'fit_iip3',
+    'IIP3Fit',
+    'include_reference',
+    'Instance',
+    'iter_logical_lines',
+    'load_index',
+    'logical_lines',
+    'MIMCAP_CORNERS',
+    'MOS_CORNERS',
+    'NetlistExpander',
+    'NGSPICE',
+    'parse_measurements',
+    'prepare_deck',
+    'RawFile',
+    'RawPlot',
+    'RawVariable',
+    'RES_CORNERS',
+    'resample',
+    'run_batch',
+    'run_corners',
+    'run_job',
+    'SimCacheStats',
+    'SimJob',
+    'SimResult',
+    'SimulationCache',
+    'SimulationStore',
+    'simulator_version',
+    'spice_number',
+    'SpiceIndex',
+    'split_element',
+    'STUB_SIMULATOR',
+    'Subckt',
+    'TEMPERATURES',
+    'TESTBENCH_DIR',
+    'testbench_jobs',
+    'two_tone_spectrum',
+    'TwoToneResult',
+    'TwoToneSetup',
+]
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import json
+import os
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .cache import SimulationCache
+
+TESTBENCH_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                              "../../design_tb/simulation"))
+
+# The testbenches are exported by xschem with the PDK installed here
+XSCHEM_PDK_ROOT = "/usr/local/share/pdk"
+
+NGSPICE = ("ngspice", "-b")
+# Stand-in for ngspice in the tests, see simulation/stub.py
+STUB_SIMULATOR = (sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub.py"))
+
+_PARAM = re.compile(r"^\s*\.param\s+([A-Za-z_]\w*)\s*=", re.IGNORECASE)
+# "name = value" as printed by print and .meas in batch mode
+_MEASUREMENT = re.compile(r"^\s*([A-Za-z_][\w.\[\]()+\-*/]*)\s*=\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\b")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    batch TEXT NOT NULL,
+    job TEXT NOT NULL,
+    netlist TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    returncode INTEGER,
+    elapsed REAL,
+    workdir TEXT,
+    rawfiles TEXT,
+    measurements TEXT,
+    error TEXT,
+    finished REAL NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (batch, job)
+);
+"""
+
+
+@dataclass
+class SimJob:
+    """
+    One simulator run of a testbench deck.
+
+    params replace (or add) top level .param definitions, alterparams are
+    applied with alterparam + reset at the start of the .control block; a
+    "subckt.param" key alters the default of a subcircuit parameter. deck
+    replaces the contents of the netlist file, e.g. a generated corner
+    variant.
+    """
+    name: str
+    netlist: str
+    params: Dict[str, object] = field(default_factory=dict)
+    alterparams: Dict[str, object] = field(default_factory=dict)
+    timeout: Optional[float] = None
+    deck: Optional[str] = None
+
+
+@dataclass
+class SimResult:
+    """Outcome of one SimJob, as stored in the runs table"""
+    job: str
+    netlist: str
+    status: str  # "done", "failed" or "timeout"
+    params: Dict[str, object] = field(default_factory=dict)
+    returncode: Optional[int] = None
+    elapsed: Optional[float] = None
+    workdir: Optional[str] = None
+    rawfiles: List[str] = field(default_factory=list)
+    measurements: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    finished: float = field(default_factory=time.time)
+    cached: bool = False  # restored from a SimulationCache, elapsed is that of the original run
+
+
+def testbench_jobs(names: Optional[Sequence[str]] = None, directory: str = TESTBENCH_DIR, **job_args) -> List[SimJob]:
+    """
+    Jobs of the design_tb testbench decks.
+
+    Args:
+        names: Deck names without .spice (e.g. "Gilbert_cell_tb"), default every deck in directory
+        directory: Directory of the decks
+        **job_args: params, alterparams or timeout given to every job
+
+    Returns:
+        list: one SimJob per deck, named after it
+    """
+    if names is None:
+        names = sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(directory, "*.spice")))
+    jobs = []
+    for name in names:
+        path = os.path.join(directory, f"{name}.spice")
+        if not os.path.isfile(path):
+            raise ValueError(f"no testbench {name!r} in {directory}")
+        jobs.append(SimJob(name, path, **job_args))
+    return jobs
+
+
+def _format_value(value) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def prepare_deck(text: str, params: Optional[Dict] = None, alterparams: Optional[Dict] = None,
+                 pdk_root: Optional[str] = None) -> str:
+    """
+    Apply parameter overrides to a deck.
+
+    Args:
+        text: Deck contents
+        params: {name: value} top level .param overrides, new names are added before the .control block
+        alterparams: {name or "subckt.name": value} applied with alterparam before the analyses
+        pdk_root: Replaces the PDK path the decks were exported with in .include/.lib lines
+
+    Raises:
+        ValueError: alterparams given for a deck without a .control block
+
+    Returns:
+        str: the new deck
+    """
+    params = dict(params or {})
+    lines = text.splitlines()
+    out = []
+    control = None
+    for line in lines:
+        lowered = line.strip().lower()
+        match = _PARAM.match(line)
+        if match and match.group(1) in params:
+            name = match.group(1)
+            line = f".param {name}={_format_value(params.pop(name))}"
+        elif pdk_root and lowered.startswith((".include", ".lib")):
+            line = line.replace(XSCHEM_PDK_ROOT, pdk_root.rstrip("/"))
+        elif lowered.startswith(".control") and control is None:
+            control = len(out)
+        out.append(line)
+    if params:
+        # Parameters must be defined before the analyses that use them
+        at = control if control is not None else next(
+            (i for i in range(len(out) - 1, -1, -1) if out[i].strip().lower() == ".end"), len(out))
+        out[at:at] = [f".param {name}={_format_value(value)}" for name, value in params.items()]
+        if control is not None:
+            control += len(params)
+    if alterparams:
+        if control is None:
+            raise ValueError("alterparam needs a .control block in the deck")
+        commands = []
+        for key, value in alterparams.items():
+            subckt, _, name = key.rpartition(".")
+            commands.append(f"alterparam {subckt + ' ' if subckt else ''}{name}={_format_value(value)}")
+        out[control + 1:control + 1] = commands + ["reset"]
+    return "\n".join(out) + "\n"
+
+
+def parse_measurements(output: str) -> Dict[str, float]:
+    """{name: value} of the "name = value" lines a batch run prints (print, .meas), the last one wins"""
+    values = {}
+    for line in output.splitlines():
+        match = _MEASUREMENT.match(line)
+        if match:
+            values[match.group(1)] = float(match.group(2))
+    return values
+
+
+def _kill(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+
+
+def run_job(job: SimJob, output_dir: str, simulator: Sequence[str] = NGSPICE, pdk_root: Optional[str] = None,
+            timeout: Optional[float] = None, cache: Optional[SimulationCache] = None) -> SimResult:
+    """
+    Run one job in its own directory under output_dir, the deck's write commands land there.
+
+    A job running longer than its timeout (job.timeout, else timeout) is
+    killed together with anything it started and recorded as "timeout".
+    With a cache, a deck whose expanded netlist was simulated before is not
+    run again: its rawfiles, log and measurements are restored instead, and
+    finished runs are added to the cache.
+    """
+    workdir = os.path.join(output_dir, job.name)
+    params = {**job.params, **{f"alterparam:{k}": v for k, v in job.alterparams.items()}}
+    result = SimResult(job.name, job.netlist, "failed", params=params, workdir=workdir)
+    start = time.perf_counter()
+    try:
+        os.makedirs(workdir, exist_ok=True)
+        if job.deck is None:
+            with open(job.netlist) as f:
+                deck = f.read()
+        else:
+            deck = job.deck
+        deck = prepare_deck(deck, job.params, job.alterparams, pdk_root)
+        deck_path = os.path.join(workdir, os.path.basename(job.netlist))
+        with open(deck_path, "w") as f:
+            f.write(deck)
+        log_path = os.path.join(workdir, f"{job.name}.log")
+        # Rawfiles of an earlier run would be taken for this run's output
+        for stale in glob.glob(os.path.join(workdir, "*.raw")):
+            os.remove(stale)
+        if cache is not None:
+            key = cache.key(deck, os.path.dirname(os.path.abspath(job.netlist)), simulator)
+            hit = cache.restore(key, workdir, log_path)
+            if hit is not None:
+                result.status, result.cached, result.returncode = "done", True, hit.returncode
+                result.rawfiles, result.measurements, result.elapsed = hit.rawfiles, hit.measurements, hit.elapsed
+                result.finished = time.time()
+                return result
+        process = subprocess.Popen([*simulator, os.path.basename(deck_path)], cwd=workdir, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True)
+        limit = job.timeout if job.timeout is not None else timeout
+        try:
+            output, _ = process.communicate(timeout=limit)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            output, _ = process.communicate()
+            result.status, result.error = "timeout", f"killed after {limit:g} s"
+        output = output.decode(errors="replace")
+        with open(log_path, "w") as f:
+            f.write(output)
+        result.returncode = process.returncode
+        result.measurements = parse_measurements(output)
+        result.rawfiles = sorted(glob.glob(os.path.join(workdir, "*.raw")))
+        if result.status != "timeout":
+            if process.returncode == 0:
+                result.status = "done"
+            else:
+                tail = "\n".join(output.strip().splitlines()[-5:])
+                result.error = f"exit code {process.returncode}\n{tail}"
+        result.elapsed = time.perf_counter() - start
+        if cache is not None and result.status == "done":
+            cache.store(key, job.name, result.returncode, result.elapsed, result.rawfiles, result.measurements,
+                        log_path)
+    except OSError as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.elapsed = result.elapsed or time.perf_counter() - start
+    result.finished = time.time()
+    return result
+
+
+class SimulationStore:
+    """
+    SQLite store of simulation results.
+
+    Each batch keeps the last result of every job name, with its status,
+    the rawfiles it wrote and the measurements parsed from its output.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "SimulationStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(self, batch: str, result: SimResult) -> None:
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (batch, result.job, result.netlist, json.dumps(result.params, sort_keys=True),
+                              result.status, result.returncode, result.elapsed, result.workdir,
+                              json.dumps(result.rawfiles), json.dumps(result.measurements), result.error,
+                              result.finished, int(result.cached)))
+
+    def batches(self) -> List[str]:
+        return [row[0] for row in self._db.execute("SELECT batch FROM runs GROUP BY batch ORDER BY MIN(finished)")]
+
+    def results(self, batch: str, status: Optional[str] = None) -> List[SimResult]:
+        query, args = "SELECT * FROM runs WHERE batch=?", [batch]
+        if status:
+            query, args = query + " AND status=?", args + [status]
+        results = []
+        for row in self._db.execute(query + " ORDER BY job", args):
+            results.append(SimResult(row["job"], row["netlist"], row["status"], json.loads(row["params"]),
+                                     row["returncode"], row["elapsed"], row["workdir"], json.loads(row["rawfiles"]),
+                                     json.loads(row["measurements"]), row["error"], row["finished"],
+                                     bool(row["cached"])))
+        return results
+
+    def measurements(self, batch: str) -> Dict[str, Dict[str, float]]:
+        """{job: {measurement: value}} of the finished jobs of a batch"""
+        return {result.job: result.measurements for result in self.results(batch, "done")}
+
+
+@dataclass
+class BatchResult:
+    """Result of run_batch"""
+    batch: str
+    results: List[SimResult]
+    elapsed: float
+
+    @property
+    def failed(self) -> List[SimResult]:
+        return [result for result in self.results if result.status != "done"]
+
+    def __str__(self) -> str:
+        lines = [f"batch {self.batch}: {len(self.results) - len(self.failed)}/{len(self.results)} done "
+                 f"in {self.elapsed:.1f} s"]
+        for result in self.results:
+            lines.append(f"  {result.job:32s} {result.status:8s} {result.elapsed or 0:8.2f} s"
+                         + ("  (cached)" if result.cached else "")
+                         + (f"  {result.error.splitlines()[0]}" if result.error else ""))
+        return "\n".join(lines)
+
+
+def run_batch(
+    jobs: Sequence[SimJob],
+    output_dir: str,
+    store: Optional[SimulationStore] = None,
+    batch: str = "default",
+    simulator: Sequence[str] = NGSPICE,
+    processes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    pdk_root: Optional[str] = None,
+    cache: Optional[SimulationCache] = None,
+    progress: Optional[Callable[[SimResult], None]] = None,
+) -> BatchResult:
+    """
+    Run simulation jobs in parallel, a regression takes about as long as its slowest job.
+
+    Each job runs the simulator in its own directory (output_dir/<job name>)
+    and is stored as soon as it finishes.
+
+    Args:
+        jobs: Jobs to run, names must be unique
+        output_dir: Directory for the per job decks, logs and rawfiles
+        store: Results store, None: only return the results
+        batch: Batch name in the store
+        simulator: Command the deck path is appended to (default ngspice -b, STUB_SIMULATOR in tests)
+        processes: Simulators running at once (default os.cpu_count())
+        timeout: Seconds before a job without its own timeout is killed, None: no limit
+        pdk_root: PDK root replacing the one the decks were exported with (default $PDK_ROOT when set)
+        cache: Reuse the results of decks simulated before, and cache the new ones
+        progress: Called with each SimResult as it finishes
+
+    Returns:
+        BatchResult: results in job order
+    """
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("job names must be unique, they name the run directories")
+    pdk_root = pdk_root or os.environ.get("PDK_ROOT")
+    start = time.perf_counter()
+    results: Dict[str, SimResult] = {}
+
+    def store_result(result: SimResult) -> None:
+        results[result.job] = result
+        if store is not None:
+            store.record(batch, result)
+        if progress is not None:
+            progress(result)
+
+    # The simulators are separate processes already, threads only wait on them
+    processes = processes or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max(1, min(processes, len(jobs)))) as pool:
+        futures = [pool.submit(run_job, job, output_dir, simulator, pdk_root, timeout, cache) for job in jobs]
+        for future in as_completed(futures):
+            store_result(future.result())
+    return BatchResult(batch, [results[name] for name in names], time.perf_counter() - start)
+
+
+def _parse_overrides(items: Optional[Sequence[str]]) -> Dict[str, str]:
+    overrides = {}
+    for item in items or ():
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"override {item!r} is not name=value")
+        overrides[name.strip()] = value.strip()
+    return overrides
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the design_tb testbenches with ngspice in parallel")
+    parser.add_argument("output_dir", help="directory for the decks, logs and rawfiles of each job")
+    parser.add_argument("testbenches", nargs="*", help="deck names (default all)")
+    parser.add_argument("--directory", default=TESTBENCH_DIR, help="testbench directory")
+    parser.add_argument("--store", help="SQLite results file")
+    parser.add_argument("--batch", default="default", help="batch name in the store")
+    parser.add_argument("--param", action="append", help=".param override name=value (repeatable)")
+    parser.add_argument("--alterparam", action="append", help="alterparam [subckt.]name=value (repeatable)")
+    parser.add_argument("--timeout", type=float, help="seconds before a job is killed")
+    parser.add_argument("--processes", type=int, help="simulators running at once")
+    parser.add_argument("--pdk-root", help="PDK root (default $PDK_ROOT)")
+    parser.add_argument("--stub", action="store_true", help="run the stub simulator instead of ngspice")
+    parser.add_argument("--cache", help="simulation cache directory")
+    parser.add_argument("--cache-size", type=float, default=1024, help="cache size limit in MB")
+    args = parser.parse_args(argv)
+
+    jobs = testbench_jobs(args.testbenches or None, args.directory, params=_parse_overrides(args.param),
+                          alterparams=_parse_overrides(args.alterparam))
+    store = SimulationStore(args.store) if args.store else None
+    cache = SimulationCache(args.cache, int(args.cache_size * 2**20)) if args.cache else None
+    try:
+        result = run_batch(jobs, args.output_dir, store, args.batch, STUB_SIMULATOR if args.stub else NGSPICE,
+                           args.processes, args.timeout, args.pdk_root, cache,
+                           progress=lambda r: print(f"{r.job}: {r.status}", flush=True))
+    finally:
+        if store is not None:
+            store.close()
+        if cache is not None:
+            print(cache.stats())
+            cache.close()
+    print(result)
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence
+
+from .netlist import NetlistExpander
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "glayout_sim")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    job TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_VERSIONS: Dict[tuple, str] = {}
+_VERSIONS_LOCK = threading.Lock()
+
+
+def simulator_version(simulator: Sequence[str]) -> str:
+    """First line `<simulator> -v` prints, asked once per command and process"""
+    command = tuple(simulator)
+    with _VERSIONS_LOCK:
+        if command not in _VERSIONS:
+            try:
+                output = subprocess.run([*command, "-v"], capture_output=True, text=True, timeout=30,
+                                        stdin=subprocess.DEVNULL).stdout
+                lines = [line.strip() for line in output.splitlines() if line.strip()]
+                _VERSIONS[command] = lines[0] if lines else "unknown"
+            except (OSError, subprocess.TimeoutExpired):
+                _VERSIONS[command] = "unknown"
+        return _VERSIONS[command]
+
+
+@dataclass
+class SimCacheStats:
+    """Counters of a SimulationCache, see SimulationCache.stats()"""
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    stores: int
+    evictions: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        stats = asdict(self)
+        stats["hit_rate"] = self.hit_rate
+        return stats
+
+    def __str__(self) -> str:
+        return (f"simulation cache: {self.entries} entries, {self.bytes / 2**20:.1f} of "
+                f"{self.max_bytes / 2**20:.0f} MB; hits {self.hits}, misses {self.misses}, "
+                f"hit rate {self.hit_rate:.1%}, stores {self.stores}, evictions {self.evictions}")
+
+
+@dataclass
+class CachedRun:
+    """What a cache hit gives back to the runner"""
+    returncode: int
+    elapsed: float  # of the original run
+    rawfiles: List[str]
+    measurements: Dict[str, float]
+
+
+class SimulationCache:
+    """
+    Results of finished simulations, keyed by what determines them.
+
+    The key hashes the simulator version and the deck with its includes and
+    .lib sections resolved and comments stripped, so the analysis commands
+    of the .control block are part of it and reformatting or commenting a
+    deck is not. An entry keeps the rawfiles, log and measurements of the
+    run; the least recently used entries are evicted to stay within
+    max_bytes. Restored rawfiles are hard links where the file system allows.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = 2**30,
+                 expander: Optional[NetlistExpander] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.expander = expander or NetlistExpander()
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(directory, "cache.sqlite"), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "SimulationCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def key(self, deck: str, base_dir: str, simulator: Sequence[str]) -> str:
+        with self._lock:
+            digest = self.expander.digest(deck, base_dir)
+        return hashlib.sha256(f"{simulator_version(simulator)}\n{digest}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        self._db.execute("INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value=value+?",
+                         (name, amount, amount))
+
+    def restore(self, key: str, workdir: str, log_path: Optional[str] = None) -> Optional[CachedRun]:
+        """Put the rawfiles (and log) of a cached run into workdir, None on a miss"""
+        with self._lock:
+            path = self._path(key)
+            meta_path = os.path.join(path, "run.json")
+            row = self._db.execute("SELECT key FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None or not os.path.isfile(meta_path):
+                with self._db:
+                    self._count("misses")
+                return None
+            with open(meta_path) as f:
+                meta = json.load(f)
+            rawfiles = []
+            for name in meta["rawfiles"]:
+                rawfiles.append(os.path.join(workdir, name))
+                _link(os.path.join(path, name), rawfiles[-1])
+            if log_path is not None and os.path.isfile(os.path.join(path, "run.log")):
+                shutil.copyfile(os.path.join(path, "run.log"), log_path)
+            with self._db:
+                self._db.execute("UPDATE entries SET last_used=?, hits=hits+1 WHERE key=?", (time.time(), key))
+                self._count("hits")
+            return CachedRun(meta["returncode"], meta["elapsed"], rawfiles, meta["measurements"])
+
+    def store(self, key: str, job: str, returncode: int, elapsed: float, rawfiles: Sequence[str],
+              measurements: Dict[str, float], log_path: Optional[str] = None) -> None:
+        """Keep a finished run, then evict down to max_bytes"""
+        with self._lock:
+            path = self._path(key)
+            staging = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            size = 0
+            for source in rawfiles:
+                target = os.path.join(staging, os.path.basename(source))
+                _link(source, target)
+                size += os.path.getsize(target)
+            if log_path is not None and os.path.isfile(log_path):
+                shutil.copyfile(log_path, os.path.join(staging, "run.log"))
+                size += os.path.getsize(log_path)
+            with open(os.path.join(staging, "run.json"), "w") as f:
+                json.dump({"job": job, "returncode": returncode, "elapsed": elapsed,
+                           "rawfiles": [os.path.basename(p) for p in rawfiles], "measurements": measurements}, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(staging, path)
+            now = time.time()
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, 0)", (key, job, size, now, now))
+                self._count("stores")
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least recently used entries until at most max_bytes (default self.max_bytes) are kept"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+            evicted = 0
+            for key, size in self._db.execute("SELECT key, bytes FROM entries ORDER BY last_used").fetchall():
+                if total <= limit:
+                    break
+                shutil.rmtree(self._path(key), ignore_errors=True)
+                with self._db:
+                    self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                    self._count("evictions")
+                total -= size
+                evicted += 1
+            return evicted
+
+    def clear(self) -> None:
+        self.evict(0)
+
+    def stats(self) -> SimCacheStats:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+            counters = dict(self._db.execute("SELECT name, value FROM counters"))
+        return SimCacheStats(entries, size, self.max_bytes, counters.get("hits", 0), counters.get("misses", 0),
+                             counters.get("stores", 0), counters.get("evictions", 0))
+
+
+def _link(source: str, target: str) -> None:
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
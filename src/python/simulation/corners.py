@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .batch import (NGSPICE, STUB_SIMULATOR, TESTBENCH_DIR, SimJob, SimResult, SimulationStore, prepare_deck,
+                    run_batch, testbench_jobs)
+from .cache import SimulationCache
+from .netlist import NetlistExpander
+
+# Model library of the gf180mcu testbenches and its corner sections
+MODEL_LIBRARY = "sm141064.ngspice"
+MOS_CORNERS = ("typical", "ff", "ss", "fs", "sf")
+MIMCAP_CORNERS = ("mimcap_typical", "mimcap_ff", "mimcap_ss")
+RES_CORNERS = ("res_typical", "res_ff", "res_ss")
+TEMPERATURES = (-40.0, 0.0, 27.0, 85.0, 125.0)
+
+
+@dataclass(frozen=True)
+class Corner:
+    """Model library sections and temperature of one PVT corner"""
+    mos: str = "typical"
+    mimcap: str = "mimcap_typical"
+    res: str = "res_typical"
+    temperature: float = 27.0
+
+    @property
+    def name(self) -> str:
+        """e.g. "ff_27C", non typical mimcap/res sections are appended ("ss_mimcap_ff_res_ss_-40C")"""
+        parts = [self.mos]
+        parts += [section for section in (self.mimcap, self.res) if not section.endswith("_typical")]
+        return "_".join(parts + [f"{self.temperature:g}C"])
+
+    def section(self, section: str) -> str:
+        """Section of this corner replacing a .lib section of the model library"""
+        lowered = section.lower()
+        if lowered in MOS_CORNERS or lowered == "statistical":
+            return self.mos
+        if lowered.startswith("mimcap_"):
+            return self.mimcap
+        if lowered.startswith("res_"):
+            return self.res
+        return section
+
+
+def corner_grid(mos: Sequence[str] = MOS_CORNERS, mimcap: Sequence[str] = ("mimcap_typical",),
+                res: Sequence[str] = ("res_typical",), temperatures: Sequence[float] = (27.0,)) -> List[Corner]:
+    """Every combination of the given sections and temperatures (temperature varies fastest)"""
+    return [Corner(*values) for values in itertools.product(mos, mimcap, res, temperatures)]
+
+
+def apply_corner(text: str, corner: Corner, library: str = MODEL_LIBRARY) -> str:
+    """
+    Deck with the model library sections of a corner and its temperature.
+
+    .lib lines of the model library get the corner's MOS, mimcap and res
+    sections (other sections such as cap_mim are kept); a .temp line is
+    replaced, or added before the .control block.
+    """
+    out, control, temp = [], None, False
+    for line in text.splitlines():
+        words = line.split()
+        directive = words[0].lower() if words else ""
+        if directive == ".lib" and len(words) == 3 and os.path.basename(words[1].strip("'\"")) == library:
+            line = f"{words[0]} {words[1]} {corner.section(words[2])}"
+        elif directive == ".temp":
+            line, temp = f".temp {corner.temperature:g}", True
+        elif directive == ".control" and control is None:
+            control = len(out)
+        out.append(line)
+    if not temp:
+        at = control if control is not None else next(
+            (i for i in range(len(out) - 1, -1, -1) if out[i].strip().lower() == ".end"), len(out))
+        out.insert(at, f".temp {corner.temperature:g}")
+    return "\n".join(out) + "\n"
+
+
+@dataclass
+class CornerVariant:
+    """One testbench at one corner"""
+    testbench: str
+    corner: Corner
+    digest: str
+    job: SimJob
+
+
+@dataclass
+class CornerPlan:
+    """
+    Result of expand_corners: every variant, and the first variant of each
+    distinct expanded netlist, which is the one that gets simulated.
+    """
+    variants: List[CornerVariant]
+    unique: Dict[str, CornerVariant]
+    missing: List[str]
+    elapsed: float
+
+    @property
+    def duplicates(self) -> int:
+        return len(self.variants) - len(self.unique)
+
+    def __str__(self) -> str:
+        text = (f"{len(self.variants)} corner variants, {len(self.unique)} distinct netlists "
+                f"({self.duplicates} duplicates) expanded in {self.elapsed * 1e3:.1f} ms")
+        if self.missing:
+            text += f"\n  unresolved includes (hashed by reference): {', '.join(self.missing)}"
+        return text
+
+
+def expand_corners(jobs: Sequence[SimJob], corners: Sequence[Corner], pdk_root: Optional[str] = None,
+                   expander: Optional[NetlistExpander] = None) -> CornerPlan:
+    """
+    Corner variants of testbench jobs, deduplicated by the hash of their expanded netlists.
+
+    Each deck is read and given its overrides once; the model library is
+    parsed once and the digests of its sections are shared by all variants.
+
+    Args:
+        jobs: Testbench jobs, their params and alterparams are applied to every variant
+        corners: Corners to generate
+        pdk_root: PDK root replacing the one the decks were exported with (default $PDK_ROOT when set)
+        expander: Include resolver to reuse across calls (keeps its parsed files)
+
+    Returns:
+        CornerPlan: variants in (job, corner) order, jobs named "<testbench>.<corner name>"
+    """
+    start = time.perf_counter()
+    pdk_root = pdk_root or os.environ.get("PDK_ROOT")
+    expander = expander or NetlistExpander()
+    variants, unique = [], {}
+    for job in jobs:
+        if job.deck is None:
+            with open(job.netlist) as f:
+                deck = f.read()
+        else:
+            deck = job.deck
+        deck = prepare_deck(deck, job.params, job.alterparams, pdk_root)
+        base_dir = os.path.dirname(os.path.abspath(job.netlist))
+        for corner in corners:
+            text = apply_corner(deck, corner)
+            digest = expander.digest(text, base_dir)
+            variant = CornerVariant(job.name, corner, digest,
+                                    SimJob(f"{job.name}.{corner.name}", job.netlist, timeout=job.timeout, deck=text))
+            variants.append(variant)
+            unique.setdefault(digest, variant)
+    return CornerPlan(variants, unique, list(expander.missing), time.perf_counter() - start)
+
+
+@dataclass
+class CornerTable:
+    """Results of run_corners, one row per variant; duplicates share the result of their netlist"""
+    rows: List[CornerVariant]
+    results: Dict[str, SimResult]  # digest -> result
+    elapsed: float
+    measurements: Sequence[str] = field(default_factory=tuple)
+
+    def result(self, testbench: str, corner: Corner) -> SimResult:
+        for row in self.rows:
+            if row.testbench == testbench and row.corner == corner:
+                return self.results[row.digest]
+        raise ValueError(f"no variant of {testbench!r} at corner {corner.name}")
+
+    def values(self, measurement: str, testbench: Optional[str] = None) -> Dict[tuple, Optional[float]]:
+        """{(testbench, corner name): value} of one measurement, None where a run failed or lacks it"""
+        return {(row.testbench, row.corner.name): self.results[row.digest].measurements.get(measurement)
+                for row in self.rows if testbench is None or row.testbench == testbench}
+
+    def __str__(self) -> str:
+        names = list(self.measurements)
+        if not names:
+            names = sorted({name for result in self.results.values() for name in result.measurements})
+        lines = [f"{len(self.rows)} corner variants, {len(self.results)} simulated in {self.elapsed:.1f} s"]
+        testbench = None
+        for row in self.rows:
+            if row.testbench != testbench:
+                testbench = row.testbench
+                lines.append(f"{testbench}")
+                lines.append(f"  {'corner':28s} {'status':8s}" + "".join(f" {name[:14]:>14s}" for name in names))
+            result = self.results[row.digest]
+            cells = []
+            for name in names:
+                value = result.measurements.get(name)
+                cells.append(f" {value:14.5g}" if value is not None else f" {'-':>14s}")
+            lines.append(f"  {row.corner.name:28s} {result.status:8s}" + "".join(cells))
+        return "\n".join(lines)
+
+
+def run_corners(
+    plan: CornerPlan,
+    output_dir: str,
+    measurements: Sequence[str] = (),
+    store: Optional[SimulationStore] = None,
+    batch: str = "corners",
+    simulator: Sequence[str] = NGSPICE,
+    processes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cache: Optional[SimulationCache] = None,
+    progress: Optional[Callable[[SimResult], None]] = None,
+) -> CornerTable:
+    """
+    Simulate each distinct netlist of a corner plan once, in parallel, and tabulate the measurements.
+
+    Args:
+        plan: Result of expand_corners
+        output_dir: Directory for the per variant decks, logs and rawfiles
+        measurements: Names printed by the decks to tabulate (default every one found)
+        store: Results store, None: only return the results
+        batch: Batch name in the store
+        simulator: Simulator command (default ngspice -b)
+        processes: Simulators running at once (default os.cpu_count())
+        timeout: Seconds before a variant without its own timeout is killed
+        cache: Reuse the results of variants simulated before, and cache the new ones
+        progress: Called with each SimResult as it finishes
+
+    Returns:
+        CornerTable: one row per variant of the plan
+    """
+    variants = list(plan.unique.values())
+    batch_result = run_batch([variant.job for variant in variants], output_dir, store, batch, simulator, processes,
+                             timeout, cache=cache, progress=progress)
+    results = {variant.digest: result for variant, result in zip(variants, batch_result.results)}
+    return CornerTable(plan.variants, results, batch_result.elapsed, tuple(measurements))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the design_tb testbenches across PVT corners")
+    parser.add_argument("output_dir", help="directory for the decks, logs and rawfiles of each variant")
+    parser.add_argument("testbenches", nargs="*", help="deck names (default all)")
+    parser.add_argument("--directory", default=TESTBENCH_DIR, help="testbench directory")
+    parser.add_argument("--mos", nargs="+", default=list(MOS_CORNERS), help="MOS corner sections")
+    parser.add_argument("--mimcap", nargs="+", default=["mimcap_typical"], help="MIM capacitor sections")
+    parser.add_argument("--res", nargs="+", default=["res_typical"], help="resistor sections")
+    parser.add_argument("--temperatures", nargs="+", type=float, default=[27.0], help="temperatures in C")
+    parser.add_argument("--measure", nargs="+", default=[], help="measurements to tabulate (default all)")
+    parser.add_argument("--store", help="SQLite results file")
+    parser.add_argument("--batch", default="corners", help="batch name in the store")
+    parser.add_argument("--timeout", type=float, help="seconds before a variant is killed")
+    parser.add_argument("--processes", type=int, help="simulators running at once")
+    parser.add_argument("--pdk-root", help="PDK root (default $PDK_ROOT)")
+    parser.add_argument("--stub", action="store_true", help="run the stub simulator instead of ngspice")
+    parser.add_argument("--dry-run", action="store_true", help="only expand the variants")
+    parser.add_argument("--cache", help="simulation cache directory")
+    parser.add_argument("--cache-size", type=float, default=1024, help="cache size limit in MB")
+    args = parser.parse_args(argv)
+
+    corners = corner_grid(args.mos, args.mimcap, args.res, args.temperatures)
+    plan = expand_corners(testbench_jobs(args.testbenches or None, args.directory), corners, args.pdk_root)
+    print(plan)
+    if args.dry_run:
+        return 0
+    store = SimulationStore(args.store) if args.store else None
+    cache = SimulationCache(args.cache, int(args.cache_size * 2**20)) if args.cache else None
+    try:
+        table = run_corners(plan, args.output_dir, args.measure, store, args.batch,
+                            STUB_SIMULATOR if args.stub else NGSPICE, args.processes, args.timeout, cache,
+                            progress=lambda r: print(f"{r.job}: {r.status}", flush=True))
+    finally:
+        if store is not None:
+            store.close()
+        if cache is not None:
+            print(cache.stats())
+            cache.close()
+    print(table)
+    return 1 if any(result.status != "done" for result in table.results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+import math
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import reduce
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .rawfile import RawFile
+
+# 4 term Blackman-Harris, -92 dB sidelobes
+_BLACKMAN_HARRIS = (0.35875, 0.48829, 0.14128, 0.01168)
+
+Run = Union[str, Path, Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]  # rawfile or (time, v_out, v_rf)
+
+
+@dataclass(frozen=True)
+class TwoToneSetup:
+    """
+    Tones of the two tone testbench, defaults as in Gilbert_cell_tb_IIP3.
+
+    The IF products are |f_lo - f_rf|, the third order products of the two
+    RF tones (2 f1 - f2, 2 f2 - f1) land at |f_lo - f_im3|.
+    """
+    f_lo: float = 100e6
+    f_rf1: float = 89.3e6
+    f_rf2: float = 89.4e6
+    settle: float = 0.0  # seconds of transient dropped before the analysis window
+    output: Tuple[str, str] = ("v(v_out_p)", "v(v_out_n)")
+    rf_input: Tuple[str, str] = ("v(v_rf)", "v(v_rf_b)")
+
+    @property
+    def rf_tones(self) -> Tuple[float, float]:
+        return self.f_rf1, self.f_rf2
+
+    @property
+    def if_tones(self) -> Tuple[float, float]:
+        return abs(self.f_lo - self.f_rf1), abs(self.f_lo - self.f_rf2)
+
+    @property
+    def im3_tones(self) -> Tuple[float, float]:
+        return abs(self.f_lo - (2 * self.f_rf1 - self.f_rf2)), abs(self.f_lo - (2 * self.f_rf2 - self.f_rf1))
+
+    @property
+    def resolution(self) -> float:
+        """Largest frequency every tone is a multiple of, the record must hold whole periods of it"""
+        tones = [Fraction(f).limit_denominator(1000) for f in (self.f_lo, self.f_rf1, self.f_rf2)]
+        return float(reduce(math.gcd, (t.numerator for t in tones)) / reduce(math.lcm, (t.denominator for t in tones)))
+
+
+def _window(kind: str, points: int) -> np.ndarray:
+    if kind == "rect":
+        return np.ones(points)
+    phase = 2 * np.pi * np.arange(points) / points
+    if kind == "hann":
+        return 0.5 - 0.5 * np.cos(phase)
+    if kind == "blackmanharris":
+        a0, a1, a2, a3 = _BLACKMAN_HARRIS
+        return a0 - a1 * np.cos(phase) + a2 * np.cos(2 * phase) - a3 * np.cos(3 * phase)
+    raise ValueError(f"unknown window {kind!r}, use rect, hann or blackmanharris")
+
+
+def resample(times: Sequence[np.ndarray], values: Sequence[np.ndarray], starts: np.ndarray, step: float,
+             points: int) -> np.ndarray:
+    """
+    Linear interpolation of many nonuniform waveforms onto uniform grids in one np.interp call.
+
+    The runs are laid end to end on one time axis (each shifted past the
+    previous one), so a single sorted interpolation serves all of them.
+
+    Returns:
+        (runs, points) array, row i sampled at starts[i] + step * arange(points)
+    """
+    spans = np.array([t[-1] - t[0] for t in times])
+    pitch = 2 * (float(spans.max()) + points * step)
+    offsets = pitch * np.arange(len(times))
+    flat_t = np.concatenate([np.asarray(t, float) - t[0] + off for t, off in zip(times, offsets)])
+    flat_v = np.concatenate([np.asarray(v, float) for v in values])
+    begins = np.asarray(starts, float) - np.array([t[0] for t in times]) + offsets
+    grid = begins[:, None] + step * np.arange(points)[None, :]
+    return np.interp(grid.ravel(), flat_t, flat_v).reshape(len(times), points)
+
+
+def _load(run: Run, setup: TwoToneSetup):
+    if not isinstance(run, (str, Path)):
+        time, v_out, v_rf = run
+        return np.asarray(time, float), np.asarray(v_out, float), None if v_rf is None else np.asarray(v_rf, float)
+    with RawFile(run) as raw:
+        plots = [plot for plot in raw if "time" in plot and all(name in plot for name in setup.output)]
+        if not plots:
+            raise ValueError(f"{run}: no transient plot with {', '.join(setup.output)}")
+        plot = plots[-1]
+        # Copies, the mapping is closed on return
+        time = np.array(plot["time"].real)
+        v_out = plot[setup.output[0]].real - plot[setup.output[1]].real
+        v_rf = None
+        if all(name in plot for name in setup.rf_input):
+            v_rf = plot[setup.rf_input[0]].real - plot[setup.rf_input[1]].real
+    return time, v_out, v_rf
+
+
+def _dbm(amplitude: np.ndarray, reference_ohms: float) -> np.ndarray:
+    with np.errstate(divide="ignore"):
+        return 10 * np.log10(np.square(amplitude) / (2 * reference_ohms) / 1e-3)
+
+
+@dataclass
+class TwoToneResult:
+    """
+    Tone amplitudes (V peak, differential) of a batch of two tone runs, one
+    row per run; pairs are (tone 1, tone 2) as in TwoToneSetup.
+    """
+    runs: List[str]
+    rf: np.ndarray  # (runs, 2) input tones, nan where the input was not saved and not given
+    fundamental: np.ndarray  # (runs, 2) IF tones
+    im3: np.ndarray  # (runs, 2) third order products at IF
+    lo_feedthrough: np.ndarray  # (runs,) output at f_lo
+    window: str
+    coherent: bool
+    duration: float
+    reference_ohms: float = 50.0
+
+    @property
+    def conversion_gain_db(self) -> np.ndarray:
+        """20 log10(V_if / V_rf), as in the sizing notebook"""
+        return 20 * np.log10(self.fundamental.mean(axis=1) / self.rf.mean(axis=1))
+
+    @property
+    def pin_dbm(self) -> np.ndarray:
+        return _dbm(self.rf.mean(axis=1), self.reference_ohms)
+
+    @property
+    def fundamental_dbm(self) -> np.ndarray:
+        return _dbm(self.fundamental.mean(axis=1), self.reference_ohms)
+
+    @property
+    def im3_dbm(self) -> np.ndarray:
+        """Output referred power of the larger IM3 product"""
+        return _dbm(self.im3.max(axis=1), self.reference_ohms)
+
+    @property
+    def im3_dbc(self) -> np.ndarray:
+        return self.im3_dbm - self.fundamental_dbm
+
+    @property
+    def iip3_dbm(self) -> np.ndarray:
+        """Single point estimate of each run, Pin + (P_fund - P_im3) / 2"""
+        return self.pin_dbm - self.im3_dbc / 2
+
+    def __str__(self) -> str:
+        lines = [f"{len(self.runs)} two tone runs, {self.duration * 1e6:.3g} us {self.window} window"
+                 + ("" if self.coherent else " (not coherent)"),
+                 f"  {'run':32s} {'Pin dBm':>8s} {'CG dB':>7s} {'IM3 dBc':>8s} {'IIP3 dBm':>9s} {'LO mV':>7s}"]
+        for i, run in enumerate(self.runs):
+            lines.append(f"  {run[-32:]:32s} {self.pin_dbm[i]:8.2f} {self.conversion_gain_db[i]:7.2f} "
+                         f"{self.im3_dbc[i]:8.2f} {self.iip3_dbm[i]:9.2f} {self.lo_feedthrough[i] * 1e3:7.3f}")
+        return "\n".join(lines)
+
+
+def two_tone_spectrum(
+    runs: Sequence[Run],
+    setup: TwoToneSetup = TwoToneSetup(),
+    rf_amplitude: Optional[Union[float, Sequence[float]]] = None,
+    window: str = "auto",
+    sample_rate: Optional[float] = None,
+    reference_ohms: float = 50.0,
+) -> TwoToneResult:
+    """
+    Tone amplitudes of many two tone transients at once.
+
+    Every run is resampled onto a uniform grid over the last whole number of
+    periods of setup.resolution that fits in the shortest run (after the
+    settle time), windowed, and transformed in one batched FFT; the tones
+    are read from their bins.
+
+    Runs shorter than one period of the resolution can only be analysed
+    with a window over the adjacent bins, which the default 100 kHz tone
+    spacing does not resolve; keep tran long enough for a coherent record.
+
+    Args:
+        runs: Rawfiles of Gilbert_cell_tb_IIP3 style transients, or (time, v_out diff, v_rf diff or None)
+        setup: Tone frequencies and vector names
+        rf_amplitude: Differential amplitude of each RF tone per run (or for all), used where the
+            input was not saved
+        window: "rect", "hann", "blackmanharris" or "auto" (rect when the record is coherent,
+            else blackmanharris)
+        sample_rate: Resampling rate, default 16x the highest of the LO and RF tones
+        reference_ohms: Reference resistance of the dBm values
+
+    Raises:
+        ValueError: a run ends before the settle time
+
+    Returns:
+        TwoToneResult: one row per run
+    """
+    loaded = [_load(run, setup) for run in runs]
+    names = [str(run) if isinstance(run, (str, Path)) else f"run {i}" for i, run in enumerate(runs)]
+    resolution = setup.resolution
+    usable = min(t[-1] - t[0] - setup.settle for t, _, _ in loaded)
+    periods = math.floor(usable * resolution + 1e-9)
+    coherent = periods >= 1
+    duration = periods / resolution if coherent else usable
+    if duration <= 0:
+        raise ValueError("runs end before the settle time")
+    fs = sample_rate or 16 * max(setup.f_lo, *setup.rf_tones)
+    points = int(round(duration * fs))
+    step = duration / points
+    if window == "auto":
+        window = "rect" if coherent else "blackmanharris"
+    w = _window(window, points)
+    starts = np.array([t[-1] - duration for t, _, _ in loaded])
+
+    out = resample([t for t, _, _ in loaded], [v for _, v, _ in loaded], starts, step, points)
+    spectrum = np.abs(np.fft.rfft(out * w, axis=1)) * 2 / w.sum()
+
+    def pick(spec, frequencies):
+        bins = np.rint(np.asarray(frequencies) * duration).astype(int)
+        if coherent:
+            return spec[:, bins]
+        # Off grid tones: the largest of the neighbouring bins
+        neighbours = np.clip(bins[:, None] + np.arange(-1, 2)[None, :], 0, spec.shape[1] - 1)
+        return spec[:, neighbours].max(axis=2)
+
+    rf = np.full((len(runs), 2), np.nan)
+    with_rf = [i for i, (_, _, v) in enumerate(loaded) if v is not None]
+    if with_rf:
+        rf_wave = resample([loaded[i][0] for i in with_rf], [loaded[i][2] for i in with_rf], starts[with_rf],
+                           step, points)
+        rf[with_rf] = pick(np.abs(np.fft.rfft(rf_wave * w, axis=1)) * 2 / w.sum(), setup.rf_tones)
+    if rf_amplitude is not None:
+        given = np.broadcast_to(np.asarray(rf_amplitude, float), (len(runs),))
+        missing = np.isnan(rf[:, 0])
+        rf[missing] = given[missing, None]
+    return TwoToneResult(names, rf, pick(spectrum, setup.if_tones), pick(spectrum, setup.im3_tones),
+                         pick(spectrum, [setup.f_lo])[:, 0], window, coherent, duration, reference_ohms)
+
+
+@dataclass
+class IIP3Fit:
+    """Intercept fit over the last axis (the amplitude sweep) of its inputs"""
+    iip3_dbm: np.ndarray
+    oip3_dbm: np.ndarray
+    gain_db: np.ndarray  # small signal power gain, fundamental - Pin
+    fundamental_slope: np.ndarray  # free least squares slopes, about 1 and 3 in the weakly nonlinear region
+    im3_slope: np.ndarray
+
+
+def fit_iip3(pin_dbm: np.ndarray, fundamental_dbm: np.ndarray, im3_dbm: np.ndarray,
+             max_pin_dbm: Optional[float] = None) -> IIP3Fit:
+    """
+    IIP3 from an amplitude sweep, vectorized over any leading axes (e.g. corners x amplitudes).
+
+    Lines of slope 1 and 3 are fitted to the fundamental and IM3 powers of
+    the points at or below max_pin_dbm (default all), the input intercept is
+    where they cross.
+
+    Raises:
+        ValueError: fewer than two points per sweep are used
+
+    Returns:
+        IIP3Fit: arrays shaped like the inputs without their last axis
+    """
+    pin, fund, im3 = np.broadcast_arrays(*(np.asarray(a, float) for a in (pin_dbm, fundamental_dbm, im3_dbm)))
+    use = np.isfinite(pin) & np.isfinite(fund) & np.isfinite(im3)
+    if max_pin_dbm is not None:
+        use &= pin <= max_pin_dbm
+    count = use.sum(axis=-1)
+    if np.any(count < 2):
+        raise ValueError("the IIP3 fit needs at least two usable amplitudes per sweep")
+
+    def mean(values):
+        return np.where(use, values, 0.0).sum(axis=-1) / count
+
+    def slope(y):
+        x0, y0 = mean(pin), mean(y)
+        dx = np.where(use, pin - x0[..., None], 0.0)
+        return (dx * np.where(use, y - y0[..., None], 0.0)).sum(axis=-1) / (dx * dx).sum(axis=-1)
+
+    gain = mean(fund - pin)
+    im3_offset = mean(im3 - 3 * pin)
+    iip3 = (gain - im3_offset) / 2
+    return IIP3Fit(iip3, iip3 + gain, gain, slope(fund), slope(im3))
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_INLINE_COMMENT = re.compile(r"\s(?:\$|;).*$")
+
+
+def iter_logical_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Lines of a SPICE deck as the simulator sees them: "+" continuations
+    joined, comment lines and inline "$"/";" comments dropped, whitespace
+    collapsed. The .control block is kept (without its "*" comments).
+
+    Takes any iterable of physical lines, e.g. an open file, and holds
+    only the line being continued.
+    """
+    pending = None
+    for raw in lines:
+        line = raw.strip()
+        if not line or line[0] == "*":
+            continue
+        line = _INLINE_COMMENT.sub("", line)
+        if line[0] == "+":
+            if pending is not None:
+                pending += " " + " ".join(line[1:].split())
+            continue
+        if pending is not None:
+            yield pending
+        pending = " ".join(line.split())
+    if pending is not None:
+        yield pending
+
+
+def logical_lines(text: str) -> List[str]:
+    """iter_logical_lines of a whole deck"""
+    return list(iter_logical_lines(text.splitlines()))
+
+
+def _directive(line: str) -> str:
+    return line.split(None, 1)[0].lower() if line[0] == "." else ""
+
+
+def _unquote(path: str) -> str:
+    return path.strip("'\"")
+
+
+def include_reference(line: str, base_dir: str) -> Optional[Tuple[str, Optional[str]]]:
+    """(path, .lib section or None) of an .include/.lib reference line, None for other lines"""
+    directive = _directive(line)
+    words = line.split()
+    if directive in (".include", ".inc") and len(words) >= 2:
+        path, section = _unquote(words[1]), None
+    elif directive == ".lib" and len(words) >= 3:
+        path, section = _unquote(words[1]), words[2].lower()
+    else:
+        return None
+    return os.path.normpath(os.path.join(base_dir, os.path.expanduser(path))), section
+
+
+@dataclass
+class _File:
+    key: Tuple[int, int]  # (mtime_ns, size), reparsed when it changes
+    lines: List[str]
+    sections: Dict[str, Tuple[int, int]]  # .lib name -> (first, end) line index
+
+
+class NetlistExpander:
+    """
+    Resolves .include and .lib references of SPICE decks.
+
+    Every file is read and split into logical lines once, and the digest of
+    every included file and library section is memoized, so hashing many
+    variants of decks that share a model library only costs the decks' own
+    lines. Missing files are left as references and listed in `missing`.
+    """
+
+    def __init__(self, max_depth: int = 16):
+        self.max_depth = max_depth
+        self._files: Dict[str, _File] = {}
+        self._digests: Dict[Tuple[str, Optional[str]], Tuple[str, tuple]] = {}
+        self.missing: List[str] = []
+
+    def _file(self, path: str) -> Optional[_File]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if path not in self.missing:
+                self.missing.append(path)
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(path)
+        if cached is not None and cached.key == key:
+            return cached
+        with open(path, errors="replace") as f:
+            lines = list(iter_logical_lines(f))
+        sections, start, name = {}, None, None
+        for i, line in enumerate(lines):
+            directive = _directive(line)
+            words = line.split()
+            # ".lib name" opens a section, ".lib file name" references one
+            if directive == ".lib" and len(words) == 2 and start is None:
+                start, name = i + 1, words[1].lower()
+            elif directive == ".endl" and start is not None:
+                sections[name] = (start, i)
+                start = None
+        self._files[path] = _File(key, lines, sections)
+        return self._files[path]
+
+    def _body(self, path: str, section: Optional[str]) -> Optional[List[str]]:
+        parsed = self._file(path)
+        if parsed is None:
+            return None
+        if section is None:
+            return parsed.lines
+        if section not in parsed.sections:
+            raise ValueError(f"no .lib section {section!r} in {path}")
+        first, end = parsed.sections[section]
+        return parsed.lines[first:end]
+
+    def expand(self, text: str, base_dir: str = ".") -> List[str]:
+        """Logical lines of a deck with every resolvable .include/.lib inlined"""
+        return self._expand(logical_lines(text), base_dir, 0)
+
+    def _expand(self, lines: Sequence[str], base_dir: str, depth: int) -> List[str]:
+        if depth > self.max_depth:
+            raise ValueError(f"includes nested deeper than {self.max_depth} levels")
+        out: List[str] = []
+        for line in lines:
+            reference = include_reference(line, base_dir) if line[0] == "." else None
+            body = self._body(*reference) if reference else None
+            if body is None:
+                out.append(line)
+            else:
+                out.extend(self._expand(body, os.path.dirname(reference[0]), depth + 1))
+        return out
+
+    def digest(self, text: str, base_dir: str = ".") -> str:
+        """
+        SHA-256 of a deck with its includes and libraries resolved.
+
+        Two decks get the same digest when their expanded netlists are the
+        same; an included file or section contributes the memoized digest of
+        its own expansion instead of its lines. A memoized digest is used
+        again only while none of the files it was computed from changed.
+        """
+        return self._digest(logical_lines(text), base_dir, 0, [])
+
+    def _digest(self, lines: Sequence[str], base_dir: str, depth: int, deps: List) -> str:
+        if depth > self.max_depth:
+            raise ValueError(f"includes nested deeper than {self.max_depth} levels")
+        h = hashlib.sha256()
+        for line in lines:
+            reference = include_reference(line, base_dir) if line[0] == "." else None
+            part = self._reference_digest(reference, depth, deps) if reference else None
+            h.update((part or line).encode())
+            h.update(b"\n")
+        return h.hexdigest()
+
+    def _reference_digest(self, reference: Tuple[str, Optional[str]], depth: int, deps: List) -> Optional[str]:
+        memo = self._digests.get(reference)
+        if memo is not None and all(self._file(path) is not None and self._files[path].key == key
+                                    for path, key in memo[1]):
+            deps.extend(memo[1])
+            return memo[0]
+        body = self._body(*reference)
+        if body is None:
+            return None
+        own = [(reference[0], self._files[reference[0]].key)]
+        digest = "@" + self._digest(body, os.path.dirname(reference[0]), depth + 1, own)
+        self._digests[reference] = (digest, tuple(dict.fromkeys(own)))
+        deps.extend(own)
+        return digest
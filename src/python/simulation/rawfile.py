@@ -0,0 +1,221 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# A plot header ends with one of these lines, the values follow
+_DATA_KEYS = ("Binary", "Values")
+
+
+@dataclass
+class RawVariable:
+    index: int
+    name: str
+    type: str
+
+
+@dataclass
+class RawPlot:
+    """
+    One plot of a rawfile. Vectors of binary plots are zero-copy views into
+    the memory-mapped file; ascii plots are parsed on first access.
+    """
+    plotname: str
+    flags: str
+    variables: List[RawVariable]
+    points: int
+    offset: int  # byte offset of the values
+    binary: bool
+    header: Dict[str, str] = field(default_factory=dict)
+    _file: Optional["RawFile"] = field(default=None, repr=False)
+    _data: Optional[np.ndarray] = field(default=None, repr=False)
+    _end: int = field(default=0, repr=False)
+
+    @property
+    def is_complex(self) -> bool:
+        return "complex" in self.flags.lower()
+
+    @property
+    def names(self) -> List[str]:
+        return [variable.name for variable in self.variables]
+
+    @property
+    def data(self) -> np.ndarray:
+        """(points, variables) array of every vector, complex128 for complex plots"""
+        if self._data is None:
+            if self.binary:
+                dtype = np.dtype("<c16" if self.is_complex else "<f8")
+                raw = self._file._map[self.offset:self.offset + self.points * len(self.variables) * dtype.itemsize]
+                self._data = raw.view(dtype).reshape(self.points, len(self.variables))
+            else:
+                self._data = self._parse_values()
+        return self._data
+
+    def _parse_values(self) -> np.ndarray:
+        text = bytes(self._file._map[self.offset:self._end]).replace(b",", b" ")
+        values = np.fromstring(text.decode("latin-1"), sep=" ")
+        # Each point is its index followed by one (re) or two (re, im) numbers per variable
+        width = 2 if self.is_complex else 1
+        per_point = 1 + width * len(self.variables)
+        points = min(self.points, len(values) // per_point)
+        values = values[:points * per_point].reshape(points, per_point)[:, 1:]
+        if self.is_complex:
+            values = values[:, 0::2] + 1j * values[:, 1::2]
+        self.points = points
+        return values
+
+    def _index(self, name: str) -> int:
+        lowered = name.lower()
+        for variable in self.variables:
+            if variable.name.lower() == lowered:
+                return variable.index
+        raise KeyError(f"no vector {name!r} in plot {self.plotname!r}")
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self._index(name)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Vector by name (case insensitive), a strided view of data"""
+        return self.data[:, self._index(name)]
+
+    def __len__(self) -> int:
+        return self.points
+
+    def vectors(self, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """{name: vector} of the given (default all) vectors"""
+        return {name: self[name] for name in (names or self.names)}
+
+    def chunks(self, names: Optional[Sequence[str]] = None, points: int = 1 << 16) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        {name: vector} views of successive runs of points. Only the pages
+        of the current chunk of a binary plot need to be in memory, so files
+        larger than RAM can be reduced chunk by chunk.
+        """
+        indices = [(name, self._index(name)) for name in (names or self.names)]
+        data = self.data
+        for start in range(0, self.points, points):
+            block = data[start:start + points]
+            yield {name: block[:, index] for name, index in indices}
+
+
+class RawFile:
+    """
+    Memory-mapped ngspice rawfile (binary or ascii, one or more plots).
+
+    The headers are parsed once when the file is opened; the values stay in
+    the file until a vector is accessed. Vectors of binary plots are views
+    into the mapping and keep it alive, copy them to outlive the RawFile.
+    A plot whose point count exceeds the values in the file (a run that was
+    killed while writing) is truncated to the complete points.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        size = os.path.getsize(self.path)
+        if size == 0:
+            raise ValueError(f"{self.path}: empty rawfile")
+        self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+        self.plots: List[RawPlot] = []
+        position = 0
+        while position < size:
+            plot, position = self._read_plot(position, size)
+            if plot is None:
+                break
+            self.plots.append(plot)
+        if not self.plots:
+            raise ValueError(f"{self.path}: no plots in rawfile")
+
+    def _readline(self, position: int, size: int):
+        end = position
+        while True:
+            chunk = bytes(self._map[end:min(end + 4096, size)])
+            newline = chunk.find(b"\n")
+            if newline >= 0 or end + len(chunk) >= size:
+                end = end + newline if newline >= 0 else size
+                return bytes(self._map[position:end]).decode("latin-1").rstrip("\r"), min(end + 1, size)
+            end += len(chunk)
+
+    def _read_plot(self, position: int, size: int):
+        header: Dict[str, str] = {}
+        variables: List[RawVariable] = []
+        key = None
+        while position < size:
+            line, position = self._readline(position, size)
+            if not line.strip():
+                continue
+            key, _, value = line.partition(":")
+            key = key.strip()
+            if key == "Variables":
+                count = int(header["No. Variables"])
+                words = value.split()
+                if words:
+                    # Some writers put the first variable on the Variables: line
+                    variables.append(RawVariable(int(words[0]), words[1], words[2] if len(words) > 2 else ""))
+                while len(variables) < count:
+                    line, position = self._readline(position, size)
+                    words = line.split()
+                    variables.append(RawVariable(int(words[0]), words[1], words[2] if len(words) > 2 else ""))
+            elif key in _DATA_KEYS:
+                break
+            else:
+                header[key] = value.strip()
+        if key not in _DATA_KEYS:
+            if header:
+                raise ValueError(f"{self.path}: plot header without values")
+            return None, size
+        if "No. Points" not in header or not variables:
+            raise ValueError(f"{self.path}: malformed plot header {header}")
+        flags = header.get("Flags", "real")
+        plot = RawPlot(header.get("Plotname", ""), flags, variables, int(header["No. Points"]), position,
+                       key == "Binary", header, self)
+        if plot.binary:
+            row = len(variables) * (16 if plot.is_complex else 8)
+            end = min(position + plot.points * row, size)
+            plot.points = (end - position) // row
+        else:
+            end = self._find(b"\nTitle:", position, size)
+            end = size if end < 0 else end + 1
+        plot._end = end
+        return plot, end
+
+    def _find(self, token: bytes, position: int, size: int, chunk: int = 1 << 20) -> int:
+        while position < size:
+            block = bytes(self._map[position:min(position + chunk + len(token), size)])
+            found = block.find(token)
+            if found >= 0:
+                return position + found
+            position += chunk
+        return -1
+
+    def __len__(self) -> int:
+        return len(self.plots)
+
+    def __iter__(self) -> Iterator[RawPlot]:
+        return iter(self.plots)
+
+    def __getitem__(self, key: Union[int, str]) -> RawPlot:
+        """Plot by position, or the first one whose name contains key (case insensitive)"""
+        if isinstance(key, int):
+            return self.plots[key]
+        for plot in self.plots:
+            if key.lower() in plot.plotname.lower():
+                return plot
+        raise KeyError(f"no plot {key!r} in {self.path}")
+
+    def close(self) -> None:
+        """Drop the mapping, vectors already handed out keep their pages mapped"""
+        for plot in self.plots:
+            plot._data = None
+        self._map = None
+
+    def __enter__(self) -> "RawFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,427 @@
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .netlist import _directive, include_reference, iter_logical_lines
+
+# Bumped whenever the layout of the saved arrays changes
+FORMAT_VERSION = 1
+
+# Quoted or braced expressions may contain blanks, "a = b" is read as "a=b"
+_TOKEN = re.compile(r"""(?:[^\s'"{]|'[^']*'|"[^"]*"|\{[^}]*\})+""")
+_EQUALS = re.compile(r"\s*=\s*")
+_NUMBER = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[fpnumkgt])?[a-z]*$", re.IGNORECASE)
+_SCALE = {"f": 1e-15, "p": 1e-12, "n": 1e-9, "u": 1e-6, "m": 1e-3, "k": 1e3, "meg": 1e6, "g": 1e9, "t": 1e12,
+          "mil": 25.4e-6}
+
+# Terminal counts of elements without a model name; "d", "m", "q", "j" and
+# "x" lines end with their model or subcircuit instead
+_TERMINALS = {"r": 2, "c": 2, "l": 2, "v": 2, "i": 2, "f": 2, "h": 2, "b": 2, "e": 4, "g": 4}
+_MODEL_ELEMENTS = frozenset("dmqjxz")
+
+
+def spice_number(text: str) -> float:
+    """Value of a SPICE number such as "0.28u", "4.67374p" or "1meg" (trailing units are ignored)"""
+    match = _NUMBER.match(text.strip())
+    if match is None:
+        raise ValueError(f"not a SPICE number: {text!r}")
+    return float(match.group(1)) * _SCALE.get((match.group(2) or "").lower(), 1.0)
+
+
+def _is_value(token: str) -> bool:
+    return token[0] in "0123456789.+-'\"{"
+
+
+def split_element(line: str) -> Tuple[str, List[str], Optional[str], List[Tuple[str, str]]]:
+    """
+    (name, nodes, model or subcircuit, params) of an element line.
+
+    Parameter names are lowercased. The value of R, C and L lines, and the
+    source specification of V, I, B and controlled sources, become a "value"
+    parameter; an R, C or L line may also name a model.
+    """
+    positional, params = [], []
+    for token in _TOKEN.findall(_EQUALS.sub("=", line)):
+        key, equals, value = token.partition("=")
+        if equals and key and not _is_value(token):
+            params.append((key.lower(), value))
+        elif token.lower() != "params:":
+            positional.append(token)
+    name, kind, ref = positional[0], positional[0][0].lower(), None
+    if kind in _MODEL_ELEMENTS:
+        nodes = positional[1:-1]
+        ref = positional[-1] if len(positional) > 1 else None
+    elif kind in _TERMINALS:
+        count = _TERMINALS[kind]
+        nodes, rest = positional[1:1 + count], positional[1 + count:]
+        if kind in "rcl" and rest and not _is_value(rest[0]):
+            ref, rest = rest[0], rest[1:]
+        if rest:
+            params.insert(0, ("value", " ".join(rest)))
+    else:
+        nodes = positional[1:]
+    return name, nodes, ref, params
+
+
+@dataclass
+class Instance:
+    name: str
+    nodes: Tuple[str, ...]
+    ref: Optional[str]  # model or subcircuit name
+    params: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def kind(self) -> str:
+        """Lowercase element letter, e.g. "x", "r", "m" """
+        return self.name[0].lower()
+
+    @property
+    def multiplier(self) -> float:
+        """m parameter, 1 when it is missing or an expression"""
+        try:
+            return spice_number(self.params.get("m", "1"))
+        except ValueError:
+            return 1.0
+
+
+@dataclass
+class Subckt:
+    name: str  # "" for the instances outside any .subckt
+    ports: Tuple[str, ...]
+    instances: List[Instance]
+    params: Dict[str, str]
+    source: str  # file of the definition
+
+    @property
+    def nets(self) -> List[str]:
+        """Ports followed by the internal nets in order of first use"""
+        nets = dict.fromkeys(self.ports)
+        for instance in self.instances:
+            nets.update(dict.fromkeys(instance.nodes))
+        return list(nets)
+
+    def instance(self, name: str) -> Instance:
+        for instance in self.instances:
+            if instance.name.lower() == name.lower():
+                return instance
+        raise ValueError(f"no instance {name!r} in subcircuit {self.name!r}")
+
+    def __len__(self) -> int:
+        return len(self.instances)
+
+
+class _Builder:
+    """Interns strings and appends parsed subcircuits to the flat arrays of a SpiceIndex"""
+
+    def __init__(self):
+        self.strings: Dict[str, int] = {"": 0}
+        self.columns: Dict[str, list] = {name: [] for name in (
+            "sub_name", "sub_source", "sub_ports", "sub_instances", "sub_params", "ports", "inst_name",
+            "inst_ref", "inst_nodes", "inst_params", "nodes", "params", "subckt_params", "models")}
+        for name in ("sub_ports", "sub_instances", "sub_params", "inst_nodes", "inst_params"):
+            self.columns[name].append(0)
+
+    def intern(self, text: str) -> int:
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def subckt(self, name: str, source: str, ports: Sequence[str], params: Sequence[Tuple[str, str]],
+               instances: Sequence[tuple]) -> None:
+        c, intern = self.columns, self.intern
+        c["sub_name"].append(intern(name))
+        c["sub_source"].append(intern(source))
+        c["ports"].extend(intern(port) for port in ports)
+        c["sub_ports"].append(len(c["ports"]))
+        for key, value in params:
+            c["subckt_params"].extend((intern(key), intern(value)))
+        c["sub_params"].append(len(c["subckt_params"]) // 2)
+        for inst_name, nodes, ref, inst_params in instances:
+            c["inst_name"].append(intern(inst_name))
+            c["inst_ref"].append(-1 if ref is None else intern(ref))
+            c["nodes"].extend(intern(node) for node in nodes)
+            c["inst_nodes"].append(len(c["nodes"]))
+            for key, value in inst_params:
+                c["params"].extend((intern(key), intern(value)))
+            c["inst_params"].append(len(c["params"]) // 2)
+        c["sub_instances"].append(len(c["inst_name"]))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {name: np.asarray(values, dtype=np.int32) for name, values in self.columns.items()}
+        for name in ("params", "subckt_params", "models"):
+            arrays[name] = arrays[name].reshape(-1, 2)
+        return arrays
+
+
+class _Parser:
+    def __init__(self, builder: _Builder, max_depth: int):
+        self.builder = builder
+        self.max_depth = max_depth
+        self.sources: Dict[str, Tuple[int, int]] = {}
+        self.missing: List[str] = []
+        self.top: List[tuple] = []
+        self.top_params: List[Tuple[str, str]] = []
+        # Open .subckt definitions: [name, source, ports, params, instances]
+        self.stack: List[list] = []
+
+    def parse(self, path: str, section: Optional[str] = None, depth: int = 0) -> None:
+        if depth > self.max_depth:
+            raise ValueError(f"includes nested deeper than {self.max_depth} levels")
+        try:
+            f = open(path, errors="replace")
+        except OSError:
+            if path not in self.missing:
+                self.missing.append(path)
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            self.sources[path] = (stat.st_mtime_ns, stat.st_size)
+            base_dir, inside, control = os.path.dirname(path), None, False
+            for line in iter_logical_lines(f):
+                directive = _directive(line)
+                if control:
+                    control = directive != ".endc"
+                    continue
+                if directive == ".lib" and len(line.split()) == 2:
+                    inside = line.split()[1].lower()
+                    continue
+                if directive == ".endl":
+                    inside = None
+                    continue
+                if inside != section:
+                    continue
+                reference = include_reference(line, base_dir) if directive else None
+                if reference is not None:
+                    self.parse(*reference, depth + 1)
+                elif directive == ".control":
+                    control = True
+                elif directive == ".end":
+                    break
+                else:
+                    self.line(line, directive, path)
+
+    def line(self, line: str, directive: str, path: str) -> None:
+        if not directive:
+            name, nodes, ref, params = split_element(line)
+            (self.stack[-1][4] if self.stack else self.top).append((name, nodes, ref, params))
+        elif directive == ".subckt":
+            _, words, _, params = split_element("x " + line.split(None, 1)[1] + " _")
+            self.stack.append([words[0], path, words[1:], params, []])
+        elif directive == ".ends":
+            if not self.stack:
+                raise ValueError(f".ends without .subckt in {path}")
+            self.builder.subckt(*self.stack.pop())
+        elif directive == ".param":
+            params = split_element("x " + line.split(None, 1)[1] + " _")[3] if " " in line else []
+            (self.stack[-1][3] if self.stack else self.top_params).extend(params)
+        elif directive == ".model":
+            words = line.replace("(", " ").split()
+            if len(words) >= 3:
+                self.builder.columns["models"].extend((self.builder.intern(words[1]),
+                                                       self.builder.intern(words[2].lower())))
+
+    def finish(self) -> None:
+        if self.stack:
+            raise ValueError(f"subcircuit {self.stack[-1][0]!r} of {self.stack[-1][1]} has no .ends")
+        self.builder.subckt("", "", (), self.top_params, self.top)
+
+
+class SpiceIndex:
+    """
+    Subcircuits, instances, nets and parameters of SPICE files.
+
+    build() streams the files line by line, following .include and .lib
+    references, and keeps everything in a handful of integer arrays over one
+    interned string table. save() writes those arrays as they are, so load()
+    only reads them back and splits the string table; Subckt and Instance
+    objects are made when they are asked for. Lookups are case insensitive,
+    as in ngspice; the instances outside any .subckt are the subcircuit "".
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], strings: Optional[List[str]] = None, elapsed: float = 0.0):
+        self.arrays = arrays
+        self.strings = strings if strings is not None else bytes(arrays["strings"]).decode().split("\0")
+        self.elapsed = elapsed
+        names = arrays["sub_name"]
+        # A name defined twice resolves to its last definition, as later .subckt lines override
+        self._names = {self.strings[name].lower(): i for i, name in enumerate(names)}
+        self._cache: Dict[int, Subckt] = {}
+
+    @classmethod
+    def build(cls, paths: Union[str, Sequence[str]], max_depth: int = 16) -> "SpiceIndex":
+        """
+        Parse SPICE files (and what they include) into an index.
+
+        Every path is read as an included file, a first line is not taken as
+        a title; lines in .control blocks and unreferenced .lib sections are
+        skipped. Missing includes are listed in `missing`.
+        """
+        start = time.perf_counter()
+        builder = _Builder()
+        parser = _Parser(builder, max_depth)
+        for path in [paths] if isinstance(paths, (str, os.PathLike)) else paths:
+            parser.parse(os.path.abspath(path))
+        parser.finish()
+        arrays = builder.arrays()
+        arrays["inputs"] = np.array([builder.intern(os.path.abspath(p)) for p in
+                                     ([paths] if isinstance(paths, (str, os.PathLike)) else paths)], dtype=np.int32)
+        arrays["source_path"] = np.array([builder.intern(p) for p in parser.sources], dtype=np.int32)
+        arrays["source_key"] = np.array(list(parser.sources.values()), dtype=np.int64).reshape(-1, 2)
+        arrays["missing"] = np.array([builder.intern(p) for p in parser.missing], dtype=np.int32)
+        arrays["strings"] = np.frombuffer("\0".join(builder.strings).encode(), dtype=np.uint8)
+        arrays["version"] = np.array([FORMAT_VERSION], dtype=np.int32)
+        return cls(arrays, list(builder.strings), time.perf_counter() - start)
+
+    def save(self, path: str) -> None:
+        """Write the index arrays uncompressed (numpy .npz), replacing path atomically"""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez(f, **self.arrays)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SpiceIndex":
+        start = time.perf_counter()
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        if int(arrays.get("version", [0])[0]) != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a SpiceIndex of format version {FORMAT_VERSION}")
+        index = cls(arrays)
+        index.elapsed = time.perf_counter() - start
+        return index
+
+    @property
+    def inputs(self) -> List[str]:
+        """Files build() was given"""
+        return [self.strings[i] for i in self.arrays["inputs"]]
+
+    @property
+    def sources(self) -> Dict[str, Tuple[int, int]]:
+        """{path: (mtime_ns, size)} of every file read, includes too"""
+        return {self.strings[i]: tuple(int(v) for v in key)
+                for i, key in zip(self.arrays["source_path"], self.arrays["source_key"])}
+
+    @property
+    def missing(self) -> List[str]:
+        return [self.strings[i] for i in self.arrays["missing"]]
+
+    @property
+    def models(self) -> Dict[str, str]:
+        """{model name: type} of the .model lines"""
+        return {self.strings[name]: self.strings[kind] for name, kind in self.arrays["models"]}
+
+    def stale(self) -> bool:
+        """Whether a file read by build() changed or disappeared since"""
+        for path, key in self.sources.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            if (stat.st_mtime_ns, stat.st_size) != key:
+                return True
+        return any(os.path.exists(path) for path in self.missing)
+
+    @property
+    def names(self) -> List[str]:
+        """Subcircuit names in order of definition, without the top level"""
+        return [self.strings[name] for name in self.arrays["sub_name"] if name != 0]
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Subckt]:
+        for name in self.names:
+            yield self[name]
+
+    @property
+    def top(self) -> Subckt:
+        return self[""]
+
+    def __getitem__(self, name: str) -> Subckt:
+        i = self._names.get(name.lower())
+        if i is None:
+            raise ValueError(f"no subcircuit {name!r} in the index")
+        if i not in self._cache:
+            self._cache[i] = self._subckt(i)
+        return self._cache[i]
+
+    def _params(self, first: int, end: int, table: str = "params") -> Dict[str, str]:
+        s = self.strings
+        return {s[key]: s[value] for key, value in self.arrays[table][first:end].tolist()}
+
+    def _subckt(self, i: int) -> Subckt:
+        a, s = self.arrays, self.strings
+        names, refs = a["inst_name"].tolist(), a["inst_ref"].tolist()
+        node_ends, param_ends, nodes = a["inst_nodes"], a["inst_params"], a["nodes"]
+        instances = []
+        for k in range(int(a["sub_instances"][i]), int(a["sub_instances"][i + 1])):
+            instances.append(Instance(s[names[k]], tuple(s[n] for n in nodes[node_ends[k]:node_ends[k + 1]].tolist()),
+                                      None if refs[k] < 0 else s[refs[k]],
+                                      self._params(param_ends[k], param_ends[k + 1])))
+        ports = tuple(s[p] for p in a["ports"][a["sub_ports"][i]:a["sub_ports"][i + 1]].tolist())
+        return Subckt(s[a["sub_name"][i]], ports, instances, self._params(a["sub_params"][i], a["sub_params"][i + 1], "subckt_params"),
+                      s[a["sub_source"][i]])
+
+    def device_counts(self, name: str, flatten: bool = True) -> Counter:
+        """
+        {(element letter, model): count} of a subcircuit, weighted by m.
+
+        With flatten, subcircuit instances are replaced by the counts of
+        their definitions (multiplied by their m); instances of subcircuits
+        that are not in the index are counted as ("x", name) like devices,
+        which is how the PDK device subcircuits (ppolyf_u, cap_nmos_06v0)
+        appear.
+        """
+        counts: Dict[str, Counter] = {}
+
+        def count(subckt: Subckt, path: Tuple[str, ...]) -> Counter:
+            key = subckt.name.lower()
+            if key in counts:
+                return counts[key]
+            if key in path:
+                raise ValueError(f"subcircuit {subckt.name!r} instantiates itself")
+            total: Counter = Counter()
+            for instance in subckt.instances:
+                ref = instance.ref or ""
+                if flatten and instance.kind == "x" and ref in self:
+                    for device, n in count(self[ref], path + (key,)).items():
+                        total[device] += n * instance.multiplier
+                else:
+                    total[(instance.kind, ref.lower())] += instance.multiplier
+            counts[key] = total
+            return total
+
+        return count(self[name], ())
+
+    def __str__(self) -> str:
+        instances = len(self.arrays["inst_name"])
+        return (f"{len(self)} subcircuits, {instances} instances, {len(self.strings)} strings "
+                f"from {len(self.sources)} files in {self.elapsed * 1e3:.1f} ms")
+
+
+def load_index(paths: Union[str, Sequence[str]], cache_path: Optional[str] = None) -> SpiceIndex:
+    """
+    Index of SPICE files, read from cache_path while none of the files it
+    was built from changed, otherwise built again and saved there.
+    """
+    inputs = [os.path.abspath(p) for p in ([paths] if isinstance(paths, (str, os.PathLike)) else paths)]
+    if cache_path is not None and os.path.isfile(cache_path):
+        try:
+            index = SpiceIndex.load(cache_path)
+        except (ValueError, OSError, KeyError):
+            index = None
+        if index is not None and index.inputs == inputs and not index.stale():
+            return index
+    index = SpiceIndex.build(inputs)
+    if cache_path is not None:
+        index.save(cache_path)
+    return index
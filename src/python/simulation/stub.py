@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `ngspice -b deck.spice` in the tests. It simulates nothing: it
+reads the numeric .param values and the .temp of the deck (after
+alterparam), sleeps for stub_delay seconds, exits with an error when
+stub_fail is non zero, prints every parameter as "name = value" and writes
+them as an operating point plot to each file named by a write command in
+the .control block.
+"""
+
+import re
+import struct
+import sys
+import time
+
+STUB_VERSION = "1"
+
+_SUFFIXES = {"t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6, "m": 1e-3, "u": 1e-6, "n": 1e-9,
+             "p": 1e-12, "f": 1e-15}
+_NUMBER = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*$", re.IGNORECASE)
+
+
+def spice_number(text):
+    """Value of a SPICE number with an optional scale suffix, None for expressions"""
+    match = _NUMBER.match(text.strip().strip("'{}"))
+    if not match:
+        return None
+    return float(match.group(1)) * _SUFFIXES.get((match.group(2) or "").lower(), 1.0)
+
+
+def _assignments(text):
+    return re.findall(r"([A-Za-z_]\w*)\s*=\s*(\S+)", text)
+
+
+def read_deck(path):
+    """(params, rawfile names) of a deck, continuation lines joined"""
+    with open(path) as f:
+        lines = []
+        for line in f:
+            if line.startswith("+") and lines:
+                lines[-1] += " " + line[1:].strip()
+            else:
+                lines.append(line.strip())
+    params, writes, control = {}, [], False
+    for line in lines:
+        lowered = line.lower()
+        if lowered.startswith(".control"):
+            control = True
+        elif lowered.startswith(".endc"):
+            control = False
+        elif lowered.startswith(".temp") and len(line.split()) > 1:
+            params["temp"] = spice_number(line.split()[1])
+        elif lowered.startswith(".param"):
+            for name, value in _assignments(line[6:]):
+                params[name.lower()] = spice_number(value)
+        elif control and lowered.startswith("alterparam"):
+            words = line.split(None, 2)
+            # "alterparam subckt name=value" only alters subcircuit defaults
+            if len(words) == 2 or (len(words) == 3 and "=" in words[1]):
+                for name, value in _assignments(line[len("alterparam"):]):
+                    params[name.lower()] = spice_number(value)
+        elif control and lowered.startswith("write") and len(line.split()) > 1:
+            writes.append(line.split()[1])
+    return {name: value for name, value in params.items() if value is not None}, writes
+
+
+def write_plot(path, params, append):
+    """Append an ngspice style binary operating point plot of the params"""
+    names = sorted(params) or ["stub"]
+    values = [params.get(name, 0.0) for name in names]
+    header = ["Title: stub", "Date: " + time.ctime(), "Plotname: Operating Point", "Flags: real",
+              f"No. Variables: {len(names)}", "No. Points: 1", "Variables:"]
+    header += [f"\t{i}\t{name}\tvoltage" for i, name in enumerate(names)]
+    with open(path, "ab" if append else "wb") as f:
+        f.write(("\n".join(header) + "\nBinary:\n").encode())
+        f.write(struct.pack(f"<{len(values)}d", *values))
+
+
+def main(argv):
+    if "-v" in argv:
+        print(f"stub simulator {STUB_VERSION}")
+        return 0
+    args = [arg for arg in argv if arg != "-b"]
+    if len(args) != 1:
+        print("usage: stub.py [-b] deck.spice", file=sys.stderr)
+        return 2
+    params, writes = read_deck(args[0])
+    time.sleep(params.get("stub_delay", 0.0))
+    if params.get("stub_fail"):
+        print("Error: stub_fail is set")
+        return 1
+    print(f"stub simulation of {args[0]}")
+    for name, value in sorted(params.items()):
+        print(f"{name} = {value:.6e}")
+    written = set()
+    for path in writes:
+        write_plot(path, params, path in written)
+        written.add(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,24 @@
+###gm/Id sizing and the sizing to layout bridge.
+
+
+from .gilbert import GILBERT_AXES, GilbertExploration, GilbertTargets, explore_gilbert, pareto_front
+from .gmid import DEFAULT_LUT_DIR, GMID_OUTPUTS, LUT_FORMAT, SWEEP_AXES, GmIdLUT, convert_mat
+from .layout import WIDTH_KEYS, build_candidate, build_gilbert_candidates, snap_gilbert_sizes
+
+__all__ = [
+    'build_candidate',
+    'build_gilbert_candidates',
+    'convert_mat',
+    'DEFAULT_LUT_DIR',
+    'explore_gilbert',
+    'GILBERT_AXES',
+    'GilbertExploration',
+    'GilbertTargets',
+    'GMID_OUTPUTS',
+    'GmIdLUT',
+    'LUT_FORMAT',
+    'pareto_front',
+    'snap_gilbert_sizes',
+    'SWEEP_AXES',
+    'WIDTH_KEYS',
+]
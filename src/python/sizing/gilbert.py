@@ -0,0 +1,235 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .gmid import GmIdLUT
+
+BOLTZMANN = 1.380649e-23
+
+# Grid axes of explore_gilbert, in the order of the grid dimensions
+GILBERT_AXES = ("gm_id_rf", "gm_id_lo", "l", "i0", "rs", "r_load")
+
+
+@dataclass
+class GilbertTargets:
+    """
+    Operating conditions and specifications of sizing_Gilbert_cell.ipynb.
+
+    The noise model needs what the notebook leaves open: the RF source
+    resistance, the LO amplitude at the switch gates and the channel noise
+    factor gamma.
+    """
+    vdd: float = 3.3
+    f_rf: float = 89e6
+    f_lo: float = 100e6
+    nf_db: float = 9.0  # maximum
+    gain_db: float = 15.0  # minimum conversion gain, 20 log10(V_out / V_rf)
+    iip3_dbm: float = 8.0  # minimum
+    vds: float = 1.65  # V, bias of the VGS lookups, as in the notebook
+    source_ohms: float = 50.0
+    lo_amplitude: float = 0.5  # V, differential LO peak
+    gamma: float = 1.0
+    temperature: float = 300.0
+    tail_headroom: float = 0.2  # V the bias current sinks need
+    min_ft_ratio: float = 10.0  # fT of each pair over its signal frequency
+
+
+@dataclass
+class GilbertExploration:
+    """
+    Result of explore_gilbert: one value per grid point in each column,
+    flattened in C order over GILBERT_AXES.
+    """
+    axes: Dict[str, np.ndarray]
+    columns: Dict[str, np.ndarray]
+    feasible: np.ndarray
+    meets_spec: np.ndarray
+    pareto: np.ndarray  # indices of the feasible points no other feasible point beats on NF, gain and power
+    targets: GilbertTargets
+    elapsed: float = 0.0
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(self.axes[name]) for name in GILBERT_AXES)
+
+    def __len__(self) -> int:
+        return int(np.prod(self.shape))
+
+    def row(self, index: int) -> Dict[str, float]:
+        """Grid values and columns of one point"""
+        position = np.unravel_index(index, self.shape)
+        row = {name: float(self.axes[name][i]) for name, i in zip(GILBERT_AXES, position)}
+        row.update({name: float(values[index]) for name, values in self.columns.items()})
+        return row
+
+    def rows(self, indices: Optional[Sequence[int]] = None) -> List[Dict[str, float]]:
+        """Rows of some points, default the Pareto front by increasing power"""
+        indices = self.pareto if indices is None else indices
+        return [self.row(int(i)) for i in indices]
+
+    def __str__(self) -> str:
+        lines = [f"{len(self)} points, {int(self.feasible.sum())} feasible, {int(self.meets_spec.sum())} meet "
+                 f"the spec, {len(self.pareto)} on the NF/gain/power front in {self.elapsed:.2f} s",
+                 f"  {'gm/Id rf':>8} {'gm/Id lo':>8} {'L':>5} {'I0 uA':>6} {'RS':>7} {'RL':>7} {'W rf':>7} "
+                 f"{'W lo':>7} {'NF dB':>6} {'gain dB':>7} {'IIP3':>6} {'P mW':>6}"]
+        for row in self.rows(self.pareto[:20]):
+            lines.append(f"  {row['gm_id_rf']:8.3g} {row['gm_id_lo']:8.3g} {row['l']:5.3g} {row['i0'] * 1e6:6.3g} "
+                         f"{row['rs']:7.3g} {row['r_load']:7.3g} {row['width_rf']:7.3g} {row['width_lo']:7.3g} "
+                         f"{row['nf_db']:6.2f} {row['gain_db']:7.2f} {row['iip3_dbm']:6.2f} {row['power'] * 1e3:6.3f}")
+        if len(self.pareto) > 20:
+            lines.append(f"  ... {len(self.pareto) - 20} more")
+        return "\n".join(lines)
+
+
+def pareto_front(objectives: np.ndarray) -> np.ndarray:
+    """
+    Indices of the non-dominated rows of an (n, 2) or (n, 3) array, every column minimized.
+
+    Rows are taken in groups of equal first objective, in increasing order;
+    within a group the 2D front of the other two columns is kept when no
+    earlier front point is at least as good in both (a staircase lookup),
+    so grids where the first objective takes few values (power against the
+    bias current) cost a handful of sorts. One row is kept per distinct
+    objective vector.
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    if objectives.ndim != 2 or objectives.shape[1] not in (2, 3):
+        raise ValueError("pareto_front takes an (n, 2) or (n, 3) array")
+    if objectives.shape[1] == 2:
+        objectives = np.column_stack([np.zeros(len(objectives)), objectives])
+    order = np.lexsort((objectives[:, 2], objectives[:, 1], objectives[:, 0]))
+    first = objectives[order, 0]
+    bounds = np.flatnonzero(np.diff(first)) + 1
+    stair_a, stair_b = np.empty(0), np.empty(0)
+    front = []
+    for group in np.split(order, bounds):
+        a, b = objectives[group, 1], objectives[group, 2]
+        # 2D front of the group: sorted by a then b, keep strictly falling b
+        best = np.minimum.accumulate(np.concatenate([[np.inf], b[:-1]]))
+        keep = b < best
+        group, a, b = group[keep], a[keep], b[keep]
+        if len(stair_a):
+            at = np.searchsorted(stair_a, a, side="right") - 1
+            dominated = (at >= 0) & (stair_b[np.maximum(at, 0)] <= b)
+            group, a, b = group[~dominated], a[~dominated], b[~dominated]
+        if not len(group):
+            continue
+        front.append(group)
+        merged_a, merged_b = np.concatenate([stair_a, a]), np.concatenate([stair_b, b])
+        by_a = np.lexsort((merged_b, merged_a))
+        merged_a, merged_b = merged_a[by_a], merged_b[by_a]
+        keep = merged_b < np.minimum.accumulate(np.concatenate([[np.inf], merged_b[:-1]]))
+        stair_a, stair_b = merged_a[keep], merged_b[keep]
+    return np.concatenate(front) if front else np.empty(0, dtype=np.intp)
+
+
+def explore_gilbert(
+    nfet: GmIdLUT,
+    gm_id_rf: Sequence[float] = (12.0,),
+    gm_id_lo: Sequence[float] = (15.0,),
+    l: Sequence[float] = (0.28,),
+    i0: Sequence[float] = (50e-6,),
+    rs: Sequence[float] = (1e3, 10e3, 100e3),
+    r_load: Sequence[float] = (10e3,),
+    targets: Optional[GilbertTargets] = None,
+) -> GilbertExploration:
+    """
+    Evaluate a grid of Gilbert cell sizings in one vectorized pass.
+
+    Follows sizing_Gilbert_cell.ipynb: each RF device carries I0 and each
+    LO device I0/2 (the notebook sizes the LO devices for I0 although it
+    takes gm_lo at I0/2; here both use I0/2), widths are I/(ID/W) in um,
+    fT = gm / (2 pi Cgg), VGS at the notebook's VDS, and IIP3 is the
+    notebook's 2 I0/3 sqrt(gm (RS + 2/gm)^3) in dBm. With RS the
+    degeneration between the RF sources the RF pair transconductance is
+    Gm = 2 / (RS + 2/gm) and the conversion gain (2/pi) Gm R_load. The noise
+    figure assumes hard switching: white noise ahead of the switches
+    (source, RS, RF devices) folds unchanged, switch noise is
+    16 kT gamma I0 / (pi A_LO) per pair (Darabi and Abidi) and each load
+    adds 4kT/R_load, all against the source noise at the RF sideband.
+
+    Table lookups only depend on gm/Id and L, so they run on that small
+    grid and broadcast over the bias current, RS and load axes.
+
+    Args:
+        nfet: gm/Id table of the mixer device (nfet_03v3)
+        gm_id_rf, gm_id_lo: gm/Id of the RF and LO pairs, 1/V
+        l: Channel lengths shared by both pairs, um
+        i0: Current of each RF device, A
+        rs: Degeneration between the RF sources, ohm
+        r_load: Load resistance at each output, ohm
+        targets: Operating conditions and specification
+
+    Returns:
+        GilbertExploration: columns width_rf/width_lo (um), vgs_rf/vgs_lo,
+        ft_rf/ft_lo (Hz), gain_db, iip3_dbm, nf_db, power (W), headroom (V)
+    """
+    start = time.perf_counter()
+    targets = targets or GilbertTargets()
+    axes = {name: np.atleast_1d(np.asarray(values, dtype=np.float64)) for name, values in
+            zip(GILBERT_AXES, (gm_id_rf, gm_id_lo, l, i0, rs, r_load))}
+    shape = tuple(len(axes[name]) for name in GILBERT_AXES)
+
+    def along(name: str) -> np.ndarray:
+        """Axis values shaped to broadcast over the grid"""
+        view = [1] * len(GILBERT_AXES)
+        view[GILBERT_AXES.index(name)] = -1
+        return axes[name].reshape(view)
+
+    def device(gm_id: np.ndarray) -> Dict[str, np.ndarray]:
+        lengths = along("l")
+        return {
+            "jd": nfet.lookup("ID_W", GM_ID=gm_id, L=lengths, VDS=targets.vds, VSB=0.0),
+            "cgg_w": nfet.lookup("CGG_W", GM_ID=gm_id, L=lengths, VDS=targets.vds, VSB=0.0),
+            "vgs": nfet.look_upVGS(GM_ID=gm_id, L=lengths, VDS=targets.vds, VSB=0.0),
+        }
+
+    gm_id_rf_, gm_id_lo_, i0_, rs_, r_load_ = (along(name) for name in ("gm_id_rf", "gm_id_lo", "i0", "rs",
+                                                                          "r_load"))
+    rf, lo = device(gm_id_rf_), device(gm_id_lo_)
+    kt = BOLTZMANN * targets.temperature
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gm_rf = gm_id_rf_ * i0_
+        width_rf = i0_ / rf["jd"]
+        width_lo = (i0_ / 2) / lo["jd"]
+        ft_rf = gm_id_rf_ * rf["jd"] / (2 * np.pi * rf["cgg_w"])
+        ft_lo = gm_id_lo_ * lo["jd"] / (2 * np.pi * lo["cgg_w"])
+        degenerated = rs_ + 2 / gm_rf
+        gm_pair = 2 / degenerated
+        gain = 2 / np.pi * gm_pair * r_load_
+        iip3_w = 2 * i0_ / 3 * np.sqrt(gm_rf * degenerated ** 3)
+        front_end = gm_pair ** 2 * 4 * kt * (targets.source_ohms + 2 * targets.gamma / gm_rf + rs_)
+        switches = 2 * 16 * kt * targets.gamma * i0_ / (np.pi * targets.lo_amplitude)
+        loads = 2 * 4 * kt / r_load_
+        source = (2 / np.pi) ** 2 * gm_pair ** 2 * 4 * kt * targets.source_ohms
+        noise_factor = (front_end + switches + loads) / source
+        # Output common mode less the RF and LO saturation voltages (about 2/(gm/Id)) and the tail
+        headroom = (targets.vdd - i0_ * r_load_ - targets.tail_headroom - i0_ * rs_ / 2
+                    - 2 / gm_id_rf_ - 2 / gm_id_lo_)
+
+    def flat(values) -> np.ndarray:
+        return np.ascontiguousarray(np.broadcast_to(values, shape)).reshape(-1)
+
+    columns = {
+        "width_rf": flat(width_rf), "width_lo": flat(width_lo),
+        "vgs_rf": flat(rf["vgs"]), "vgs_lo": flat(lo["vgs"]),
+        "ft_rf": flat(ft_rf), "ft_lo": flat(ft_lo),
+        "gain_db": flat(20 * np.log10(gain)),
+        "iip3_dbm": flat(10 * np.log10(iip3_w / 1e-3)),
+        "nf_db": flat(10 * np.log10(noise_factor)),
+        "power": flat(2 * i0_ * targets.vdd),
+        "headroom": flat(headroom),
+    }
+    feasible = ((columns["headroom"] >= 0)
+                & (columns["ft_rf"] >= targets.min_ft_ratio * targets.f_rf)
+                & (columns["ft_lo"] >= targets.min_ft_ratio * targets.f_lo)
+                & np.all(np.isfinite(np.column_stack([columns[name] for name in columns])), axis=1))
+    meets_spec = (feasible & (columns["nf_db"] <= targets.nf_db) & (columns["gain_db"] >= targets.gain_db)
+                  & (columns["iip3_dbm"] >= targets.iip3_dbm))
+    candidates = np.flatnonzero(feasible)
+    objectives = np.column_stack([columns["power"][candidates], columns["nf_db"][candidates],
+                                  -columns["gain_db"][candidates]])
+    pareto = candidates[pareto_front(objectives)]
+    return GilbertExploration(axes, columns, feasible, meets_spec, pareto, targets, time.perf_counter() - start)
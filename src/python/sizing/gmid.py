@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_LUT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "glayout_gmid")
+# Bumped whenever the layout of a converted table changes
+LUT_FORMAT = 1
+# Outputs tabulated against gm/Id when a table is converted
+GMID_OUTPUTS = ("ID_W", "CGG_W", "VGS", "GM_GDS")
+# Sweep variables of a pygmid/techsweep table, in the order of the data axes
+SWEEP_AXES = ("L", "VGS", "VDS", "VSB")
+
+
+def _load_mat(path: str) -> Tuple[Dict[str, np.ndarray], Dict[str, object]]:
+    """Arrays and scalars of the one struct a pygmid .mat file holds"""
+    from scipy.io import loadmat
+
+    data = loadmat(path, squeeze_me=True, struct_as_record=False)
+    structs = [value for key, value in data.items() if not key.startswith("__")]
+    if len(structs) != 1 or not hasattr(structs[0], "_fieldnames"):
+        raise ValueError(f"{path} does not hold a single pygmid table struct")
+    arrays, scalars = {}, {}
+    for name in structs[0]._fieldnames:
+        value = getattr(structs[0], name)
+        if isinstance(value, np.ndarray) and value.dtype.kind in "fiu" and value.size > 1:
+            arrays[name.upper()] = np.asarray(value, dtype=np.float64)
+        elif isinstance(value, np.ndarray) and value.dtype.kind in "fiu":
+            scalars[name.upper()] = float(value)
+        elif isinstance(value, (int, float, str)):
+            scalars[name.upper()] = value
+    for axis in SWEEP_AXES:
+        if axis not in arrays and axis in scalars:
+            arrays[axis] = np.array([scalars.pop(axis)], dtype=np.float64)
+        if axis not in arrays:
+            raise ValueError(f"{path} has no {axis} sweep")
+    shape = tuple(len(arrays[axis]) for axis in SWEEP_AXES)
+    fields = {name: value.reshape(shape) for name, value in arrays.items()
+              if name not in SWEEP_AXES and value.size == np.prod(shape)}
+    if "ID" not in fields or "GM" not in fields:
+        raise ValueError(f"{path} has no ID and GM tables of shape {shape}")
+    return {**{axis: arrays[axis] for axis in SWEEP_AXES}, **fields}, scalars
+
+
+def _ratio(tables: Dict[str, np.ndarray], scalars: Dict[str, object], name: str) -> np.ndarray:
+    """A field ("GM"), a ratio of fields or of a field and W ("ID_W", "GM_GDS"), or the VGS sweep"""
+    if name in tables and name not in SWEEP_AXES:
+        return tables[name]
+    if name == "VGS":
+        return np.broadcast_to(tables["VGS"][None, :, None, None], tables["ID"].shape)
+    top, _, bottom = name.partition("_")
+    if top not in tables or not (bottom in tables or bottom == "W"):
+        raise ValueError(f"unknown table output {name!r}")
+    denominator = float(scalars.get("W", 1.0)) if bottom == "W" else tables[bottom]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return tables[top] / denominator
+
+
+def _gm_id_columns(gm_id: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Resample outputs from VGS to a gm/Id grid, one (L, VDS, VSB) column at a time.
+
+    gm/Id peaks in weak inversion and falls with VGS above it; like pygmid
+    only that falling branch is used, so every gm/Id has one VGS. Points
+    outside a column's gm/Id range are NaN.
+    """
+    from scipy.interpolate import PchipInterpolator
+
+    out = np.full(values.shape[:-1] + (len(grid),), np.nan, dtype=np.float32)
+    for column in np.ndindex(gm_id.shape[:-1]):
+        x = gm_id[column]
+        valid = np.isfinite(x) & np.all(np.isfinite(values[(slice(None),) + column]), axis=0)
+        if valid.sum() < 2:
+            continue
+        start = int(np.nanargmax(np.where(valid, x, -np.inf)))
+        x, y = x[start:], values[(slice(None),) + column][:, start:]
+        keep = valid[start:] & (x < np.minimum.accumulate(np.concatenate([[np.inf], x[:-1]])))
+        keep[0] = valid[start]
+        x, y = x[keep][::-1], y[:, keep][:, ::-1]
+        if len(x) < 2:
+            continue
+        inside = (grid >= x[0]) & (grid <= x[-1])
+        out[(slice(None),) + column + (inside,)] = PchipInterpolator(x, y, axis=1)(grid[inside])
+    return out
+
+
+def convert_mat(mat_path: str, directory: str, outputs: Sequence[str] = GMID_OUTPUTS, points: int = 256) -> str:
+    """
+    Convert a pygmid .mat table into a directory of .npy arrays.
+
+    The sweeps and the raw 4D tables (L, VGS, VDS, VSB) are kept as they
+    are; every output is also resampled once against a uniform gm/Id grid
+    of `points` values, which is what the gm/Id lookups interpolate in.
+
+    Returns:
+        str: the directory
+    """
+    tables, scalars = _load_mat(mat_path)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gm_id = tables["GM"] / tables["ID"]
+    finite = gm_id[np.isfinite(gm_id) & (gm_id > 0)]
+    if finite.size == 0:
+        raise ValueError(f"{mat_path} has no positive gm/Id")
+    grid = np.linspace(max(float(finite.min()), 1e-3), float(finite.max()), points)
+    # Axis order of the resampled tables: output, L, VDS, VSB, gm/Id
+    columns = np.moveaxis(gm_id, 1, -1)
+    values = np.stack([np.moveaxis(np.asarray(_ratio(tables, scalars, name), dtype=np.float64), 1, -1)
+                       for name in outputs])
+
+    stat = os.stat(mat_path)
+    temporary = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for name, table in tables.items():
+        np.save(os.path.join(temporary, f"{name}.npy"), table)
+    np.save(os.path.join(temporary, "gm_id_grid.npy"), grid)
+    np.save(os.path.join(temporary, "gm_id_tables.npy"), _gm_id_columns(columns, values, grid))
+    meta = {"format": LUT_FORMAT, "source": os.path.abspath(mat_path), "key": [stat.st_mtime_ns, stat.st_size],
+            "fields": [name for name in tables if name not in SWEEP_AXES], "outputs": list(outputs),
+            "scalars": {k: v for k, v in scalars.items() if isinstance(v, (int, float, str))}}
+    with open(os.path.join(temporary, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+    return directory
+
+
+def _axis(grid: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lower grid index, weight of the upper point and in-range mask of values on a sorted grid"""
+    if len(grid) == 1:
+        inside = np.isclose(values, grid[0])
+        return np.zeros(values.shape, dtype=np.intp), np.zeros(values.shape), inside
+    index = np.clip(np.searchsorted(grid, values, side="right") - 1, 0, len(grid) - 2)
+    weight = (values - grid[index]) / (grid[index + 1] - grid[index])
+    inside = (values >= grid[0] - 1e-12 * abs(grid[0])) & (values <= grid[-1] + 1e-12 * abs(grid[-1]))
+    return index, np.clip(weight, 0.0, 1.0), inside
+
+
+def _interpolate(table: np.ndarray, axes: List[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> np.ndarray:
+    """Multilinear interpolation of table (first len(axes) dimensions) at flat points"""
+    result = 0.0
+    for corner in np.ndindex(*(2,) * len(axes)):
+        weight, index = 1.0, []
+        for bit, (lower, upper_weight, _) in zip(corner, axes):
+            weight = weight * (upper_weight if bit else 1.0 - upper_weight)
+            index.append(np.minimum(lower + bit, table.shape[len(index)] - 1))
+        values = table[tuple(index)]
+        # A NaN neighbour only matters where it carries weight
+        result = result + np.where(weight > 0, values * weight, 0.0)
+    inside = np.logical_and.reduce([axis[2] for axis in axes])
+    return np.where(inside, result, np.nan)
+
+
+class GmIdLUT:
+    """
+    gm/Id lookup table of one device, memory-mapped from a converted pygmid table.
+
+    lookup() and look_upVGS() take the keywords of pygmid.Lookup (GM_ID, L,
+    VDS, VSB, VGS) with scalars or NumPy arrays that broadcast together, and
+    answer every point in one vectorized pass: the gm/Id outputs interpolate
+    the tables resampled at conversion, the rest the raw tables. Defaults are
+    pygmid's: shortest L, half the largest VDS, VSB = 0. The arrays are
+    opened read-only with mmap, so processes using the same table share
+    the pages, and a pickled GmIdLUT reopens its directory instead of
+    copying the arrays.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != LUT_FORMAT:
+            raise ValueError(f"{directory} is not a gm/Id table of format {LUT_FORMAT}")
+        self.scalars: Dict[str, object] = self.meta["scalars"]
+        self.outputs: List[str] = self.meta["outputs"]
+        self._tables: Dict[str, np.ndarray] = {}
+        self._ratios: Dict[str, np.ndarray] = {}
+        self.gm_id_grid = self._load("gm_id_grid")
+        self.gm_id_tables = self._load("gm_id_tables")
+        self.L, self.VGS, self.VDS, self.VSB = (np.asarray(self._load(axis)) for axis in SWEEP_AXES)
+
+    def _load(self, name: str) -> np.ndarray:
+        if name not in self._tables:
+            self._tables[name] = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+        return self._tables[name]
+
+    @classmethod
+    def open(cls, path: str, cache_dir: str = DEFAULT_LUT_DIR, outputs: Sequence[str] = GMID_OUTPUTS,
+             points: int = 256) -> "GmIdLUT":
+        """
+        Table of a pygmid .mat file (converted into cache_dir the first time,
+        and again when the file changes) or of an already converted directory.
+        """
+        if os.path.isdir(path):
+            return cls(path)
+        source = os.path.abspath(path)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        directory = os.path.join(cache_dir, f"{stem}-{hashlib.sha1(source.encode()).hexdigest()[:10]}")
+        stat = os.stat(source)
+        try:
+            table = cls(directory)
+            if (table.meta["key"] == [stat.st_mtime_ns, stat.st_size]
+                    and set(outputs) <= set(table.outputs) and len(table.gm_id_grid) == points):
+                return table
+        except (OSError, ValueError, KeyError):
+            pass
+        os.makedirs(cache_dir, exist_ok=True)
+        return cls(convert_mat(source, directory, outputs, points))
+
+    def __getstate__(self) -> Dict[str, str]:
+        return {"directory": self.directory}
+
+    def __setstate__(self, state: Dict[str, str]) -> None:
+        self.__init__(state["directory"])
+
+    @property
+    def W(self) -> float:
+        return float(self.scalars.get("W", 1.0))
+
+    def _bias(self, L, VDS, VSB) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        L = self.L.min() if L is None else L
+        VDS = self.VDS.max() / 2 if VDS is None else VDS
+        VSB = 0.0 if VSB is None else VSB
+        return L, VDS, VSB
+
+    def lookup(self, out: str, GM_ID=None, L=None, VDS=None, VSB=None, VGS=None) -> np.ndarray:
+        """
+        Batched pygmid lookup.
+
+        With GM_ID, `out` is one of the outputs tabulated against gm/Id
+        (default ID_W, CGG_W, VGS, GM_GDS); with VGS (default the whole VGS
+        sweep when neither is given) any field or ratio of fields such as
+        "GM_ID", "ID_W" or "GM_CGG" is interpolated from the raw tables.
+        Points outside the tables are NaN.
+        """
+        out = out.upper()
+        L, VDS, VSB = self._bias(L, VDS, VSB)
+        if GM_ID is not None:
+            if VGS is not None:
+                raise ValueError("lookup takes GM_ID or VGS, not both")
+            if out not in self.outputs:
+                raise ValueError(f"{out} is not tabulated against gm/Id (have {', '.join(self.outputs)})")
+            arrays = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (L, VDS, VSB, GM_ID)))
+            shape = arrays[0].shape
+            axes = [_axis(grid, values.ravel()) for grid, values in
+                    zip((self.L, self.VDS, self.VSB, self.gm_id_grid), arrays)]
+            table = self.gm_id_tables[self.outputs.index(out)]
+            return _interpolate(table, axes).reshape(shape)
+        VGS = self.VGS if VGS is None else VGS
+        arrays = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (L, VGS, VDS, VSB)))
+        shape = arrays[0].shape
+        axes = [_axis(grid, values.ravel()) for grid, values in
+                zip((self.L, self.VGS, self.VDS, self.VSB), arrays)]
+        if out not in self._ratios:
+            tables = {name: self._load(name) for name in self.meta["fields"]}
+            tables["VGS"] = self.VGS
+            self._ratios[out] = _ratio(tables, self.scalars, out)
+        return _interpolate(self._ratios[out], axes).reshape(shape)
+
+    def look_upVGS(self, GM_ID, L=None, VDS=None, VSB=None) -> np.ndarray:
+        """VGS that gives GM_ID at the bias, as pygmid.Lookup.look_upVGS"""
+        return self.lookup("VGS", GM_ID=GM_ID, L=L, VDS=VDS, VSB=VSB)
+
+    def __str__(self) -> str:
+        return (f"gm/Id table {os.path.basename(self.directory)}: W={self.W:g} um, L {self.L.min():g}-"
+                f"{self.L.max():g} um ({len(self.L)}), VGS {len(self.VGS)}, VDS {len(self.VDS)}, "
+                f"VSB {len(self.VSB)}, gm/Id {self.gm_id_grid[0]:.3g}-{self.gm_id_grid[-1]:.3g} "
+                f"({len(self.gm_id_grid)}) for {', '.join(self.outputs)}")
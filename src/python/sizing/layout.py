@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from parasitics.pex_lite import estimate_parasitics
+from sweep.failure_memo import canonical_params, resolve_generator
+from sweep.footprint import _load_builder_configs, _rules_for
+from sweep.legality import _snap, check_gilbert_mixer
+from sweep.cell_cache import bounded_cell_cache
+from sweep.runner import GENERATORS, PINNED_CELL_PREFIXES, _config, _init_worker
+
+# Keys of a candidate row: total device widths in um as explore_gilbert names them
+WIDTH_KEYS = {"lo": "width_lo", "rf": "width_rf"}
+
+
+def _lo_sizes(width: np.ndarray, fingers: np.ndarray, max_finger_width: float):
+    # LO finger array: lo_width is the device width, lo_width / lo_fingers per finger, and
+    # _validate_inputs wants lo_width % lo_fingers == 0, so the finger width is whole um
+    per_finger = np.clip(np.rint(width[:, None] / fingers), 1, np.floor(max_finger_width))
+    return per_finger * fingers, fingers * per_finger
+
+
+def _rf_sizes(width: np.ndarray, fingers: np.ndarray, max_finger_width: float):
+    # nmos: rf_width is the width of each finger, the device is rf_width * rf_fingers wide,
+    # and rf_width % rf_fingers == 0 again
+    most = np.floor(max_finger_width / fingers)
+    step = np.clip(np.rint(width[:, None] / fingers ** 2), 1, np.maximum(most, 1))
+    total = np.where(most >= 1, step * fingers ** 2, np.inf)
+    return total, fingers * step
+
+
+def snap_gilbert_sizes(
+    pdk,
+    candidates: Sequence[Mapping],
+    max_fingers: int = 8,
+    max_finger_width: float = 10.0,
+    lo_fet_config: Optional[Dict] = None,
+    rf_fet_config: Optional[Dict] = None,
+) -> List[Dict]:
+    """
+    Turn sized devices into legal GilbertMixerInterdigited parameters.
+
+    For each pair the finger count from 1 to max_fingers whose legal width
+    comes closest to the sized width is chosen (fewest fingers on ties):
+    LO fingers are whole um wide and RF fingers a whole multiple of the RF
+    finger count, as the builder's width % fingers check requires, and no
+    finger is wider than max_finger_width. Lengths are snapped to the 2x
+    grid. Every snapped row is then checked with check_gilbert_mixer.
+
+    Args:
+        pdk: MappedPDK the layouts will be built with
+        candidates: Rows with the total device widths width_lo and width_rf in
+            um and the length l (or lo_length / rf_length), e.g.
+            GilbertExploration.rows()
+        max_fingers: Largest finger count tried for each pair
+        max_finger_width: Widest finger, um
+        lo_fet_config, rf_fet_config: LOFETConfig / RFFETConfig fields as dicts
+
+    Returns:
+        list: copies of the rows with "layout" (the builder parameters),
+        "lo_width_error" / "rf_width_error" (relative error of the snapped
+        device width), "legal" and "illegal" (names of the failed checks)
+    """
+    if max_fingers < 1 or max_finger_width < 1:
+        raise ValueError("max_fingers and max_finger_width must be at least 1")
+    rows = [dict(row) for row in candidates]
+    if not rows:
+        return rows
+    module = _load_builder_configs("Gilbert_mixer_intedigited", "Gilbert_mixer_interdigited")
+    lo_config = _config(module.LOFETConfig, lo_fet_config) or module.LOFETConfig()
+    rf_config = _config(module.RFFETConfig, rf_fet_config) or module.RFFETConfig()
+    rules = _rules_for(pdk)
+
+    fingers = np.arange(1, max_fingers + 1, dtype=float)
+    sizes = {}
+    for pair, sizer in (("lo", _lo_sizes), ("rf", _rf_sizes)):
+        width = np.array([float(row[WIDTH_KEYS[pair]]) for row in rows])
+        if not np.all(width > 0):
+            raise ValueError(f"{WIDTH_KEYS[pair]} must be positive")
+        total, parameter = sizer(width, fingers, max_finger_width)
+        error = np.abs(total - width[:, None]) / width[:, None]
+        best = np.argmin(error, axis=1)
+        picked = np.arange(len(rows))
+        sizes[pair] = (parameter[picked, best], fingers[best], error[picked, best])
+    lengths = {pair: _snap(rules, np.array([float(row.get(f"{pair}_length", row.get("l", 0.0))) for row in rows]))
+               for pair in ("lo", "rf")}
+
+    report = check_gilbert_mixer(pdk, sizes["lo"][0], sizes["lo"][1], sizes["rf"][0], sizes["rf"][1],
+                                 lengths["lo"], lengths["rf"], lo_config, rf_config)
+    for i, row in enumerate(rows):
+        row["layout"] = {"lo_width": float(sizes["lo"][0][i]), "lo_fingers": int(sizes["lo"][1][i]),
+                         "rf_width": float(sizes["rf"][0][i]), "rf_fingers": int(sizes["rf"][1][i]),
+                         "lo_length": float(lengths["lo"][i]), "rf_length": float(lengths["rf"][i])}
+        for config, values in (("lo_fet_config", lo_fet_config), ("rf_fet_config", rf_fet_config)):
+            if values:
+                row["layout"][config] = dict(values)
+        row["lo_width_error"] = float(sizes["lo"][2][i])
+        row["rf_width_error"] = float(sizes["rf"][2][i])
+        row["legal"] = bool(report.legal[i])
+        row["illegal"] = report.explain(i)
+    return rows
+
+
+def _layout_key(params: Dict) -> str:
+    return hashlib.sha1(canonical_params(params).encode()).hexdigest()[:16]
+
+
+def build_candidate(pdk_name: str, params: Dict, output_dir: Optional[str] = None,
+                    parasitics: bool = True) -> Dict:
+    """
+    Build one mixer layout and measure it, runs in the worker processes.
+
+    With an output_dir the GDS file and the measurements of a successful build
+    are written to output_dir/<hash of params>/ and read back by later calls
+    instead of building again, so an interrupted batch resumes. Failed builds
+    are not stored and are tried again.
+
+    Returns:
+        dict: status ("done" or "failed"), area, layout_width, layout_height,
+        build_time, pins {label: [x, y]}, parasitics {net: {"capacitance": fF,
+        "resistance": ohm}}, gds_path, error
+    """
+    result_path = None
+    if output_dir:
+        point_dir = os.path.join(output_dir, _layout_key(params))
+        result_path = os.path.join(point_dir, "result.json")
+        if os.path.isfile(result_path):
+            with open(result_path) as f:
+                return json.load(f)
+    try:
+        pdk = getattr(importlib.import_module("glayout"), pdk_name)
+        start = time.perf_counter()
+        component = resolve_generator(GENERATORS["gilbert_mixer"])(pdk, **params)
+        build_time = time.perf_counter() - start
+        (xmin, ymin), (xmax, ymax) = component.bbox
+        pins = {}
+        for label in component.labels:
+            pins.setdefault(label.text, [float(label.origin[0]), float(label.origin[1])])
+        result = {"status": "done", "area": float((xmax - xmin) * (ymax - ymin)),
+                  "layout_width": float(xmax - xmin), "layout_height": float(ymax - ymin),
+                  "build_time": build_time, "pins": pins, "parasitics": None, "gds_path": None, "error": None}
+        if parasitics:
+            report = estimate_parasitics(component, pdk)
+            result["parasitics"] = {net.name: {"capacitance": net.capacitance, "resistance": net.resistance}
+                                    for net in report.nets.values()}
+        if output_dir:
+            os.makedirs(point_dir, exist_ok=True)
+            result["gds_path"] = os.path.join(point_dir, f"{component.name}.gds")
+            component.write_gds(result["gds_path"])
+    except Exception as e:
+        result = {"status": "failed", "error": f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=-3)}"}
+    if result_path and result["status"] == "done":
+        with open(result_path + ".tmp", "w") as f:
+            json.dump(result, f)
+        os.replace(result_path + ".tmp", result_path)
+    return result
+
+
+def build_gilbert_candidates(
+    candidates: Sequence[Mapping],
+    pdk: str = "gf180",
+    output_dir: Optional[str] = None,
+    processes: Optional[int] = None,
+    parasitics: bool = True,
+    max_fingers: int = 8,
+    max_finger_width: float = 10.0,
+    lo_fet_config: Optional[Dict] = None,
+    rf_fet_config: Optional[Dict] = None,
+    cell_cache_entries: Optional[int] = 2048,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> List[Dict]:
+    """
+    Snap sized Gilbert cell candidates to legal layouts and build them in parallel.
+
+    Candidates that snap to the same parameters are built once. Illegal ones
+    are not built. Workers keep gdsfactory's @cell cache bounded like
+    run_sweep, so the via stacks and tap rings shared by the candidates are
+    built once per worker; a serial build bounds this process's cache while
+    it runs. Failed builds are recorded in their rows, not
+    raised.
+
+    Args:
+        candidates: Sized rows, see snap_gilbert_sizes
+        pdk: glayout PDK attribute name
+        output_dir: Directory for the GDS files and the per layout results
+            (None: no artifacts, no resuming)
+        processes: Worker processes (default os.cpu_count(), 1: build in this process)
+        parasitics: Attach estimate_parasitics() of every net
+        max_fingers, max_finger_width, lo_fet_config, rf_fet_config: See snap_gilbert_sizes
+        cell_cache_entries: @cell cache budget of each worker, or of this process
+            when building serially (None: gdsfactory's unbounded dict)
+        progress: Called with each layout result as it arrives
+
+    Returns:
+        list: the rows of snap_gilbert_sizes with the layout_status ("done",
+        "failed" or "illegal"), layout_error and the build_candidate results added
+    """
+    rows = snap_gilbert_sizes(getattr(importlib.import_module("glayout"), pdk), candidates, max_fingers,
+                              max_finger_width, lo_fet_config, rf_fet_config)
+    todo = {}
+    for row in rows:
+        if row["legal"]:
+            todo.setdefault(_layout_key(row["layout"]), row["layout"])
+    results = {}
+
+    def store_result(key: str, result: Dict) -> None:
+        results[key] = result
+        if progress is not None:
+            progress(result)
+
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(todo)), initializer=_init_worker,
+                                 initargs=(cell_cache_entries,)) as pool:
+            futures = {pool.submit(build_candidate, pdk, params, output_dir, parasitics): key
+                       for key, params in todo.items()}
+            for future in as_completed(futures):
+                store_result(futures[future], future.result())
+    else:
+        cache = (contextlib.nullcontext() if cell_cache_entries is None else
+                 bounded_cell_cache(max_entries=cell_cache_entries, pinned_prefixes=PINNED_CELL_PREFIXES))
+        with cache:
+            for key, params in todo.items():
+                store_result(key, build_candidate(pdk, params, output_dir, parasitics))
+
+    for row in rows:
+        if not row["legal"]:
+            row["layout_status"] = "illegal"
+            continue
+        result = dict(results[_layout_key(row["layout"])])
+        row["layout_status"] = result.pop("status")
+        row["layout_error"] = result.pop("error")
+        row.update(result)
+    return rows
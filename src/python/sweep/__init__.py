@@ -0,0 +1,47 @@
+###Parameter sweep infrastructure.
+
+
+from .cell_cache import (BoundedCellCache, CacheStats, bounded_cell_cache, estimate_component_bytes,
+                         get_cell_cache, install_cell_cache, uninstall_cell_cache)
+from .failure_memo import (DETERMINISTIC_ERRORS, FailureMemo, FailureRecord, KnownFailure, canonical_params,
+                           resolve_generator, source_hash)
+from .footprint import Footprint, estimate_cmirror_footprint, estimate_gilbert_footprint
+from .rmult import RmultChoice, RouteTarget, optimize_cmirror_rmult, optimize_gilbert_rmult
+from .runner import PointResult, SweepProgress, SweepStore, expand_grid, run_sweep
+from .legality import (Illegal, LegalityReport, check_cmirror, check_diff_pair, check_gilbert_mixer,
+                       check_nmos)
+
+__all__ = [
+    'BoundedCellCache',
+    'bounded_cell_cache',
+    'CacheStats',
+    'canonical_params',
+    'check_cmirror',
+    'check_diff_pair',
+    'check_gilbert_mixer',
+    'check_nmos',
+    'DETERMINISTIC_ERRORS',
+    'estimate_cmirror_footprint',
+    'estimate_component_bytes',
+    'estimate_gilbert_footprint',
+    'expand_grid',
+    'FailureMemo',
+    'FailureRecord',
+    'Footprint',
+    'get_cell_cache',
+    'Illegal',
+    'install_cell_cache',
+    'KnownFailure',
+    'LegalityReport',
+    'optimize_cmirror_rmult',
+    'optimize_gilbert_rmult',
+    'PointResult',
+    'resolve_generator',
+    'RmultChoice',
+    'RouteTarget',
+    'run_sweep',
+    'source_hash',
+    'SweepProgress',
+    'SweepStore',
+    'uninstall_cell_cache',
+]
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+import importlib
+import os
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, Optional
+
+# Rough per-object sizes (bytes) of the Python objects a cached Component owns
+COMPONENT_OVERHEAD = 6000  # Component, gdstk.Cell, pydantic Settings
+POLYGON_OVERHEAD = 150
+POINT_BYTES = 16
+PORT_BYTES = 1100
+REFERENCE_OVERHEAD = 1500
+LABEL_BYTES = 250
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _gdsfactory_cell_module():
+    # gdsfactory re-exports the decorator as gdsfactory.cell, which shadows the
+    # module attribute, so fetch the module itself
+    return importlib.import_module("gdsfactory.cell")
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def estimate_component_bytes(component) -> int:
+    """
+    Estimated memory held by one Component, children excluded.
+
+    Child cells are separate cache entries, only the local port copies each
+    reference keeps of its child are counted here.
+    """
+    polygons = component.polygons
+    size = COMPONENT_OVERHEAD + len(polygons) * POLYGON_OVERHEAD
+    size += POINT_BYTES * sum(polygon.size for polygon in polygons)
+    size += PORT_BYTES * len(component.ports) + LABEL_BYTES * len(component.labels)
+    for reference in component.references:
+        size += REFERENCE_OVERHEAD + PORT_BYTES * len(reference.parent.ports)
+    return size
+
+
+@dataclass
+class CacheStats:
+    """Counters of a BoundedCellCache, see BoundedCellCache.stats()"""
+    entries: int
+    pinned: int
+    hits: int
+    misses: int
+    inserts: int
+    rebuilds: int  # inserts of names already cached, i.e. work a cache lookup would have saved
+    evictions: int
+    estimated_bytes: int
+    attributed_rss_bytes: int
+    process_rss_bytes: Optional[int]
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        stats = asdict(self)
+        stats["hit_rate"] = self.hit_rate
+        return stats
+
+    def __str__(self) -> str:
+        rss = f"{self.process_rss_bytes / 2**20:.1f} MB" if self.process_rss_bytes is not None else "n/a"
+        return (f"cell cache: {self.entries} entries ({self.pinned} pinned), "
+                f"~{self.estimated_bytes / 2**20:.1f} MB estimated, "
+                f"{self.attributed_rss_bytes / 2**20:.1f} MB RSS attributed (process {rss}); "
+                f"hits {self.hits}, misses {self.misses}, hit rate {self.hit_rate:.1%}, "
+                f"inserts {self.inserts}, rebuilds {self.rebuilds}, evictions {self.evictions}")
+
+
+class BoundedCellCache(MutableMapping):
+    """
+    Drop-in replacement for gdsfactory.cell.CACHE with an LRU budget.
+
+    gdsfactory stores every @cell result in CACHE, even when the PDK disables
+    cache lookups (as gf180 does), so long sweeps grow it without bound. This
+    mapping keeps at most max_entries components and/or max_bytes of estimated
+    memory, evicting the least recently used ones. Cells whose name starts with
+    a pinned prefix (shared primitives such as via_array or tapring) are never
+    evicted.
+
+    Evicting only drops the cache's reference: components still placed in a
+    live layout stay valid.
+
+    The RSS attributed to an entry is the growth of the process RSS since the
+    previous insert, i.e. what building it cost. This is an approximation:
+    nested @cell calls insert children first, and memory freed later is not
+    subtracted.
+    """
+
+    def __init__(self, max_entries: Optional[int] = 2048, max_bytes: Optional[int] = None,
+                 pinned_prefixes: Iterable[str] = (), track_rss: bool = True):
+        if max_entries is not None and max_entries < 0:
+            raise ValueError("max_entries must be non-negative")
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes must be non-negative")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.track_rss = track_rss
+        self._lru: "OrderedDict[str, object]" = OrderedDict()
+        self._pinned: Dict[str, object] = {}
+        self._pinned_prefixes = tuple(pinned_prefixes)
+        self._bytes: Dict[str, int] = {}
+        self._rss: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._total_rss = 0
+        self._last_rss = current_rss_bytes() if track_rss else None
+        self.hits = self.misses = self.inserts = self.rebuilds = self.evictions = 0
+
+    # Mapping protocol, as used by gdsfactory.cell
+    def __contains__(self, name) -> bool:
+        found = name in self._lru or name in self._pinned
+        if not found:
+            self.misses += 1
+        return found
+
+    def __getitem__(self, name: str):
+        if name in self._pinned:
+            self.hits += 1
+            return self._pinned[name]
+        component = self._lru[name]  # KeyError propagates like a dict
+        self._lru.move_to_end(name)
+        self.hits += 1
+        return component
+
+    def __setitem__(self, name: str, component) -> None:
+        if name in self._lru or name in self._pinned:
+            self.rebuilds += 1
+            self._forget(name)
+        self.inserts += 1
+        size = estimate_component_bytes(component)
+        self._bytes[name] = size
+        self._total_bytes += size
+        if self.track_rss:
+            rss = current_rss_bytes()
+            if rss is not None and self._last_rss is not None:
+                self._rss[name] = max(rss - self._last_rss, 0)
+                self._total_rss += self._rss[name]
+            self._last_rss = rss
+        if self._is_pinned(name):
+            self._pinned[name] = component
+        else:
+            self._lru[name] = component
+        self._evict()
+
+    def __delitem__(self, name: str) -> None:
+        if name not in self._lru and name not in self._pinned:
+            raise KeyError(name)
+        self._forget(name)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._pinned)
+        yield from list(self._lru)
+
+    def __len__(self) -> int:
+        return len(self._lru) + len(self._pinned)
+
+    def values(self):
+        # gdsfactory scans all values on every @cell call, this must not count as hits
+        return list(self._pinned.values()) + list(self._lru.values())
+
+    def items(self):
+        return list(self._pinned.items()) + list(self._lru.items())
+
+    def clear(self) -> None:
+        """Drop every entry, pinned ones included. Counters are kept."""
+        self._lru.clear()
+        self._pinned.clear()
+        self._bytes.clear()
+        self._rss.clear()
+        self._total_bytes = self._total_rss = 0
+
+    # Budget management
+    def pin(self, *prefixes: str) -> None:
+        """Never evict cells whose name starts with one of prefixes (e.g. "via_array")."""
+        self._pinned_prefixes += tuple(prefixes)
+        for name in [name for name in self._lru if self._is_pinned(name)]:
+            self._pinned[name] = self._lru.pop(name)
+
+    def unpin(self, *prefixes: str) -> None:
+        self._pinned_prefixes = tuple(p for p in self._pinned_prefixes if p not in prefixes)
+        for name in [name for name in self._pinned if not self._is_pinned(name)]:
+            self._lru[name] = self._pinned.pop(name)
+        self._evict()
+
+    def resize(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _is_pinned(self, name: str) -> bool:
+        return bool(self._pinned_prefixes) and name.startswith(self._pinned_prefixes)
+
+    def _forget(self, name: str) -> None:
+        self._lru.pop(name, None)
+        self._pinned.pop(name, None)
+        self._total_bytes -= self._bytes.pop(name, 0)
+        self._total_rss -= self._rss.pop(name, 0)
+
+    def _over_budget(self) -> bool:
+        return ((self.max_entries is not None and len(self) > self.max_entries)
+                or (self.max_bytes is not None and self._total_bytes > self.max_bytes))
+
+    def _evict(self) -> None:
+        # Pinned entries count towards the budget but only LRU entries can go
+        while self._lru and self._over_budget():
+            name = next(iter(self._lru))
+            self._forget(name)
+            self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        return CacheStats(entries=len(self), pinned=len(self._pinned), hits=self.hits, misses=self.misses,
+                          inserts=self.inserts, rebuilds=self.rebuilds, evictions=self.evictions,
+                          estimated_bytes=self._total_bytes, attributed_rss_bytes=self._total_rss,
+                          process_rss_bytes=current_rss_bytes())
+
+
+def install_cell_cache(max_entries: Optional[int] = 2048, max_bytes: Optional[int] = None,
+                       pinned_prefixes: Iterable[str] = (), track_rss: bool = True) -> BoundedCellCache:
+    """
+    Replace gdsfactory.cell.CACHE with a BoundedCellCache.
+
+    Entries already cached are carried over (and evicted if over budget).
+    gdsfactory.cell.clear_cache(), which also runs the first time a PDK is
+    activated, is wrapped so it empties the bounded cache instead of
+    replacing it with a plain dict.
+
+    Args:
+        max_entries: Maximum number of cached components (None: unbounded)
+        max_bytes: Maximum estimated memory of the cached components (None: unbounded)
+        pinned_prefixes: Cell name prefixes that are never evicted
+        track_rss: Attribute process RSS growth to cache entries
+
+    Returns:
+        BoundedCellCache: The installed cache
+    """
+    module = _gdsfactory_cell_module()
+    uninstall_cell_cache()
+    cache = BoundedCellCache(max_entries, max_bytes, pinned_prefixes, track_rss)
+    for name, component in list(module.CACHE.items()):
+        cache[name] = component
+    cache.inserts = cache.rebuilds = cache.evictions = 0
+    original_clear_cache = module.clear_cache
+
+    def clear_cache() -> None:
+        original_clear_cache()  # also resets gdsfactory's name counters
+        cache.clear()
+        module.CACHE = cache
+
+    clear_cache.original = original_clear_cache
+    module.clear_cache = clear_cache
+    module.CACHE = cache
+    return cache
+
+
+def get_cell_cache() -> Optional[BoundedCellCache]:
+    """The installed BoundedCellCache, None if gdsfactory uses its plain dict."""
+    cache = _gdsfactory_cell_module().CACHE
+    return cache if isinstance(cache, BoundedCellCache) else None
+
+
+def uninstall_cell_cache() -> None:
+    """Put a plain dict holding the current entries and the original clear_cache back in place."""
+    module = _gdsfactory_cell_module()
+    module.clear_cache = getattr(module.clear_cache, "original", module.clear_cache)
+    if isinstance(module.CACHE, BoundedCellCache):
+        module.CACHE = dict(module.CACHE.items())
+
+
+@contextmanager
+def bounded_cell_cache(**kwargs):
+    """Context manager form of install_cell_cache, the previous CACHE is restored on exit."""
+    module = _gdsfactory_cell_module()
+    previous_cache, previous_clear = module.CACHE, module.clear_cache
+    cache = install_cell_cache(**kwargs)
+    try:
+        yield cache
+    finally:
+        module.CACHE, module.clear_cache = previous_cache, previous_clear
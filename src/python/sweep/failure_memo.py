@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+import argparse
+import dataclasses
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+DEFAULT_MEMO_PATH = os.path.join(os.path.expanduser("~"), ".cache", "glayout_sweep", "failures.sqlite")
+
+# Exceptions a generator raises the same way on every call with the same parameters, glayout
+# raises all of them on bad geometry (an index past a port list, None sizes, zero pitches). Others
+# (MemoryError, OSError, a killed worker) are transient and must not be skipped next run
+DETERMINISTIC_ERRORS: Tuple[Type[BaseException], ...] = (ValueError, AssertionError, KeyError, IndexError,
+                                                         TypeError, ZeroDivisionError)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failures (
+    generator TEXT NOT NULL,
+    params TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    exception TEXT NOT NULL,
+    message TEXT NOT NULL,
+    recorded REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (generator, params, source_hash)
+)
+"""
+
+
+def generator_name(generator: Callable) -> str:
+    """Importable "module:qualname" of a generator function or class"""
+    return f"{generator.__module__}:{generator.__qualname__}"
+
+
+def resolve_generator(name: str) -> Callable:
+    """The function or class a "module:qualname" name refers to, the inverse of generator_name"""
+    module, _, qualname = name.partition(":")
+    obj = importlib.import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _glayout_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("glayout")
+    except Exception:
+        return "unknown"
+
+
+def source_hash(generator: Callable) -> str:
+    """
+    Hash of the file defining generator and the installed glayout version.
+
+    The whole module file is hashed rather than the function alone, generators
+    fail in the helpers they call; upgrading glayout changes the version even
+    where the file itself is unchanged. Wrappers around a builder defined
+    elsewhere list its files in a sources attribute, which are hashed too.
+    """
+    digest = hashlib.sha256(_glayout_version().encode())
+    try:
+        with open(inspect.getsourcefile(generator), "rb") as f:
+            digest.update(f.read())
+    except (TypeError, OSError):
+        digest.update(generator_name(generator).encode())
+    for path in getattr(generator, "sources", ()):
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(path.encode())
+    return digest.hexdigest()[:16]
+
+
+def _canonical(value):
+    if hasattr(value, "name") and hasattr(value, "gds_write_settings"):
+        return f"pdk:{value.name}"  # MappedPDK
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {type(value).__name__: dataclasses.asdict(value)}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if hasattr(value, "tolist"):  # numpy scalars and arrays
+        return value.tolist()
+    return repr(value)
+
+
+def canonical_params(params: Dict) -> str:
+    """Stable JSON key of a parameter dict: sorted keys, PDKs by name, configs as dicts"""
+    return json.dumps(params, sort_keys=True, default=_canonical, separators=(",", ":"))
+
+
+@dataclass
+class FailureRecord:
+    """A memoized generator failure"""
+    generator: str
+    params: str
+    source_hash: str
+    exception: str
+    message: str
+    recorded: float
+    hits: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.generator} {self.params}: {self.exception}: {self.message}"
+
+
+class KnownFailure(Exception):
+    """Raised by FailureMemo.call for parameters that already failed with the current source"""
+
+    def __init__(self, record: FailureRecord):
+        super().__init__(f"known failure, {record.exception}: {record.message}")
+        self.record = record
+
+
+class FailureMemo:
+    """
+    Persistent record of generator calls that raised, so sweeps skip them next run.
+
+    Entries are keyed by generator name, canonical parameters and source_hash,
+    so editing the generator or upgrading glayout makes old entries
+    unreachable; prune() (or `python -m sweep.failure_memo prune`) deletes them.
+    call() only records the exception types in errors, default
+    DETERMINISTIC_ERRORS.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 errors: Tuple[Type[BaseException], ...] = DETERMINISTIC_ERRORS):
+        self.path = path or os.environ.get("GLAYOUT_FAILURE_MEMO", DEFAULT_MEMO_PATH)
+        self.errors = tuple(errors)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._hashes: Dict[str, str] = {}
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __getstate__(self) -> Dict:
+        # Worker processes open their own connection to the same file
+        if self.path == ":memory:":
+            raise ValueError("an in-memory FailureMemo cannot be shared with other processes")
+        return {"path": self.path, "errors": self.errors}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state["path"], state["errors"])
+
+    def __enter__(self) -> "FailureMemo":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _key(self, generator: Callable, params: Dict):
+        name = generator_name(generator)
+        if name not in self._hashes:
+            self._hashes[name] = source_hash(generator)
+        return name, canonical_params(params), self._hashes[name]
+
+    def lookup(self, generator: Callable, params: Dict) -> Optional[FailureRecord]:
+        """The recorded failure of generator(**params), None if it is not known to fail"""
+        key = self._key(generator, params)
+        row = self._db.execute("SELECT * FROM failures WHERE generator=? AND params=? AND source_hash=?",
+                               key).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE failures SET hits=hits+1 WHERE generator=? AND params=? AND source_hash=?", key)
+        self._db.commit()
+        return FailureRecord(*row[:6], hits=row[6] + 1)
+
+    def record(self, generator: Callable, params: Dict, error: BaseException) -> FailureRecord:
+        """Store the exception generator(**params) raised"""
+        record = FailureRecord(*self._key(generator, params), type(error).__name__, str(error), time.time())
+        self._db.execute("INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         dataclasses.astuple(record))
+        self._db.commit()
+        return record
+
+    def call(self, generator: Callable, **params):
+        """
+        generator(**params), recording the exceptions of the memo's error types it raises.
+
+        Other exceptions propagate without being recorded.
+
+        Raises:
+            KnownFailure: params already failed with the current source, generator is not called
+        """
+        record = self.lookup(generator, params)
+        if record is not None:
+            raise KnownFailure(record)
+        try:
+            return generator(**params)
+        except self.errors as e:
+            self.record(generator, params, e)
+            raise
+
+    def failures(self, generator: Optional[str] = None) -> List[FailureRecord]:
+        query, args = "SELECT * FROM failures", ()
+        if generator:
+            query, args = query + " WHERE generator LIKE ?", (f"%{generator}%",)
+        return [FailureRecord(*row) for row in self._db.execute(query + " ORDER BY generator, recorded", args)]
+
+    def clear(self, generator: Optional[str] = None) -> int:
+        """Delete all entries (of generators whose name contains generator), returns the count"""
+        if generator:
+            cursor = self._db.execute("DELETE FROM failures WHERE generator LIKE ?", (f"%{generator}%",))
+        else:
+            cursor = self._db.execute("DELETE FROM failures")
+        self._db.commit()
+        return cursor.rowcount
+
+    def prune(self) -> int:
+        """Delete entries recorded against a different source hash than the current one"""
+        removed = 0
+        for (name,) in self._db.execute("SELECT DISTINCT generator FROM failures").fetchall():
+            try:
+                current = source_hash(resolve_generator(name))
+            except Exception:
+                current = None  # generator no longer importable
+            cursor = self._db.execute("DELETE FROM failures WHERE generator=? AND source_hash IS NOT ?",
+                                      (name, current))
+            removed += cursor.rowcount
+        self._db.commit()
+        return removed
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the sweep failure memo")
+    parser.add_argument("command", choices=["list", "prune", "clear"],
+                        help="list entries, prune entries of changed sources (e.g. after a glayout upgrade), "
+                             "or clear entries")
+    parser.add_argument("--db", default=None, help=f"memo file (default $GLAYOUT_FAILURE_MEMO or {DEFAULT_MEMO_PATH})")
+    parser.add_argument("--generator", default=None, help="only entries whose generator name contains this")
+    args = parser.parse_args(argv)
+
+    with FailureMemo(args.db) as memo:
+        if args.command == "list":
+            records = memo.failures(args.generator)
+            for record in records:
+                print(f"{record} (skipped {record.hits}x)")
+            print(f"{len(records)} known failures in {memo.path}")
+        elif args.command == "prune":
+            print(f"Removed {memo.prune()} stale entries from {memo.path}")
+        else:
+            print(f"Removed {memo.clear(args.generator)} entries from {memo.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
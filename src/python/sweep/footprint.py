@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from dataclasses import dataclass, field
+from math import ceil, floor
+from typing import Dict, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]  # (xmin, ymin, xmax, ymax)
+
+
+@dataclass
+class Footprint:
+    """Predicted outline of a generated cell, in the coordinates build() produces"""
+    bbox: BBox
+    pins: Dict[str, Tuple[float, float]]  # label text -> label position (escape via centers)
+    taprings: Dict[str, Tuple[float, float]]  # block -> outer (width, height) of its tapring
+    blocks: Dict[str, BBox] = field(default_factory=dict)  # sub-block outlines, e.g. "lo", "rf"
+
+    @property
+    def width(self) -> float:
+        return self.bbox[2] - self.bbox[0]
+
+    @property
+    def height(self) -> float:
+        return self.bbox[3] - self.bbox[1]
+
+    @property
+    def area(self) -> float:
+        return self.width * self.height
+
+
+def _merge(a: Optional[BBox], b: Optional[BBox]) -> Optional[BBox]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _box(cx: float, cy: float, w: float, h: float) -> BBox:
+    return (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+
+
+def _pad(b: BBox, d: float) -> BBox:
+    return (b[0] - d, b[1] - d, b[2] + d, b[3] + d)
+
+
+def _level(glayer: str) -> int:
+    return int(glayer[-1]) if "met" in glayer else 0
+
+
+class _Rules:
+    """
+    Sizes of the glayout primitives, computed from the PDK grules.
+
+    Mirrors via_gen.via_stack/via_array, guardring.tapring and the finger
+    macros, so a footprint is arithmetic on cached numbers.
+    """
+
+    def __init__(self, pdk):
+        self.pdk = pdk
+        self._cache = {}
+        self._grid = 2 * pdk.grid_size or 0.001
+        self.max_metal_separation = pdk.util_max_metal_seperation()
+
+    def rule(self, *glayers) -> dict:
+        key = ("rule",) + glayers
+        if key not in self._cache:
+            self._cache[key] = self.pdk.get_grule(*glayers)
+        return self._cache[key]
+
+    def capmet_layers(self) -> Tuple[str, str]:
+        """(metal below, metal above) capmet, as mimcap builds it"""
+        if "capmet" not in self._cache:
+            self._cache["capmet"] = tuple(self.pdk.layer_to_glayer(self.rule("capmet")[key])
+                                          for key in ("capmetbottom", "capmettop"))
+        return self._cache["capmet"]
+
+    def snap(self, value: float) -> float:
+        # MappedPDK.snap_to_2xgrid without its Decimal round trip. It rounds away
+        # from zero, so float noise must not reach it
+        steps = round(value / self._grid, 4)
+        steps = ceil(steps) if steps >= 0 else -ceil(-steps)
+        return round(steps * self._grid, 6)
+
+    def _layer_dim(self, glayer: str, mode: str) -> float:
+        # via_gen.__get_layer_dim
+        is_lvl0 = any(hint in glayer for hint in ("poly", "active"))
+        dim = 0
+        if mode in ("both", "below") and not is_lvl0:
+            via_below = "mcon" if glayer == "met1" else "via" + str(int(glayer[-1]) - 1)
+            dim = self.rule(via_below)["width"] + 2 * self.rule(via_below, glayer)["min_enclosure"]
+        if mode in ("both", "above"):
+            via_above = "mcon" if is_lvl0 else "via" + glayer[-1]
+            dim = max(dim, self.rule(via_above)["width"] + 2 * self.rule(via_above, glayer)["min_enclosure"])
+        return max(dim, self.rule(glayer)["min_width"])
+
+    def stack(self, glayer1: str, glayer2: str):
+        """((level1, level2), (glayer1, glayer2), layer dims, stack dim) of via_stack(glayer1, glayer2)"""
+        key = ("stack", glayer1, glayer2)
+        if key not in self._cache:
+            level1, level2 = _level(glayer1), _level(glayer2)
+            if level1 > level2:
+                level1, level2, glayer1, glayer2 = level2, level1, glayer2, glayer1
+            dims = {}
+            sizes = [0.0]
+            if level1 != level2:
+                for level in range(level1, level2 + 1):
+                    layer = glayer1 if level == 0 else "met" + str(level)
+                    mode = "below" if level == level2 else ("above" if level == level1 else "both")
+                    dims[layer] = self._layer_dim(layer, mode)
+                    sizes.append(dims[layer])
+                    if level != level2:
+                        sizes.append(self.rule("mcon" if level == 0 else "via" + str(level))["width"])
+            self._cache[key] = ((level1, level2), (glayer1, glayer2), dims, max(sizes))
+        return self._cache[key]
+
+    def stack_dim(self, glayer1: str, glayer2: str) -> float:
+        return self.stack(glayer1, glayer2)[3]
+
+    def array_pitch(self, glayer1: str, glayer2: str) -> Tuple[float, float]:
+        """(via pitch, 2 * top enclosure) of via_array, see via_gen.__get_viastack_minseperation"""
+        key = ("pitch", glayer1, glayer2)
+        if key not in self._cache:
+            (level1, level2), (_, top), dims, _ = self.stack(glayer1, glayer2)
+            spacing = [] if level1 else [self.rule("mcon")["min_separation"] + self.rule("mcon")["width"]]
+            top_enclosure = 0
+            for level in range(level1 or 1, level2):
+                met, via = "met" + str(level), "via" + str(level)
+                spacing.append(self.rule(met)["min_separation"] + dims[met])
+                spacing.append(self.rule(via)["min_separation"] + self.rule(via)["width"])
+                if level == level2 - 1:
+                    top_enclosure = self.rule(top, via)["min_enclosure"]
+            self._cache[key] = (self.snap(max(spacing)), self.snap(2 * self.snap(top_enclosure)))
+        return self._cache[key]
+
+    def array_count(self, glayer1: str, glayer2: str, size: float, minus1: bool = False) -> int:
+        pitch, top_enclosure = self.array_pitch(glayer1, glayer2)
+        num = floor((self.snap(size) - top_enclosure) / pitch) or 1
+        num = 1 if num < 1 else num
+        return ((num - 1) or 1) if minus1 else num
+
+    def array_extent(self, glayer1: str, glayer2: str, num: int) -> float:
+        return (num - 1) * self.array_pitch(glayer1, glayer2)[0] + self.stack_dim(glayer1, glayer2)
+
+    def array_size(self, glayer1: str, glayer2: str, size: Tuple[Optional[float], Optional[float]],
+                   minus1: bool = False, num_vias: Tuple[Optional[int], Optional[int]] = (None, None)) -> Tuple[float, float]:
+        """Top metal (width, height) of via_array(glayer1, glayer2, size, minus1, num_vias)"""
+        if _level(glayer1) == _level(glayer2):
+            return (0.0, 0.0)
+        dims = []
+        for dim, num in zip(size, num_vias):
+            num = num or self.array_count(glayer1, glayer2, dim, minus1)
+            extent = self.array_extent(glayer1, glayer2, num)
+            dims.append(max(extent, dim) if dim else extent)
+        return tuple(dims)
+
+    def array_bottom(self, glayer1: str, glayer2: str, num: Tuple[int, int]) -> Tuple[float, float]:
+        """Extent of the bottom layer of a via array (lay_bottom without fullbottom)"""
+        (_, _), (bottom, _), dims, _ = self.stack(glayer1, glayer2)
+        pitch = self.array_pitch(glayer1, glayer2)[0]
+        return tuple((n - 1) * pitch + dims[bottom] for n in num)
+
+    def tapring(self, enclosed: Tuple[float, float], sdlayer: str, horizontal_glayer: str, vertical_glayer: str):
+        """Outer (width, height) of guardring.tapring and the x of its tie_W_bottom_lay_W port"""
+        enclosed = [self.snap(dim) for dim in enclosed]
+        tap_width = max(self.rule("active_tap")["min_width"],
+                        2 * self.rule("active_tap", "mcon")["min_enclosure"] + self.rule("mcon")["width"])
+        outer = tap_width + self.rule("active_tap", sdlayer)["min_enclosure"]
+        if sdlayer == "n+s/d":
+            outer = max(outer, tap_width + self.rule("nwell", "active_tap")["min_enclosure"])
+        size = (enclosed[0] + 2 * outer, enclosed[1] + 2 * outer)
+        # west edge of the active_tap laid under the vertical via array
+        vertical_width = self.stack_dim("active_tap", vertical_glayer)
+        num_x = self.array_count("active_tap", vertical_glayer, vertical_width, minus1=True)
+        bottom_x = self.array_bottom("active_tap", vertical_glayer, (num_x, 1))[0]
+        tie_w = -0.5 * (enclosed[0] + tap_width) - bottom_x / 2
+        return size, tie_w
+
+
+_RULES: Dict[str, _Rules] = {}
+
+
+def _rules_for(pdk) -> _Rules:
+    if pdk.name not in _RULES:
+        _RULES[pdk.name] = _Rules(pdk)
+    return _RULES[pdk.name]
+
+
+@dataclass
+class _FingerArray:
+    """Geometry of a centered finger array (_create_finger_array / fet.__gen_fingers_macro)"""
+    pitch: float  # gate pitch, poly_spacing + length
+    columns: int
+    finger_width: float
+    poly_height: float
+    sd_width: float  # x size of the s/d via column (top metal of its via array)
+    sd_array_width: float  # x size of the active_diff->met1 array alone, the leftsd_ ports
+    col0_offset: float  # x offset of the first via column inside an s/d via array
+    half_width: float  # of the plus doped layer, the widest layer
+    half_height: float
+
+
+def _finger_array(r: _Rules, finger_width: float, length: float, columns: int, interfinger_rmult: int,
+                  inter_finger_topmet: str, sdlayer: str, dummy_gates: bool = False) -> _FingerArray:
+    finger_width = r.snap(finger_width)
+    length = r.snap(length)
+    poly_height = r.snap(finger_width + 2 * r.rule("poly", "active_diff")["overhang"])
+    sd_viaxdim = interfinger_rmult * r.stack_dim("active_diff", "met1")
+    poly_spacing = max(sd_viaxdim, 2 * r.rule("poly", "mcon")["min_separation"] + r.rule("mcon")["width"])
+    met1_minsep = r.rule("met1")["min_separation"]
+    poly_spacing += met1_minsep if length < met1_minsep else 0
+    pitch = poly_spacing + length
+    sd_array = r.array_size("active_diff", "met1", (sd_viaxdim, finger_width), minus1=True)
+    correction = r.array_size("met1", inter_finger_topmet, (None, finger_width), num_vias=(1, None))
+    sd_width = max(sd_array[0], correction[0])
+    columns_x = r.array_count("active_diff", "met1", sd_viaxdim, minus1=True)
+    col0_offset = -(columns_x - 1) * r.array_pitch("active_diff", "met1")[0] / 2
+    half_x = (columns * pitch + sd_width) / 2
+    if dummy_gates:
+        half_x = max(half_x, (columns + 1) * pitch / 2 + length / 2)
+    diff_x = 2 * r.rule("mcon", "active_diff")["min_enclosure"] + 2 * half_x
+    overhang = r.rule(sdlayer, "active_diff")["min_enclosure"]
+    half_height = max(poly_height, sd_array[1], correction[1], finger_width + 2 * overhang) / 2
+    return _FingerArray(pitch, columns, finger_width, poly_height, sd_width, sd_array[0], col0_offset,
+                        diff_x / 2 + overhang, half_height)
+
+
+def _tap_separation(r: _Rules, metals: float) -> float:
+    return max(metals, r.rule("active_diff", "active_tap")["min_separation"]) + r.rule("p+s/d", "active_tap")["min_enclosure"]
+
+
+def _nmos(r: _Rules, width: float, fingers: int, length: Optional[float], with_tie: bool, with_dummy, with_dnwell: bool,
+          with_substrate_tap: bool, sd_route_topmet: str, gate_route_topmet: str, sd_rmult: int, gate_rmult: int,
+          interfinger_rmult: int, tie_layers: Tuple[str, str]) -> dict:
+    """glayout nmos with a single multiplier, centered like fet.nmos"""
+    min_length = r.rule("poly")["min_width"]
+    length = r.snap(min_length if (length or min_length) <= min_length else length)
+    min_width = max(min_length, r.rule("active_diff")["min_width"])
+    width = r.snap(min_width if (width or min_width) <= min_width else width)
+    fa = _finger_array(r, width, length, fingers, interfinger_rmult, "met2", "n+s/d")
+    # s/d vias over every s/d column, drains on the odd ones
+    sdvia = r.stack_dim("met1", sd_route_topmet)
+    track = sd_rmult * sdvia
+    minsep = r.rule(sd_route_topmet)["min_separation"]
+    extension = 0  # nmos() does not expose sd_route_extension
+    source_y = width / 2 + sdvia / 2 + minsep + track / 2 + extension
+    drain_y = width / 2 + sdvia / 2 + 2 * minsep + 1.5 * track + extension
+    track_x = fingers * fa.pitch + sdvia
+    top = max(fa.half_height, drain_y + max(track, sdvia) / 2)
+    # gate track below the fingers
+    gate_top = r.snap(-fa.poly_height / 2 - r.max_metal_separation)
+    gate_w = (fingers - 1) * fa.pitch + length
+    gate_size = r.array_size("poly", gate_route_topmet, (gate_w, None), num_vias=(None, gate_rmult))
+    # Extent the builders read off the gate_E/W/S ports. Those names collapse onto
+    # individual vias of the gate array unless it is a single via column.
+    gate_port_w = gate_size[0] if r.array_count("poly", gate_route_topmet, gate_w) == 1 else r.stack_dim("poly", gate_route_topmet)
+    gate_port = (gate_rmult - 1) * r.array_pitch("poly", gate_route_topmet)[0] + gate_port_w
+    bottom = gate_top - gate_size[1]
+    half_x = max(fa.half_width, track_x / 2, gate_size[0] / 2)
+    if isinstance(with_dummy, bool):
+        with_dummy = (with_dummy, with_dummy)
+    if any(with_dummy):
+        dummy = _finger_array(r, width, length, 1, interfinger_rmult, "met1", "n+s/d")
+        half_x += r.rule("n+s/d")["min_separation"] + 2 * dummy.half_width
+        bottom = min(bottom, -fa.poly_height / 2 - r.stack_dim("poly", "met1"))
+    # __mult_array_macro recenters the multiplier on its bbox
+    dy = -(top + bottom) / 2
+    half_y = (top - bottom) / 2
+    bbox = (-half_x, -half_y, half_x, half_y)
+    result = dict(source_y=source_y + dy, drain_y=drain_y + dy, track=track, track_x=track_x,
+                  gate_bottom=gate_top - gate_size[1] + dy, gate_port=gate_port, tapring=None, tie_w=None)
+    if with_tie:
+        tap_separation = _tap_separation(r, r.max_metal_separation)
+        ring, tie_w = r.tapring((2 * (tap_separation + half_x), 2 * (tap_separation + half_y)),
+                                "p+s/d", tie_layers[0], tie_layers[1])
+        bbox = _merge(bbox, _box(0, 0, *ring))
+        result.update(tapring=ring, tie_w=tie_w)
+    bbox = _pad(bbox, r.rule("pwell", "active_tap")["min_enclosure"])
+    if with_dnwell:
+        bbox = _pad(bbox, r.rule("pwell", "dnwell")["min_enclosure"])
+    if with_substrate_tap:
+        separation = r.rule("dnwell", "active_tap")["min_separation"]
+        ring, _ = r.tapring((2 * (separation + bbox[2]), 2 * (separation + bbox[3])), "p+s/d", "met2", "met1")
+        bbox = _merge(bbox, _box(0, 0, *ring))
+    result["bbox"] = bbox
+    return result
+
+
+def _load_builder_configs(package: str, module: str):
+    # Same import style the builders use for diff_pair
+    path = os.path.join(os.path.dirname(__file__), "..", package)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return __import__(module)
+
+
+def estimate_gilbert_footprint(
+    pdk,
+    lo_width: float,
+    lo_fingers: int,
+    rf_width: float,
+    rf_fingers: int,
+    lo_length: Optional[float] = None,
+    rf_length: Optional[float] = None,
+    lo_fet_config=None,
+    rf_fet_config=None,
+) -> Footprint:
+    """
+    Predict the footprint of GilbertMixerInterdigited(...).build() without building it.
+
+    Takes the same arguments as GilbertMixerInterdigited and replays its
+    placement arithmetic: the interdigited LO finger array, its s/d and gate
+    tracks, both taprings, the RF pair of glayout nmos and the escape vias
+    moved outside the taprings.
+
+    Returns:
+        Footprint: bbox, pin label positions and tapring sizes
+    """
+    if lo_fet_config is None or rf_fet_config is None:
+        module = _load_builder_configs("Gilbert_mixer_intedigited", "Gilbert_mixer_interdigited")
+        lo_fet_config = lo_fet_config or module.LOFETConfig()
+        rf_fet_config = rf_fet_config or module.RFFETConfig()
+    lo, rf = lo_fet_config, rf_fet_config
+    if not lo.routing:
+        raise ValueError("the LO escape vias need lo_fet_config.routing")
+    if not rf.with_tie:
+        raise ValueError("the RF escape vias need rf_fet_config.with_tie")
+    r = _rules_for(pdk)
+    min_length = r.rule("poly")["min_width"]
+    lo_length = lo_length if lo_length is not None else min_length
+    rf_length = rf_length if rf_length is not None else min_length
+
+    # LO pairs: 4 interdigited FETs
+    fa = _finger_array(r, lo_width / lo_fingers, lo_length, 4 * lo_fingers, lo.interfinger_rmult,
+                       lo.sd_route_topmet, "n+s/d", dummy_gates=lo.with_dummies)
+    width = r.snap(lo_width / lo_fingers)
+    length = r.snap(lo_length)
+    sdvia = r.stack_dim("met1", lo.sd_route_topmet)
+    track = lo.sd_rmult * sdvia
+    minsep = r.rule(lo.sd_route_topmet)["min_separation"]
+    extension = r.snap(lo.sd_route_extension)
+    # ports 1/2 below the fingers, 3/4 above, see _add_source_drain_gate_routing
+    port_y = {
+        1: -(width / 2 + sdvia / 2 + 2 * minsep + 1.5 * track) - extension,
+        2: -(width / 2 + sdvia / 2 + minsep + track / 2) - extension,
+        3: width / 2 + sdvia / 2 + minsep + track / 2 + extension,
+        4: width / 2 + sdvia / 2 + 2 * minsep + 1.5 * track + extension,
+    }
+    columns = fa.columns
+    track_w = columns * fa.pitch + fa.col0_offset + sdvia
+    gate_y = r.snap(width / 2 + 3 * minsep + 2.5 * track + lo.sd_route_extension + lo.gate_route_extension)
+    gate_w = (columns - 2) * fa.pitch + length
+    gate_size = r.array_size("poly", lo.gate_route_topmet, (gate_w, None), num_vias=(None, lo.gate_rmult))
+    # LO gate track spans fingers 0..N-2 (south), LO_b gate track fingers 1..N-1 (north)
+    lo_gate_left = (columns - 3) * fa.pitch / 2 + length / 2 - gate_size[0]
+    lo_b_gate_right = (columns - 1) * fa.pitch / 2 + length / 2
+    half_x = max(fa.half_width, track_w / 2, lo_b_gate_right)
+    half_y = max(fa.half_height, gate_y + gate_size[1], port_y[4] + max(track, sdvia) / 2)
+    tap_separation = _tap_separation(r, max(r.rule("met2")["min_separation"], r.rule("met1")["min_separation"]))
+    lo_ring, lo_tie_w = r.tapring((2 * (tap_separation + half_x), 2 * (tap_separation + half_y)),
+                                  "p+s/d", lo.tie_layers[0], lo.tie_layers[1])
+    lo_bbox = _pad(_merge((-half_x, -half_y, half_x, half_y), _box(0, 0, *lo_ring)),
+                   r.rule("pwell", "active_tap")["min_enclosure"])
+
+    # RF pair: M2 mirrored and abutted to M1, aligned under the LO well
+    fet = _nmos(r, rf_width, rf_fingers, rf_length, rf.with_tie, rf.with_dummies, rf.with_dnwell,
+                rf.with_substrate_tap, rf.sd_route_topmet, rf.gate_route_topmet, rf.sd_rmult, rf.gate_rmult,
+                rf.interfinger_rmult, rf.tie_layers)
+    fet_w = fet["bbox"][2] - fet["bbox"][0]
+    fet_h = fet["bbox"][3] - fet["bbox"][1]
+    rf_cy = lo_bbox[1] - fet_h / 2
+    m1_cx, m2_cx = -fet_w / 2, fet_w / 2
+    rf_bbox = (-fet_w, lo_bbox[1] - fet_h, fet_w, lo_bbox[1])
+
+    # build() drops a fixed 1.42 um VSS via on the LO/RF boundary
+    pins = {"VSS": (0.0, lo_bbox[1])}
+    boxes = [lo_bbox, rf_bbox, _box(0.0, lo_bbox[1], *r.array_size("met2", "met3", (1.42, 1.42)))]
+
+    def escape_via(name: str, x: float, y: float, size: float) -> float:
+        dim = r.array_size("met2", "met3", (size, size))
+        boxes.append(_box(x, y, *dim))
+        if name:
+            pins[name] = (x, y)
+        return dim[0]
+
+    # LO outputs and gates, moved out by the extra displacement of build()
+    extra = abs((lo_bbox[2] - lo_bbox[0]) - (rf_bbox[2] - rf_bbox[0]))
+    tie_w, tie_e = lo_tie_w, -lo_tie_w
+    displacement = {
+        1: r.snap(1.5 * (tie_w + track_w / 2) - track - extra),
+        2: r.snap(1.5 * (tie_e - track_w / 2) + track + extra),
+        3: r.snap(2.5 * (tie_w + track_w / 2) - track - extra),
+        4: r.snap(2.5 * (tie_e - track_w / 2) + track + extra),
+    }
+    via_x = {port: (track_w / 2 if port % 2 == 0 else -track_w / 2) + displacement[port] for port in displacement}
+    via_1 = escape_via("", via_x[1], port_y[1], track)
+    via_2 = escape_via("", via_x[2], port_y[2], track)
+    escape_via("V_out_p", via_x[3], port_y[3], track)
+    escape_via("V_out_n", via_x[4], port_y[4], track)
+    gate_center = gate_y + gate_size[1] / 2
+    escape_via("V_LO", lo_gate_left + r.snap(displacement[3] - 2 * gate_size[1]), -gate_center, gate_size[1])
+    escape_via("V_LO_b", lo_b_gate_right + r.snap(displacement[4] + 2 * gate_size[1]), gate_center, gate_size[1])
+
+    # RF sources and gates; M1 has drain and source swapped
+    fet_tie_w = fet["tie_w"]
+    rf_gate = fet["gate_port"]
+    escape_via("I_bias_pos", m1_cx + fet_tie_w - fet["track"], rf_cy + fet["drain_y"], fet["track"])
+    escape_via("I_bias_neg", m2_cx - fet_tie_w + fet["track"], rf_cy + fet["source_y"], fet["track"])
+    gate_via = r.array_size("met2", "met3", (rf_gate, rf_gate))[1]
+    gate_via_y = rf_cy + fet["gate_bottom"] - gate_via / 2 + rf_gate
+    escape_via("V_RF", m1_cx + fet_tie_w - rf_gate, gate_via_y, rf_gate)
+    escape_via("V_RF_b", m2_cx - fet_tie_w + rf_gate, gate_via_y, rf_gate)
+    # L routes from the LO common sources down to the RF drains
+    boxes.append(_box(via_x[1], rf_cy + fet["source_y"], via_1, fet["track"]))
+    boxes.append(_box(via_x[2], rf_cy + fet["drain_y"], via_2, fet["track"]))
+
+    bbox = None
+    for b in boxes:
+        bbox = _merge(bbox, b)
+    return Footprint(bbox=bbox, pins=pins, taprings={"lo": lo_ring, "rf": fet["tapring"]},
+                     blocks={"lo": lo_bbox, "rf": rf_bbox})
+
+
+def estimate_cmirror_footprint(
+    pdk,
+    width_ref: float,
+    width_mir: float,
+    fingers_ref: int,
+    fingers_mir: int,
+    length: Optional[float] = None,
+    cmirror_config=None,
+    decap_size: Optional[Tuple[float, float]] = None,
+    extra_port_vias_x_displacement: float = 0,
+) -> Footprint:
+    """
+    Predict the footprint of CmirrorWithDecap(...).build() without building it.
+
+    Takes the same arguments as CmirrorWithDecap. Odd finger counts are
+    doubled like the builder does. Interdigitations the builder cannot route
+    raise ValueError here instead of failing halfway through build().
+
+    Returns:
+        Footprint: bbox, pin label positions and tapring size
+    """
+    if cmirror_config is None:
+        cmirror_config = _load_builder_configs("Cmirror_with_decap", "Cmirror_with_decap").CMirrorConfig()
+    config = cmirror_config
+    if width_ref / fingers_ref != width_mir / fingers_mir:
+        raise ValueError(f"Please make sure width_ref/fingers_ref = width_mir/fingers_mir. Currently {width_ref}/{fingers_ref} != {width_mir}/{fingers_mir}")
+    if fingers_ref % 2 or fingers_mir % 2:
+        fingers_ref, fingers_mir = 2 * fingers_ref, 2 * fingers_mir
+    # The gate track is aligned to the reference drain via of the last finger,
+    # which only the (Rs Md Ms Rd) interdigitation with spare reference fingers places
+    if fingers_ref % 4 == 0 or fingers_mir % 4 == 0 or fingers_ref <= fingers_mir:
+        raise ValueError(f"CmirrorWithDecap cannot route fingers_ref={fingers_ref}, fingers_mir={fingers_mir} "
+                         "(after doubling both must be 2 mod 4 with fingers_ref > fingers_mir)")
+    if not config.routing or not config.with_tie:
+        raise ValueError("the escape vias need cmirror_config.routing and cmirror_config.with_tie")
+    if config.with_dummies:
+        raise ValueError("CmirrorWithDecap cannot build with_dummies")
+    r = _rules_for(pdk)
+    min_length = r.rule("poly")["min_width"]
+    length = length if length is not None else min_length
+    columns = fingers_ref + fingers_mir
+    fa = _finger_array(r, width_mir / fingers_mir, length, columns, config.interfinger_rmult,
+                       config.sd_route_topmet, config.sdlayer)
+    width = width_ref / fingers_ref  # routing uses the unsnapped finger width
+    sdvia = r.stack_dim("met1", config.sd_route_topmet)
+    track = config.sd_rmult * sdvia
+    minsep = r.rule(config.sd_route_topmet)["min_separation"]
+    extension = r.snap(config.sd_route_extension)
+    half_span = columns * fa.pitch / 2  # leftsd and the last right s/d column
+    ref_via_y = -(width / 2 + sdvia / 2 + minsep + track / 2) - extension
+    mir_y = width / 2 + sdvia / 2 + minsep + track / 2 + extension
+    vss_y = width / 2 + sdvia / 2 + 2 * minsep + 1.5 * track + extension
+    # Reference drain tracks sit at the bottom of their via, see align_comp_to_port
+    ref_y = ref_via_y - abs(sdvia - track) / 2
+    sd_width = (columns - 1) * fa.pitch + sdvia
+    sd_width_gate = columns * fa.pitch + fa.sd_array_width / config.interfinger_rmult
+    gate_size = r.array_size("poly", config.gate_route_topmet, (sd_width_gate, None), num_vias=(None, config.gate_rmult))
+    gate_right = half_span + sdvia / 2
+    gate_cy = ref_via_y - abs(sdvia - gate_size[1]) / 2
+    gate_stub_y = r.snap(-width / 2 - minsep - track / 2)
+    block = _merge((-fa.half_width, -fa.half_height, fa.half_width, fa.half_height),
+                   (-half_span - sdvia / 2, gate_stub_y, half_span + sdvia / 2, vss_y + track / 2))
+    block = _merge(block, _box(0, ref_y, max(sd_width, sd_width_gate), track))
+    block = _merge(block, (gate_right - gate_size[0], gate_cy - gate_size[1] / 2, gate_right, gate_cy + gate_size[1] / 2))
+    # The tapring is centered on the origin and sized from the positive extents
+    tap_separation = _tap_separation(r, max(r.rule("met2")["min_separation"], r.rule("met1")["min_separation"]))
+    tie_sdlayer = "p+s/d" if config.sdlayer == "n+s/d" else "n+s/d"
+    tie_well = "pwell" if config.sdlayer == "n+s/d" else "nwell"
+    ring, tie_w = r.tapring((2 * (tap_separation + block[2]), 2 * (tap_separation + block[3])),
+                            tie_sdlayer, config.tie_layers[0], config.tie_layers[1])
+    cmirror_bbox = _pad(_merge(block, _box(0, 0, *ring)), r.rule(tie_well, "active_tap")["min_enclosure"])
+    if config.with_dnwell and config.sdlayer == "n+s/d":
+        cmirror_bbox = _pad(cmirror_bbox, r.rule("pwell", "dnwell")["min_enclosure"])
+
+    # Escape vias, sized by the widest of the three tracks
+    via = r.array_size("met2", "met3", (track, track))
+    displacement = track + extra_port_vias_x_displacement
+    pins = {
+        "I_BIAS": (tie_w - displacement, ref_y),
+        "I_OUT": (-tie_w + displacement, mir_y),
+        "VSS" if config.sdlayer == "n+s/d" else "VDD": (tie_w - displacement, vss_y),
+    }
+    bbox = cmirror_bbox
+    for x, y in pins.values():
+        bbox = _merge(bbox, _box(x, y, *via))
+    if config.with_decap:
+        # mimcap left of the VSS via, L routed down to the I_BIAS via
+        size = r.snap(decap_size[0] if decap_size else 1.0), r.snap(decap_size[1] if decap_size else 1.0)
+        capmetbottom, capmettop = r.capmet_layers()
+        enclosure = r.rule(capmetbottom, "capmet")["min_enclosure"]
+        top = r.array_size(capmetbottom, capmettop, size, minus1=True)
+        decap = (max(size[0] + 2 * enclosure, top[0]), max(size[1] + 2 * enclosure, top[1]))
+        vss_x, vss_y = pins["VSS" if config.sdlayer == "n+s/d" else "VDD"]
+        decap_x = vss_x - via[0] / 2 - decap[0] / 2
+        bbox = _merge(bbox, _box(decap_x, vss_y, *decap))
+        bbox = _merge(bbox, _box(decap_x, ref_y, size[0] + 2 * enclosure, via[1]))
+    return Footprint(bbox=bbox, pins=pins, taprings={"cmirror": ring}, blocks={"cmirror": cmirror_bbox})
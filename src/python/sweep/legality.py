@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+import enum
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .footprint import _load_builder_configs, _rules_for
+
+
+class Illegal(enum.IntFlag):
+    """Reasons a parameter combination cannot be generated as requested, one bit each"""
+    BAD_COUNT = 1  # fingers or multipliers not a positive integer
+    BAD_RMULT = 2  # routing multiplier not a positive integer
+    WIDTH_NOT_FINGER_MULTIPLE = 4  # builder _validate_inputs: width % fingers != 0
+    FINGER_TOO_NARROW = 8  # snapped finger width below the s/d via arrays (via_array raises)
+    LENGTH_BELOW_MIN = 16  # shorter than poly min_width (clamped by nmos, DRC error in the builders)
+    BAD_ROUTE_LAYER = 32  # route top metal is not a metal, or s/d route on met1 (no via to place)
+    UNEQUAL_FINGER_WIDTH = 64  # CmirrorWithDecap: width_ref/fingers_ref != width_mir/fingers_mir
+    UNROUTABLE_INTERDIGITATION = 128  # CmirrorWithDecap finger counts its routing cannot handle
+    BAD_PLACEMENT = 256  # diff_pair placement / vss_port_placement not recognised
+    BAD_CONFIG = 512  # config options the builder cannot build (no tie, no routing, dummies)
+
+
+@dataclass
+class LegalityReport:
+    """Per-combination reason bitmasks returned by the check_* functions"""
+    reasons: np.ndarray  # Illegal bits, 0 for legal combinations
+
+    @property
+    def legal(self) -> np.ndarray:
+        return self.reasons == 0
+
+    def __len__(self) -> int:
+        return self.reasons.size
+
+    def explain(self, index) -> List[str]:
+        """Names of the reasons set for one combination"""
+        bits = int(self.reasons[index])
+        return [reason.name for reason in Illegal if bits & reason]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of combinations failing each check (a combination can fail several)"""
+        return {reason.name: int(np.count_nonzero(self.reasons & reason)) for reason in Illegal
+                if np.any(self.reasons & reason)}
+
+    def __str__(self) -> str:
+        failing = ", ".join(f"{name} {count}" for name, count in self.counts().items())
+        return f"{int(np.count_nonzero(self.legal))}/{len(self)} legal" + (f" ({failing})" if failing else "")
+
+
+def _per_value(values, func, dtype=float) -> np.ndarray:
+    """Apply a scalar func to an array of (possibly non numeric) values, once per distinct value"""
+    values = np.asarray(values, dtype=object)
+    unique = {value: func(value) for value in set(values.ravel().tolist())}
+    return np.array([unique[value] for value in values.ravel().tolist()], dtype=dtype).reshape(values.shape)
+
+
+def _snap(rules, values: np.ndarray) -> np.ndarray:
+    # MappedPDK.snap_to_2xgrid, vectorized: rounds away from zero
+    steps = np.round(values / rules._grid, 4)
+    return np.round(np.sign(steps) * np.ceil(np.abs(steps)) * rules._grid, 6)
+
+
+def _is_metal(glayer) -> bool:
+    return isinstance(glayer, str) and glayer.startswith("met") and glayer[3:].isdigit()
+
+
+def _bad_count(count: np.ndarray) -> np.ndarray:
+    return (count < 1) | (count != np.floor(count))
+
+
+def _sd_via_width(rules, inter_finger_topmet) -> np.ndarray:
+    """Narrowest finger the s/d via column and the inter finger via array both fit on"""
+    return _per_value(inter_finger_topmet, lambda glayer: max(
+        rules.stack_dim("active_diff", "met1"),
+        rules.stack_dim("met1", glayer) if _is_metal(glayer) else 0.0))
+
+
+def _route_layers(sd_route_topmet, gate_route_topmet) -> np.ndarray:
+    sd_ok = _per_value(sd_route_topmet, lambda glayer: _is_metal(glayer) and glayer != "met1", dtype=bool)
+    gate_ok = _per_value(gate_route_topmet, _is_metal, dtype=bool)
+    return ~(sd_ok & gate_ok)
+
+
+def _flag(mask, reason: Illegal) -> np.ndarray:
+    return np.where(mask, np.uint32(reason), np.uint32(0))
+
+
+def _fet_reasons(rules, finger_width, length, fingers, sd_rmult, gate_rmult, interfinger_rmult,
+                 sd_route_topmet, gate_route_topmet, inter_finger_topmet, clamp: bool) -> np.ndarray:
+    """Checks shared by nmos and the finger arrays of the builders, broadcast over all arguments"""
+    min_length = rules.rule("poly")["min_width"]
+    rmults = [np.asarray(rmult, dtype=float) for rmult in (sd_rmult, gate_rmult, interfinger_rmult)]
+    reasons = _flag(_bad_count(fingers), Illegal.BAD_COUNT)
+    reasons = reasons | _flag(_bad_count(rmults[0]) | _bad_count(rmults[1]) | _bad_count(rmults[2]), Illegal.BAD_RMULT)
+    reasons = reasons | _flag(length < min_length - 1e-9, Illegal.LENGTH_BELOW_MIN)
+    if clamp:
+        # fet.multiplier raises widths at or below the minimum to the minimum
+        min_width = max(min_length, rules.rule("active_diff")["min_width"])
+        finger_width = np.where(finger_width <= min_width, min_width, finger_width)
+    too_narrow = _snap(rules, finger_width) < _sd_via_width(rules, inter_finger_topmet) - 1e-9
+    reasons = reasons | _flag(too_narrow, Illegal.FINGER_TOO_NARROW)
+    return reasons | _flag(_route_layers(sd_route_topmet, gate_route_topmet), Illegal.BAD_ROUTE_LAYER)
+
+
+def _lengths(rules, length) -> np.ndarray:
+    min_length = rules.rule("poly")["min_width"]
+    return np.asarray(min_length if length is None else length, dtype=float)
+
+
+def _config_reasons(config, shape, *required: str, dummies: bool = True) -> np.ndarray:
+    """BAD_CONFIG wherever a scalar config disables an option the builder relies on"""
+    bad = any(not getattr(config, option) for option in required)
+    bad = bad or (not dummies and config.with_dummies) or "+s/d" not in getattr(config, "sdlayer", "n+s/d")
+    return np.full(shape, Illegal.BAD_CONFIG if bad else 0, dtype=np.uint32)
+
+
+def check_nmos(
+    pdk,
+    width,
+    length=None,
+    fingers=1,
+    multipliers=1,
+    sd_route_topmet="met2",
+    gate_route_topmet="met2",
+    inter_finger_topmet="met2",
+    sd_rmult=1,
+    gate_rmult=1,
+    interfinger_rmult=1,
+    rmult: Optional[int] = None,
+) -> LegalityReport:
+    """
+    Check nmos/pmos parameter combinations without generating them.
+
+    Every argument may be a scalar or an array, they are broadcast against
+    each other (route layers may be arrays of strings). width is the
+    per finger width, as for glayout nmos.
+
+    Returns:
+        LegalityReport: reason bitmask per combination, see Illegal
+    """
+    rules = _rules_for(pdk)
+    if rmult:
+        sd_rmult, gate_rmult, interfinger_rmult = rmult, 1, ((rmult - 1) or 1)
+    width, length, fingers, multipliers, sd_rmult, gate_rmult, interfinger_rmult = np.broadcast_arrays(
+        np.asarray(width, dtype=float), _lengths(rules, length), np.asarray(fingers, dtype=float),
+        np.asarray(multipliers, dtype=float), np.asarray(sd_rmult, dtype=float),
+        np.asarray(gate_rmult, dtype=float), np.asarray(interfinger_rmult, dtype=float))
+    reasons = _fet_reasons(rules, width, length, fingers, sd_rmult, gate_rmult, interfinger_rmult,
+                           sd_route_topmet, gate_route_topmet, inter_finger_topmet, clamp=True)
+    return LegalityReport(reasons | _flag(_bad_count(multipliers), Illegal.BAD_COUNT))
+
+
+def check_diff_pair(
+    pdk,
+    width=(3, 3),
+    length=None,
+    fingers=(1, 1),
+    multipliers=(1, 1),
+    sd_rmult=1,
+    placement="vertical",
+    vss_port_placement="N",
+) -> LegalityReport:
+    """
+    Check diff_pair parameter combinations without generating them.
+
+    Pairs are given as (M1, M2) tuples like diff_pair takes them, each
+    element may be an array.
+
+    Returns:
+        LegalityReport: reason bitmask per combination, see Illegal
+    """
+    length = (None, None) if length is None else length
+    reasons = check_nmos(pdk, width[0], length[0], fingers[0], multipliers[0], sd_rmult=sd_rmult).reasons
+    reasons = reasons | check_nmos(pdk, width[1], length[1], fingers[1], multipliers[1], sd_rmult=sd_rmult).reasons
+    bad_placement = ~(_per_value(placement, lambda p: p in ("horizontal", "vertical"), dtype=bool)
+                      & _per_value(vss_port_placement, lambda p: p in ("N", "S", "E", "W"), dtype=bool))
+    return LegalityReport(reasons | _flag(bad_placement, Illegal.BAD_PLACEMENT))
+
+
+def check_gilbert_mixer(
+    pdk,
+    lo_width,
+    lo_fingers,
+    rf_width,
+    rf_fingers,
+    lo_length=None,
+    rf_length=None,
+    lo_fet_config=None,
+    rf_fet_config=None,
+) -> LegalityReport:
+    """
+    Check GilbertMixerInterdigited parameter combinations without building them.
+
+    The numeric arguments may be arrays, the FET configs are scalar like the
+    builder takes them. Covers _validate_inputs as well as the LO finger
+    array (lo_width / lo_fingers per finger) and the RF nmos (rf_width per
+    finger).
+
+    Returns:
+        LegalityReport: reason bitmask per combination, see Illegal
+    """
+    if lo_fet_config is None or rf_fet_config is None:
+        module = _load_builder_configs("Gilbert_mixer_intedigited", "Gilbert_mixer_interdigited")
+        lo_fet_config = lo_fet_config or module.LOFETConfig()
+        rf_fet_config = rf_fet_config or module.RFFETConfig()
+    lo, rf = lo_fet_config, rf_fet_config
+    rules = _rules_for(pdk)
+    lo_width, lo_fingers, rf_width, rf_fingers, lo_length, rf_length = np.broadcast_arrays(
+        np.asarray(lo_width, dtype=float), np.asarray(lo_fingers, dtype=float), np.asarray(rf_width, dtype=float),
+        np.asarray(rf_fingers, dtype=float), _lengths(rules, lo_length), _lengths(rules, rf_length))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        not_multiple = (np.mod(lo_width, lo_fingers) != 0) | (np.mod(rf_width, rf_fingers) != 0)
+        lo_finger_width = np.where(lo_fingers > 0, lo_width / lo_fingers, 0.0)
+    reasons = _flag(not_multiple, Illegal.WIDTH_NOT_FINGER_MULTIPLE)
+    # the LO finger array carries its inter finger vias up to sd_route_topmet
+    reasons = reasons | _fet_reasons(
+        rules, lo_finger_width, lo_length, lo_fingers, lo.sd_rmult, lo.gate_rmult, lo.interfinger_rmult,
+        lo.sd_route_topmet, lo.gate_route_topmet, lo.sd_route_topmet, clamp=False)
+    reasons = reasons | _fet_reasons(
+        rules, rf_width, rf_length, rf_fingers, rf.sd_rmult, rf.gate_rmult, rf.interfinger_rmult,
+        rf.sd_route_topmet, rf.gate_route_topmet, "met2", clamp=True)
+    reasons |= _config_reasons(lo, reasons.shape, "routing")
+    reasons |= _config_reasons(rf, reasons.shape, "with_tie")
+    return LegalityReport(reasons)
+
+
+def check_cmirror(
+    pdk,
+    width_ref,
+    width_mir,
+    fingers_ref,
+    fingers_mir,
+    length=None,
+    cmirror_config=None,
+) -> LegalityReport:
+    """
+    Check CmirrorWithDecap parameter combinations without building them.
+
+    Odd finger counts are doubled like the builder does. Only the
+    interdigitation with both counts 2 mod 4 and fingers_ref > fingers_mir
+    routes; the others fail inside build().
+
+    Returns:
+        LegalityReport: reason bitmask per combination, see Illegal
+    """
+    if cmirror_config is None:
+        cmirror_config = _load_builder_configs("Cmirror_with_decap", "Cmirror_with_decap").CMirrorConfig()
+    config = cmirror_config
+    rules = _rules_for(pdk)
+    width_ref, width_mir, fingers_ref, fingers_mir, length = np.broadcast_arrays(
+        np.asarray(width_ref, dtype=float), np.asarray(width_mir, dtype=float), np.asarray(fingers_ref, dtype=float),
+        np.asarray(fingers_mir, dtype=float), _lengths(rules, length))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unequal = width_ref / fingers_ref != width_mir / fingers_mir
+    odd = (np.mod(fingers_ref, 2) == 1) | (np.mod(fingers_mir, 2) == 1)
+    fingers_ref = np.where(odd, 2 * fingers_ref, fingers_ref)
+    fingers_mir = np.where(odd, 2 * fingers_mir, fingers_mir)
+    unroutable = (np.mod(fingers_ref, 4) != 2) | (np.mod(fingers_mir, 4) != 2) | (fingers_ref <= fingers_mir)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        finger_width = np.where(fingers_mir > 0, width_mir / fingers_mir, 0.0)
+    reasons = _flag(unequal, Illegal.UNEQUAL_FINGER_WIDTH) | _flag(unroutable, Illegal.UNROUTABLE_INTERDIGITATION)
+    reasons = reasons | _fet_reasons(
+        rules, finger_width, length, np.minimum(fingers_ref, fingers_mir), config.sd_rmult, config.gate_rmult,
+        config.interfinger_rmult, config.sd_route_topmet, config.gate_route_topmet, config.sd_route_topmet,
+        clamp=False)
+    reasons |= _config_reasons(config, reasons.shape, "routing", "with_tie", dummies=False)
+    return LegalityReport(reasons)
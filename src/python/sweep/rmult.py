@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+import itertools
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .footprint import _load_builder_configs, _rules_for, estimate_cmirror_footprint, estimate_gilbert_footprint
+from .legality import _snap
+
+RMULT_FIELDS = ("sd_rmult", "gate_rmult", "interfinger_rmult")
+
+
+@dataclass
+class RouteTarget:
+    """Requirement on one pin route, named like the layout pin label"""
+    current: float = 0.0  # A, DC or rms through the route
+    max_resistance: Optional[float] = None  # ohm from the pin to the device terminals
+
+
+@dataclass
+class RmultChoice:
+    """Result of optimize_*_rmult(): FET configs ready to pass to the builder"""
+    configs: Dict[str, object]  # builder argument -> config, e.g. {"cmirror_config": CMirrorConfig(...)}
+    area: float  # um^2 of the predicted footprint
+    resistance: Dict[str, float]  # route -> ohm, analytic estimate
+    limit_ratio: Dict[str, float]  # route -> worst density over the EM limit among rmult sized parts
+    fixed_ratio: Dict[str, float]  # route -> density over the limit of the finger straps no rmult widens
+    evaluated: int = 0  # rmult combinations scored with the R/EM model
+    footprints: int = 0  # of those, predicted with the footprint model
+    elapsed: float = 0.0
+
+    def rmults(self) -> Dict[str, Dict[str, int]]:
+        return {name: {f: getattr(config, f) for f in RMULT_FIELDS} for name, config in self.configs.items()}
+
+    def __str__(self) -> str:
+        chosen = "; ".join(f"{name}: " + ", ".join(f"{k}={v}" for k, v in values.items())
+                           for name, values in self.rmults().items())
+        lines = [f"{chosen}, area {self.area:.1f} um^2 ({self.evaluated} combinations, "
+                 f"{self.footprints} footprints in {self.elapsed * 1e3:.1f} ms)"]
+        for route in self.resistance:
+            lines.append(f"  {route:<12} R={self.resistance[route]:7.2f} ohm  "
+                         f"EM {self.limit_ratio[route]:6.1%}  straps {self.fixed_ratio[route]:6.1%}")
+        return "\n".join(lines)
+
+
+def _tech(pdk, tech):
+    # The R and EM data live with the parasitic estimators
+    from parasitics.tech import tech_for
+    return tech_for(pdk, tech)
+
+
+def _stack_resistance(tech, bottom: str, top: str) -> float:
+    """Series resistance of one cut per via layer from bottom up to the metal top"""
+    order = ("mcon", "via1", "via2", "via3", "via4")
+    first = 0 if bottom in ("active_diff", "poly") else int(bottom[-1])
+    return sum(tech.vias[order[level]].resistance for level in range(first, int(top[-1])))
+
+
+def _count(rules, glayer1: str, glayer2: str, size: np.ndarray, minus1: bool = False) -> np.ndarray:
+    """_Rules.array_count, vectorized over size"""
+    pitch, top_enclosure = rules.array_pitch(glayer1, glayer2)
+    num = np.floor((_snap(rules, size) - top_enclosure) / pitch)
+    num = np.where(num < 1, 1, num)
+    return np.where(num - 1 < 1, 1, num - 1) if minus1 else num
+
+
+class _FETModel:
+    """
+    Pin route resistance and current density of a finger array as functions of its rmults.
+
+    A s/d route is the contact arrays on the fingers of its terminal
+    (interfinger_rmult wide), one via stack per finger up to the track, the
+    track itself (sd_rmult high) fed from its end and the met3 escape via the
+    builders size like the track. A gate route is the gate via array
+    (gate_rmult rows), its track and escape via.
+    """
+
+    def __init__(self, pdk, tech, config, finger_width: float, length: float, columns: int):
+        self.rules = rules = _rules_for(pdk)
+        self.tech = tech
+        self.config = config
+        self.finger_width = finger_width
+        self.length = rules.snap(length)
+        self.columns = columns
+        self.contact_rows = float(_count(rules, "active_diff", "met1", np.array(finger_width), minus1=True))
+
+    def pitch(self, interfinger_rmult: np.ndarray) -> np.ndarray:
+        r = self.rules
+        poly_spacing = np.maximum(interfinger_rmult * r.stack_dim("active_diff", "met1"),
+                                  2 * r.rule("poly", "mcon")["min_separation"] + r.rule("mcon")["width"])
+        met1_minsep = r.rule("met1")["min_separation"]
+        return poly_spacing + (met1_minsep if self.length < met1_minsep else 0) + self.length
+
+    def escape(self, size: np.ndarray) -> np.ndarray:
+        """Cuts per layer of the square met2 -> met3 pin via array of side size"""
+        return _count(self.rules, "met2", "met3", size) ** 2
+
+    def _escape_limit(self, topmet: str) -> float:
+        limits = [self.tech.vias[f"via{level}"].em_limit for level in range(int(topmet[-1]), 3)]
+        return min(limits) if limits else np.inf
+
+    def sd(self, fingers: int, current: float, sd_rmult, interfinger_rmult):
+        """(resistance, rmult sized limit ratio, strap limit ratio) of a s/d route joining fingers columns"""
+        r, tech, topmet = self.rules, self.tech, self.config.sd_route_topmet
+        cuts = _count(r, "active_diff", "met1", interfinger_rmult * r.stack_dim("active_diff", "met1"),
+                      minus1=True) * self.contact_rows * fingers
+        track = sd_rmult * r.stack_dim("met1", topmet)
+        track_length = self.columns * self.pitch(interfinger_rmult)
+        strap = r.stack_dim("met1", topmet)
+        escape = self.escape(track)
+        resistance = (tech.vias["mcon"].resistance / cuts
+                      + _stack_resistance(tech, "met1", topmet) / fingers
+                      + tech.conductors[topmet].sheet_resistance * track_length / (3 * track)
+                      + _stack_resistance(tech, topmet, "met3") / escape)
+        milliamps = current * 1e3
+        ratio = np.maximum.reduce([milliamps / cuts / tech.vias["mcon"].em_limit,
+                                   milliamps / track / tech.conductors[topmet].em_limit,
+                                   milliamps / escape / self._escape_limit(topmet)])
+        strap_ratio = milliamps / fingers / strap / tech.conductors["met1"].em_limit
+        return resistance, ratio, np.broadcast_to(strap_ratio, np.shape(ratio))
+
+    def gate(self, current: float, gate_rmult, interfinger_rmult):
+        """(resistance, limit ratio, 0) of the gate route"""
+        r, tech, topmet = self.rules, self.tech, self.config.gate_route_topmet
+        gate_length = (self.columns - 1) * self.pitch(interfinger_rmult) + self.length
+        via_columns = _count(r, "poly", topmet, gate_length)
+        height = (gate_rmult - 1) * r.array_pitch("poly", topmet)[0] + r.stack_dim("poly", topmet)
+        escape = self.escape(height)
+        resistance = (_stack_resistance(tech, "poly", topmet) / (via_columns * gate_rmult)
+                      + tech.conductors[topmet].sheet_resistance * gate_length / (3 * height)
+                      + _stack_resistance(tech, topmet, "met3") / escape)
+        ratio = np.maximum(current * 1e3 / height / tech.conductors[topmet].em_limit,
+                           current * 1e3 / escape / self._escape_limit(topmet))
+        return resistance, ratio, np.zeros(np.shape(ratio))
+
+
+def _evaluate(model: _FETModel, routes: Mapping[str, Tuple[str, int]], targets: Mapping[str, RouteTarget],
+              grid: Dict[str, np.ndarray], margin: float):
+    """Feasibility mask and per route (resistance, ratio, strap ratio) over the rmult grid"""
+    feasible = np.ones(grid["sd_rmult"].shape, dtype=bool)
+    values = {}
+    for route, (kind, fingers) in routes.items():
+        target = targets.get(route)
+        if target is None:
+            continue
+        if kind == "gate":
+            values[route] = model.gate(target.current, grid["gate_rmult"], grid["interfinger_rmult"])
+        else:
+            values[route] = model.sd(fingers, target.current, grid["sd_rmult"], grid["interfinger_rmult"])
+        resistance, ratio, _ = values[route]
+        feasible &= ratio * margin <= 1.0
+        if target.max_resistance is not None:
+            feasible &= resistance <= target.max_resistance
+    return feasible, values
+
+
+def _minimal(points: np.ndarray) -> np.ndarray:
+    """Indices of the rows no other row is componentwise <= to (area grows with every rmult)"""
+    keep = []
+    for i, point in enumerate(points):
+        dominated = np.all(points <= point, axis=1) & np.any(points < point, axis=1)
+        if not dominated.any():
+            keep.append(i)
+    return np.array(keep, dtype=int)
+
+
+def _candidates(model, routes, targets, base, max_rmult: int, margin: float):
+    """Minimal feasible rmult triples of one config, the route values at each, and the grid size"""
+    axes = np.arange(1, max_rmult + 1)
+    sd, gate, interfinger = np.meshgrid(axes, axes, axes, indexing="ij")
+    grid = {"sd_rmult": sd.ravel(), "gate_rmult": gate.ravel(), "interfinger_rmult": interfinger.ravel()}
+    # rmults no target depends on stay as configured
+    used = {"sd_rmult": False, "gate_rmult": False, "interfinger_rmult": False}
+    for route, (kind, _) in routes.items():
+        if route in targets:
+            used["gate_rmult" if kind == "gate" else "sd_rmult"] = True
+            used["interfinger_rmult"] = True
+    for name, is_used in used.items():
+        if not is_used:
+            grid[name] = np.full_like(grid[name], getattr(base, name))
+    feasible, values = _evaluate(model, routes, targets, grid, margin)
+    points = np.unique(np.column_stack([grid[name] for name in RMULT_FIELDS])[feasible], axis=0)
+    if len(points) == 0:
+        raise ValueError(f"no rmult up to {max_rmult} meets the targets of {', '.join(sorted(routes))}")
+    minimal = points[_minimal(points)]
+    return minimal, grid["sd_rmult"].size
+
+
+def _route_values(model, routes, targets, triple) -> Dict[str, Tuple[float, float, float]]:
+    grid = {name: np.array([value]) for name, value in zip(RMULT_FIELDS, triple)}
+    _, values = _evaluate(model, routes, targets, grid, 1.0)
+    return {route: tuple(float(np.ravel(v)[0]) for v in value) for route, value in values.items()}
+
+
+def _choose(models, bases, routes, targets, max_rmult, margin, area_of) -> RmultChoice:
+    start = time.perf_counter()
+    unknown = set(targets) - {route for config_routes in routes.values() for route in config_routes}
+    if unknown:
+        raise ValueError(f"no route model for {', '.join(sorted(unknown))}")
+    candidates, evaluated = {}, 0
+    for name in models:
+        candidates[name], count = _candidates(models[name], routes[name], targets, bases[name], max_rmult, margin)
+        evaluated += count
+    best, footprints = None, 0
+    for combination in itertools.product(*candidates.values()):
+        configs = {name: replace(bases[name], **dict(zip(RMULT_FIELDS, (int(v) for v in triple))))
+                   for name, triple in zip(candidates, combination)}
+        area = area_of(configs)
+        footprints += 1
+        key = (area, sum(int(np.sum(triple)) for triple in combination))
+        if best is None or key < best[0]:
+            best = (key, configs, combination)
+    _, configs, combination = best
+    resistance, ratio, strap = {}, {}, {}
+    for name, triple in zip(candidates, combination):
+        for route, (r, k, s) in _route_values(models[name], routes[name], targets, triple).items():
+            resistance[route], ratio[route], strap[route] = r, k, s
+    return RmultChoice(configs, best[0][0], resistance, ratio, strap, evaluated, footprints,
+                       time.perf_counter() - start)
+
+
+def optimize_cmirror_rmult(
+    pdk,
+    width_ref: float,
+    width_mir: float,
+    fingers_ref: int,
+    fingers_mir: int,
+    targets: Mapping[str, RouteTarget],
+    length: Optional[float] = None,
+    cmirror_config=None,
+    max_rmult: int = 8,
+    margin: float = 1.0,
+    tech=None,
+) -> RmultChoice:
+    """
+    Smallest CmirrorWithDecap routing multipliers meeting resistance and EM targets.
+
+    Every (sd_rmult, gate_rmult, interfinger_rmult) up to max_rmult is scored
+    with an analytic route model at once; the feasible combinations no other
+    feasible one undercuts in every rmult are then compared by their predicted
+    footprint. Nothing is built.
+
+    Args:
+        pdk: MappedPDK
+        width_ref, width_mir, fingers_ref, fingers_mir, length: As for CmirrorWithDecap
+        targets: {"I_BIAS" / "I_OUT": RouteTarget}, the s/d routes of the reference and mirror drains
+        cmirror_config: Base CMirrorConfig, its other fields are kept
+        max_rmult: Largest rmult tried
+        margin: Required EM headroom, 1.2 keeps densities below 1 / 1.2 of the limits
+        tech: Layer resistances and EM limits, default the built-in table of pdk
+
+    Returns:
+        RmultChoice: {"cmirror_config": config} and the route estimates
+    """
+    if cmirror_config is None:
+        cmirror_config = _load_builder_configs("Cmirror_with_decap", "Cmirror_with_decap").CMirrorConfig()
+    if fingers_ref % 2 or fingers_mir % 2:
+        fingers_ref, fingers_mir = 2 * fingers_ref, 2 * fingers_mir
+    rules = _rules_for(pdk)
+    length = length if length is not None else rules.rule("poly")["min_width"]
+    model = _FETModel(pdk, _tech(pdk, tech), cmirror_config, width_mir / fingers_mir, length,
+                      fingers_ref + fingers_mir)
+    routes = {"cmirror_config": {"I_BIAS": ("sd", fingers_ref // 2), "I_OUT": ("sd", fingers_mir // 2)}}
+
+    def area_of(configs):
+        return estimate_cmirror_footprint(pdk, width_ref, width_mir, fingers_ref, fingers_mir, length,
+                                          cmirror_config=configs["cmirror_config"]).area
+
+    return _choose({"cmirror_config": model}, {"cmirror_config": cmirror_config}, routes, targets,
+                   max_rmult, margin, area_of)
+
+
+def optimize_gilbert_rmult(
+    pdk,
+    lo_width: float,
+    lo_fingers: int,
+    rf_width: float,
+    rf_fingers: int,
+    targets: Mapping[str, RouteTarget],
+    lo_length: Optional[float] = None,
+    rf_length: Optional[float] = None,
+    lo_fet_config=None,
+    rf_fet_config=None,
+    max_rmult: int = 8,
+    margin: float = 1.0,
+    tech=None,
+) -> RmultChoice:
+    """
+    Smallest GilbertMixerInterdigited routing multipliers meeting resistance and EM targets.
+
+    The LO and RF configs are screened separately with the analytic route
+    model, then every pair of their minimal feasible rmults is compared by the
+    predicted footprint of the whole mixer. Nothing is built.
+
+    Args:
+        pdk: MappedPDK
+        lo_width, lo_fingers, rf_width, rf_fingers, lo_length, rf_length: As for GilbertMixerInterdigited
+        targets: RouteTarget per pin route: I_bias_pos/neg (RF sources), V_out_p/n (LO drains),
+            V_RF/V_RF_b and V_LO/V_LO_b (gates)
+        lo_fet_config, rf_fet_config: Base configs, their other fields are kept
+        max_rmult: Largest rmult tried
+        margin: Required EM headroom
+        tech: Layer resistances and EM limits, default the built-in table of pdk
+
+    Returns:
+        RmultChoice: {"lo_fet_config": ..., "rf_fet_config": ...} and the route estimates
+    """
+    if lo_fet_config is None or rf_fet_config is None:
+        module = _load_builder_configs("Gilbert_mixer_intedigited", "Gilbert_mixer_interdigited")
+        lo_fet_config = lo_fet_config or module.LOFETConfig()
+        rf_fet_config = rf_fet_config or module.RFFETConfig()
+    rules = _rules_for(pdk)
+    min_length = rules.rule("poly")["min_width"]
+    lo_length = lo_length if lo_length is not None else min_length
+    rf_length = rf_length if rf_length is not None else min_length
+    tech = _tech(pdk, tech)
+    models = {
+        # four interdigited LO FETs, each output joins the drains of two
+        "lo_fet_config": _FETModel(pdk, tech, lo_fet_config, lo_width / lo_fingers, lo_length, 4 * lo_fingers),
+        "rf_fet_config": _FETModel(pdk, tech, rf_fet_config, rf_width, rf_length, rf_fingers),
+    }
+    rf_sources = (rf_fingers + 2) // 2
+    routes = {
+        "lo_fet_config": {"V_out_p": ("sd", lo_fingers), "V_out_n": ("sd", lo_fingers),
+                          "V_LO": ("gate", 0), "V_LO_b": ("gate", 0)},
+        "rf_fet_config": {"I_bias_pos": ("sd", rf_sources), "I_bias_neg": ("sd", rf_sources),
+                          "V_RF": ("gate", 0), "V_RF_b": ("gate", 0)},
+    }
+
+    def area_of(configs):
+        return estimate_gilbert_footprint(pdk, lo_width, lo_fingers, rf_width, rf_fingers, lo_length, rf_length,
+                                          lo_fet_config=configs["lo_fet_config"],
+                                          rf_fet_config=configs["rf_fet_config"]).area
+
+    return _choose(models, {"lo_fet_config": lo_fet_config, "rf_fet_config": rf_fet_config}, routes, targets,
+                   max_rmult, margin, area_of)
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .failure_memo import FailureMemo, canonical_params, resolve_generator
+from .footprint import _load_builder_configs
+
+# Short names for the builders, anything else is given as "module:qualname" of a
+# function taking (pdk, **params) and returning a Component
+GENERATORS = {
+    "gilbert_mixer": "sweep.runner:build_gilbert_mixer",
+    "cmirror": "sweep.runner:build_cmirror",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    name TEXT PRIMARY KEY,
+    generator TEXT NOT NULL,
+    pdk TEXT NOT NULL,
+    grid TEXT NOT NULL,
+    output_dir TEXT,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS points (
+    sweep TEXT NOT NULL,
+    point INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    rmult INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    area REAL,
+    width REAL,
+    height REAL,
+    port_count INTEGER,
+    build_time REAL,
+    drc_count INTEGER,
+    gds_path TEXT,
+    drc_report TEXT,
+    error TEXT,
+    finished REAL,
+    PRIMARY KEY (sweep, point)
+);
+CREATE INDEX IF NOT EXISTS points_status ON points (sweep, status);
+"""
+
+_RESULT_COLUMNS = ("status", "area", "width", "height", "port_count", "build_time", "drc_count", "gds_path",
+                   "drc_report", "error", "finished")
+
+
+def _nest(params: Dict) -> Dict:
+    """Turn dotted keys ("lo_fet_config.sd_rmult") into nested dicts"""
+    nested: Dict = {}
+    for key, value in params.items():
+        *parents, leaf = key.split(".")
+        target = nested
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return nested
+
+
+def _config(factory, values):
+    if values is None or not isinstance(values, dict):
+        return values
+    return factory(**{key: tuple(value) if isinstance(value, list) else value for key, value in values.items()})
+
+
+def build_gilbert_mixer(pdk, **params):
+    """GilbertMixerInterdigited(pdk, **params).build(), FET configs may be given as dicts"""
+    module = _load_builder_configs("Gilbert_mixer_intedigited", "Gilbert_mixer_interdigited")
+    params = _nest(params)
+    params["lo_fet_config"] = _config(module.LOFETConfig, params.get("lo_fet_config"))
+    params["rf_fet_config"] = _config(module.RFFETConfig, params.get("rf_fet_config"))
+    return module.GilbertMixerInterdigited(pdk, **params).build()
+
+
+def build_cmirror(pdk, **params):
+    """CmirrorWithDecap(pdk, **params).build(), the config may be given as a dict"""
+    module = _load_builder_configs("Cmirror_with_decap", "Cmirror_with_decap")
+    params = _nest(params)
+    params["cmirror_config"] = _config(module.CMirrorConfig, params.get("cmirror_config"))
+    if isinstance(params.get("decap_size"), list):
+        params["decap_size"] = tuple(params["decap_size"])
+    return module.CmirrorWithDecap(pdk, **params).build()
+
+
+def _builder_source(package: str, module: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", package, f"{module}.py")
+
+
+# The wrappers only forward to these files, FailureMemo hashes them so fixing a builder
+# invalidates the failures recorded against it
+build_gilbert_mixer.sources = (_builder_source("Gilbert_mixer_intedigited", "Gilbert_mixer_interdigited"),)
+build_cmirror.sources = (_builder_source("Cmirror_with_decap", "Cmirror_with_decap"),)
+
+
+def routing_multiplier(params: Dict) -> int:
+    """Sum of the swept *rmult parameters of a point, 0 when none are swept"""
+    return sum(int(value) for key, value in params.items() if key.split(".")[-1].endswith("rmult"))
+
+
+def expand_grid(grid: Dict[str, Sequence]) -> List[Dict]:
+    """All combinations of a {parameter: values} grid, in a stable order (last key varies fastest)"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def _port_count(component) -> int:
+    # CmirrorWithDecap exports its pins as labels only
+    return len(component.ports) or len({label.text for label in component.labels})
+
+
+def _drc_count(report: str) -> Optional[int]:
+    with open(report) as f:
+        match = re.search(r"count:\s*(\d+)", f.readline())
+    return int(match.group(1)) if match else None
+
+
+@dataclass
+class PointResult:
+    """Outcome of one sweep point, as stored in the points table"""
+    point: int
+    status: str  # "done" or "failed"
+    area: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
+    port_count: Optional[int] = None
+    build_time: Optional[float] = None
+    drc_count: Optional[int] = None
+    gds_path: Optional[str] = None
+    drc_report: Optional[str] = None
+    error: Optional[str] = None
+    finished: float = field(default_factory=time.time)
+
+
+_WORKER_CACHE = None
+# Small subcells nearly every point shares, never evicted from the workers' @cell caches
+PINNED_CELL_PREFIXES = ("via_array", "via_stack", "tapring")
+
+
+def _init_worker(cell_cache_entries: Optional[int]) -> None:
+    # Workers run many points, keep gdsfactory's @cell cache from growing without bound
+    global _WORKER_CACHE
+    if cell_cache_entries is not None:
+        from .cell_cache import install_cell_cache
+        _WORKER_CACHE = install_cell_cache(max_entries=cell_cache_entries,
+                                           pinned_prefixes=PINNED_CELL_PREFIXES)
+
+
+def run_point(generator: str, pdk_name: str, point: int, params: Dict, output_dir: Optional[str],
+              drc: bool = False, memo: Optional[FailureMemo] = None) -> PointResult:
+    """Build one point and measure it, runs in the worker processes"""
+    try:
+        pdk = getattr(importlib.import_module("glayout"), pdk_name)
+        build = resolve_generator(GENERATORS.get(generator, generator))
+        start = time.perf_counter()
+        component = build(pdk, **params) if memo is None else memo.call(build, pdk=pdk, **params)
+        build_time = time.perf_counter() - start
+        (xmin, ymin), (xmax, ymax) = component.bbox
+        result = PointResult(point, "done", width=float(xmax - xmin), height=float(ymax - ymin),
+                             port_count=_port_count(component), build_time=build_time)
+        result.area = result.width * result.height
+        if output_dir:
+            point_dir = os.path.join(output_dir, f"point_{point:06d}")
+            os.makedirs(point_dir, exist_ok=True)
+            result.gds_path = os.path.join(point_dir, f"{component.name}.gds")
+            component.write_gds(result.gds_path)
+            if drc:
+                pdk.drc_magic(result.gds_path, component.name, output_file=point_dir)
+                result.drc_report = os.path.join(point_dir, "drc", component.name, f"{component.name}.rpt")
+                result.drc_count = _drc_count(result.drc_report)
+        return result
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=-3)}"
+        return PointResult(point, "failed", error=error)
+
+
+class SweepStore:
+    """
+    SQLite results store of resumable parameter sweeps.
+
+    Every point of a sweep is inserted as pending when the sweep is created;
+    the runner commits each result as it arrives, so after a crash only the
+    points that were in flight are built again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "SweepStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def create_sweep(self, name: str, generator: str, grid: Dict[str, Sequence], pdk: str = "gf180",
+                     output_dir: Optional[str] = None) -> int:
+        """
+        Register a sweep and its points, a no-op when it already exists with the same grid.
+
+        Raises:
+            ValueError: name is already used by a sweep with a different generator, PDK or grid
+
+        Returns:
+            int: number of points in the sweep
+        """
+        grid_json = canonical_params(grid)
+        row = self._db.execute("SELECT generator, pdk, grid FROM sweeps WHERE name=?", (name,)).fetchone()
+        if row is not None:
+            if tuple(row) != (generator, pdk, grid_json):
+                raise ValueError(f"sweep {name!r} already exists with a different generator, PDK or grid")
+            return self._db.execute("SELECT COUNT(*) FROM points WHERE sweep=?", (name,)).fetchone()[0]
+        points = expand_grid(grid)
+        with self._db:
+            self._db.execute("INSERT INTO sweeps VALUES (?, ?, ?, ?, ?, ?)",
+                             (name, generator, pdk, grid_json, output_dir, time.time()))
+            self._db.executemany("INSERT INTO points (sweep, point, params, rmult) VALUES (?, ?, ?, ?)",
+                                 ((name, i, canonical_params(params), routing_multiplier(params))
+                                  for i, params in enumerate(points)))
+        return len(points)
+
+    def sweep(self, name: str) -> sqlite3.Row:
+        row = self._db.execute("SELECT * FROM sweeps WHERE name=?", (name,)).fetchone()
+        if row is None:
+            raise ValueError(f"no sweep named {name!r} in {self.path}")
+        return row
+
+    def sweeps(self) -> List[str]:
+        return [row[0] for row in self._db.execute("SELECT name FROM sweeps ORDER BY created")]
+
+    def todo(self, name: str, retry_failed: bool = False) -> List[tuple]:
+        """(point, params) of the points that still have to be built"""
+        statuses = ("pending", "failed") if retry_failed else ("pending",)
+        rows = self._db.execute(f"SELECT point, params FROM points WHERE sweep=? AND status IN "
+                                f"({','.join('?' * len(statuses))}) ORDER BY point", (name, *statuses))
+        return [(row["point"], json.loads(row["params"])) for row in rows]
+
+    def record(self, name: str, result: PointResult) -> None:
+        values = [getattr(result, column) for column in _RESULT_COLUMNS]
+        with self._db:
+            self._db.execute(f"UPDATE points SET {', '.join(c + '=?' for c in _RESULT_COLUMNS)} "
+                             f"WHERE sweep=? AND point=?", (*values, name, result.point))
+
+    def status_counts(self, name: str) -> Dict[str, int]:
+        rows = self._db.execute("SELECT status, COUNT(*) FROM points WHERE sweep=? GROUP BY status", (name,))
+        return {status: count for status, count in rows}
+
+    def results(self, name: str, status: Optional[str] = "done") -> List[Dict]:
+        """Points of a sweep as dicts, params decoded"""
+        query, args = "SELECT * FROM points WHERE sweep=?", [name]
+        if status:
+            query, args = query + " AND status=?", args + [status]
+        rows = []
+        for row in self._db.execute(query + " ORDER BY point", args):
+            row = dict(row)
+            row["params"] = json.loads(row["params"])
+            rows.append(row)
+        return rows
+
+    def pareto(self, name: str, rmult_key: Optional[str] = None) -> List[Dict]:
+        """
+        Points on the area vs. routing multiplier Pareto front: no other point has a
+        smaller area with at least the same routing multiplier.
+
+        Args:
+            name: Sweep name
+            rmult_key: Swept parameter to use as the routing multiplier (e.g.
+                "lo_fet_config.sd_rmult"), default the sum of all *rmult parameters
+
+        Returns:
+            list: result dicts ordered by area, each with an "rmult" entry
+        """
+        rows = self.results(name)
+        if rmult_key:
+            for row in rows:
+                row["rmult"] = row["params"][rmult_key]
+        front, best = [], None
+        for row in sorted(rows, key=lambda row: (row["area"], -row["rmult"])):
+            if best is None or row["rmult"] > best:
+                front.append(row)
+                best = row["rmult"]
+        return front
+
+
+@dataclass
+class SweepProgress:
+    """Result of run_sweep"""
+    name: str
+    built: int
+    failed: int
+    counts: Dict[str, int]
+    elapsed: float
+
+    def __str__(self) -> str:
+        counts = ", ".join(f"{status} {count}" for status, count in sorted(self.counts.items()))
+        return (f"sweep {self.name}: built {self.built}, failed {self.failed} in {self.elapsed:.1f} s "
+                f"(total: {counts})")
+
+
+def run_sweep(
+    store: SweepStore,
+    name: str,
+    generator: Optional[str] = None,
+    grid: Optional[Dict[str, Sequence]] = None,
+    pdk: str = "gf180",
+    output_dir: Optional[str] = None,
+    processes: Optional[int] = None,
+    drc: bool = False,
+    retry_failed: bool = False,
+    cell_cache_entries: Optional[int] = 2048,
+    progress: Optional[Callable[[PointResult], None]] = None,
+    memo: Optional[FailureMemo] = None,
+) -> SweepProgress:
+    """
+    Build every pending point of a sweep over a process pool, committing each result.
+
+    Calling it again with the same name resumes: finished and failed points
+    are not built again (failed ones are with retry_failed). generator and
+    grid are only needed the first time.
+
+    Args:
+        store: Results store
+        name: Sweep name
+        generator: "gilbert_mixer", "cmirror" or "module:qualname" of a function (pdk, **params) -> Component
+        grid: {parameter: values}, dotted names address config fields (e.g. "lo_fet_config.sd_rmult")
+        pdk: glayout PDK attribute name
+        output_dir: Directory for the per point GDS files (and DRC reports), None: no artifacts
+        processes: Worker processes (default os.cpu_count(), 1: build in this process)
+        drc: Run magic DRC on each GDS file and store the error count (needs output_dir)
+        retry_failed: Build failed points again
+        cell_cache_entries: @cell cache budget of each worker (None: gdsfactory's unbounded dict)
+        progress: Called with each PointResult as it is stored
+        memo: Generator calls go through memo.call, so points known to fail with
+            the current generator source fail without being built (KnownFailure)
+
+    Raises:
+        ValueError: drc without output_dir, or an in-memory memo with worker processes
+
+    Returns:
+        SweepProgress: counts of this run and of the whole sweep
+    """
+    if generator is not None and grid is not None:
+        store.create_sweep(name, generator, grid, pdk, output_dir)
+    sweep = store.sweep(name)
+    if drc and not sweep["output_dir"]:
+        raise ValueError("drc needs an output_dir to write the GDS files to")
+    todo = store.todo(name, retry_failed)
+    args = (sweep["generator"], sweep["pdk"])
+    start = time.perf_counter()
+    built = failed = 0
+
+    def store_result(result: PointResult) -> None:
+        nonlocal built, failed
+        store.record(name, result)
+        built += result.status == "done"
+        failed += result.status == "failed"
+        if progress is not None:
+            progress(result)
+
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(todo) > 1:
+        if memo is not None and memo.path == ":memory:":
+            raise ValueError("an in-memory failure memo cannot be shared with worker processes")
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(cell_cache_entries,)) as pool:
+            futures = [pool.submit(run_point, *args, point, params, sweep["output_dir"], drc, memo)
+                       for point, params in todo]
+            for future in as_completed(futures):
+                store_result(future.result())
+    else:
+        for point, params in todo:
+            store_result(run_point(*args, point, params, sweep["output_dir"], drc, memo))
+    return SweepProgress(name, built, failed, store.status_counts(name), time.perf_counter() - start)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Resumable GilbertMixerInterdigited / CmirrorWithDecap sweeps")
+    parser.add_argument("store", help="SQLite results file")
+    parser.add_argument("name", help="sweep name")
+    parser.add_argument("--generator", help=f"{' or '.join(GENERATORS)} or module:qualname (new sweeps)")
+    parser.add_argument("--grid", help="JSON {parameter: [values]} (new sweeps), or @file.json")
+    parser.add_argument("--pdk", default="gf180")
+    parser.add_argument("--output-dir", help="directory for the GDS files and DRC reports of each point")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes")
+    parser.add_argument("--drc", action="store_true", help="run magic DRC on every point")
+    parser.add_argument("--retry-failed", action="store_true", help="build failed points again")
+    parser.add_argument("--pareto", action="store_true", help="only print the area vs. rmult Pareto front")
+    parser.add_argument("--rmult-key", help="parameter used as routing multiplier for --pareto")
+    parser.add_argument("--failure-memo", help="SQLite file of known failing points, skipped without building them")
+    args = parser.parse_args(argv)
+
+    grid = None
+    if args.grid:
+        if args.grid.startswith("@"):
+            with open(args.grid[1:]) as f:
+                grid = json.load(f)
+        else:
+            grid = json.loads(args.grid)
+    memo = FailureMemo(args.failure_memo) if args.failure_memo else None
+    with SweepStore(args.store) as store:
+        if not args.pareto:
+            print(run_sweep(store, args.name, args.generator, grid, args.pdk, args.output_dir, args.processes,
+                            args.drc, args.retry_failed,
+                            progress=lambda r: print(f"point {r.point}: {r.status}", flush=True), memo=memo))
+        for row in store.pareto(args.name, args.rmult_key):
+            print(f"area {row['area']:10.2f}  rmult {row['rmult']}  {row['params']}")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Geometric XOR of a regenerated layout against a golden GDS.
+Exits with status 1 when the layouts differ, e.g.
+
+    python tests/diff_gds.py Cmirror_with_decap/lvs/gds/nmos_Cmirror_with_decap.gds Cmirror_with_decap.gds
+"""
+
+import os
+import sys
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+from gds_tools.gds_diff import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+List or invalidate the sweep failure memo (known failing generator calls).
+Run prune after upgrading glayout to drop entries recorded against the old sources, e.g.
+
+    python tests/failure_memo.py list --generator nmos
+    python tests/failure_memo.py prune
+"""
+
+import os
+import sys
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+from sweep.failure_memo import main
+
+if __name__ == "__main__":
+    sys.exit(main())
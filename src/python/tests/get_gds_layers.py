@@ -1,5 +1,28 @@
+import argparse
+import os
+import sys
+
 from glayout import gf180
 
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+parser = argparse.ArgumentParser(description="Print the gf180 layer map, or per-layer statistics of GDS files")
+parser.add_argument("gds_files", nargs="*", help="GDS files to scan (memory-mapped, no geometry is loaded)")
+parser.add_argument("--hierarchical", action="store_true", help="Report per-cell counts instead of flattening from the top cell")
+args = parser.parse_args()
+
+layers = getattr(gf180, 'layers', None) or getattr(gf180, '_layers', None)
+
+if args.gds_files:
+    from gds_tools import print_summary, scan_gds
+
+    layer_names = {tuple(gds_info): name for name, gds_info in layers.items()} if layers else None
+    for gds_file in args.gds_files:
+        print_summary(scan_gds(gds_file), layer_names=layer_names, flat=not args.hierarchical)
+        print()
+    sys.exit(0)
+
 # Try to access the PDK's internal layer mapping
 try:
     # This might work depending on the PDK implementation
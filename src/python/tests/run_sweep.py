@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Run or resume a checkpointed GilbertMixerInterdigited / CmirrorWithDecap sweep, e.g.
+
+    python tests/run_sweep.py sweeps.sqlite gilbert --generator gilbert_mixer \
+        --grid '{"lo_width": [8.0, 16.0], "lo_fingers": [2, 4], "rf_width": [4.0], "rf_fingers": [2],
+                 "lo_fet_config.sd_rmult": [1, 2, 3]}' --output-dir sweep_gds
+    python tests/run_sweep.py sweeps.sqlite gilbert            # resume after a crash
+    python tests/run_sweep.py sweeps.sqlite gilbert --pareto   # area vs. rmult front
+"""
+
+import os
+import sys
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+from sweep.runner import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,24 +2,74 @@
 """
 Stress test script for NMOS transistor layout generation.
 Places 100-200 NMOS transistors with different combinations of W, L, and options.
+
+Run with --streaming to serialize each transistor through gds_tools.GdsStreamWriter
+as soon as it is generated, instead of holding every Component until the end;
+the @cell cache is cleared after each transistor so its subcells are freed too.
+Peak memory (max RSS) is reported for both modes.
+
+Run with --cell-cache-entries N to bound gdsfactory's @cell cache to N entries
+(see sweep.cell_cache); its hit/miss/eviction counters are printed at the end.
+
+Combinations nmos cannot generate are filtered out up front with
+sweep.check_nmos, the skipped counts are printed per reason.
+
+Cells are packed with the skyline placer (placement.pack_skyline) by default,
+--placer grid restores the uniform grid of max column widths / row heights.
+
+Run with --failure-memo FILE to record transistors that fail to generate
+(see sweep.failure_memo) and skip them on the next run.
 """
 
 import os
 import sys
+import argparse
+import importlib
+import resource
 import itertools
 import numpy as np
 
 # Add the diff_pair module to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
 
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NMOS layout generation stress test")
+    parser.add_argument("--streaming", action="store_true",
+                        help="stream cells to the GDS file as they are generated")
+    parser.add_argument("--output", default="nmos_stress_test.gds", help="output GDS filename")
+    parser.add_argument("--cell-cache-entries", type=int, default=None,
+                        help="bound the @cell cache to this many components (LRU, via_array/tapring pinned)")
+    parser.add_argument("--failure-memo", default=None,
+                        help="SQLite file of known failing combinations, skipped without generating them")
+    parser.add_argument("--placer", choices=["skyline", "grid"], default="skyline",
+                        help="pack cells densely (skyline) or on a uniform grid")
+    args = parser.parse_args()
+
     try:
         from glayout import gf180, nmos
         from gdsfactory import Component
         from glayout.util.comp_utils import evaluate_bbox, move, movex, movey
+        from gds_tools import GdsStreamWriter
+        from placement import pack_skyline
+        from sweep import FailureMemo, KnownFailure, LegalityReport, check_nmos
+        cell_module = importlib.import_module("gdsfactory.cell")  # clear_cache, wrapped by install_cell_cache
+
+        cell_cache = None
+        if args.cell_cache_entries is not None:
+            from sweep import install_cell_cache
+            cell_cache = install_cell_cache(max_entries=args.cell_cache_entries,
+                                            pinned_prefixes=("via_array", "via_stack", "tapring"))
         
+        failure_memo = FailureMemo(args.failure_memo) if args.failure_memo else None
+
         print("NMOS TRANSISTOR STRESS TEST")
         print("="*60)
+        print(f"Mode: {'streaming GDS writer' if args.streaming else 'in-memory top level'}")
         print("Generating all NMOS transistor combinations with varying parameters...")
         
         # Define parameter ranges for stress testing
@@ -86,30 +136,46 @@ if __name__ == "__main__":
         ]
         
         # Create top-level component to hold all transistors
-        top_level = Component("NMOS_STRESS_TEST")
+        # In streaming mode only cell names and bboxes are kept, the cells go straight to disk
+        gds_filename = args.output
+        if args.streaming:
+            writer = GdsStreamWriter(gds_filename, "NMOS_STRESS_TEST", precision=gf180.gds_write_settings.precision)
+        else:
+            top_level = Component("NMOS_STRESS_TEST")
         
         # Generate all parameter combinations
         param_combinations = []
         
-        # Create all combinations of parameter space
-        for w in widths:
-            for l in lengths:
-                for f in fingers_list:
-                    for m in multipliers_list:
-                        if w % f == 0:
-                            for kwargs_idx, kwargs in enumerate(kwargs_variations):
-                                param_combinations.append((w, l, f, m, kwargs, kwargs_idx))
-                        else: 
-                            print(f"Skipping W={w}μm, F={f}: finger width is not integer")
+        # Create all combinations of parameter space and drop the ones that cannot build
+        # in one vectorized pass (sweep.legality), instead of finding out inside nmos()
+        W, L, F, M = (grid.ravel() for grid in np.meshgrid(widths, lengths, fingers_list, multipliers_list,
+                                                         indexing="ij"))
+        integer_fingers = np.mod(W, F) == 0  # keep the sweep to integer finger widths
+        skipped = np.count_nonzero(~integer_fingers)
+        if skipped:
+            print(f"Skipping {skipped} W/F combinations: finger width is not integer")
+        for kwargs_idx, kwargs in enumerate(kwargs_variations):
+            report = check_nmos(gf180, W, L, F, M, sd_route_topmet=kwargs["sd_route_topmet"],
+                                gate_route_topmet=kwargs["gate_route_topmet"], sd_rmult=kwargs["sd_rmult"],
+                                gate_rmult=kwargs["gate_rmult"], interfinger_rmult=kwargs["interfinger_rmult"])
+            keep = integer_fingers & report.legal
+            if np.any(integer_fingers & ~report.legal):
+                print(f"Skipping illegal combinations for kwargs_set={kwargs_idx}: "
+                      f"{LegalityReport(report.reasons[integer_fingers])}")
+            for i in np.flatnonzero(keep):
+                param_combinations.append((float(W[i]), float(L[i]), int(F[i]), int(M[i]), kwargs, kwargs_idx))
+        param_combinations.sort(key=lambda combination: combination[:4])
 
-        
         print(f"Generated {len(param_combinations)} parameter combinations")
         
         # Grid layout parameters
         grid_cols = int(np.ceil(np.sqrt(len(param_combinations))))
         grid_rows = int(np.ceil(len(param_combinations) / grid_cols))
         
-        print(f"Arranging in {grid_rows}x{grid_cols} grid")
+        if args.placer == "grid":
+            print(f"Arranging in {grid_rows}x{grid_cols} grid")
+        else:
+            print("Arranging with the skyline packer")
         
         # Spacing between transistors
         x_spacing = 5.0  # micrometers
@@ -117,6 +183,7 @@ if __name__ == "__main__":
         
         transistor_count = 0
         failed_count = 0
+        known_failure_count = 0
         
         # Track positions for dynamic placement
         current_x = 0.0
@@ -133,6 +200,7 @@ if __name__ == "__main__":
         # First pass: create all transistors and calculate their sizes
         transistor_refs = []
         transistor_sizes = []
+        transistor_origins = []  # bbox lower left corners, the skyline packer places bboxes
         
         for idx, (width, length, fingers, multipliers, kwargs, kwargs_idx) in enumerate(param_combinations):
             try:
@@ -141,7 +209,7 @@ if __name__ == "__main__":
                       f"kwargs_set={kwargs_idx}")
                 
                 # Create NMOS transistor
-                nmos_transistor = nmos(
+                nmos_params = dict(
                     pdk=gf180,
                     width=width,
                     length=length,
@@ -152,14 +220,32 @@ if __name__ == "__main__":
                     tie_layers=kwargs["substrate_tap_layers"],
                     **kwargs
                 )
+                if failure_memo is not None:
+                    nmos_transistor = failure_memo.call(nmos, **nmos_params)
+                else:
+                    nmos_transistor = nmos(**nmos_params)
                 
-                # Add to top level component
-                transistor_ref = top_level << nmos_transistor
-                transistor_ref.name = f"NMOS_{idx}"
-                
-                # Get transistor size
-                bbox = evaluate_bbox(nmos_transistor)
+                if args.streaming:
+                    # Serialize now and keep only the cell name, the Component can be released
+                    cell_name = writer.write_component(nmos_transistor)
+                    xmin, ymin, xmax, ymax = writer.cell_bbox(cell_name)
+                    bbox = (xmax - xmin, ymax - ymin)
+                    origin = (xmin, ymin)
+                    transistor_ref = cell_name
+                    # The @cell cache would keep every multiplier/via_array of this transistor alive;
+                    # the writer recognises cells rebuilt later by their content
+                    del nmos_transistor
+                    cell_module.clear_cache()
+                else:
+                    # Add to top level component
+                    transistor_ref = top_level << nmos_transistor
+                    transistor_ref.name = f"NMOS_{idx}"
+                    
+                    # Get transistor size
+                    bbox = evaluate_bbox(nmos_transistor)
+                    origin = tuple(nmos_transistor.bbox[0])
                 transistor_sizes.append(bbox)
+                transistor_origins.append(origin)
                 transistor_refs.append((transistor_ref, idx))
                 
                 # Update column and row size tracking
@@ -176,58 +262,98 @@ if __name__ == "__main__":
                 
                 transistor_count += 1
                 
+            except KnownFailure as e:
+                print(f"  ⚠ Skipped transistor {idx+1}: {e}")
+                known_failure_count += 1
+                transistor_refs.append(None)
+                transistor_sizes.append(None)
+                transistor_origins.append(None)
+                continue
             except Exception as e:
                 print(f"  ⚠ Failed to create transistor {idx+1}: {e}")
                 failed_count += 1
                 transistor_refs.append(None)
                 transistor_sizes.append(None)
+                transistor_origins.append(None)
                 continue
         
-        # Second pass: position transistors based on calculated grid sizes
+        # Second pass: position transistors, packed by the skyline placer or on the grid
+        placed = [i for i, size_data in enumerate(transistor_sizes) if size_data is not None]
+        positions = {}
+        if args.placer == "skyline" and placed:
+            packing = pack_skyline([transistor_sizes[i] for i in placed], spacing=x_spacing)
+            offsets = packing.offsets([transistor_origins[i] for i in placed])
+            positions = dict(zip(placed, map(tuple, offsets)))
+            print(f"✓ Skyline packing: {packing}")
+        else:
+            # Cumulative column widths and row heights
+            col_starts = np.concatenate(([0.0], np.cumsum(col_widths))) + np.arange(grid_cols + 1) * x_spacing
+            row_starts = np.concatenate(([0.0], np.cumsum(row_heights))) + np.arange(grid_rows + 1) * y_spacing
+
         for transistor_data, size_data in zip(transistor_refs, transistor_sizes):
             if transistor_data is None or size_data is None:
                 continue
                 
             transistor_ref, idx = transistor_data
-            row = idx // grid_cols
-            col = idx % grid_cols
-            
-            # Calculate position based on cumulative column widths and row heights
-            x_pos = sum(col_widths[:col]) + col * x_spacing
-            y_pos = sum(row_heights[:row]) + row * y_spacing
+            if args.placer == "skyline":
+                x_pos, y_pos = positions[idx]
+            else:
+                x_pos = col_starts[idx % grid_cols]
+                y_pos = row_starts[idx // grid_cols]
             
             # Move transistor to calculated position
-            transistor_ref.move((x_pos, y_pos))
+            if args.streaming:
+                writer.add_reference(transistor_ref, origin=(x_pos, y_pos))
+            else:
+                transistor_ref.move((x_pos, y_pos))
         
         print(f"\n✓ Successfully created {transistor_count} transistors")
         if failed_count > 0:
             print(f"⚠ Failed to create {failed_count} transistors")
+        if known_failure_count > 0:
+            print(f"⚠ Skipped {known_failure_count} known failing transistors ({failure_memo.path})")
         
-        # Set component name
-        top_level.name = "NMOS_STRESS_TEST"
-        
-        # Get bounding box info
-        bbox = evaluate_bbox(top_level)
-        print(f"✓ Total layout size: {bbox[0]:.1f} x {bbox[1]:.1f} μm")
-        
-        # Write GDS file
-        print("✓ Writing GDS file...")
-        gds_filename = 'nmos_stress_test.gds'
-        top_level.write_gds(gds_filename)
-        print(f"  - GDS file: {gds_filename}")
+        if args.streaming:
+            # Get bounding box info from the placement records
+            xmin, ymin, xmax, ymax = writer.top_bbox
+            print(f"✓ Total layout size: {xmax - xmin:.1f} x {ymax - ymin:.1f} μm")
+            
+            # Assemble the top cell from the spooled references
+            print("✓ Finishing GDS file...")
+            writer.close()
+            print(f"  - GDS file: {gds_filename}")
+        else:
+            # Set component name
+            top_level.name = "NMOS_STRESS_TEST"
+            
+            # Get bounding box info
+            bbox = evaluate_bbox(top_level)
+            print(f"✓ Total layout size: {bbox[0]:.1f} x {bbox[1]:.1f} μm")
+            
+            # Write GDS file
+            print("✓ Writing GDS file...")
+            top_level.write_gds(gds_filename)
+            print(f"  - GDS file: {gds_filename}")
+            
+            # Show layout (if display available)
+            try:
+                top_level.show()
+                print("✓ Layout displayed successfully")
+            except Exception as e:
+                print(f"⚠ Could not display layout: {e}")
         
-        # Show layout (if display available)
-        try:
-            top_level.show()
-            print("✓ Layout displayed successfully")
-        except Exception as e:
-            print(f"⚠ Could not display layout: {e}")
+        print(f"✓ Peak memory (max RSS): {peak_rss_mb():.1f} MB")
+        if cell_cache is not None:
+            print(f"✓ {cell_cache.stats()}")
         
         # Simple DRC checks (skip if they fail due to environment issues)
         print("\n...Running DRC...")
         
         try:
-            drc_result = gf180.drc_magic(top_level, top_level.name)
+            if args.streaming:
+                drc_result = gf180.drc_magic(gds_filename, "NMOS_STRESS_TEST")
+            else:
+                drc_result = gf180.drc_magic(top_level, top_level.name)
             print(f"✓ Magic DRC result: {drc_result}")
         except Exception as e:
             print(f"⚠ Magic DRC skipped: {e}")
@@ -244,6 +370,7 @@ if __name__ == "__main__":
         print(f"STRESS TEST COMPLETED!")
         print(f"Successfully generated {transistor_count} NMOS transistors")
         print(f"GDS file: {gds_filename}")
+        print(f"Peak memory (max RSS): {peak_rss_mb():.1f} MB")
         print("="*60)
         
     except ImportError as e:
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test for the bounded @cell cache used in parameter sweeps.
+Builds a series of NMOS cells with the cache installed and checks that the
+entry budget holds, pinned primitives survive and the counters add up.
+"""
+
+import os
+import sys
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+if __name__ == "__main__":
+    try:
+        import importlib
+        from glayout import gf180, nmos
+        from sweep import bounded_cell_cache, get_cell_cache
+
+        print("BOUNDED CELL CACHE TEST")
+        print("="*60)
+
+        gf_cell = importlib.import_module("gdsfactory.cell")
+        previous = gf_cell.CACHE
+
+        with bounded_cell_cache(max_entries=64, pinned_prefixes=("via_stack",)) as cache:
+            assert get_cell_cache() is cache, "cache not installed"
+            for width in (1.0, 2.0, 3.0, 4.0):
+                nmos(gf180, width=width, fingers=2, with_dummy=(True, True))
+                assert len(cache) <= max(64, cache.stats().pinned), f"cache grew to {len(cache)} entries"
+            stats = cache.stats()
+            print(f"✓ {stats}")
+            assert stats.evictions > 0, "expected evictions with a 64 entry budget"
+            assert stats.pinned > 0 and all(name.startswith("via_stack") for name in cache._pinned), \
+                "pinned entries missing"
+            assert stats.inserts == stats.evictions + stats.rebuilds + len(cache), "counters do not add up"
+            assert stats.estimated_bytes > 0
+
+            # Rebuilding an identical cell re-inserts names that are already cached
+            rebuilds = cache.rebuilds
+            nmos(gf180, width=4.0, fingers=2, with_dummy=(True, True))
+            assert cache.rebuilds > rebuilds, "identical rebuild not detected"
+            print(f"✓ Identical rebuild re-inserted {cache.rebuilds - rebuilds} cached names")
+
+            # Shrinking the budget evicts down to the pinned entries
+            cache.resize(max_entries=0)
+            assert len(cache) == cache.stats().pinned
+            print(f"✓ Resize to 0 keeps {len(cache)} pinned entries")
+
+        assert gf_cell.CACHE is previous, "previous cache not restored"
+        print("✓ Previous cache restored")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - cell cache stays within budget")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
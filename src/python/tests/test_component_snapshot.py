@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Round-trip test for the component snapshot format.
+Saves a multiplier NMOS and a small hierarchy with ports, reloads them and
+compares geometry, ports and hierarchy with the originals.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def assert_same_component(original, loaded):
+    assert original.name == loaded.name, f"name {loaded.name}, expected {original.name}"
+    expected = original.get_polygons(by_spec=True)
+    actual = loaded.get_polygons(by_spec=True)
+    assert set(expected) == set(actual), "layer sets differ"
+    for layer, polygons in expected.items():
+        assert len(polygons) == len(actual[layer]), f"layer {layer}: polygon count differs"
+        assert all(np.array_equal(a, b) for a, b in zip(polygons, actual[layer])), f"layer {layer}: points differ"
+    assert list(original.ports) == list(loaded.ports), "port names or order differ"
+    for name, port in original.ports.items():
+        other = loaded.ports[name]
+        assert np.allclose(port.center, other.center), f"port {name}: center differs"
+        assert (port.width, port.orientation, tuple(port.layer), port.port_type) == \
+            (other.width, other.orientation, tuple(other.layer), other.port_type), f"port {name} differs"
+    assert [r.parent.name for r in original.references] == [r.parent.name for r in loaded.references], \
+        "references differ"
+
+
+if __name__ == "__main__":
+    try:
+        from glayout import gf180, nmos
+        from gdsfactory.component import Component
+        from gds_tools import ComponentSnapshot, load_snapshot, save_snapshot
+
+        print("COMPONENT SNAPSHOT TEST")
+        print("="*60)
+
+        transistor = nmos(gf180, width=4.0, fingers=2, multipliers=2, with_dummy=(True, True))
+
+        top = Component("snapshot_top")
+        left = top << transistor
+        right = top << transistor
+        right.movex(20).mirror_x()
+        top.add_ports(left.get_ports_list(), prefix="L_")
+        top.add_ports(right.get_ports_list(), prefix="R_")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for component in (transistor, top):
+                path = os.path.join(tmp, component.name)
+                start = time.time()
+                save_snapshot(component, path)
+                save_ms = (time.time() - start) * 1e3
+                start = time.time()
+                loaded = load_snapshot(path)
+                load_ms = (time.time() - start) * 1e3
+                assert_same_component(component, loaded)
+                print(f"✓ {component.name}: {len(component.ports)} ports round-trip "
+                      f"(save {save_ms:.1f} ms, load {load_ms:.1f} ms)")
+
+            # Lazy access without rebuilding the component
+            snapshot = ComponentSnapshot(os.path.join(tmp, top.name))
+            assert isinstance(snapshot.points, np.memmap), "points are not memory-mapped"
+            port = snapshot.port("R_gate_W")
+            assert np.allclose((port["x"], port["y"]), top.ports["R_gate_W"].center), "R_gate_W center differs"
+            metal1 = snapshot.polygons((34, 0), cell=transistor.name)
+            assert len(metal1) == len(transistor.get_polygons(by_spec=(34, 0))), "metal1 polygon count differs"
+            print(f"✓ Lazy access: {len(snapshot.cell_names)} cells, {len(snapshot.layers)} layers, "
+                  f"{len(metal1)} metal1 polygons in {transistor.name}")
+            if "netlist" in transistor.info:
+                assert "netlist" in snapshot.info(transistor.name), "netlist info not restored"
+                print("✓ Netlist info restored")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - snapshots round-trip components with ports")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test for the PVT corner sweep. Builds a small stand-in for the gf180mcu model
+library, expands every design_tb testbench over MOS, resistor and temperature
+corners, checks that netlists which do not depend on a corner are simulated
+once, and runs a few variants through the stub simulator.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def write_library(pdk_root, models_per_section=2000):
+    """sm141064.ngspice and design.ngspice with the sections the testbenches use"""
+    directory = os.path.join(pdk_root, "gf180mcuD", "libs.tech", "ngspice")
+    os.makedirs(directory, exist_ok=True)
+    sections = ["typical", "ff", "ss", "fs", "sf", "mimcap_typical", "mimcap_ff", "mimcap_ss", "res_typical",
+                "res_ff", "res_ss", "cap_mim", "bjt_typical", "diode_typical", "moscap_typical"]
+    with open(os.path.join(directory, "sm141064.ngspice"), "w") as f:
+        for i, section in enumerate(sections):
+            f.write(f"* {section} corner\n.lib {section}\n.param corner_{section}={i}\n")
+            for m in range(models_per_section):
+                f.write(f".model m{m}_{section} nmos level=54\n+ vth0={0.5 + i * 0.01:.3f} u0={400 + m}\n")
+            f.write(".endl\n")
+    with open(os.path.join(directory, "design.ngspice"), "w") as f:
+        f.write(".param sw_stat_global=0 sw_stat_mismatch=0\n")
+    return directory
+
+
+if __name__ == "__main__":
+    try:
+        from simulation import (MOS_CORNERS, RES_CORNERS, STUB_SIMULATOR, Corner, NetlistExpander, SimJob,
+                                apply_corner, corner_grid, expand_corners, run_corners, testbench_jobs)
+
+        print("PVT CORNER SWEEP TEST")
+        print("="*60)
+
+        corner = Corner("ff", res="res_ss", temperature=85)
+        deck = apply_corner(".lib /pdk/sm141064.ngspice typical\n.lib /pdk/sm141064.ngspice res_typical\n"
+                            ".lib /pdk/sm141064.ngspice cap_mim\n.control\nop\n.endc\n.end\n", corner)
+        assert deck.splitlines()[:5] == [".lib /pdk/sm141064.ngspice ff", ".lib /pdk/sm141064.ngspice res_ss",
+                                         ".lib /pdk/sm141064.ngspice cap_mim", ".temp 85", ".control"]
+        assert corner.name == "ff_res_ss_85C"
+        print("✓ Model sections and temperature rewritten")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            library = write_library(os.path.join(tmp, "pdk"))
+            jobs = testbench_jobs()
+            # A mirror deck without resistor models does not change across the res corners
+            with open(next(job.netlist for job in jobs if job.name == "Local_mirror_nmos_tb")) as f:
+                no_res = "".join(line for line in f if "res_typical" not in line)
+            jobs.append(SimJob("Local_mirror_nmos_no_res", jobs[0].netlist, deck=no_res))
+            corners = corner_grid(MOS_CORNERS, res=RES_CORNERS, temperatures=(-40, 0, 27, 85, 125))
+            expander = NetlistExpander()
+
+            plan = expand_corners(jobs, corners, pdk_root=os.path.join(tmp, "pdk"), expander=expander)
+            print(plan)
+            # Only the pad models the hierarchical testbench includes from its author's machine
+            assert all("Chipathon2025_pads" in path for path in plan.missing), plan.missing
+            assert len(plan.variants) == len(jobs) * len(corners) == 750
+            assert plan.duplicates == len(corners) - len(corners) // len(RES_CORNERS)
+            assert plan.elapsed < 2.0, f"expansion took {plan.elapsed:.2f} s"
+            print(f"✓ {len(plan.variants)} variants, {plan.duplicates} duplicates removed "
+                  f"in {plan.elapsed * 1e3:.0f} ms")
+
+            # Expanded netlists inline the chosen sections and stay in sync with the library
+            variant = plan.variants[0]
+            expanded = expander.expand(variant.job.deck)
+            assert any(line.startswith(".param corner_typical=") for line in expanded)
+            assert not any(line.startswith(".param corner_ff=") for line in expanded)
+            model = os.path.join(library, "sm141064.ngspice")
+            with open(model, "a") as f:
+                f.write("* appended\n.lib typical_new\n.endl\n")
+            stat = os.stat(model)
+            os.utime(model, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert expander.digest(variant.job.deck) == variant.digest, "a new section changes no used section"
+            with open(model) as f:
+                text = f.read()
+            with open(model, "w") as f:
+                f.write(text.replace(".param corner_typical=0", ".param corner_typical=99"))
+            os.utime(model, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+            assert expander.digest(variant.job.deck) != variant.digest
+            print("✓ Section digests follow library edits")
+
+            start = time.perf_counter()
+            small = expand_corners(jobs[:2], corner_grid(("typical", "ff", "ss"), temperatures=(27, 85)),
+                                   pdk_root=os.path.join(tmp, "pdk"))
+            table = run_corners(small, os.path.join(tmp, "runs"), ["temp"], simulator=STUB_SIMULATOR)
+            print(table)
+            temps = table.values("temp", jobs[0].name)
+            assert temps[(jobs[0].name, "ff_85C")] == 85 and temps[(jobs[0].name, "ss_27C")] == 27
+            assert all(result.status == "done" for result in table.results.values())
+            print(f"✓ {len(table.rows)} variants simulated and tabulated in {time.perf_counter() - start:.1f} s")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - corner sweep works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test for the electromigration checker. Writes an ngspice style binary
+rawfile for the current mirror testbench, maps its currents onto the
+mirror layout, and checks that a current large enough to break the EM
+limits gets rmult suggestions that relieve the rebuilt layout.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory and the Cmirror package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Cmirror_with_decap'))
+
+
+def write_rawfile(path, plots):
+    """Binary rawfile of [(plot name, {vector: values})] as ngspice writes it"""
+    with open(path, "wb") as f:
+        for name, vectors in plots:
+            points = len(next(iter(vectors.values())))
+            header = ["Title: * test", "Date: today", f"Plotname: {name}", "Flags: real",
+                      f"No. Variables: {len(vectors)}", f"No. Points: {points}", "Variables:"]
+            header += [f"\t{i}\t{v}\t{'time' if v == 'time' else 'current'}" for i, v in enumerate(vectors)]
+            f.write(("\n".join(header) + "\nBinary:\n").encode())
+            f.write(np.column_stack(list(vectors.values())).astype("<f8").tobytes())
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from glayout import gf180
+        from parasitics import CMIRROR_ROUTES, CMIRROR_TB_CURRENTS, currents_from_raw, em_check
+        from Cmirror_with_decap import CMirrorConfig, CmirrorWithDecap
+
+        print("EM CHECK TEST")
+        print("="*60)
+
+        time_points = np.linspace(0, 1e-8, 101)
+        i_out = 4e-3 * (1 + 0.1 * np.sin(2 * np.pi * 1e8 * time_points))
+        with tempfile.TemporaryDirectory() as tmp:
+            raw = os.path.join(tmp, "Local_mirror_nmos_tb.raw")
+            write_rawfile(raw, [("Operating Point", {"v1#branch": np.array([-1e-3]), "vmeas1#branch": np.array([4e-3])}),
+                                ("Transient Analysis", {"time": time_points, "v1#branch": -i_out, "i(vmeas1)": i_out})])
+            currents, time_vector = currents_from_raw(raw, CMIRROR_TB_CURRENTS)
+            assert np.allclose(currents["I_OUT"], i_out) and np.allclose(time_vector, time_points)
+            assert np.allclose(currents["VSS"], i_out + 10e-6)
+            op, no_time = currents_from_raw(raw, CMIRROR_TB_CURRENTS, plot="operating")
+            assert no_time is None and np.allclose(op["I_OUT"], 4e-3)
+        print("✓ Rawfile currents mapped onto layout nets (op and transient plots)")
+
+        config = CMirrorConfig()
+        layout = CmirrorWithDecap(gf180, 6.0, 2.0, 6, 2, cmirror_config=config).build()
+        configs = {"cmirror_config": config}
+        report = em_check(layout, gf180, currents, time=time_vector, configs=configs, routes=CMIRROR_ROUTES)
+        print(report)
+        assert not report.passed, "4 mA should break the 1 um scale routes"
+        by_field = {s.field: s for s in report.suggestions}
+        assert by_field and all(s.suggested >= 1 for s in by_field.values())
+        assert any(s.suggested > s.current for s in by_field.values())
+        print(f"✓ {len(report.violations)} violations, suggested "
+              + ", ".join(f"{s.field}={s.suggested}" for s in report.suggestions))
+
+        # Density scales with the current: 1 uA is far below every limit
+        small = em_check(layout, gf180, {net: 1e-6 for net in currents})
+        assert small.passed and small.worst() < 0.01
+        print(f"✓ 1 uA per net passes (worst {small.worst():.3%} of limit)")
+
+        # The suggested config widens the routes it sizes
+        fixed = report.apply(configs)["cmirror_config"]
+        rebuilt = CmirrorWithDecap(gf180, 6.0, 2.0, 6, 2, cmirror_config=fixed).build()
+        after = em_check(rebuilt, gf180, currents, time=time_vector, configs={"cmirror_config": fixed},
+                         routes=CMIRROR_ROUTES)
+        print(after)
+        for s in report.suggestions:
+            if s.suggested > s.current:
+                worst = max(a.worst_ratio for a in after.suggestions if a.field == s.field)
+                assert worst < s.worst_ratio, f"{s.field}: {worst:.2f} not below {s.worst_ratio:.2f}"
+                print(f"✓ {s.field} {s.current} -> {s.suggested}: worst {s.worst_ratio:.1%} -> {worst:.1%}")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - EM check and rmult suggestions work")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test for the persistent failure memo used by sweep drivers.
+Records an NMOS combination that fails inside glayout, checks it is skipped
+on the next lookup (also from a fresh memo on the same file), that other
+parameters and changed sources miss, that the sweep wrappers hash the
+builder files they forward to, that transient errors are not recorded,
+that prune/clear invalidate it, and that run_sweep consults it.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def build_nmos(pdk, **params):
+    """run_sweep generator, "__main__:build_nmos" resolves in the forked workers"""
+    from glayout import nmos
+    return nmos(pdk, **params)
+
+
+def out_of_memory(**params):
+    raise MemoryError("worker ran out of memory")
+
+
+def missing_port(**params):
+    return [][params["index"]]
+
+if __name__ == "__main__":
+    try:
+        from glayout import gf180, nmos
+        from sweep import FailureMemo, KnownFailure, SweepStore, run_sweep
+        from sweep.failure_memo import main, source_hash
+        from sweep.runner import build_cmirror, build_gilbert_mixer
+
+        print("FAILURE MEMO TEST")
+        print("="*60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "failures.sqlite")
+            bad = dict(pdk=gf180, width=0.47, fingers=2, tie_layers=("met2", "met1"))
+
+            with FailureMemo(path) as memo:
+                try:
+                    memo.call(nmos, **bad)
+                    raise AssertionError("width 0.47 should fail in via_array")
+                except ValueError as e:
+                    print(f"✓ First call failed and was recorded: {e}")
+                assert memo.lookup(nmos, dict(bad, fingers=1)) is None, "different parameters must miss"
+                assert memo.call(nmos, pdk=gf180, width=1.0, fingers=2) is not None
+                assert len(memo.failures()) == 1, "successful calls must not be recorded"
+
+            # Same file, new process state: the failure is known, tuple/list spelling does not matter
+            with FailureMemo(path) as memo:
+                try:
+                    memo.call(nmos, **dict(bad, tie_layers=["met2", "met1"]))
+                    raise AssertionError("known failure was generated again")
+                except KnownFailure as e:
+                    assert e.record.exception == "ValueError" and e.record.hits == 1
+                    print(f"✓ Second call skipped: {e}")
+
+                # Entries recorded against other sources are stale
+                memo._hashes[memo._key(nmos, {})[0]] = "0" * 16
+                memo.record(nmos, dict(bad, width=0.45), ValueError("old glayout"))
+                memo._hashes.clear()
+                assert len(memo.failures()) == 2
+                assert memo.prune() == 1 and len(memo.failures()) == 1, "prune kept the stale entry"
+                print("✓ Prune removed the entry of a changed source")
+
+            # Wrappers hash the builder they forward to, editing it invalidates their entries
+            builder = os.path.join(tmp, "builder.py")
+            with open(builder, "w") as f:
+                f.write("def build(pdk): raise ValueError('bad geometry')\n")
+            build_nmos.sources = (builder,)
+            before = source_hash(build_nmos)
+            with open(builder, "a") as f:
+                f.write("# fixed\n")
+            assert source_hash(build_nmos) != before, "builder edit kept the source hash"
+            del build_nmos.sources
+            assert all(os.path.isfile(path) for path in build_gilbert_mixer.sources + build_cmirror.sources)
+            print("✓ Source hash covers the builder files of the sweep wrappers")
+
+            with FailureMemo(path) as memo:
+                for _ in range(2):
+                    try:
+                        memo.call(out_of_memory, width=1.0)
+                        raise AssertionError("MemoryError swallowed")
+                    except MemoryError:
+                        pass
+                assert memo.lookup(out_of_memory, {"width": 1.0}) is None, "transient failure recorded"
+                strict = FailureMemo(":memory:", errors=(MemoryError,))
+                try:
+                    strict.call(out_of_memory, width=1.0)
+                except MemoryError:
+                    assert strict.lookup(out_of_memory, {"width": 1.0}) is not None
+                default = FailureMemo(":memory:")
+                try:
+                    default.call(missing_port, index=3)
+                except IndexError:
+                    assert default.lookup(missing_port, {"index": 3}) is not None, "IndexError not recorded"
+                print("✓ Transient errors are not recorded unless configured, IndexError is")
+
+            assert main(["list", "--db", path]) == 0
+            assert main(["clear", "--db", path, "--generator", "nmos"]) == 0
+            with FailureMemo(path) as memo:
+                assert not memo.failures(), "clear left entries behind"
+            print("✓ CLI list/clear")
+
+            # run_sweep routes the builds through the memo, in the workers as well
+            with SweepStore(os.path.join(tmp, "sweeps.sqlite")) as store, FailureMemo(path) as memo:
+                grid = {"width": [0.47, 1.0], "fingers": [2]}
+                progress = run_sweep(store, "nmos", "__main__:build_nmos", grid, processes=2, memo=memo)
+                assert progress.counts == {"done": 1, "failed": 1}, progress.counts
+                assert len(memo.failures("build_nmos")) == 1
+                progress = run_sweep(store, "nmos", processes=1, retry_failed=True, memo=memo)
+                failed, = store.results("nmos", "failed")
+                assert progress.failed == 1 and failed["error"].startswith("KnownFailure")
+                assert memo.failures("build_nmos")[0].hits == 1
+                print("✓ run_sweep skips the point the memo knows to fail")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - failure memo skips known failures")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
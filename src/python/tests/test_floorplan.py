@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test for the simulated annealing floorplanner.
+Floorplans a Gilbert mixer, two current mirrors standing in for the output
+buffer bias and the biasing network, and a dummy block, then checks the
+result is overlap free, shorter in wirelength than the packing it started
+from, and that the built top level puts every pin where the floorplan says.
+Also builds a block by hand with block_from_component.
+"""
+
+import os
+import sys
+import time
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Gilbert_mixer_intedigited'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Cmirror_with_decap'))
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from glayout import gf180, nmos
+        from Gilbert_mixer_interdigited import GilbertMixerInterdigited
+        from Cmirror_with_decap import CmirrorWithDecap
+        from placement import block_from_component, floorplan
+
+        print("FLOORPLANNER TEST")
+        print("="*60)
+
+        gilbert = GilbertMixerInterdigited(gf180, 8.0, 2, 4.0, 2).build()
+        mirror_pos = CmirrorWithDecap(gf180, 6.0, 2.0, 6, 2, component_name="bias_pos").build()
+        mirror_neg = CmirrorWithDecap(gf180, 6.0, 2.0, 6, 2, component_name="bias_neg").build()
+        dummy = nmos(gf180, width=4.0, fingers=4)
+        nets = [
+            "gilbert.I_bias_pos bias_pos.I_OUT",
+            "gilbert.I_bias_neg bias_neg.I_OUT",
+            "bias_pos.I_BIAS bias_neg.I_BIAS",
+        ]
+        blocks = {"gilbert": gilbert, "bias_pos": mirror_pos, "bias_neg": mirror_neg, "dummy": dummy}
+
+        start = floorplan(blocks, nets, iterations=0)
+        t0 = time.perf_counter()
+        plan = floorplan(blocks, nets)
+        elapsed = time.perf_counter() - t0
+        print(f"✓ Start (skyline packing): {start}")
+        print(f"✓ Annealed in {elapsed:.1f} s: {plan}")
+        assert plan.wirelength < start.wirelength, "annealing did not shorten the nets"
+        assert plan.area < 1.1 * start.area, "annealing traded too much area for wirelength"
+
+        # No two blocks closer than the spacing
+        lo = plan.positions
+        hi = lo + np.array([block.size for block in plan.blocks]) + 10.0 - 1e-6
+        for i in range(len(lo)):
+            for j in range(i + 1, len(lo)):
+                assert not (np.all(lo[i] < hi[j]) and np.all(lo[j] < hi[i])), \
+                    f"{plan.blocks[i].name} overlaps {plan.blocks[j].name}"
+        print("✓ Blocks keep their spacing")
+
+        # Built layout: pin labels land where the floorplan put them (mirroring included)
+        top = plan.build("floorplan_test")
+        (xmin, ymin), (xmax, ymax) = top.bbox
+        assert abs(xmax - xmin - plan.width) < 1e-3 and abs(ymax - ymin - plan.height) < 1e-3
+        flat = top.flatten()
+        for block, position, mirrored in zip(plan.blocks, plan.positions, plan.mirrored):
+            for pin, (x, y) in block.pins.items():
+                x = block.size[0] - x if mirrored else x
+                expected = position + (x, y)
+                found = [label.origin for label in flat.labels if label.text == pin
+                         and np.allclose(label.origin, expected, atol=1e-3)]
+                assert found, f"{block.name}.{pin} not at {expected}"
+        print(f"✓ Built top level, mirrored blocks: {[b.name for b, m in zip(plan.blocks, plan.mirrored) if m]}")
+
+        # Blocks built by hand: pins relative to the bbox corner, unknown pins rejected
+        block = block_from_component("bias_pos", mirror_pos, ["I_OUT", "I_BIAS"])
+        (xmin, ymin), (xmax, ymax) = mirror_pos.bbox
+        assert np.allclose(block.size, (xmax - xmin, ymax - ymin))
+        for label in mirror_pos.labels:
+            if label.text in block.pins:
+                assert np.allclose(np.add(block.pins[label.text], (xmin, ymin)), label.origin)
+        try:
+            block_from_component("bias_pos", mirror_pos, ["V_RF"])
+            raise AssertionError("unknown pin accepted")
+        except ValueError as e:
+            print(f"✓ block_from_component: pins {sorted(block.pins)}, {e}")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - floorplan is legal and shortens the nets")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
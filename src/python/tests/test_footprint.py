@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test for the analytic footprint estimator.
+Builds Gilbert mixer and current mirror cells and checks that the predicted
+bounding box and pin label positions match the generated layout.
+"""
+
+import os
+import sys
+import time
+
+# Add the src/python directory and the builder modules to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Gilbert_mixer_intedigited'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Cmirror_with_decap'))
+
+# The builders snap some float-noisy values away from zero, allow one 2x grid step
+TOLERANCE = 0.011
+
+
+def max_error(predicted, actual):
+    return max(abs(p - a) for p, a in zip(predicted, actual))
+
+
+def bbox_of(component):
+    (xmin, ymin), (xmax, ymax) = component.bbox
+    return (xmin, ymin, xmax, ymax)
+
+
+if __name__ == "__main__":
+    try:
+        from glayout import gf180
+        from Gilbert_mixer_interdigited import GilbertMixerInterdigited, LOFETConfig, RFFETConfig
+        from Cmirror_with_decap import CmirrorWithDecap, CMirrorConfig
+        from sweep import estimate_cmirror_footprint, estimate_gilbert_footprint
+
+        print("FOOTPRINT ESTIMATOR TEST")
+        print("="*60)
+
+        gilbert_cases = [
+            dict(lo_width=20.0, lo_fingers=5, rf_width=10.0, rf_fingers=5,
+                 lo_fet_config=LOFETConfig(sd_rmult=2, gate_rmult=3, interfinger_rmult=2),
+                 rf_fet_config=RFFETConfig(sd_rmult=2, gate_rmult=3, interfinger_rmult=2)),
+            dict(lo_width=8.0, lo_fingers=2, rf_width=4.0, rf_fingers=2,
+                 lo_fet_config=LOFETConfig(), rf_fet_config=RFFETConfig()),
+        ]
+        for params in gilbert_cases:
+            start = time.perf_counter()
+            layout = GilbertMixerInterdigited(gf180, **params).build()
+            build_time = time.perf_counter() - start
+            start = time.perf_counter()
+            footprint = estimate_gilbert_footprint(gf180, **params)
+            estimate_time = time.perf_counter() - start
+            error = max_error(footprint.bbox, bbox_of(layout))
+            assert error <= TOLERANCE, f"bbox {footprint.bbox} vs {bbox_of(layout)}"
+            for name, position in footprint.pins.items():
+                actual = layout.ports[f"{name}_N"].center
+                assert max_error(position, actual) <= TOLERANCE, f"{name} at {position} vs {tuple(actual)}"
+            print(f"✓ Gilbert {footprint.width:.2f} x {footprint.height:.2f} um, bbox error {error:.3f} um, "
+                  f"{len(footprint.pins)} pins (build {build_time:.1f} s, estimate {estimate_time*1e6:.0f} us)")
+
+        cmirror_cases = [
+            dict(width_ref=7.5, width_mir=1.5, fingers_ref=5, fingers_mir=1,
+                 cmirror_config=CMirrorConfig(sd_rmult=2, gate_rmult=2, interfinger_rmult=2, with_decap=True)),
+            dict(width_ref=15.0, width_mir=3.0, fingers_ref=10, fingers_mir=2, length=0.5,
+                 cmirror_config=CMirrorConfig(interfinger_rmult=2, with_decap=True), decap_size=(4.0, 4.0)),
+        ]
+        for params in cmirror_cases:
+            layout = CmirrorWithDecap(gf180, **params).build()
+            footprint = estimate_cmirror_footprint(gf180, **params)
+            error = max_error(footprint.bbox, bbox_of(layout))
+            assert error <= TOLERANCE, f"bbox {footprint.bbox} vs {bbox_of(layout)}"
+            labels = {label.text: label.origin for label in layout.labels}
+            assert set(labels) == set(footprint.pins), f"pins {sorted(footprint.pins)} vs labels {sorted(labels)}"
+            for name, position in footprint.pins.items():
+                assert max_error(position, labels[name]) <= TOLERANCE, f"{name} at {position} vs {tuple(labels[name])}"
+            print(f"✓ Current mirror {footprint.width:.2f} x {footprint.height:.2f} um, bbox error {error:.3f} um")
+
+        # Interdigitations the builder cannot route are rejected up front
+        try:
+            estimate_cmirror_footprint(gf180, 6.0, 6.0, 2, 2)
+            raise AssertionError("fingers_ref == fingers_mir should be rejected")
+        except ValueError:
+            print("✓ Unroutable current mirror rejected")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - footprints match the built layouts")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
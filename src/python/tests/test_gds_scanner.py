@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test for the memory mapped GDS scanner. Scans the LVS layouts checked into
+the repository and compares layer statistics, cell counts, bounding boxes
+and hierarchy with what gdstk reads from the same files, and checks that
+truncated files are rejected with the offset of the cut record.
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def gdstk_layers(polygons):
+    """(layer, datatype) -> [polygon count, area] of a list of gdstk polygons"""
+    layers = {}
+    for polygon in polygons:
+        stats = layers.setdefault((polygon.layer, polygon.datatype), [0, 0.0])
+        stats[0] += 1
+        stats[1] += polygon.area()
+    return layers
+
+
+def close(a, b, tol=1e-6):
+    return abs(a - b) <= tol * max(1.0, abs(a), abs(b))
+
+
+if __name__ == "__main__":
+    try:
+        import gdstk
+        from gds_tools import scan_gds
+
+        print("GDS SCANNER TEST")
+        print("="*60)
+
+        files = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '../*/lvs/gds/*.gds')))
+        assert files, "no LVS layouts found"
+
+        for filename in files:
+            stats = scan_gds(filename)
+            lib = gdstk.read_gds(filename)
+            assert stats.libname == lib.name, f"library name {stats.libname}, expected {lib.name}"
+            assert close(stats.unit, lib.unit) and close(stats.precision, lib.precision)
+            assert set(stats.cells) == {cell.name for cell in lib.cells}, "cell names differ"
+            assert sorted(stats.top_cells) == sorted(cell.name for cell in lib.top_level()), "top cells differ"
+
+            for cell in lib.cells:
+                scanned = stats.cells[cell.name]
+                expected = gdstk_layers(cell.polygons)
+                own = {key: [layer.polygons, layer.area] for key, layer in scanned.layers.items() if layer.polygons}
+                assert own.keys() == expected.keys(), f"{cell.name}: layers differ"
+                for key, (count, area) in expected.items():
+                    assert own[key][0] == count, f"{cell.name} {key}: {own[key][0]} polygons, expected {count}"
+                    assert close(own[key][1], area), f"{cell.name} {key}: area {own[key][1]}, expected {area}"
+                assert sum(layer.paths for layer in scanned.layers.values()) == len(cell.paths)
+                assert sum(layer.labels for layer in scanned.layers.values()) == len(cell.labels)
+
+                children = {}
+                for ref in cell.references:
+                    name = ref.cell if isinstance(ref.cell, str) else ref.cell.name
+                    repetition = ref.repetition
+                    instances = repetition.size if repetition.size else 1
+                    children[name] = children.get(name, 0) + instances
+                assert scanned.children == children, f"{cell.name}: children differ"
+
+                bbox = cell.bounding_box()
+                flat = stats.flat_bbox(cell.name)
+                if bbox is None:
+                    assert flat is None, f"{cell.name}: bbox for an empty cell"
+                else:
+                    (xmin, ymin), (xmax, ymax) = bbox
+                    assert all(close(a, b) for a, b in zip(flat, (xmin, ymin, xmax, ymax))), \
+                        f"{cell.name}: bbox {flat}, expected {bbox}"
+
+            for top in lib.top_level():
+                flat = {key: [layer.polygons, layer.area]
+                        for key, layer in stats.flat_layer_stats(top.name).items() if layer.polygons}
+                expected = gdstk_layers(top.get_polygons(include_paths=False))
+                assert flat.keys() == expected.keys(), f"{top.name}: flat layers differ"
+                for key, (count, area) in expected.items():
+                    assert flat[key][0] == count and close(flat[key][1], area), f"{top.name} {key}: flat stats differ"
+
+                walked = [name for _, name, _ in stats.hierarchy(top.name)]
+                assert set(walked) == {top.name} | {cell.name for cell in top.dependencies(True)}
+                depth = max(d for d, _, _ in stats.hierarchy(top.name))
+                print(f"✓ {os.path.basename(filename)}: {len(lib.cells)} cells, {len(expected)} layers, "
+                      f"{sum(count for count, _ in expected.values())} polygons flat, depth {depth}")
+
+        # Truncated files fail with the offset of the cut record, not inside the polygon reduction
+        with open(files[0], "rb") as f:
+            data = f.read()
+        with tempfile.TemporaryDirectory() as tmp:
+            truncated = os.path.join(tmp, "truncated.gds")
+            errors = []
+            for fraction in (0.5, 0.77, 0.999):
+                with open(truncated, "wb") as f:
+                    f.write(data[:int(len(data) * fraction)])
+                try:
+                    scan_gds(truncated)
+                    raise AssertionError(f"{fraction:.0%} of {os.path.basename(files[0])} scanned without error")
+                except ValueError as e:
+                    assert str(e).startswith("truncated record at offset") and e.__context__ is None, e
+                    errors.append(str(e))
+            print(f"✓ Truncated files rejected: {errors[0]}")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - scanner matches gdstk")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure gdstk is installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test for the Gilbert cell design space explorer. Uses the EKV model table of
+test_gmid_lut, checks one grid point against the step by step calculation
+of sizing_Gilbert_cell.ipynb, the Pareto front against a brute force
+dominance check, and times a two million point grid.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def dominated_brute(objectives):
+    """Rows some other row is at least as good as everywhere and better somewhere"""
+    import numpy as np
+
+    better_eq = np.all(objectives[None, :, :] <= objectives[:, None, :], axis=2)
+    strictly = np.any(objectives[None, :, :] < objectives[:, None, :], axis=2)
+    return np.any(better_eq & strictly, axis=1)
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from sizing import GILBERT_AXES, GilbertTargets, GmIdLUT, explore_gilbert, pareto_front
+        from test_gmid_lut import write_mat
+
+        print("GILBERT EXPLORER TEST")
+        print("="*60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            mat = os.path.join(tmp, "nfet_03v3_w_2um_nf_6.mat")
+            write_mat(mat)
+            n = GmIdLUT.open(mat, os.path.join(tmp, "luts"))
+
+            # The notebook point, with its three source resistances
+            result = explore_gilbert(n, gm_id_rf=[12], gm_id_lo=[15], l=[0.28], i0=[50e-6],
+                                     rs=[1e3, 10e3, 100e3], r_load=[10e3])
+            assert len(result) == 3 and result.shape == (1, 1, 1, 1, 3, 1)
+            I0, l = 50e-6, 0.28
+            gm_rf, gm_lo = 12 * I0, 15 * I0 / 2
+            jd_rf, jd_lo = n.lookup("ID_W", GM_ID=12, L=l, VDS=1.65), n.lookup("ID_W", GM_ID=15, L=l, VDS=1.65)
+            w_rf, w_lo = I0 / jd_rf, I0 / 2 / jd_lo
+            ft_rf = gm_rf / (w_rf * n.lookup("CGG_W", GM_ID=12, L=l, VDS=1.65)) / 2 / np.pi
+            ft_lo = gm_lo / (w_lo * n.lookup("CGG_W", GM_ID=15, L=l, VDS=1.65)) / 2 / np.pi
+            for row, RS in zip(result.rows(range(3)), [1e3, 10e3, 100e3]):
+                A_IIP3 = 2 * I0 / 3 * np.sqrt(gm_rf * (RS + 2 / gm_rf) ** 3)
+                assert np.isclose(row["iip3_dbm"], 10 * np.log10(A_IIP3 / 1e-3))
+                assert np.isclose(row["gain_db"], 20 * np.log10(2 / np.pi * 2 / (RS + 2 / gm_rf) * 10e3))
+                assert np.isclose(row["width_rf"], w_rf) and np.isclose(row["width_lo"], w_lo)
+                assert np.isclose(row["ft_rf"], ft_rf) and np.isclose(row["ft_lo"], ft_lo)
+                assert np.isclose(row["vgs_rf"], n.look_upVGS(GM_ID=12, L=l, VDS=1.65, VSB=0))
+                assert np.isclose(row["power"], 2 * I0 * 3.3) and row["rs"] == RS
+            assert np.all(np.diff(result.columns["iip3_dbm"]) > 0) and np.all(np.diff(result.columns["gain_db"]) < 0)
+            assert np.all(np.diff(result.columns["nf_db"]) > 0) and np.all(result.columns["nf_db"] > 3.9)
+            print(f"✓ Notebook point: W_rf {w_rf:.2f} um, W_lo {w_lo:.2f} um, fT {ft_rf / 1e9:.2f} GHz, "
+                  f"IIP3 {result.columns['iip3_dbm'].round(1).tolist()} dBm")
+
+            rng = np.random.default_rng(3)
+            points = np.column_stack([rng.integers(0, 6, 1500), rng.random(1500), rng.random(1500)])
+            front = pareto_front(points)
+            unique = np.unique(points[front], axis=0)
+            assert len(unique) == len(front)
+            assert set(map(tuple, points[front])) == set(map(tuple, points[~dominated_brute(points)]))
+            two = rng.random((500, 2))
+            assert set(pareto_front(two)) == set(np.flatnonzero(~dominated_brute(two)))
+            print(f"✓ Pareto front matches brute force ({len(front)} of {len(points)} points)")
+
+            axes = dict(gm_id_rf=np.linspace(6, 20, 20), gm_id_lo=np.linspace(6, 20, 20), l=n.L,
+                        i0=np.linspace(20e-6, 200e-6, 10), rs=np.geomspace(100, 10e3, 10),
+                        r_load=np.linspace(2e3, 20e3, 10))
+            start = time.perf_counter()
+            result = explore_gilbert(n, **axes)
+            elapsed = time.perf_counter() - start
+            print(result)
+            assert len(result) == 2_000_000 and elapsed < 10
+            assert all(len(values) == len(result) for values in result.columns.values())
+            feasible = np.flatnonzero(result.feasible)
+            assert 0 < len(result.pareto) < len(feasible) and np.all(result.feasible[result.pareto])
+            assert not result.meets_spec[~result.feasible].any()
+            sample = np.concatenate([result.pareto, rng.choice(feasible, 3000, replace=False)])
+            objectives = np.column_stack([result.columns["power"][sample], result.columns["nf_db"][sample],
+                                          -result.columns["gain_db"][sample]])
+            assert not dominated_brute(objectives)[:len(result.pareto)].any()
+            row = result.rows()[0]
+            assert set(GILBERT_AXES) <= set(row) and row["headroom"] >= 0
+            print(f"✓ {len(result)} points in {elapsed:.2f} s, {len(result.pareto)} on the front")
+
+            strict = explore_gilbert(n, **axes, targets=GilbertTargets(min_ft_ratio=1e3))
+            assert strict.feasible.sum() < result.feasible.sum()
+            relaxed = explore_gilbert(n, **axes, targets=GilbertTargets(nf_db=20.0))
+            meets = np.flatnonzero(relaxed.meets_spec)
+            assert len(meets) and np.all(relaxed.columns["nf_db"][meets] <= 20.0)
+            assert np.all(relaxed.columns["iip3_dbm"][meets] >= 8.0)
+            print("✓ Targets tighten the feasible set")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - Gilbert explorer works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
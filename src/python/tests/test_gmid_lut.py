@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test for the gm/Id lookup tables. Writes a pygmid style .mat table of an
+EKV model device, converts it and checks the batched gm/Id lookups of ID_W,
+CGG_W, VGS and GM_GDS against the model solved point by point, the raw VGS
+lookups, the conversion cache and sharing a table with a worker process.
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+W, N, UT, KP = 2.0, 1.3, 0.0259, 200e-6  # um, slope factor, thermal voltage, A/V^2
+
+
+def ekv(vgs, vds, vsb, l):
+    """ID, GM, GDS, CGG of the model device (W um wide, L um long)"""
+    import numpy as np
+
+    vt = 0.6 + 0.1 * vsb + 0.02 / l
+    lam = 0.05 / l
+    x = (vgs - vt) / (2 * N * UT)
+    soft = np.logaddexp(0, x)
+    saturation = (1 + lam * vds) * np.tanh(vds / 0.1)
+    i = soft ** 2
+    spec = 2 * N * KP * (W / l) * UT ** 2
+    id_ = spec * i * saturation
+    gm = spec * saturation * 2 * soft / (1 + np.exp(-x)) / (2 * N * UT)
+    gds = spec * i * (lam * np.tanh(vds / 0.1) + (1 + lam * vds) / np.cosh(vds / 0.1) ** 2 / 0.1)
+    cgg = W * l * 5e-15 * (0.3 + 0.7 * i / (1 + i)) + W * 0.3e-15
+    return id_, gm, gds, cgg
+
+
+def write_mat(path):
+    import numpy as np
+    from scipy.io import savemat
+
+    axes = {"L": np.array([0.28, 0.5, 1.0, 2.0, 4.0]), "VGS": np.linspace(0, 3.3, 67),
+            "VDS": np.linspace(0, 3.3, 34), "VSB": np.array([0.0, 0.5, 1.0])}
+    l, vgs, vds, vsb = np.meshgrid(axes["L"], axes["VGS"], axes["VDS"], axes["VSB"], indexing="ij")
+    id_, gm, gds, cgg = ekv(vgs, vds, vsb, l)
+    savemat(path, {"nfet_03v3": {**axes, "ID": id_, "GM": gm, "GDS": gds, "CGG": cgg, "W": W, "NFING": 6.0,
+                                 "INFO": "EKV test device", "TEMP": 300.0}})
+
+
+def reference(gm_id, l, vds, vsb):
+    """Model outputs at the VGS where gm/Id = gm_id, solved point by point"""
+    from scipy.optimize import brentq
+
+    def ratio(vgs):
+        id_, gm, _, _ = ekv(vgs, vds, vsb, l)
+        return gm / id_ - gm_id
+
+    vgs = brentq(ratio, 0.0, 3.3)
+    id_, gm, gds, cgg = ekv(vgs, vds, vsb, l)
+    return {"ID_W": id_ / W, "CGG_W": cgg / W, "VGS": vgs, "GM_GDS": gm / gds}
+
+
+def worker_lookup(table, gm_id):
+    return table.lookup("ID_W", GM_ID=gm_id, L=0.28, VDS=1.65)
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from sizing import GmIdLUT
+
+        print("GM/ID LUT TEST")
+        print("="*60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            mat = os.path.join(tmp, "nfet_03v3_w_2um_nf_6.mat")
+            write_mat(mat)
+            cache = os.path.join(tmp, "luts")
+            start = time.perf_counter()
+            n = GmIdLUT.open(mat, cache)
+            converted = time.perf_counter() - start
+            print(n)
+            start = time.perf_counter()
+            again = GmIdLUT.open(mat, cache)
+            reopened = time.perf_counter() - start
+            assert again.directory == n.directory and reopened < converted
+            assert isinstance(n.gm_id_tables, np.memmap)
+            print(f"✓ Converted in {converted * 1e3:.0f} ms, reopened in {reopened * 1e3:.1f} ms")
+
+            # Notebook calls, batched: gm/Id at the grid lengths, on and between VDS points
+            rng = np.random.default_rng(1)
+            points = 200
+            gm_id = rng.uniform(4, 20, points)
+            l = rng.choice(n.L, points)
+            vds = rng.uniform(0.5, 3.0, points)
+            vsb = rng.choice([0.0, 0.25, 0.5, 1.0], points)
+            for out in ("ID_W", "CGG_W", "VGS", "GM_GDS"):
+                got = n.lookup(out, GM_ID=gm_id, L=l, VDS=vds, VSB=vsb)
+                expected = np.array([reference(*p)[out] for p in zip(gm_id, l, vds, vsb)])
+                error = np.max(np.abs(got / expected - 1))
+                print(f"  {out:7s} max relative error {error:.2e}")
+                assert error < 0.02, out
+            assert np.allclose(n.look_upVGS(GM_ID=gm_id, L=l, VDS=vds, VSB=vsb),
+                               n.lookup("VGS", GM_ID=gm_id, L=l, VDS=vds, VSB=vsb))
+            jd = n.lookup("ID_W", GM_ID=np.array([12, 12]), L=0.28)  # sizing_Gilbert_cell.ipynb
+            assert jd.shape == (2,) and np.all(np.isfinite(jd))
+            assert np.isnan(n.lookup("ID_W", GM_ID=200.0, L=0.28)) and np.isnan(n.lookup("ID_W", GM_ID=10, L=8.0))
+            print("✓ ID_W, CGG_W, VGS and GM_GDS within 2% of the model")
+
+            vgs = n.look_upVGS(GM_ID=gm_id, L=l, VDS=vds, VSB=vsb)
+            back = n.lookup("GM_ID", VGS=vgs, L=l, VDS=vds, VSB=vsb)
+            assert np.allclose(back, gm_id, rtol=0.02)
+            assert n.lookup("GM_ID", L=0.28).shape == n.VGS.shape
+            print("✓ Raw table lookups agree with the gm/Id tables")
+
+            grid = np.meshgrid(np.linspace(5, 25, 100), n.L, np.linspace(0.2, 3.3, 40), [0.0, 0.5], indexing="ij")
+            start = time.perf_counter()
+            batch = n.lookup("ID_W", GM_ID=grid[0], L=grid[1], VDS=grid[2], VSB=grid[3])
+            elapsed = time.perf_counter() - start
+            assert batch.shape == grid[0].shape and elapsed < 2.0
+            print(f"✓ {batch.size} points in {elapsed * 1e3:.0f} ms ({batch.size / elapsed / 1e6:.1f} M/s)")
+
+            assert len(pickle.dumps(n)) < 1000
+            with ProcessPoolExecutor(1) as pool:
+                shared = pool.submit(worker_lookup, n, gm_id[:5]).result()
+            assert np.allclose(shared, worker_lookup(n, gm_id[:5]), equal_nan=True)
+            print("✓ Worker processes reopen the memory-mapped table instead of copying it")
+
+            os.utime(mat, ns=(0, os.stat(mat).st_mtime_ns + 10**9))
+            meta = os.path.join(n.directory, "meta.json")
+            before = os.stat(meta).st_mtime_ns
+            GmIdLUT.open(mat, cache)
+            assert os.stat(meta).st_mtime_ns != before
+            print("✓ Table converted again when the .mat file changes")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - gm/Id tables work")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
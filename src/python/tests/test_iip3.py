@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test for the two tone IIP3 extractor. Writes Gilbert_cell_tb_IIP3 style
+rawfiles of an ideal mixer with a cubic RF stage on nonuniform time steps,
+sweeps the tone amplitude across three "corners" and checks conversion
+gain, LO feedthrough and the fitted IIP3 against the closed form values.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def write_rawfile(path, vectors):
+    """Binary transient plot as ngspice writes it"""
+    names = list(vectors)
+    header = ["Title: * two tone", "Date: today", "Plotname: Transient Analysis", "Flags: real",
+              f"No. Variables: {len(names)}", f"No. Points: {len(vectors['time'])}", "Variables:"]
+    header += [f"\t{i}\t{name}\t{'time' if name == 'time' else 'voltage'}" for i, name in enumerate(names)]
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\nBinary:\n").encode())
+        f.write(np.column_stack([vectors[name] for name in names]).astype("<f8").tobytes())
+
+
+def mixer_run(path, setup, amplitude, a3, gain=4.0, lo_leak=1e-3, points=300_000, seed=0):
+    """Differential RF tones of amplitude A through y = gain (x + a3 x^3) cos(w_lo t) + leak cos(w_lo t)"""
+    rng = np.random.default_rng(seed)
+    t = np.sort(np.concatenate([[0.0, 10e-6], rng.uniform(0, 10e-6, points - 2)]))
+    x = amplitude * (np.cos(2 * np.pi * setup.f_rf1 * t) + np.cos(2 * np.pi * setup.f_rf2 * t))
+    lo = np.cos(2 * np.pi * setup.f_lo * t)
+    y = gain * (x + a3 * x ** 3) * lo + lo_leak * lo
+    write_rawfile(path, {"time": t, "v(v_out_p)": 1.5 + y / 2, "v(v_out_n)": 1.5 - y / 2,
+                         "v(v_rf)": 0.6 + x / 2, "v(v_rf_b)": 0.6 - x / 2})
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from simulation import TwoToneSetup, fit_iip3, two_tone_spectrum
+
+        print("TWO TONE IIP3 TEST")
+        print("="*60)
+
+        setup = TwoToneSetup()
+        assert setup.if_tones == (10.7e6, 10.6e6) and setup.im3_tones == (10.8e6, 10.5e6)
+        assert setup.resolution == 100e3
+        amplitudes = np.array([0.02, 0.03, 0.05, 0.07, 0.1])
+        a3 = np.array([-0.3, -0.5, -1.0])
+        with tempfile.TemporaryDirectory() as tmp:
+            runs = []
+            for c, coefficient in enumerate(a3):
+                for a, amplitude in enumerate(amplitudes):
+                    path = os.path.join(tmp, f"iip3_c{c}_a{a}.raw")
+                    mixer_run(path, setup, amplitude, coefficient, seed=len(runs))
+                    runs.append(path)
+            start = time.perf_counter()
+            result = two_tone_spectrum(runs, setup)
+            fit = fit_iip3(*(values.reshape(len(a3), len(amplitudes)) for values in
+                             (result.pin_dbm, result.fundamental_dbm, result.im3_dbm)))
+            elapsed = time.perf_counter() - start
+        print(result)
+
+        assert result.coherent and result.window == "rect"
+        assert np.allclose(result.rf, amplitudes[None, :, None].repeat(len(a3), 0).reshape(-1, 1), rtol=1e-3)
+        # Small signal: a cos(w_rf) times cos(w_lo) leaves half the gain at IF
+        expected_cg = 20 * np.log10(4.0 / 2)
+        small = result.conversion_gain_db.reshape(len(a3), len(amplitudes))[:, 0]
+        assert np.allclose(small, expected_cg, atol=0.05), small
+        assert np.allclose(result.lo_feedthrough, 1e-3, rtol=0.02), result.lo_feedthrough
+        print(f"✓ Conversion gain {small.mean():.2f} dB (expected {expected_cg:.2f}), LO feedthrough 1 mV")
+
+        # Cubic stage: A_IIP3 = sqrt(4 / (3 |a3|)) per tone
+        expected = 10 * np.log10(4 / (3 * np.abs(a3)) / (2 * 50) / 1e-3)
+        print("IIP3 dBm fitted", np.round(fit.iip3_dbm, 2), "expected", np.round(expected, 2))
+        assert np.allclose(fit.iip3_dbm, expected, atol=0.3)
+        assert np.allclose(fit.im3_slope, 3, atol=0.15) and np.allclose(fit.fundamental_slope, 1, atol=0.05)
+        print(f"✓ IIP3 within 0.3 dB of the closed form for {len(a3)} corners")
+
+        assert elapsed < 10, f"{len(runs)} runs took {elapsed:.1f} s"
+        print(f"✓ {len(runs)} rawfiles post-processed in {elapsed:.2f} s")
+
+        try:
+            fit_iip3(result.pin_dbm[:1], result.fundamental_dbm[:1], result.im3_dbm[:1])
+            raise AssertionError("a single amplitude cannot be fitted")
+        except ValueError:
+            print("✓ Single amplitude sweep rejected")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - IIP3 extraction works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test for the IR drop solver. A 100 um met1 strap fed through one contact
+must match the hand calculation, then the VSS rings of a current mirror are
+solved and checked for current conservation and sub-second runtime.
+"""
+
+import os
+import sys
+
+# Add the src/python directory and the Cmirror package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Cmirror_with_decap'))
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from gdsfactory import Component
+        from glayout import gf180
+        from parasitics import GF180, ir_drop
+
+        print("IR DROP TEST")
+        print("="*60)
+
+        strap = Component("ir_drop_strap")
+        strap.add_polygon([(0, 0), (100, 0), (100, 1), (0, 1)], layer=gf180.get_glayer("met1"))
+        strap.add_polygon([(99, 0), (100, 0), (100, 1), (99, 1)], layer=gf180.get_glayer("active_diff"))
+        strap.add_polygon([(99.4, 0.4), (99.6, 0.4), (99.6, 0.6), (99.4, 0.6)], layer=gf180.get_glayer("mcon"))
+        strap.add_label("VSS", position=(0.2, 0.5), layer=gf180.get_glayer("met1_label"))
+        report = ir_drop(strap, gf180, "VSS", current=1e-3)
+        # pin segment center to contact: 99 um of 1 um wide met1, then one contact cut
+        expected = 1e-3 * (GF180.conductors["met1"].sheet_resistance * 99 + GF180.vias["mcon"].resistance)
+        assert abs(report.worst_drop - expected) < 1e-3 * expected, f"{report.worst_drop} != {expected}"
+        assert abs(report.worst_location[0] - 99.5) < 1e-6
+        worst = report.segments(1)[0]
+        assert worst.layer == "mcon" and abs(worst.density - 1.0) < 1e-6
+        print(f"✓ Strap drop {report.worst_drop * 1e3:.3f} mV, expected {expected * 1e3:.3f} mV")
+
+        from Cmirror_with_decap import CmirrorWithDecap
+
+        layout = CmirrorWithDecap(gf180, 6.0, 2.0, 6, 2).build()
+        report = ir_drop(layout, gf180, "VSS", current=2e-3)
+        print(report)
+        assert report.worst_drop > 0
+        # all injected current leaves through the pin
+        pin = np.isin(report.edges, report.mesh.pins["VSS"])
+        leaving = np.where(pin[:, 1], report.current, 0).sum() - np.where(pin[:, 0], report.current, 0).sum()
+        assert abs(leaving - 2e-3) < 1e-9, f"{leaving} A reach the pin"
+        assert report.elapsed < 1.0, f"solve took {report.elapsed:.2f} s"
+        print(f"✓ VSS mesh solved in {report.elapsed * 1e3:.1f} ms, current conserved")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - IR drop matches hand calculation")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test for the PEX-lite parasitic estimator. Checks the rectangle decomposition
+on hand made shapes, then estimates the nets of a current mirror, checks that
+every pin net gets a capacitance and an access resistance quickly enough for
+sweeps, and writes the back-annotated subcircuit.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory and the Cmirror package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Cmirror_with_decap'))
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from parasitics import estimate_parasitics, write_spice
+        from parasitics.mesh import rectangles
+
+        print("PEX-LITE TEST")
+        print("="*60)
+
+        # L shape and a square ring (keyhole polygon as returned by gdstk booleans)
+        l_shape = [(0, 0), (4, 0), (4, 1), (1, 1), (1, 3), (0, 3)]
+        rects = rectangles(l_shape)
+        assert abs(np.prod(rects[:, 2:] - rects[:, :2], axis=1).sum() - 6.0) < 1e-9
+        ring = [(0, 0), (3, 0), (3, 3), (0, 3), (0, 1), (1, 1), (1, 2), (2, 2), (2, 1), (0, 1)]
+        rects = rectangles(ring)
+        assert abs(np.prod(rects[:, 2:] - rects[:, :2], axis=1).sum() - 8.0) < 1e-9
+        print(f"✓ Rectangle decomposition: L shape and ring ({len(rects)} rectangles)")
+
+        from glayout import gf180
+        from Cmirror_with_decap import CmirrorWithDecap
+
+        layout = CmirrorWithDecap(gf180, 6.0, 2.0, 6, 2).build()
+        report = estimate_parasitics(layout, gf180)
+        print(report)
+        assert not report.shorts, f"labels shorted: {report.shorts}"
+        for pin in ("I_BIAS", "I_OUT", "VSS"):
+            net = report.nets[pin]
+            assert net.capacitance > 0, f"{pin}: no capacitance"
+            assert net.resistance is not None and 0 < net.resistance < 1e3, f"{pin}: resistance {net.resistance}"
+            assert sum(net.via_cuts.values()) > 0, f"{pin}: no vias"
+        assert report.elapsed < 1.0, f"estimate took {report.elapsed:.2f} s"
+        print(f"✓ Pin nets estimated in {report.elapsed * 1e3:.1f} ms")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_spice(report, os.path.join(tmp, "cmirror_pex.spice"), "Cmirror_with_decap",
+                               pins=["VSS", "I_BIAS", "I_OUT"])
+            text = path.read_text()
+            assert ".subckt Cmirror_with_decap_pex VSS I_BIAS I_OUT" in text
+            assert "CI_OUT I_OUT_i VSS" in text and "CVSS" not in text
+        print("✓ Back-annotated subcircuit written")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - parasitics estimated for every pin net")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
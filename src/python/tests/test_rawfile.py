@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test for the memory-mapped rawfile reader. Writes multi-plot rawfiles in the
+binary and ascii formats ngspice uses (op + transient + complex AC), checks
+that both read back the same vectors, that binary vectors are views into the
+mapping, that chunked iteration and truncated files work, and that reading
+a large binary transient is at least 10x faster than parsing it as text.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+def write_rawfile(path, plots, binary=True):
+    """[(plot name, {vector: values})] as ngspice writes them with set appendwrite"""
+    with open(path, "wb") as f:
+        for name, vectors in plots:
+            values = np.column_stack(list(vectors.values()))
+            is_complex = np.iscomplexobj(values)
+            header = ["Title: * test", "Date: today", f"Plotname: {name}",
+                      f"Flags: {'complex' if is_complex else 'real'}", f"No. Variables: {len(vectors)}",
+                      f"No. Points: {len(values)}", "Variables:"]
+            header += [f"\t{i}\t{v}\t{'time' if v == 'time' else 'voltage'}" for i, v in enumerate(vectors)]
+            f.write(("\n".join(header) + ("\nBinary:\n" if binary else "\nValues:\n")).encode())
+            if binary:
+                f.write(values.astype("<c16" if is_complex else "<f8").tobytes())
+            else:
+                lines = []
+                for i, row in enumerate(values):
+                    cells = [f"{v.real:.17e},{v.imag:.17e}" if is_complex else f"{v:.17e}" for v in row]
+                    lines.append(f" {i}\t{cells[0]}\n" + "".join(f"\t{c}\n" for c in cells[1:]))
+                f.write("".join(lines).encode())
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from simulation import RawFile
+
+        print("RAWFILE READER TEST")
+        print("="*60)
+
+        t = np.linspace(0, 1e-6, 1001)
+        frequency = np.logspace(3, 9, 61)
+        plots = [("Operating Point", {"v(out)": np.array([1.2]), "i(v_pwr)": np.array([-1e-3])}),
+                 ("Transient Analysis", {"time": t, "v(out)": np.sin(2e7 * t), "i(v_pwr)": np.cos(2e7 * t)}),
+                 ("AC Analysis", {"frequency": frequency + 0j, "v(out)": 1 / (1 + 1j * frequency / 1e6)})]
+        with tempfile.TemporaryDirectory() as tmp:
+            binary, ascii = os.path.join(tmp, "binary.raw"), os.path.join(tmp, "ascii.raw")
+            write_rawfile(binary, plots)
+            write_rawfile(ascii, plots, binary=False)
+            with RawFile(binary) as raw_b, RawFile(ascii) as raw_a:
+                assert [p.plotname for p in raw_b] == [p.plotname for p in raw_a] == [name for name, _ in plots]
+                for (name, vectors), plot_b, plot_a in zip(plots, raw_b, raw_a):
+                    for vector, values in vectors.items():
+                        assert np.array_equal(plot_b[vector], values), (name, vector)
+                        assert np.allclose(plot_a[vector], values, rtol=1e-15, atol=0), (name, vector)
+                ac = raw_b["ac"]
+                assert ac.is_complex and ac["V(OUT)"].dtype == np.complex128
+                out = raw_b["transient"]["v(out)"]
+                assert not out.flags.owndata and np.shares_memory(out, raw_b["transient"].data)
+                print("✓ Binary and ascii plots (real, complex) read back the same vectors")
+
+                total = sum(chunk["v(out)"].sum() for chunk in raw_b["transient"].chunks(["v(out)"], points=97))
+                assert np.isclose(total, out.sum())
+                print("✓ Chunked iteration covers every point")
+
+            # A run killed while writing leaves a partial last plot
+            with open(binary, "rb") as f:
+                data = f.read()
+            truncated = os.path.join(tmp, "truncated.raw")
+            with open(truncated, "wb") as f:
+                f.write(data[:-(16 * 2 * 5 + 5)])
+            with RawFile(truncated) as raw:
+                assert len(raw["ac"]) == len(frequency) - 6
+                assert np.array_equal(raw["ac"]["frequency"], frequency[:-6])
+            print("✓ Truncated plot cut to its complete points")
+
+            # Large transient: memory-mapped binary vs. text parsing
+            n = 400_000
+            big_t = np.linspace(0, 1e-5, n)
+            big = [("Transient Analysis", {"time": big_t, **{f"v(n{i})": np.sin(big_t * (i + 1) * 1e6)
+                                                            for i in range(7)}})]
+            write_rawfile(binary, big)
+            write_rawfile(ascii, big, binary=False)
+            start = time.perf_counter()
+            with RawFile(binary) as raw:
+                binary_sum = sum(float(raw[0][name].sum()) for name in raw[0].names)
+            binary_time = time.perf_counter() - start
+            start = time.perf_counter()
+            with RawFile(ascii) as raw:
+                ascii_sum = sum(float(raw[0][name].sum()) for name in raw[0].names)
+            ascii_time = time.perf_counter() - start
+            assert np.isclose(binary_sum, ascii_sum)
+            speedup = ascii_time / binary_time
+            print(f"binary {binary_time * 1e3:.1f} ms, text {ascii_time * 1e3:.1f} ms ({speedup:.0f}x)")
+            assert speedup >= 10, f"binary only {speedup:.1f}x faster than text"
+            print("✓ Memory-mapped binary at least 10x faster than text")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - rawfile reader works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
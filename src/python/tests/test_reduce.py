@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test for the parasitic netlist reducer. Checks the exact series/parallel
+steps, coupling capacitor lumping and parallel device merging on small
+subcircuits, then reduces the extracted asig_5p0 pad and checks node count,
+capacitance, the port admittance error against its bound, and that the
+Gilbert_cell_hierarchal_tb deck is rerun with the reduced pad.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+PADRING_DIR = os.path.join(os.path.dirname(__file__), '../../design_padring/Chipathon2025_pads_xschem')
+EXTRACTED = os.path.join(PADRING_DIR, "gf180mcu_fd_io__asig_5p0_extracted.spice")
+TESTBENCH = os.path.join(os.path.dirname(__file__), '../../design_tb/simulation/Gilbert_cell_hierarchal_tb.spice')
+
+LADDER = """.subckt ladder a b vss
+R0 a n0 0.5
+R1 n0 n1 0.5
+R2 n1 n2 1
+R3 n2 n3 1
+R3b n2 n3 1
+R4 n3 b 1.5
+Rstub n3 dangling 100
+C1 N2 vss 1f
+C2 n1 n3 0.01f
+XM1 b a vss vss nfet_03v3 w=1u l=0.28u
+XM2 vss a b vss nfet_03v3 w=1u l=0.28u m=2
+XM3 b a vss vss nfet_03v3 w=2u l=0.28u
+.ends
+"""
+
+
+if __name__ == "__main__":
+    try:
+        import numpy as np
+        from parasitics import ReductionConfig, compare_testbench, reduce_netlist, reduce_subckt
+        from simulation import STUB_SIMULATOR, SpiceIndex
+
+        print("PARASITIC REDUCTION TEST")
+        print("="*60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ladder.spice")
+            with open(path, "w") as f:
+                f.write(LADDER)
+            ladder = SpiceIndex.build(path)["ladder"]
+
+            reduced, report = reduce_subckt(ladder, measure_speedup=False)
+            print(report)
+            resistors = [i for i in reduced.instances if i.kind == "r"]
+            # n0 joins R0 and R1, the stub ends nowhere; n1, n2 and n3 carry capacitors
+            assert report.eliminated["exact"] == 2 and report.nodes == (8, 6)
+            assert sorted(float(r.params["value"]) for r in resistors) == [0.5, 1.0, 1.0, 1.5]
+            assert report.admittance_error[0.0] < 1e-9 and report.admittance_error[1e9] < 1e-9
+            fets = [i for i in reduced.instances if i.kind == "x"]
+            assert [(f.name, f.params.get("m")) for f in fets] == [("XM1", "3"), ("XM3", None)]
+            print("✓ Series, parallel and dangling resistors removed exactly; parallel fets merged")
+
+            _, report = reduce_subckt(ladder, ReductionConfig(min_cap=2e-15), measure_speedup=False)
+            assert report.eliminated["lumped"] == 3 and report.nodes[1] == 3
+            assert report.admittance_error[0.0] < 1e-9 and report.admittance_error[1e9] <= report.error_bound(1e9)
+            _, report = reduce_subckt(ladder, ReductionConfig(min_coupling=0.1e-15), measure_speedup=False)
+            assert report.lumped_couplings == 1 and report.admittance_error[0.0] < 1e-9
+            assert np.isclose(report.capacitance[1], report.capacitance[0] + 0.01e-15)
+            print("✓ Coupling capacitor lumped to ground, small node capacitance folded into its neighbours")
+
+            output = os.path.join(tmp, "asig_reduced.spice")
+            config = ReductionConfig(min_cap=1e-15, ticer_tau=1e-12)
+            report, = reduce_netlist(EXTRACTED, output, config=config)
+            print(report)
+            assert report.nodes[1] < report.nodes[0] / 3
+            assert np.isclose(report.capacitance[1], report.capacitance[0], rtol=1e-9)
+            assert report.admittance_error[0.0] < 1e-9
+            for frequency in (1e8, 1e9):
+                assert report.admittance_error[frequency] <= report.error_bound(frequency)
+            assert report.solve_speedup > 1.5
+            pad = SpiceIndex.build(output)["gf180mcu_fd_io__asig_5p0_extracted"]
+            assert pad.ports == ("DVSS", "DVDD", "VSS", "VDD", "PAD", "ASIG5V")
+            assert sum(1 for i in pad.instances if i.kind == "l") == 514
+            print(f"✓ Extracted pad: {report.nodes[0]} -> {report.nodes[1]} nodes, "
+                  f"{report.solve_speedup:.1f}x faster LU, 1 GHz error {report.admittance_error[1e9]:.2g}")
+
+            comparison = compare_testbench(TESTBENCH, EXTRACTED, output, os.path.join(tmp, "runs"),
+                                           simulator=STUB_SIMULATOR)
+            print(comparison)
+            with open(os.path.join(comparison.reduced.workdir, os.path.basename(TESTBENCH))) as f:
+                assert f".include {output}" in f.read()
+            assert comparison.original.status == comparison.reduced.status == "done"
+            print("✓ Testbench rerun with the reduced pad")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - parasitic reduction works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
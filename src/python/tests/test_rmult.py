@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test for the routing multiplier optimizer. Small currents keep every rmult
+at 1, a tighter resistance target raises them, the chosen config builds and
+its extracted resistance drops, and the Gilbert mixer search stays within
+the EM limits of its estimates. The RF model's contact rows are checked
+against a built RF FET and its source route estimate against the mixer
+layout.
+"""
+
+import os
+import sys
+
+# Add the src/python directory and the Cmirror and Gilbert mixer packages to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Cmirror_with_decap'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Gilbert_mixer_intedigited'))
+
+
+if __name__ == "__main__":
+    try:
+        from glayout import gf180
+        from sweep import (RouteTarget, estimate_cmirror_footprint, estimate_gilbert_footprint,
+                           optimize_cmirror_rmult, optimize_gilbert_rmult)
+
+        print("RMULT OPTIMIZER TEST")
+        print("="*60)
+
+        mirror = (gf180, 6.0, 2.0, 6, 2)
+        loose = optimize_cmirror_rmult(*mirror, {"I_BIAS": RouteTarget(1e-5), "I_OUT": RouteTarget(4e-5)})
+        print(loose)
+        assert loose.rmults()["cmirror_config"] == {"sd_rmult": 1, "gate_rmult": 1, "interfinger_rmult": 1}
+        rate = loose.evaluated / loose.elapsed
+        assert rate > 1000, f"only {rate:.0f} combinations per second"
+        print(f"✓ Loose targets keep rmult 1 ({rate:.0f} combinations per second)")
+
+        tight = optimize_cmirror_rmult(*mirror, {"I_BIAS": RouteTarget(1e-4, max_resistance=7.5),
+                                                 "I_OUT": RouteTarget(4e-4)})
+        print(tight)
+        config = tight.configs["cmirror_config"]
+        assert tight.resistance["I_BIAS"] <= 7.5 and max(tight.limit_ratio.values()) <= 1.0
+        assert config.sd_rmult + config.interfinger_rmult > 2
+        assert abs(tight.area - estimate_cmirror_footprint(*mirror, cmirror_config=config).area) < 1e-6
+        print("✓ Tight resistance target raises rmult")
+
+        try:
+            optimize_cmirror_rmult(*mirror, {"I_OUT": RouteTarget(5e-3)})
+            raise AssertionError("5 mA through one mirror finger should be infeasible")
+        except ValueError as e:
+            print(f"✓ Infeasible targets rejected: {e}")
+
+        # The chosen config builds and the extracted route resistance follows the estimate
+        from Cmirror_with_decap import CmirrorWithDecap
+        from parasitics import estimate_parasitics
+
+        base = estimate_parasitics(CmirrorWithDecap(*mirror).build(), gf180).nets["I_BIAS"].resistance
+        chosen = estimate_parasitics(CmirrorWithDecap(*mirror, cmirror_config=config).build(),
+                                     gf180).nets["I_BIAS"].resistance
+        assert chosen < base, f"extracted I_BIAS resistance {chosen:.2f} not below {base:.2f}"
+        print(f"✓ Extracted I_BIAS resistance {base:.2f} -> {chosen:.2f} ohm")
+
+        mixer = (gf180, 20, 5, 10, 5)
+        targets = {"I_bias_pos": RouteTarget(2e-3, 10.0), "I_bias_neg": RouteTarget(2e-3, 10.0),
+                   "V_out_p": RouteTarget(2e-3), "V_out_n": RouteTarget(2e-3),
+                   "V_LO": RouteTarget(max_resistance=40.0), "V_RF": RouteTarget(max_resistance=40.0)}
+        choice = optimize_gilbert_rmult(*mixer, targets)
+        print(choice)
+        assert set(choice.configs) == {"lo_fet_config", "rf_fet_config"}
+        assert all(ratio <= 1.0 for ratio in choice.limit_ratio.values())
+        assert all(choice.resistance[route] <= target.max_resistance
+                   for route, target in targets.items() if target.max_resistance is not None)
+        footprint = estimate_gilbert_footprint(*mixer, **choice.configs)
+        assert abs(choice.area - footprint.area) < 1e-6
+        print(f"✓ Gilbert mixer configs chosen in {choice.elapsed * 1e3:.1f} ms")
+
+        # rf_width is the width of each RF finger: the model's contact rows match a built RF FET
+        import gdstk
+        import numpy as np
+        from glayout import nmos
+        from Gilbert_mixer_interdigited import GilbertMixerInterdigited, RFFETConfig
+        from sweep.rmult import _FETModel, _tech
+
+        rf_length = gf180.get_grule("poly")["min_width"]
+        model = _FETModel(gf180, _tech(gf180, None), RFFETConfig(), 10, rf_length, 5)
+        fet = nmos(gf180, width=10, fingers=5, length=rf_length, with_dummy=(False, False), with_tie=False,
+                   with_substrate_tap=False).get_polygons(by_spec=True)
+        diffusion = [gdstk.Polygon(p) for p in fet[gf180.get_glayer("active_diff")]]
+        cuts = sum(any(d.contain(tuple(np.mean(p, axis=0))) for d in diffusion)
+                   for p in fet[gf180.get_glayer("mcon")])
+        assert cuts == model.contact_rows * 6, f"{cuts} s/d contacts built, model has {model.contact_rows} rows"
+        print(f"✓ RF model: {model.contact_rows:.0f} contact rows per s/d column, as built")
+
+        # The chosen RF config builds and the extracted source route resistance follows the estimate
+        loose = optimize_gilbert_rmult(*mixer, {"I_bias_pos": RouteTarget(1e-5), "I_bias_neg": RouteTarget(1e-5)})
+        assert loose.rmults()["rf_fet_config"] == {"sd_rmult": 1, "gate_rmult": 1, "interfinger_rmult": 1}
+        base = estimate_parasitics(GilbertMixerInterdigited(*mixer).build(), gf180).nets["I_bias_pos"].resistance
+        chosen = estimate_parasitics(GilbertMixerInterdigited(*mixer, rf_fet_config=choice.configs["rf_fet_config"])
+                                     .build(), gf180).nets["I_bias_pos"].resistance
+        assert choice.resistance["I_bias_pos"] < loose.resistance["I_bias_pos"]
+        assert chosen < base, f"extracted I_bias_pos resistance {chosen:.2f} not below {base:.2f}"
+        assert abs(loose.resistance["I_bias_pos"] / base - 1) < 0.25, "rmult 1 estimate far from the layout"
+        print(f"✓ I_bias_pos estimate {loose.resistance['I_bias_pos']:.2f} -> {choice.resistance['I_bias_pos']:.2f} "
+              f"ohm, extracted {base:.2f} -> {chosen:.2f} ohm")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - rmult selection meets its targets")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test for the parallel simulation batch runner. Runs every design_tb testbench
+through the stub simulator with .param and alterparam overrides, checks that
+the regression takes about as long as its slowest job, that a hanging job is
+killed at its timeout and that the results land in the store.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+if __name__ == "__main__":
+    try:
+        from simulation import (STUB_SIMULATOR, SimJob, SimulationStore, prepare_deck, run_batch,
+                                testbench_jobs)
+
+        print("SIMULATION BATCH TEST")
+        print("="*60)
+
+        deck = ".param w=1u\nx1 a b sub\n.control\nop\nwrite out.raw\n.endc\n.end\n"
+        prepared = prepare_deck(deck, {"w": "2u", "l": 0.5}, {"sub.w_mir": "3u", "vdd": 3.0})
+        lines = prepared.splitlines()
+        assert ".param w=2u" in lines and ".param w=1u" not in lines
+        assert lines.index(".param l=0.5") < lines.index(".control")
+        control = lines.index(".control")
+        assert lines[control + 1:control + 4] == ["alterparam sub w_mir=3u", "alterparam vdd=3.0", "reset"]
+        try:
+            prepare_deck(".param w=1u\n.end\n", alterparams={"w": 1})
+            raise AssertionError("alterparam without a .control block should be rejected")
+        except ValueError:
+            pass
+        print("✓ .param and alterparam overrides applied")
+
+        jobs = testbench_jobs(params={"stub_delay": 0.2})
+        assert len(jobs) >= 9 and any(job.name == "Gilbert_cell_tb_IIP3" for job in jobs)
+        jobs[0].params = {"stub_delay": 1.0}
+        jobs[1].alterparams = {"stub_delay": 0.1, "gain": 2.5}
+        with tempfile.TemporaryDirectory() as tmp, SimulationStore(os.path.join(tmp, "runs.db")) as store:
+            result = run_batch(jobs, tmp, store, "regression", STUB_SIMULATOR, processes=len(jobs))
+            print(result)
+            assert not result.failed, [r.error for r in result.failed]
+            total = sum(r.elapsed for r in result.results)
+            assert result.elapsed < 0.6 * total, f"{result.elapsed:.2f} s for {total:.2f} s of jobs"
+            assert result.elapsed < 1.0 + 1.5, f"regression took {result.elapsed:.2f} s"
+            print(f"✓ {len(jobs)} testbenches in {result.elapsed:.2f} s ({total:.2f} s sequential)")
+
+            iip3 = next(r for r in result.results if r.job == "Gilbert_cell_tb_IIP3")
+            assert [os.path.basename(p) for p in iip3.rawfiles] == ["Gilbert_cell_tb_IIP3_sim.raw"]
+            assert iip3.measurements["stub_delay"] == 0.2
+            assert result.results[1].measurements["gain"] == 2.5
+            stored = store.measurements("regression")
+            assert stored[jobs[1].name] == result.results[1].measurements
+            print("✓ Rawfiles and measurements collected into the store")
+
+            hang = SimJob("hang", jobs[0].netlist, params={"stub_delay": 60}, timeout=0.5)
+            broken = SimJob("broken", jobs[0].netlist, params={"stub_fail": 1})
+            result = run_batch([hang, broken], tmp, store, "errors", STUB_SIMULATOR)
+            print(result)
+            by_job = {r.job: r for r in result.results}
+            assert by_job["hang"].status == "timeout" and by_job["hang"].elapsed < 5
+            assert by_job["broken"].status == "failed" and "stub_fail" in by_job["broken"].error
+            assert [r.status for r in store.results("errors")] == ["failed", "timeout"]
+            print("✓ Hanging job killed at its timeout, failure recorded")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - batch runner works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
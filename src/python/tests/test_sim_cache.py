@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test for the simulation result cache. Runs the mirror and Gilbert testbenches
+through the stub simulator twice and checks that the second run is served
+from the cache, that comments do not change the key while parameters,
+included files and the simulator do, and that eviction keeps the cache
+within its size limit.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+
+if __name__ == "__main__":
+    try:
+        from simulation import STUB_SIMULATOR, RawFile, SimJob, SimulationCache, run_batch, testbench_jobs
+
+        print("SIMULATION CACHE TEST")
+        print("="*60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SimulationCache(os.path.join(tmp, "cache"), max_bytes=2**20)
+            jobs = testbench_jobs(["Local_mirror_nmos_tb", "Gilbert_cell_tb"], params={"stub_delay": 0.5})
+            first = run_batch(jobs, os.path.join(tmp, "run1"), simulator=STUB_SIMULATOR, cache=cache)
+            second = run_batch(jobs, os.path.join(tmp, "run2"), simulator=STUB_SIMULATOR, cache=cache)
+            print(second)
+            assert not any(r.cached for r in first.results) and all(r.cached for r in second.results)
+            assert second.elapsed < 0.5, f"cached batch took {second.elapsed:.2f} s"
+            for before, after in zip(first.results, second.results):
+                assert after.measurements == before.measurements
+                assert [os.path.basename(p) for p in after.rawfiles] == [os.path.basename(p) for p in before.rawfiles]
+                with RawFile(after.rawfiles[0]) as raw:
+                    assert raw[0]["stub_delay"][0] == 0.5
+            stats = cache.stats()
+            print(stats)
+            assert (stats.hits, stats.misses, stats.stores) == (2, 2, 2) and stats.hit_rate == 0.5
+            print(f"✓ Second batch restored from the cache in {second.elapsed * 1e3:.0f} ms")
+
+            # The key follows the expanded netlist, not its formatting
+            netlist = jobs[0].netlist
+            with open(netlist) as f:
+                deck = f.read()
+            include = os.path.join(tmp, "models.spice")
+            with open(include, "w") as f:
+                f.write(".param vth_shift=0\n")
+            base = deck.replace(".control", f".include {include}\n.control", 1)
+            key = cache.key(base, tmp, STUB_SIMULATOR)
+            assert cache.key("* a new comment\n" + base.replace("\n.control", "\n\n.control  $ inline"), tmp,
+                             STUB_SIMULATOR) == key
+            assert cache.key(base.replace("I0 GND net3 10u", "I0 GND net3 20u"), tmp, STUB_SIMULATOR) != key
+            assert cache.key(base.replace("tran 1n 0.01u", "tran 1n 0.02u"), tmp, STUB_SIMULATOR) != key
+            assert cache.key(base, tmp, ("ngspice-not-installed", "-b")) != key
+            with open(include, "w") as f:
+                f.write(".param vth_shift=0.01\n")
+            os.utime(include, ns=(0, os.stat(include).st_mtime_ns + 10**9))
+            assert cache.key(base, tmp, STUB_SIMULATOR) != key
+            print("✓ Key ignores comments, follows values, analyses, includes and the simulator")
+
+            # Failed runs are not cached
+            broken = SimJob("broken", netlist, params={"stub_fail": 1})
+            run_batch([broken], os.path.join(tmp, "run3"), simulator=STUB_SIMULATOR, cache=cache)
+            again = run_batch([broken], os.path.join(tmp, "run4"), simulator=STUB_SIMULATOR, cache=cache)
+            assert again.results[0].status == "failed" and not again.results[0].cached
+
+            # Size bound: keep only what fits, least recently used first out
+            small = SimulationCache(os.path.join(tmp, "small"), max_bytes=1)
+            run_batch(jobs, os.path.join(tmp, "run5"), simulator=STUB_SIMULATOR, cache=small)
+            stats = small.stats()
+            print(stats)
+            assert stats.entries == 0 and stats.evictions == 2 and stats.bytes == 0
+            assert cache.evict(cache.stats().bytes - 1) == 1 and cache.stats().entries == 1
+            print("✓ Failed runs not cached, eviction keeps the size bound")
+            cache.close()
+            small.close()
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - simulation cache works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test for the sizing to layout bridge. Snaps gm/Id sized widths to legal
+GilbertMixerInterdigited parameters (checked against the constructor), then
+builds a few candidates over a process pool and checks the area, pins and
+parasitics attached to each row, deduplication and resuming from the
+output directory.
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../Gilbert_mixer_intedigited'))
+
+if __name__ == "__main__":
+    try:
+        from glayout import gf180
+        from Gilbert_mixer_interdigited import GilbertMixerInterdigited
+        from sizing import build_candidate, build_gilbert_candidates, snap_gilbert_sizes
+        from sweep import get_cell_cache
+
+        print("SIZING TO LAYOUT TEST")
+        print("="*60)
+
+        # Widths as explore_gilbert reports them for the notebook point and neighbours
+        candidates = [
+            {"width_rf": 6.41, "width_lo": 6.33, "l": 0.28, "nf_db": 16.0},
+            {"width_rf": 6.2, "width_lo": 6.1, "l": 0.28, "nf_db": 16.5},  # snaps to the same layout
+            {"width_rf": 37.0, "width_lo": 23.7, "l": 0.5},
+            {"width_rf": 2.0, "width_lo": 2.0, "l": 0.1},  # below the minimum length
+        ]
+        rows = snap_gilbert_sizes(gf180, candidates, max_fingers=6, max_finger_width=8.0)
+        assert [row["legal"] for row in rows] == [True, True, True, False]
+        assert rows[3]["illegal"] == ["LENGTH_BELOW_MIN"]
+        assert rows[0]["layout"] == rows[1]["layout"] and rows[0]["nf_db"] == 16.0
+        for row in rows[:3]:
+            layout = row["layout"]
+            assert layout["lo_width"] % layout["lo_fingers"] == 0 and layout["rf_width"] % layout["rf_fingers"] == 0
+            assert layout["lo_width"] / layout["lo_fingers"] <= 8.0 and layout["rf_width"] <= 8.0
+            rf_total = layout["rf_width"] * layout["rf_fingers"]
+            assert math.isclose(abs(rf_total / row["width_rf"] - 1), row["rf_width_error"])
+            assert math.isclose(abs(layout["lo_width"] / row["width_lo"] - 1), row["lo_width_error"])
+            assert row["rf_width_error"] < 0.1 and row["lo_width_error"] < 0.1
+            GilbertMixerInterdigited(gf180, **layout)
+            print(f"  W_rf {row['width_rf']:5.2f} -> {layout['rf_fingers']} x {layout['rf_width']:g}, "
+                  f"W_lo {row['width_lo']:5.2f} -> {layout['lo_width']:g} / {layout['lo_fingers']}")
+        assert rows[2]["layout"]["rf_length"] == 0.5
+        print("✓ Widths snapped to finger multiples the constructor accepts, illegal rows flagged")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "layouts")
+            built = []
+            start = time.perf_counter()
+            rows = build_gilbert_candidates(candidates, output_dir=output, processes=2, max_fingers=6,
+                                            max_finger_width=8.0, progress=built.append)
+            elapsed = time.perf_counter() - start
+            assert len(built) == 2, "identical layouts built more than once"
+            assert [row["layout_status"] for row in rows] == ["done", "done", "done", "illegal"]
+            for row in rows[:3]:
+                assert row["layout_error"] is None and row["area"] > 0 and os.path.isfile(row["gds_path"])
+                assert {"V_RF", "V_RF_b", "V_LO", "V_LO_b", "V_out_p", "V_out_n", "VSS"} <= set(row["pins"])
+                assert row["parasitics"]["V_RF"]["capacitance"] > 0 and row["parasitics"]["V_LO"]["resistance"] > 0
+            assert rows[2]["area"] > rows[0]["area"]
+            for row in rows[::2][:2]:
+                print(f"  area {row['area']:8.1f} um^2, V_RF {row['pins']['V_RF']}, "
+                      f"C(V_LO) {row['parasitics']['V_LO']['capacitance']:.2f} fF")
+            print(f"✓ {len(built)} layouts built in {elapsed:.1f} s, area, pins and parasitics attached")
+
+            start = time.perf_counter()
+            again = build_gilbert_candidates(candidates, output_dir=output, processes=2, max_fingers=6,
+                                             max_finger_width=8.0)
+            assert time.perf_counter() - start < 5 and again == rows
+            print("✓ Rerun reads the finished layouts back instead of building them")
+
+            caches = []
+            serial = build_gilbert_candidates(candidates[:1], output_dir=output, processes=1, max_fingers=6,
+                                              max_finger_width=8.0, cell_cache_entries=64,
+                                              progress=lambda result: caches.append(get_cell_cache()))
+            assert serial[0]["area"] == rows[0]["area"]
+            assert caches[0].max_entries == 64 and get_cell_cache() is None
+            print("✓ Serial builds bound the @cell cache while they run")
+
+            bad = {"lo_width": 5.0, "lo_fingers": 2, "rf_width": 4.0, "rf_fingers": 2}
+            failed = build_candidate("gf180", bad, output)
+            assert failed["status"] == "failed" and "multiple of fingers" in failed["error"]
+            assert len(os.listdir(output)) == 2, "failed build stored"  # the two layouts built above
+            print("✓ Failed builds are not stored, a resumed batch tries them again")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - sized candidates become layouts")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test for the SPICE subcircuit index. Indexes the padring pad library and the
+extracted asig_5p0 pad, checks instances, nets and parameters, reloads the
+saved index and checks that a changed include makes it stale. A small deck
+covers continuations, quoted expressions, .lib sections and .control blocks.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+PADRING_DIR = os.path.join(os.path.dirname(__file__), '../../design_padring/Chipathon2025_pads_xschem')
+PADS = [os.path.join(PADRING_DIR, name) for name in
+        ("gf180mcu_fd_io.spice", "gf180mcu_fd_io__asig_5p0_extracted.spice")]
+
+DECK = """* deck
+.lib models.lib tt
+.include cells.spice
+.param vdd = 3.3
+X1 out in vdd 0 inv wp='2 * 1u' m=2
++ wn=1u
+V1 vdd 0 {vdd}
+R1 out 0 10k
+.control
+tran 1n 1u
+.endc
+.end
+X2 never parsed inv
+"""
+
+MODELS = """.lib tt
+.model nch nmos (level=1)
+.endl
+.lib ff
+.model nch_ff nmos (level=1)
+.endl
+"""
+
+CELLS = """.subckt inv y a vdd vss wp=1u wn=0.5u
+M1 y a vdd vdd pch w=wp l=0.28u
+M2 y a vss vss nch w=wn l=0.28u $ pull down
+.ends
+"""
+
+
+if __name__ == "__main__":
+    try:
+        from simulation import SpiceIndex, load_index, spice_number
+
+        print("SPICE INDEX TEST")
+        print("="*60)
+
+        index = SpiceIndex.build(PADS)
+        print(index)
+        assert len(index) == 15 and not index.missing
+        pad = index["GF180MCU_FD_IO__BI_24T"]
+        assert pad.ports == ("A", "CS", "DVDD", "DVSS", "IE", "OE", "PAD", "PD", "PU", "SL", "VDD", "VSS", "Y")
+        x4 = pad.instance("X4")
+        assert x4.nodes == ("n43", "n32", "DVSS", "DVSS") and x4.ref == "nfet_06v0"
+        assert x4.params["sd"] == "520e-9" and x4.params["par"] == "1"  # from the second continuation line
+        extracted = index["gf180mcu_fd_io__asig_5p0_extracted"]
+        counts = index.device_counts(extracted.name)
+        assert (counts[("r", "")], counts[("c", "")], counts[("l", "")]) == (18853, 419, 514)
+        assert extracted.instances[0].params["value"] == "7.57208f" and len(extracted.nets) > 10000
+        assert index.device_counts("gf180mcu_fd_io__asig_5p0")[("x", "cap_nmos_06v0")] == 36
+        print(f"✓ {sum(len(s) for s in index)} instances in {len(index)} subcircuits, "
+              f"parsed in {index.elapsed * 1e3:.0f} ms")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pads.npz")
+            index.save(path)
+            loaded = SpiceIndex.load(path)
+            assert loaded.elapsed < 1.0, f"reload took {loaded.elapsed:.2f} s"
+            assert loaded.names == index.names and loaded.sources == index.sources
+            assert all(loaded[name] == index[name] for name in index.names)
+            print(f"✓ Reloaded {os.path.getsize(path) / 2**20:.1f} MB index in {loaded.elapsed * 1e3:.1f} ms "
+                  f"({index.elapsed / loaded.elapsed:.0f}x faster than parsing)")
+
+            for name, text in (("deck.spice", DECK), ("models.lib", MODELS), ("cells.spice", CELLS)):
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(text)
+            deck = os.path.join(tmp, "deck.spice")
+            cache = os.path.join(tmp, "deck.npz")
+            small = load_index(deck, cache)
+            assert small.models == {"nch": "nmos"}  # only the referenced section
+            top = small.top
+            assert [i.name for i in top.instances] == ["X1", "V1", "R1"]
+            x1 = top.instance("x1")
+            assert x1.params == {"wp": "'2 * 1u'", "m": "2", "wn": "1u"} and x1.ref == "inv"
+            assert top.params == {"vdd": "3.3"} and top.instance("V1").params == {"value": "{vdd}"}
+            assert small["inv"].params == {"wp": "1u", "wn": "0.5u"} and small["inv"].ports == ("y", "a", "vdd", "vss")
+            assert small.device_counts("") == {("m", "pch"): 2, ("m", "nch"): 2, ("v", ""): 1, ("r", ""): 1}
+            assert spice_number("10k") == 1e4 and spice_number("0.28u") == 0.28e-6 and spice_number("1meg") == 1e6
+            print("✓ Continuations, quoted expressions, .lib sections and .control blocks handled")
+
+            saved = os.stat(cache).st_mtime_ns
+            assert load_index(deck, cache) is not None and os.stat(cache).st_mtime_ns == saved
+            with open(os.path.join(tmp, "cells.spice"), "a") as f:
+                f.write(".subckt buf y a\n.ends\n")
+            assert small.stale()
+            rebuilt = load_index(deck, cache)
+            assert "buf" in rebuilt and not rebuilt.stale() and os.stat(cache).st_mtime_ns != saved
+            print("✓ Saved index reused until an included file changes")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - SPICE index works")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
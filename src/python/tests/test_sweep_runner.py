@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test for the resumable sweep runner.
+Runs a small CmirrorWithDecap sweep over a process pool into a SQLite store,
+simulates a crash by resetting points to pending, resumes it and extracts
+the area vs. routing multiplier Pareto front.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the src/python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+
+if __name__ == "__main__":
+    try:
+        from sweep import SweepStore, run_sweep
+
+        print("SWEEP RUNNER TEST")
+        print("="*60)
+
+        grid = {
+            "width_ref": [6.0],
+            "width_mir": [2.0],
+            "fingers_ref": [6],
+            "fingers_mir": [2, 6],  # 6/6 cannot be interdigitated and fails
+            "cmirror_config.sd_rmult": [1, 2],
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sweeps.sqlite")
+            with SweepStore(path) as store:
+                progress = run_sweep(store, "cmirror", "cmirror", grid, output_dir=os.path.join(tmp, "gds"),
+                                     processes=2)
+                print(f"✓ {progress}")
+                assert progress.counts == {"done": 2, "failed": 2}, progress.counts
+                for row in store.results("cmirror"):
+                    assert row["area"] > 0 and row["port_count"] > 0 and row["build_time"] > 0
+                    assert os.path.isfile(row["gds_path"]), "GDS artifact missing"
+                assert all(row["params"]["fingers_mir"] == 6 for row in store.results("cmirror", "failed"))
+
+                # Crash while building point 1: it never got its result row
+                store._db.execute("UPDATE points SET status='pending' WHERE sweep='cmirror' AND point=1")
+                store._db.commit()
+
+            with SweepStore(path) as store:
+                progress = run_sweep(store, "cmirror", processes=1)
+                assert progress.built == 1 and progress.failed == 0, progress
+                assert run_sweep(store, "cmirror").built == 0, "finished sweep built points again"
+                print(f"✓ Resumed: {progress}")
+
+                try:
+                    store.create_sweep("cmirror", "cmirror", dict(grid, width_ref=[7.0]))
+                    raise AssertionError("grid change of an existing sweep not detected")
+                except ValueError:
+                    print("✓ Changed grid for an existing sweep rejected")
+
+                front = store.pareto("cmirror")
+                assert front and all(b["area"] > a["area"] and b["rmult"] > a["rmult"]
+                                     for a, b in zip(front, front[1:]))
+                for row in front:
+                    print(f"  Pareto: area {row['area']:.2f} rmult {row['rmult']} {row['params']}")
+
+        print("\n" + "="*60)
+        print("TEST COMPLETED - sweep results survive restarts")
+        print("="*60)
+
+    except ImportError as e:
+        print(f"✗ Import error: {e}")
+        print("Make sure glayout and dependencies are installed")
+        sys.exit(1)
+    except Exception as e:
+        print(f"✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)